@@ -1,9 +1,11 @@
 from django import forms
-from django.core.exceptions import ValidationError
 from .models import Agendamento
 
 
 class AgendamentoForm(forms.ModelForm):
+    # conflito de horário é checado na reserva (services_reserva.reservar),
+    # dentro do lock do dia e considerando a duração do serviço
+
     # garante input date/time com formatos
     data = forms.DateField(
         input_formats=["%Y-%m-%d", "%d/%m/%Y"],
@@ -27,23 +29,3 @@ class AgendamentoForm(forms.ModelForm):
             "email": forms.EmailInput(attrs={"class": "form-control"}),
             "servico": forms.Select(attrs={"class": "form-select"}),
         }
-
-    def clean(self):
-        cleaned = super().clean()
-        data = cleaned.get("data")
-        hora = cleaned.get("hora")
-
-        if not data or not hora:
-            return cleaned
-
-        # ✅ 1 agendamento por horário NO GERAL
-        qs = Agendamento.objects.filter(data=data, hora=hora)
-
-        # se for edição, ignora o próprio registro
-        if self.instance and self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.exists():
-            raise ValidationError("Esse horário já está ocupado. Escolha outro horário.")
-
-        return cleaned
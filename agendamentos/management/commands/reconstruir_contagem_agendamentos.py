@@ -0,0 +1,56 @@
+# agendamentos/management/commands/reconstruir_contagem_agendamentos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from agendamentos.services_contagem import reconstruir_contagem
+from core.models import Empresa
+
+
+class Command(BaseCommand):
+    help = "Reconstrói/verifica a ContagemDiariaAgendamento a partir dos agendamentos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empresa",
+            type=int,
+            default=None,
+            help="ID da empresa (padrão: todas).",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Só verifica e lista divergências, sem gravar nada.",
+        )
+
+    def handle(self, *args, **opts):
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if empresa is None:
+                raise CommandError(f"Empresa {opts['empresa']} não encontrada.")
+
+        verificar = opts["verificar"]
+        divergencias = reconstruir_contagem(empresa=empresa, corrigir=not verificar)
+
+        for d in divergencias[:50]:
+            self.stdout.write(
+                f"- empresa={d['empresa_id']} {d['dia']} "
+                f"gravado={d['gravado']} calculado={d['calculado']}"
+            )
+        if len(divergencias) > 50:
+            self.stdout.write(f"  ... e mais {len(divergencias) - 50}")
+
+        if not divergencias:
+            self.stdout.write(
+                self.style.SUCCESS("✅ Contagem diária consistente com os agendamentos.")
+            )
+        elif verificar:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {len(divergencias)} dia(s) divergente(s). "
+                    "Rode sem --verificar para corrigir."
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {len(divergencias)} dia(s) da contagem corrigido(s).")
+            )
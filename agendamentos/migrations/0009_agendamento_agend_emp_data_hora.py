@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agendamentos', '0008_agendamento_empresa'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agendamento',
+            index=models.Index(fields=['empresa', 'data', 'hora'], name='agend_emp_data_hora'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+CAMPOS = {"agendado": "agendados", "concluido": "concluidos", "cancelado": "cancelados"}
+
+
+def popular_contagem(apps, schema_editor):
+    Agendamento = apps.get_model("agendamentos", "Agendamento")
+    ContagemDiariaAgendamento = apps.get_model("agendamentos", "ContagemDiariaAgendamento")
+    db = schema_editor.connection.alias
+
+    rows = (
+        Agendamento.objects.using(db)
+        .filter(status__in=CAMPOS)
+        .order_by()
+        .values("empresa_id", "data", "status")
+        .annotate(n=Count("id"))
+    )
+
+    dias = {}
+    for r in rows:
+        chave = (r["empresa_id"], r["data"])
+        obj = dias.get(chave)
+        if obj is None:
+            obj = dias[chave] = ContagemDiariaAgendamento(empresa_id=chave[0], dia=chave[1])
+        setattr(obj, CAMPOS[r["status"]], r["n"])
+
+    ContagemDiariaAgendamento.objects.using(db).bulk_create(list(dias.values()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('agendamentos', '0009_agendamento_agend_emp_data_hora'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContagemDiariaAgendamento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('agendados', models.IntegerField(default=0)),
+                ('concluidos', models.IntegerField(default=0)),
+                ('cancelados', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contagens_agendamento', to='core.empresa')),
+            ],
+            options={
+                'verbose_name': 'Contagem diária de agendamentos',
+                'verbose_name_plural': 'Contagens diárias de agendamentos',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='contagemdiariaagendamento',
+            constraint=models.UniqueConstraint(fields=('empresa', 'dia'), name='uniq_contagem_agend_emp_dia'),
+        ),
+        # popula com os agendamentos que já existem
+        migrations.RunPython(popular_contagem, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 
 from servicos.models import Servico
 from core.models import Empresa
@@ -34,6 +35,90 @@ class Agendamento(models.Model):
         default="agendado",
     )
 
+    CAMPOS_CONTAGEM = ("empresa_id", "data", "status")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["empresa", "data", "hora"], name="agend_emp_data_hora"),
+        ]
+
     def __str__(self):
         pet = self.pet_nome or "(sem pet)"
         return f"{pet} - {self.servico.nome} em {self.data} às {self.hora}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        # como estava no banco: o post_save tira este status da contagem diária
+        # (com .only()/.defer() o pre_save busca de novo)
+        if set(cls.CAMPOS_CONTAGEM) <= set(field_names):
+            obj._contagem_original = obj.chave_contagem()
+        return obj
+
+    def chave_contagem(self):
+        """
+        (empresa_id, dia, status) deste agendamento na ContagemDiariaAgendamento,
+        ou None se faltar empresa/data ou o status não for contado.
+        """
+        if not self.empresa_id or not self.data:
+            return None
+        if self.status not in ContagemDiariaAgendamento.CAMPOS:
+            return None
+        return (self.empresa_id, self.data, self.status)
+
+
+class ContagemDiariaAgendamento(models.Model):
+    """
+    Quantos agendamentos de cada status a empresa tem em cada dia (data do
+    agendamento). Mantida a cada Agendamento salvo/apagado
+    (agendamentos/signals.py): os dashboards somam dias, não agendamentos.
+    queryset.update()/bulk_create não disparam signal: depois deles rode
+    `python manage.py reconstruir_contagem_agendamentos`.
+    """
+
+    # status -> coluna
+    CAMPOS = {"agendado": "agendados", "concluido": "concluidos", "cancelado": "cancelados"}
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="contagens_agendamento",
+    )
+    dia = models.DateField()
+    agendados = models.IntegerField(default=0)
+    concluidos = models.IntegerField(default=0)
+    cancelados = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Contagem diária de agendamentos"
+        verbose_name_plural = "Contagens diárias de agendamentos"
+        constraints = [
+            models.UniqueConstraint(fields=["empresa", "dia"], name="uniq_contagem_agend_emp_dia"),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.dia}: {self.agendados} agendados, {self.concluidos} concluídos, "
+            f"{self.cancelados} cancelados"
+        )
+
+    @classmethod
+    def aplicar_delta(cls, chave, quantidade):
+        """
+        Soma `quantidade` na coluna do status da linha (empresa_id, dia), de
+        forma atômica (UPDATE ... SET col = col + n). Cria a linha no primeiro
+        agendamento do dia.
+        """
+        if chave is None or not quantidade:
+            return
+
+        empresa_id, dia, status = chave
+        filtros = {"empresa_id": empresa_id, "dia": dia}
+        campo = cls.CAMPOS[status]
+        novos = {campo: F(campo) + quantidade}
+        if not cls.objects.filter(**filtros).update(**novos):
+            if quantidade < 0:
+                return  # nada a desfazer (contagem ainda não montada / empresa sendo apagada)
+            # INSERT ... ON CONFLICT DO NOTHING: seguro com agendamento concorrente
+            cls.objects.bulk_create([cls(**filtros)], ignore_conflicts=True)
+            cls.objects.filter(**filtros).update(**novos)
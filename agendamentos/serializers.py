@@ -1,9 +1,19 @@
 from rest_framework import serializers
 
 from .models import Agendamento
+from .services_reserva import HorarioIndisponivel, reservar
 
 
 class AgendamentoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Agendamento
         fields = "__all__"
+
+    def create(self, validated_data):
+        # mesma reserva atômica das views (lock por empresa/dia + sobreposição)
+        dados = dict(validated_data)
+        empresa, servico = dados.pop("empresa"), dados.pop("servico")
+        try:
+            return reservar(empresa.pk, servico, dados.pop("data"), dados.pop("hora"), **dados)
+        except HorarioIndisponivel as exc:
+            raise serializers.ValidationError({"hora": [str(exc)]})
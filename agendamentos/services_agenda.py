@@ -0,0 +1,72 @@
+# agendamentos/services_agenda.py
+"""
+Agenda (dia/semana) da empresa para a recepção: agendamentos com nome, preço
+e duração do serviço numa query só (values(), sem instanciar modelos).
+
+A ETag sai da versão da agenda (core.services_empresa.versao_empresa, escopo
+"agenda"), que sobe a cada Agendamento gravado/apagado e a cada Servico
+alterado (agendamentos/signals.py). Com o cache quente, conferir If-None-Match
+não toca no banco: a tela pode consultar a cada poucos segundos.
+"""
+from datetime import datetime, timedelta
+
+from core.services_empresa import versao_empresa
+
+from .models import Agendamento
+from .services_disponibilidade import DURACAO_PADRAO, ESCOPO_VERSAO
+
+VISOES = ("dia", "semana")
+
+CAMPOS = (
+    "id", "data", "hora", "nome", "pet_nome", "telefone", "status",
+    "servico_id", "servico__nome", "servico__preco", "servico__duracao",
+)
+
+
+def periodo(dia, visao="dia"):
+    """
+    (inicio, fim) inclusive: o próprio dia, ou a semana (segunda a domingo) que o contém.
+    """
+    if visao == "semana":
+        inicio = dia - timedelta(days=dia.weekday())
+        return inicio, inicio + timedelta(days=6)
+    return dia, dia
+
+
+def etag(empresa_id, inicio, fim):
+    versao = versao_empresa(empresa_id, ESCOPO_VERSAO)
+    return f'"agenda-{empresa_id}-{versao}-{inicio:%Y%m%d}-{fim:%Y%m%d}"'
+
+
+def _item(linha):
+    duracao = linha["servico__duracao"] or DURACAO_PADRAO
+    fim = datetime.combine(linha["data"], linha["hora"]) + duracao
+    return {
+        "id": linha["id"],
+        "hora": linha["hora"].strftime("%H:%M"),
+        "fim": fim.strftime("%H:%M") if fim.date() == linha["data"] else "23:59",
+        "nome": linha["nome"],
+        "pet_nome": linha["pet_nome"] or "",
+        "telefone": linha["telefone"] or "",
+        "status": linha["status"],
+        "servico_id": linha["servico_id"],
+        "servico": linha["servico__nome"],
+        "preco": float(linha["servico__preco"] or 0),
+        "duracao_min": int(duracao.total_seconds() // 60),
+    }
+
+
+def agenda(empresa_id, inicio, fim):
+    """
+    {dia: [item, ...]} de inicio a fim (inclusive), todos os dias presentes
+    (dia vazio = []), itens por hora. Cancelados entram (com status).
+    """
+    dias = {inicio + timedelta(days=i): [] for i in range((fim - inicio).days + 1)}
+    linhas = (
+        Agendamento.objects.filter(empresa_id=empresa_id, data__gte=inicio, data__lte=fim)
+        .order_by("data", "hora", "id")
+        .values(*CAMPOS)
+    )
+    for linha in linhas:
+        dias[linha["data"]].append(_item(linha))
+    return dias
@@ -0,0 +1,125 @@
+# agendamentos/services_contagem.py
+"""
+Leitura e conferência da ContagemDiariaAgendamento (mantida pelos signals em
+agendamentos/signals.py). Dashboards somam linhas por dia, não agendamentos.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Agendamento, ContagemDiariaAgendamento
+
+COLUNAS = tuple(ContagemDiariaAgendamento.CAMPOS.values())
+
+
+def _base(empresa_id=None, inicio=None, fim=None):
+    qs = ContagemDiariaAgendamento.objects.all()
+    if empresa_id is not None:
+        qs = qs.filter(empresa_id=empresa_id)
+    if inicio is not None:
+        qs = qs.filter(dia__gte=inicio)
+    if fim is not None:
+        qs = qs.filter(dia__lte=fim)
+    return qs
+
+
+def totais_por_status(empresa_id=None, inicio=None, fim=None):
+    """
+    {"agendado": n, "concluido": n, "cancelado": n} no período (inclusive).
+    empresa_id=None soma todas as empresas.
+    """
+    somas = _base(empresa_id, inicio, fim).aggregate(**{c: Sum(c) for c in COLUNAS})
+    return {status: somas[c] or 0 for status, c in ContagemDiariaAgendamento.CAMPOS.items()}
+
+
+def painel(empresa_id=None, inicio=None, fim=None):
+    """
+    Dados dos dashboards numa query só (agrupada por mês):
+        {"contagem_status": [{"status", "total"}, ...],   # só status com total > 0
+         "evolucao_mensal": [{"mes": date, "total"}, ...]}
+    """
+    meses = (
+        _base(empresa_id, inicio, fim)
+        .annotate(mes=TruncMonth("dia"))
+        .values("mes")
+        .annotate(**{c: Sum(c) for c in COLUNAS})
+        .order_by("mes")
+    )
+
+    totais = dict.fromkeys(ContagemDiariaAgendamento.CAMPOS, 0)
+    evolucao = []
+    for m in meses:
+        for status, coluna in ContagemDiariaAgendamento.CAMPOS.items():
+            totais[status] += m[coluna] or 0
+        total = sum(m[c] or 0 for c in COLUNAS)
+        if total:
+            evolucao.append({"mes": m["mes"], "total": total})
+
+    return {
+        "contagem_status": [{"status": s, "total": n} for s, n in totais.items() if n],
+        "evolucao_mensal": evolucao,
+    }
+
+
+@transaction.atomic
+def reconstruir_contagem(empresa=None, corrigir=True):
+    """
+    Compara a ContagemDiariaAgendamento com a contagem dos agendamentos e
+    (opcionalmente) corrige. Mesmo esquema do financeiro.services_resumo.reconstruir_resumo.
+
+    Retorna lista de divergências:
+        [{"empresa_id", "dia", "gravado", "calculado"}, ...]
+    onde gravado/calculado são (agendados, concluidos, cancelados) ou None.
+    """
+    gravados_qs = ContagemDiariaAgendamento.objects.select_for_update()
+    agendamentos = Agendamento.objects.filter(status__in=ContagemDiariaAgendamento.CAMPOS)
+    if empresa is not None:
+        gravados_qs = gravados_qs.filter(empresa=empresa)
+        agendamentos = agendamentos.filter(empresa=empresa)
+
+    gravados = {(r.empresa_id, r.dia): r for r in gravados_qs}
+    calculados = {}
+    for r in agendamentos.values("empresa_id", "data", "status").annotate(n=Count("id")).order_by():
+        linha = calculados.setdefault((r["empresa_id"], r["data"]), dict.fromkeys(COLUNAS, 0))
+        linha[ContagemDiariaAgendamento.CAMPOS[r["status"]]] = r["n"]
+    calculados = {k: tuple(v[c] for c in COLUNAS) for k, v in calculados.items()}
+
+    zerada = (0,) * len(COLUNAS)
+    divergencias = []
+    novos, alterados, vazios = [], [], []
+    for chave in set(gravados) | set(calculados):
+        obj = gravados.get(chave)
+        gravado = tuple(getattr(obj, c) for c in COLUNAS) if obj else None
+        calculado = calculados.get(chave)
+
+        if gravado == calculado:
+            continue
+        if calculado is None and gravado == zerada:
+            vazios.append(obj.pk)  # dia zerado por exclusões: só limpa
+            continue
+
+        divergencias.append(
+            {"empresa_id": chave[0], "dia": chave[1], "gravado": gravado, "calculado": calculado}
+        )
+        if calculado is None:
+            vazios.append(obj.pk)
+        elif obj is None:
+            novos.append(
+                ContagemDiariaAgendamento(
+                    empresa_id=chave[0], dia=chave[1], **dict(zip(COLUNAS, calculado))
+                )
+            )
+        else:
+            for coluna, valor in zip(COLUNAS, calculado):
+                setattr(obj, coluna, valor)
+            alterados.append(obj)
+
+    if corrigir:
+        if vazios:
+            ContagemDiariaAgendamento.objects.filter(pk__in=vazios).delete()
+        if novos:
+            ContagemDiariaAgendamento.objects.bulk_create(novos, batch_size=1000)
+        if alterados:
+            ContagemDiariaAgendamento.objects.bulk_update(alterados, COLUNAS, batch_size=1000)
+
+    return divergencias
@@ -0,0 +1,123 @@
+# agendamentos/services_disponibilidade.py
+"""
+Disponibilidade da agenda por empresa.
+
+Cada dia vira um bitmap (int) de slots de SLOT_MINUTOS: o bit i é o slot que
+começa em i * SLOT_MINUTOS minutos depois da meia-noite. Um agendamento marca
+os bits de `hora` até `hora + Servico.duracao` (cancelados não ocupam).
+"Cabe o serviço X às HH:MM" é um AND com a máscara da duração.
+
+Os bitmaps ficam no cache por (empresa, versão da agenda, dia). A versão sobe
+a cada Agendamento gravado/apagado (agendamentos/signals.py), então o cache
+vale até a agenda mudar. Dias fora do cache saem numa query só.
+"""
+import math
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core.services_empresa import versao_empresa
+
+from .models import Agendamento
+
+SLOT_MINUTOS = 5
+SLOTS_POR_DIA = 24 * 60 // SLOT_MINUTOS
+DURACAO_PADRAO = timedelta(minutes=30)  # serviço sem duração cadastrada
+STATUS_SEM_OCUPACAO = ("cancelado",)
+ESCOPO_VERSAO = "agenda"  # core.services_empresa.versao_empresa(..., escopo)
+TIMEOUT_CACHE = 60 * 60 * 24
+
+
+def slot_da_hora(hora):
+    return (hora.hour * 60 + hora.minute) // SLOT_MINUTOS
+
+
+def hora_do_slot(slot):
+    minutos = slot * SLOT_MINUTOS
+    return time(minutos // 60, minutos % 60)
+
+
+def slots_da_duracao(duracao):
+    minutos = (duracao or DURACAO_PADRAO).total_seconds() / 60
+    return max(1, math.ceil(minutos / SLOT_MINUTOS))
+
+
+def mascara(inicio, quantidade):
+    # agendamento que passa da meia-noite é cortado no fim do dia
+    fim = min(inicio + quantidade, SLOTS_POR_DIA)
+    return ((1 << (fim - inicio)) - 1) << inicio
+
+
+def _expediente():
+    """
+    (primeiro slot, slot de fechamento) do dia: settings.AGENDA_ABERTURA /
+    AGENDA_FECHAMENTO ("HH:MM"), padrão 08:00–18:00.
+    """
+    abre = time.fromisoformat(getattr(settings, "AGENDA_ABERTURA", "08:00"))
+    fecha = time.fromisoformat(getattr(settings, "AGENDA_FECHAMENTO", "18:00"))
+    return slot_da_hora(abre), slot_da_hora(fecha)
+
+
+def _chave(empresa_id, versao, dia):
+    return f"agendamentos:ocupacao:{empresa_id}:{versao}:{dia.isoformat()}"
+
+
+def ocupacao(empresa_id, inicio, fim):
+    """
+    {dia: bitmap} de inicio a fim (inclusive); dia livre = 0.
+    """
+    versao = versao_empresa(empresa_id, ESCOPO_VERSAO)
+    dias = [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+    chaves = {_chave(empresa_id, versao, d): d for d in dias}
+
+    mapa = {chaves[k]: bitmap for k, bitmap in cache.get_many(list(chaves)).items()}
+    faltando = [d for d in dias if d not in mapa]
+    if faltando:
+        novos = dict.fromkeys(faltando, 0)
+        linhas = (
+            Agendamento.objects.filter(
+                empresa_id=empresa_id, data__gte=faltando[0], data__lte=faltando[-1]
+            )
+            .exclude(status__in=STATUS_SEM_OCUPACAO)
+            .values_list("data", "hora", "servico__duracao")
+        )
+        for dia, hora, duracao in linhas:
+            if dia in novos:
+                novos[dia] |= mascara(slot_da_hora(hora), slots_da_duracao(duracao))
+        cache.set_many({_chave(empresa_id, versao, d): b for d, b in novos.items()}, TIMEOUT_CACHE)
+        mapa.update(novos)
+    return mapa
+
+
+def horarios_livres(empresa_id, servico, inicio=None, dias=7, agora=None):
+    """
+    {dia: [time, ...]} com os horários de início em que `servico` cabe inteiro
+    dentro do expediente, sem encostar em outro agendamento, de inicio até
+    inicio + dias - 1. Horários que já passaram (hoje) não entram.
+    Intervalo entre opções: settings.AGENDA_INTERVALO_MINUTOS (padrão 15).
+    """
+    agora = agora or timezone.localtime()
+    hoje = agora.date()
+    inicio = inicio or hoje
+    fim = inicio + timedelta(days=max(dias, 1) - 1)
+
+    precisa = slots_da_duracao(servico.duracao)
+    abre, fecha = _expediente()
+    passo = max(1, getattr(settings, "AGENDA_INTERVALO_MINUTOS", 15) // SLOT_MINUTOS)
+    slot_agora = math.ceil((agora.hour * 60 + agora.minute + agora.second / 60) / SLOT_MINUTOS)
+
+    livres = {}
+    for dia, bitmap in sorted(ocupacao(empresa_id, inicio, fim).items()):
+        if dia < hoje:
+            livres[dia] = []
+            continue
+        opcoes = []
+        for slot in range(abre, fecha - precisa + 1, passo):
+            if dia == hoje and slot < slot_agora:
+                continue
+            if not bitmap & mascara(slot, precisa):
+                opcoes.append(hora_do_slot(slot))
+        livres[dia] = opcoes
+    return livres
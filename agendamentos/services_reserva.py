@@ -0,0 +1,97 @@
+# agendamentos/services_reserva.py
+"""
+Reserva de horário sem corrida: dois clientes no mesmo horário ao mesmo
+tempo não conseguem os dois.
+
+reservar() abre uma transação, pega um advisory lock do PostgreSQL por
+(empresa, dia) — pg_advisory_xact_lock, solto sozinho no COMMIT/ROLLBACK —,
+confere sobreposição com os agendamentos do dia (uma query) e só então
+grava. Reservas de dias ou empresas diferentes não se esperam; no mesmo dia
+a fila dura uma SELECT + um INSERT.
+
+Conflito vira HorarioIndisponivel, sempre com o mesmo texto e o agendamento
+que ocupa o horário (quem chegou primeiro fica com ele).
+"""
+from datetime import time
+
+from django.db import connection, transaction
+
+from .models import Agendamento
+from .services_disponibilidade import (
+    SLOTS_POR_DIA,
+    STATUS_SEM_OCUPACAO,
+    hora_do_slot,
+    mascara,
+    slot_da_hora,
+    slots_da_duracao,
+)
+
+
+class HorarioIndisponivel(Exception):
+    """
+    O serviço não cabe no horário pedido. `conflito`: dict do agendamento que
+    ocupa o horário (id, nome, pet_nome, telefone, servico_id, hora, fim).
+    """
+
+    def __init__(self, conflito):
+        self.conflito = conflito
+        super().__init__(
+            f"Horário indisponível: conflita com outro agendamento das "
+            f"{conflito['hora']:%H:%M} às {conflito['fim']:%H:%M}."
+        )
+
+
+def _travar_dia(empresa_id, dia):
+    # forma de duas chaves int4: (empresa, dia) não colide com locks de uma chave bigint
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [empresa_id, dia.toordinal()])
+
+
+def primeiro_conflito(empresa_id, servico, dia, hora):
+    """
+    Agendamento do dia que sobrepõe `servico` às `hora` (dict), ou None.
+    Lê do banco (não do cache): é a checagem que vale dentro do lock.
+    """
+    inicio = slot_da_hora(hora)
+    pedido = mascara(inicio, slots_da_duracao(servico.duracao))
+    qs = (
+        Agendamento.objects.filter(empresa_id=empresa_id, data=dia)
+        .exclude(status__in=STATUS_SEM_OCUPACAO)
+        .order_by("hora", "id")
+    )
+    campos = ("id", "nome", "pet_nome", "telefone", "servico_id", "hora", "servico__duracao")
+    for ag in qs.values(*campos):
+        n = slots_da_duracao(ag.pop("servico__duracao"))
+        slot = slot_da_hora(ag["hora"])
+        if pedido & mascara(slot, n):
+            ag["fim"] = hora_do_slot(slot + n) if slot + n < SLOTS_POR_DIA else time(23, 59)
+            return ag
+    return None
+
+
+def reservar(empresa_id, servico, data, hora, **campos):
+    """
+    Cria o Agendamento se o horário estiver livre; senão HorarioIndisponivel.
+    `campos`: nome, pet_nome, email, telefone...
+    """
+    with transaction.atomic():
+        _travar_dia(empresa_id, data)
+        conflito = primeiro_conflito(empresa_id, servico, data, hora)
+        if conflito is not None:
+            raise HorarioIndisponivel(conflito)
+        return Agendamento.objects.create(
+            empresa_id=empresa_id, servico=servico, data=data, hora=hora, **campos
+        )
+
+
+def eh_duplicado(conflito, nome, telefone, servico, hora, pet_nome=None):
+    """
+    O conflito é o mesmo pedido enviado duas vezes (duplo clique / reenvio)?
+    """
+    return (
+        conflito["nome"] == nome
+        and (conflito["telefone"] or "") == (telefone or "")
+        and (conflito["pet_nome"] or "") == (pet_nome or "")
+        and conflito["servico_id"] == servico.pk
+        and conflito["hora"] == hora
+    )
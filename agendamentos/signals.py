@@ -0,0 +1,56 @@
+# agendamentos/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.services_empresa import invalidar_respostas_empresa
+from servicos.models import Servico
+
+from .models import Agendamento, ContagemDiariaAgendamento
+from .services_disponibilidade import ESCOPO_VERSAO
+
+
+@receiver(post_save, sender=Agendamento)
+@receiver(post_delete, sender=Agendamento)
+def invalidar_agenda(sender, instance, **kwargs):
+    # bitmaps de ocupação em cache (services_disponibilidade) expiram com a versão
+    invalidar_respostas_empresa(instance.empresa_id, ESCOPO_VERSAO)
+
+
+@receiver(post_save, sender=Servico)
+def invalidar_agendas_do_servico(sender, instance, created, **kwargs):
+    # duração mudou: toda empresa que tem o serviço na agenda recalcula
+    if created:
+        return
+    empresas = Agendamento.objects.filter(servico=instance).values_list("empresa_id", flat=True)
+    for empresa_id in empresas.distinct():
+        invalidar_respostas_empresa(empresa_id, ESCOPO_VERSAO)
+
+
+@receiver(pre_save, sender=Agendamento)
+def guardar_contagem_original(sender, instance, **kwargs):
+    """
+    Update de instância que não veio inteira do banco (.only(), pk montado à mão):
+    busca o status antigo para o post_save conseguir desfazer na contagem.
+    """
+    if instance._state.adding or hasattr(instance, "_contagem_original"):
+        return
+    antigo = Agendamento.objects.filter(pk=instance.pk).only(*Agendamento.CAMPOS_CONTAGEM).first()
+    instance._contagem_original = antigo.chave_contagem() if antigo else None
+
+
+@receiver(post_save, sender=Agendamento)
+def atualizar_contagem_agendamento_salvo(sender, instance, created, **kwargs):
+    # status/dia mudou: sai da coluna antiga e entra na nova, na mesma transação
+    antiga = None if created else getattr(instance, "_contagem_original", None)
+    nova = instance.chave_contagem()
+    if antiga == nova:
+        return
+    ContagemDiariaAgendamento.aplicar_delta(antiga, -1)
+    ContagemDiariaAgendamento.aplicar_delta(nova, 1)
+    instance._contagem_original = nova
+
+
+@receiver(post_delete, sender=Agendamento)
+def atualizar_contagem_agendamento_apagado(sender, instance, **kwargs):
+    chave = getattr(instance, "_contagem_original", None) or instance.chave_contagem()
+    ContagemDiariaAgendamento.aplicar_delta(chave, -1)
@@ -23,6 +23,8 @@ urlpatterns = [
     path("api/agendar/", views.criar_agendamento, name="criar_agendamento"),
     path("api/agendamentos/", views.AgendamentoCreateView.as_view(), name="agendamento_create"),
     path("dashboard/hoje/", views.dashboard_hoje, name="dashboard_hoje"),
+    path("api/agenda/", views.agenda, name="agenda"),
     path("acao/<int:id>/", views.acao_agendamento, name="acao_agendamento"),
     path("horarios-ocupados/", views.horarios_ocupados, name="horarios_ocupados"),
+    path("horarios-livres/", views.horarios_livres, name="horarios_livres"),
 ]
@@ -6,28 +6,35 @@ from django.apps import apps
 from django.conf import settings
 from django.contrib import messages
 from django.core.mail import send_mail
-from django.db.models import Count
-from django.db.models.functions import TruncMonth
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_POST
-from django.views.decorators.http import require_GET
+from django.views.decorators.http import condition, require_GET
 from rest_framework import generics
+from django.utils.dateparse import parse_date, parse_time
 from django.utils.timezone import localdate
 
 from django.contrib.auth.decorators import login_required
+from core import esquema
 from core.decorators import bloquear_demo
 
 
 
+from . import services_agenda as agenda_svc
+from . import services_contagem as contagem_svc
+from . import services_disponibilidade as disponibilidade
 from .forms import AgendamentoForm
 from .models import Agendamento, Servico
 from .serializers import AgendamentoSerializer
+from .services_reserva import HorarioIndisponivel, eh_duplicado, reservar
 from django.shortcuts import get_object_or_404
 import json
 
 logger = logging.getLogger(__name__)
 
+MAX_DIAS_DISPONIBILIDADE = 31
+
 
 class AgendamentoCreateView(generics.CreateAPIView):
     queryset = Agendamento.objects.all()
@@ -45,26 +52,33 @@ def agendar(request):
         if form.is_valid():
             cd = form.cleaned_data
 
-            # ✅ Anti-duplicado (evita 2 POSTs iguais)
-            ja_existe = Agendamento.objects.filter(
-                nome=cd.get("nome"),
-                pet_nome=cd.get("pet_nome"),
-                telefone=cd.get("telefone"),
-                servico=cd.get("servico"),
-                data=cd.get("data"),
-                hora=cd.get("hora"),
-            ).exists()
-
-            if ja_existe:
-                messages.warning(request, "Esse agendamento já existe. Duplicado evitado ✅")
-                return redirect("agendamentos:agendamento_sucesso")
-
-            # ✅ Salva só se não existir
-            agendamento = form.save(commit=False)
-            agendamento.empresa = request.user.perfil.empresa
-            agendamento.save()
-            form.save_m2m()
-
+            empresa_id = _empresa_da_agenda(request)
+            if not empresa_id:
+                form.add_error(None, "Empresa não identificada para o agendamento.")
+                return render(request, "agendamentos/agendar.html", {"form": form})
+
+            # ✅ Reserva atômica: lock por (empresa, dia) + checagem de sobreposição
+            try:
+                agendamento = reservar(
+                    empresa_id,
+                    cd["servico"],
+                    cd["data"],
+                    cd["hora"],
+                    nome=cd.get("nome"),
+                    pet_nome=cd.get("pet_nome"),
+                    telefone=cd.get("telefone"),
+                    email=cd.get("email"),
+                )
+            except HorarioIndisponivel as exc:
+                # ✅ Anti-duplicado (evita 2 POSTs iguais)
+                if eh_duplicado(
+                    exc.conflito, cd.get("nome"), cd.get("telefone"), cd["servico"], cd["hora"],
+                    pet_nome=cd.get("pet_nome"),
+                ):
+                    messages.warning(request, "Esse agendamento já existe. Duplicado evitado ✅")
+                    return redirect("agendamentos:agendamento_sucesso")
+                form.add_error("hora", str(exc))
+                return render(request, "agendamentos/agendar.html", {"form": form}, status=409)
 
             # ✅ Monta mensagem
             assunto = "Confirmação de Agendamento - Spaço da Jhuséna"
@@ -118,12 +132,8 @@ def listar_agendamentos(request):
     else:
         agendamentos = Agendamento.objects.all().order_by("-data", "-hora")
 
-    contagem = {
-        "agendado": Agendamento.objects.filter(status="agendado").count(),
-        "pendente": Agendamento.objects.filter(status="pendente").count(),
-        "concluido": Agendamento.objects.filter(status="concluido").count(),
-        "cancelado": Agendamento.objects.filter(status="cancelado").count(),
-    }
+    # uma query na contagem diária (não há mais status "pendente": fica 0 no template)
+    contagem = {"pendente": 0, **contagem_svc.totais_por_status(_empresa_id(request))}
 
     return render(
         request,
@@ -148,81 +158,47 @@ def cancelar_agendamento(request, id):
     return redirect("agendamentos:listar_agendamentos")
 
 
-def dashboard_agendamentos(request):
-    data_inicio = request.GET.get("data_inicio")
-    data_fim = request.GET.get("data_fim")
+def _empresa_id(request):
+    # empresa do usuário logado; sem empresa (admin/anônimo) soma todas
+    empresa = getattr(request, "empresa", None) or None
+    return empresa.pk if empresa is not None else None
 
-    agendamentos_qs = Agendamento.objects.all()
 
-    if data_inicio:
+def _periodo_dashboard(request):
+    """
+    (data_inicio, data_fim) do GET como date; inválida/ausente vira None.
+    """
+    datas = []
+    for campo in ("data_inicio", "data_fim"):
         try:
-            data_inicio_obj = datetime.strptime(data_inicio, "%Y-%m-%d")
-            agendamentos_qs = agendamentos_qs.filter(data__gte=data_inicio_obj)
+            datas.append(datetime.strptime(request.GET.get(campo) or "", "%Y-%m-%d").date())
         except ValueError:
-            pass
+            datas.append(None)
+    return tuple(datas)
 
-    if data_fim:
-        try:
-            data_fim_obj = datetime.strptime(data_fim, "%Y-%m-%d")
-            agendamentos_qs = agendamentos_qs.filter(data__lte=data_fim_obj)
-        except ValueError:
-            pass
-
-    contagem_status = agendamentos_qs.values("status").annotate(total=Count("id"))
-    evolucao_mensal = (
-        agendamentos_qs.annotate(mes=TruncMonth("data"))
-        .values("mes")
-        .annotate(total=Count("id"))
-        .order_by("mes")
-    )
+
+def dashboard_agendamentos(request):
+    data_inicio, data_fim = _periodo_dashboard(request)
+    dados = contagem_svc.painel(_empresa_id(request), data_inicio, data_fim)
 
     context = {
-        "contagem_status": list(contagem_status),
-        "evolucao_mensal": list(evolucao_mensal),
-        "data_inicio": data_inicio or "",
-        "data_fim": data_fim or "",
+        "contagem_status": dados["contagem_status"],
+        "evolucao_mensal": dados["evolucao_mensal"],
+        "data_inicio": request.GET.get("data_inicio") or "",
+        "data_fim": request.GET.get("data_fim") or "",
     }
 
     return render(request, "agendamentos/dashboard.html", context)
 
 
 def dashboard_dados_ajax(request):
-    data_inicio = request.GET.get("data_inicio")
-    data_fim = request.GET.get("data_fim")
-
-    agendamentos_qs = Agendamento.objects.all()
-
-    if data_inicio:
-        try:
-            data_inicio_obj = datetime.strptime(data_inicio, "%Y-%m-%d")
-            agendamentos_qs = agendamentos_qs.filter(data__gte=data_inicio_obj)
-        except ValueError:
-            pass
+    data_inicio, data_fim = _periodo_dashboard(request)
+    dados = contagem_svc.painel(_empresa_id(request), data_inicio, data_fim)
 
-    if data_fim:
-        try:
-            data_fim_obj = datetime.strptime(data_fim, "%Y-%m-%d")
-            agendamentos_qs = agendamentos_qs.filter(data__lte=data_fim_obj)
-        except ValueError:
-            pass
-
-    contagem_status = list(agendamentos_qs.values("status").annotate(total=Count("id")))
-    evolucao_mensal = list(
-        agendamentos_qs.annotate(mes=TruncMonth("data"))
-        .values("mes")
-        .annotate(total=Count("id"))
-        .order_by("mes")
-    )
-
-    for item in evolucao_mensal:
+    for item in dados["evolucao_mensal"]:
         item["mes"] = item["mes"].strftime("%Y-%m")
 
-    return JsonResponse(
-        {
-            "contagem_status": contagem_status,
-            "evolucao_mensal": evolucao_mensal,
-        }
-    )
+    return JsonResponse(dados)
 
 
 @login_required
@@ -247,48 +223,131 @@ def criar_agendamento(request):
     except Servico.DoesNotExist:
         return JsonResponse({"erro": "Serviço não encontrado."}, status=400)
 
-    ag = Agendamento.objects.create(
-        nome=data["nomeTutor"],
-        pet_nome =data["nomePet"],
-        telefone=data["telefone"],
-        email=data["email"],
-        servico=servico_obj,
-        data=data["data"],
-        hora=data["hora"],
-    )
+    dia = parse_date(str(data["data"]))
+    hora = parse_time(str(data["hora"]))
+    if dia is None or hora is None:
+        return JsonResponse({"erro": "Data/hora inválidas (YYYY-MM-DD / HH:MM)."}, status=400)
+
+    empresa_id = _empresa_da_agenda(request)
+    if not empresa_id:
+        return JsonResponse({"erro": "Usuário sem empresa vinculada."}, status=400)
+
+    try:
+        ag = reservar(
+            empresa_id,
+            servico_obj,
+            dia,
+            hora,
+            nome=data["nomeTutor"],
+            pet_nome=data["nomePet"],
+            telefone=data["telefone"],
+            email=data["email"],
+        )
+    except HorarioIndisponivel as exc:
+        conflito = exc.conflito
+        return JsonResponse(
+            {
+                "erro": str(exc),
+                "conflito": {
+                    "id": conflito["id"],
+                    "hora": conflito["hora"].strftime("%H:%M"),
+                    "fim": conflito["fim"].strftime("%H:%M"),
+                },
+            },
+            status=409,
+        )
 
     return JsonResponse({"mensagem": "Agendamento salvo com sucesso!", "id": ag.id}, status=201)
 
 
+def _periodo_agenda(request):
+    """
+    (inicio, fim) pedido em ?data=YYYY-MM-DD (padrão hoje) e ?visao=dia|semana;
+    None se inválido.
+    """
+    visao = request.GET.get("visao") or "dia"
+    try:
+        dia = parse_date(request.GET["data"]) if request.GET.get("data") else localdate()
+    except ValueError:  # formato certo, data inexistente (2026-02-30)
+        dia = None
+    if dia is None or visao not in agenda_svc.VISOES:
+        return None
+    return agenda_svc.periodo(dia, visao)
+
+
+def _etag_agenda(request, *args, **kwargs):
+    empresa_id = _empresa_id(request)
+    periodo = _periodo_agenda(request)
+    if empresa_id is None or periodo is None:
+        return None
+    return agenda_svc.etag(empresa_id, *periodo)
+
+
+def _etag_hoje(request, *args, **kwargs):
+    empresa_id = _empresa_id(request)
+    if empresa_id is None:
+        return None
+    return agenda_svc.etag(empresa_id, localdate(), localdate())
+
+
+def _revalidar_sempre(response):
+    # o navegador guarda a resposta, mas pergunta de novo (If-None-Match) a cada consulta
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @login_required
+@require_GET
+@condition(etag_func=_etag_hoje)
 def dashboard_hoje(request):
+    """
+    Agendamentos de hoje da empresa do usuário (card "Hoje" do dashboard).
+    Mesmos itens da api/agenda/; usuário sem empresa recebe lista vazia.
+    """
+    empresa_id = _empresa_id(request)
+    if empresa_id is None:
+        return JsonResponse({"itens": []})
+
     hoje = localdate()
+    itens = agenda_svc.agenda(empresa_id, hoje, hoje)[hoje]
+    return _revalidar_sempre(JsonResponse({"data": hoje.isoformat(), "itens": itens}))
 
-    # campo de data é DateField
-    campo_data = "data"  # ajuste se o nome for outro
 
-    qs = (
-        Agendamento.objects
-        .filter(**{campo_data: hoje})
-        .order_by(campo_data)
-    )
+@login_required
+@require_GET
+@condition(etag_func=_etag_agenda)
+def agenda(request):
+    """
+    GET ?data=YYYY-MM-DD&visao=dia|semana — agenda da empresa do usuário:
+
+      {"ok": true, "inicio": "2026-10-19", "fim": "2026-10-25",
+       "dias": {"2026-10-19": [{"id", "hora", "fim", "nome", "pet_nome", "telefone",
+                                "status", "servico_id", "servico", "preco", "duracao_min"}, ...]}}
+
+    Responde com ETag; If-None-Match igual devolve 304 sem consultar agendamentos.
+    """
+    empresa_id = _empresa_id(request)
+    if empresa_id is None:
+        return JsonResponse({"ok": False, "erro": "Usuário sem empresa vinculada."}, status=400)
+    periodo = _periodo_agenda(request)
+    if periodo is None:
+        return JsonResponse(
+            {"ok": False, "erro": "Use data=YYYY-MM-DD e visao=dia ou semana."}, status=400
+        )
 
-    itens = []
-    for a in qs:
-        itens.append(
+    inicio, fim = periodo
+    dias = agenda_svc.agenda(empresa_id, inicio, fim)
+    return _revalidar_sempre(
+        JsonResponse(
             {
-                "id": a.id,
-                "hora": "",  # DateField não tem hora
-                "pet_nome": getattr(a, "pet_nome", "") or getattr(a, "tutor", ""),
-                "servico": str(getattr(a, "servico", "")),
-                "nome": getattr(a, "pet", "") or getattr(a, "pet_nome", ""),
-                "status": a.status,
+                "ok": True,
+                "inicio": inicio.isoformat(),
+                "fim": fim.isoformat(),
+                "dias": {d.isoformat(): itens for d, itens in dias.items()},
             }
         )
+    )
 
-    return JsonResponse({"itens": itens})
-   
-   
 
 @login_required
 @require_POST
@@ -348,13 +407,72 @@ def acao_agendamento(request, id):
 
 
 
+def _empresa_da_agenda(request):
+    """
+    Empresa do usuário logado; na página pública, ?empresa=<id>.
+    """
+    empresa = getattr(request, "empresa", None) or None
+    if empresa is not None:
+        return empresa.pk
+    try:
+        return int(request.GET.get("empresa") or 0) or None
+    except ValueError:
+        return None
+
+
+@require_GET
+def horarios_livres(request):
+    """
+    GET /agendamentos/horarios-livres/?servico=<id>&inicio=YYYY-MM-DD&dias=14
+    Horários de início em que o serviço cabe (pela duração), dia a dia:
+      {"ok": true, "duracao_min": 40, "dias": {"2026-10-20": ["08:00", "08:15", ...]}}
+    Os bitmaps de ocupação ficam em cache até a agenda mudar: trocar de data
+    na página não volta ao banco.
+    """
+    empresa_id = _empresa_da_agenda(request)
+    if not empresa_id:
+        return JsonResponse({"ok": False, "erro": "empresa obrigatória"}, status=400)
+
+    servicos = Servico.objects.all()
+    # catálogo hoje é único; se Servico ganhar empresa, só os da agenda valem
+    if esquema.tem_campo(Servico, "empresa"):
+        servicos = servicos.filter(empresa_id=empresa_id)
+    servico = servicos.filter(pk=request.GET.get("servico") or 0).first()
+    if servico is None:
+        return JsonResponse({"ok": False, "erro": "serviço obrigatório"}, status=400)
+
+    inicio = parse_date(request.GET.get("inicio") or "") or localdate()
+    try:
+        dias = min(max(int(request.GET.get("dias", 14)), 1), MAX_DIAS_DISPONIBILIDADE)
+    except ValueError:
+        dias = 14
+
+    livres = disponibilidade.horarios_livres(empresa_id, servico, inicio=inicio, dias=dias)
+    return JsonResponse(
+        {
+            "ok": True,
+            "servico": servico.pk,
+            "duracao_min": disponibilidade.slots_da_duracao(servico.duracao)
+            * disponibilidade.SLOT_MINUTOS,
+            "dias": {
+                dia.isoformat(): [h.strftime("%H:%M") for h in horas]
+                for dia, horas in livres.items()
+            },
+        }
+    )
+
+
 @require_GET
 def horarios_ocupados(request):
     data = request.GET.get("data")  # "YYYY-MM-DD"
     if not data:
         return JsonResponse({"ok": False, "erro": "data obrigatória"}, status=400)
 
-    qs = Agendamento.objects.filter(data=data).values_list("hora", flat=True)
+    qs = Agendamento.objects.filter(data=data)
+    empresa_id = _empresa_da_agenda(request)
+    if empresa_id:
+        qs = qs.filter(empresa_id=empresa_id)
+    qs = qs.values_list("hora", flat=True)
 
     # retorna "HH:MM"
     ocupados = [h.strftime("%H:%M") for h in qs if h]
@@ -129,6 +129,7 @@ INSTALLED_APPS = [
 LOGIN_URL = "/admin/login/"
 
 MIDDLEWARE = [
+    "core.middleware.MetricasRequestMiddleware",  # primeiro: mede o request inteiro
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # precisa estar aqui
     "corsheaders.middleware.CorsMiddleware",
@@ -136,6 +137,7 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.EmpresaRequestMiddleware",  # request.empresa (depois do auth)
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -199,6 +201,37 @@ else:
     }
 
 
+# =========================
+# Cache
+# =========================
+# O cache guarda a versão dos dados de cada empresa (core.services_empresa) e
+# precisa ser COMPARTILHADO entre os workers: com locmem cada processo tem a sua
+# versão e um worker segue servindo resposta velha depois que outro gravou.
+#   REDIS_URL=redis://...   -> Redis (requer o pacote "redis")
+#   CACHE_BACKEND/LOCATION  -> qualquer backend do Django
+#   ENV=prod (sem os dois)  -> tabela no banco, criada no migrate (core/apps.py)
+#   dev/testes              -> locmem (um processo só)
+# locmem com ENV=prod ou WEB_CONCURRENCY > 1 acusa no check (core/checks.py).
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    _CACHE_PADRAO = ("django.core.cache.backends.redis.RedisCache", REDIS_URL)
+elif ENV == "prod":
+    _CACHE_PADRAO = ("django.core.cache.backends.db.DatabaseCache", "core_cache")
+else:
+    _CACHE_PADRAO = ("django.core.cache.backends.locmem.LocMemCache", "spaco-da-jhusena")
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", _CACHE_PADRAO[0]),
+        "LOCATION": os.getenv("CACHE_LOCATION", _CACHE_PADRAO[1]),
+    }
+}
+
+# JSON dos dashboards em cache por empresa (core.decorators.cache_por_empresa).
+# Invalidado pela versão da empresa; o timeout só limita dado alterado sem signal.
+CACHE_RESPOSTAS_TIMEOUT = int(os.getenv("CACHE_RESPOSTAS_TIMEOUT", 300))
+
+
 
 # =========================
 # Password validation
@@ -282,9 +315,14 @@ LOGGING = {
     "loggers": {
         "django": {"handlers": ["console"], "level": "INFO"},
         "financeiro": {"handlers": ["console"], "level": "DEBUG"},
+        "core.metricas": {"handlers": ["console"], "level": "INFO", "propagate": False},
     },
 }
 
+# Métricas por request (core.middleware / /metrics): avisa quando a mesma
+# forma de query se repete mais que isso num request só (N+1)
+METRICAS_LIMITE_REPETICAO = int(os.getenv("METRICAS_LIMITE_REPETICAO", 10))
+
 
 # =========================
 # Integrações externas (via ENV)
@@ -295,3 +333,11 @@ TELEGRAM_CHAT_ID_DEFAULT = os.getenv("TELEGRAM_CHAT_ID_DEFAULT", "6126423440")
 WHATSAPP_CLOUD_TOKEN = os.getenv("WHATSAPP_CLOUD_TOKEN", "")
 WHATSAPP_PHONE_ID = os.getenv("WHATSAPP_PHONE_ID", "")
 WHATSAPP_TO_DEFAULT = os.getenv("WHATSAPP_TO_DEFAULT", "")
+
+# Fila de notificações (notificacoes/outbox.py + manage.py processar_notificacoes)
+NOTIF_MAX_TENTATIVAS = int(os.getenv("NOTIF_MAX_TENTATIVAS", 5))
+NOTIF_BACKOFF_BASE = float(os.getenv("NOTIF_BACKOFF_BASE", 30))  # segundos; dobra a cada falha
+NOTIF_BACKOFF_MAX = float(os.getenv("NOTIF_BACKOFF_MAX", 3600))
+NOTIF_WORKERS = int(os.getenv("NOTIF_WORKERS", 8))
+# mensagens por segundo por canal (Telegram aceita ~30/s por bot)
+NOTIF_LIMITE_POR_CANAL = {"telegram": 25, "whatsapp": 20}
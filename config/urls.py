@@ -20,8 +20,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import include, path
 
+from core.views import exportar_colunar, metricas
+
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metricas, name="metricas"),
+    path("export/colunar/<str:fonte>/", exportar_colunar, name="exportar_colunar"),
     # Módulos primeiro
     path("agendamentos/", include(("agendamentos.urls", "agendamentos"), namespace="agendamentos")),
     path("estoque/", include(("estoque.urls", "estoque"), namespace="estoque")),
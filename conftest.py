@@ -14,3 +14,24 @@ os.environ.setdefault("EMAIL_BACKEND", "django.core.mail.backends.console.EmailB
 #     def __contains__(self, item): return True
 #     def __getitem__(self, item): return None
 # settings.MIGRATION_MODULES = DisableMigrations()
+
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _sequencia_empresa(django_db_setup, django_db_blocker):
+    """
+    A migração estoque.0004 cria Empresa(id=1) sem avançar a sequence: o
+    primeiro Empresa.objects.create() dos testes colidiria com ela. Acerta uma
+    vez no banco de teste (o setval não volta no rollback dos TestCase).
+    """
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    from core.models import Empresa
+
+    with django_db_blocker.unblock():
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Empresa]):
+                cursor.execute(sql)
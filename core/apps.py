@@ -1,5 +1,13 @@
 # core/apps.py
 from django.apps import AppConfig
+from django.core.management import call_command
+from django.db.models.signals import post_migrate
+
+
+def _criar_tabela_cache(sender, using, **kwargs):
+    # DatabaseCache (padrão em produção, config/settings.py): a tabela sai do
+    # próprio migrate. Com outros backends o comando não faz nada.
+    call_command("createcachetable", database=using, verbosity=0)
 
 
 class CoreConfig(AppConfig):
@@ -7,4 +15,9 @@ class CoreConfig(AppConfig):
     name = "core"
 
     def ready(self):
-        from . import signals  # noqa
+        from . import checks, esquema, signals  # noqa
+
+        post_migrate.connect(_criar_tabela_cache, sender=self)
+
+        # mapa de campos dos models: as views não olham _meta por request
+        esquema.carregar()
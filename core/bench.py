@@ -0,0 +1,370 @@
+# core/bench.py
+"""
+Massa de dados sintética e determinística para benchmark.
+
+Mesmos volumes + mesma semente + mesma data_base => mesmo conjunto de dados.
+Tudo entra via bulk_create em blocos (chunk). Signals não disparam: os saldos
+materializados (SaldoProduto / SaldoLote) são calculados aqui e gravados junto.
+
+Os dados ficam nas empresas "bench-N" e no usuário "bench"; `limpar()` apaga
+só isso.
+"""
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+from agendamentos.models import Agendamento, ContagemDiariaAgendamento
+from agendamentos.services_contagem import reconstruir_contagem
+from core.models import Empresa, Perfil
+from core.services_empresa import invalidar_empresa_usuario
+from estoque.models import (
+    LoteProduto,
+    MovimentoEstoque,
+    MovimentoEstoqueArquivo,
+    Produto,
+    SaldoLote,
+    SaldoProduto,
+    SnapshotEstoque,
+)
+from financeiro.models import (
+    HistoricoIA,
+    RecomendacaoIA,
+    ResumoDiarioFinanceiro,
+    SerieMensalFinanceira,
+    Transacao,
+    normalizar_tipo_ia,
+)
+from financeiro.services_resumo import reconstruir_resumo
+from pdv.models import OverrideLoteVencido, Venda, VendaItem
+from servicos.models import Servico
+
+PREFIXO_CODIGO = "bench-"
+USUARIO = "bench"
+
+VOLUMES_PADRAO = {
+    "empresas": 5,
+    "produtos": 250,
+    "lotes": 5_000,
+    "movimentos": 100_000,
+    "vendas": 20_000,
+    "transacoes": 100_000,
+    "agendamentos": 10_000,
+    "historico_ia": 2_000,
+}
+
+CATEGORIAS = ["Ração", "Banho e tosa", "Aluguel", "Fornecedores", "Energia", "Marketing", "Outros"]
+
+
+@contextmanager
+def _sem_auto_now(*campos):
+    """
+    bulk_create respeita auto_now_add e sobrescreveria as datas geradas.
+    """
+    originais = [(c, c.auto_now_add) for c in campos]
+    for c, _ in originais:
+        c.auto_now_add = False
+    try:
+        yield
+    finally:
+        for c, valor in originais:
+            c.auto_now_add = valor
+
+
+def _em_blocos(gerador, tamanho):
+    bloco = []
+    for obj in gerador:
+        bloco.append(obj)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+def _campo(model, nome):
+    return model._meta.get_field(nome)
+
+
+def limpar():
+    """
+    Apaga a massa das empresas bench-* (e o histórico de IA do usuário bench).
+    DELETE "cru", sem signals: o saldo materializado some junto.
+    Retorna o total de linhas apagadas.
+    """
+    empresas = list(
+        Empresa.objects.filter(codigo__startswith=PREFIXO_CODIGO).values_list("id", flat=True)
+    )
+
+    querysets = [
+        VendaItem.objects.filter(vendas__empresa_id__in=empresas),
+        OverrideLoteVencido.objects.filter(empresa_id__in=empresas),
+        Venda.objects.filter(empresa_id__in=empresas),
+        Transacao.objects.filter(empresa_id__in=empresas),
+        ResumoDiarioFinanceiro.objects.filter(empresa_id__in=empresas),
+        SerieMensalFinanceira.objects.filter(empresa_id__in=empresas),
+        Agendamento.objects.filter(empresa_id__in=empresas),
+        ContagemDiariaAgendamento.objects.filter(empresa_id__in=empresas),
+        MovimentoEstoque.objects.filter(empresa_id__in=empresas),
+        MovimentoEstoqueArquivo.objects.filter(empresa_id__in=empresas),
+        SnapshotEstoque.objects.filter(empresa_id__in=empresas),
+        SaldoLote.objects.filter(empresa_id__in=empresas),
+        SaldoProduto.objects.filter(empresa_id__in=empresas),
+        LoteProduto.objects.filter(empresa_id__in=empresas),
+        Produto.objects.filter(empresa_id__in=empresas),
+        HistoricoIA.objects.filter(usuario__username=USUARIO),
+        RecomendacaoIA.objects.filter(usuario__username=USUARIO),
+    ]
+
+    total = 0
+    for qs in querysets:
+        total += qs._raw_delete(qs.db)
+    return total
+
+
+def semear(volumes=None, semente=42, data_base=None, chunk=5000):
+    """
+    Gera a massa com os `volumes` (ver VOLUMES_PADRAO), distribuída entre as
+    empresas bench-N. Chame `limpar()` antes para ter sempre o mesmo resultado.
+
+    - produtos/vendas/transações/agendamentos: round-robin pelas empresas
+    - lotes: round-robin pelos produtos (1 em 10 sem validade)
+    - movimentos: round-robin pelos lotes, E, E, S... (lote nunca fica negativo)
+
+    Retorna {"empresas": [ids], "<volume>": linhas_inseridas, ...}.
+    """
+    v = {**VOLUMES_PADRAO, **(volumes or {})}
+    rnd = random.Random(semente)
+    hoje = data_base or timezone.localdate()
+    agora = timezone.make_aware(datetime.combine(hoje, time(12, 0)))
+
+    def _momento(dias):
+        return agora - timedelta(days=rnd.randint(0, dias), minutes=rnd.randint(0, 1439))
+
+    def _slot():
+        k = rnd.randint(0, 19)
+        return time(8 + k // 2, 30 * (k % 2))
+
+    empresas = []
+    for n in range(1, v["empresas"] + 1):
+        empresa, _ = Empresa.objects.get_or_create(
+            codigo=f"{PREFIXO_CODIGO}{n}", defaults={"nome": f"Bench {n}"}
+        )
+        empresas.append(empresa)
+    resultado = {"empresas": [e.id for e in empresas]}
+
+    User = get_user_model()
+    operador, _ = User.objects.get_or_create(username=USUARIO)
+    Perfil.objects.filter(user=operador).update(empresa=empresas[0])
+    invalidar_empresa_usuario(operador.pk)  # update() não dispara signal
+    servico, _ = Servico.objects.get_or_create(
+        nome="Banho (bench)", defaults={"preco": Decimal("50.00")}
+    )
+
+    # ---- produtos
+    produtos = Produto.objects.bulk_create(
+        [
+            Produto(
+                empresa=empresas[i % len(empresas)],
+                nome=f"Produto bench {i:05d}",
+                tipo="PRODUTO",
+                preco_venda=Decimal(rnd.randint(500, 20000)) / 100,
+                controla_estoque=True,
+                estoque_minimo=rnd.randint(0, 10),
+            )
+            for i in range(v["produtos"])
+        ],
+        batch_size=chunk,
+    )
+    produtos_por_empresa = defaultdict(list)
+    for p in produtos:
+        produtos_por_empresa[p.empresa_id].append(p)
+    resultado["produtos"] = len(produtos)
+
+    # ---- lotes
+    lotes = []
+    with _sem_auto_now(_campo(LoteProduto, "criado_em")):
+        for bloco in _em_blocos(
+            (
+                LoteProduto(
+                    empresa_id=produtos[i % len(produtos)].empresa_id,
+                    produto=produtos[i % len(produtos)],
+                    codigo=f"B{i:06d}",
+                    validade=None if i % 10 == 0 else hoje + timedelta(days=rnd.randint(-30, 370)),
+                    criado_em=_momento(730),
+                )
+                for i in range(v["lotes"] if produtos else 0)
+            ),
+            chunk,
+        ):
+            lotes.extend(LoteProduto.objects.bulk_create(bloco))
+    resultado["lotes"] = len(lotes)
+
+    # ---- movimentos (+ saldos calculados em memória)
+    saldo_lote = defaultdict(Decimal)
+    saldo_produto = defaultdict(Decimal)
+
+    def _movimentos():
+        for i in range(v["movimentos"] if lotes else 0):
+            lote = lotes[i % len(lotes)]
+            rodada = i // len(lotes)
+            tipo = "S" if rodada % 3 == 2 else "E"
+            qtd = Decimal(1 + rodada % 5)
+            delta = qtd if tipo == "E" else -qtd
+            saldo_lote[lote.id] += delta
+            saldo_produto[(lote.empresa_id, lote.produto_id)] += delta
+            yield MovimentoEstoque(
+                empresa_id=lote.empresa_id,
+                produto_id=lote.produto_id,
+                lote=lote,
+                tipo=tipo,
+                quantidade=qtd,
+                data=_momento(730),
+                observacao="bench",
+            )
+
+    total = 0
+    with _sem_auto_now(_campo(MovimentoEstoque, "data")):
+        for bloco in _em_blocos(_movimentos(), chunk):
+            MovimentoEstoque.objects.bulk_create(bloco)
+            total += len(bloco)
+    resultado["movimentos"] = total
+
+    SaldoProduto.objects.bulk_create(
+        [SaldoProduto(empresa_id=e, produto_id=p, saldo=s) for (e, p), s in saldo_produto.items()],
+        batch_size=chunk,
+    )
+    por_id = {lote.id: lote for lote in lotes}
+    SaldoLote.objects.bulk_create(
+        [
+            SaldoLote(empresa_id=por_id[lote_id].empresa_id, lote_id=lote_id, saldo=s)
+            for lote_id, s in saldo_lote.items()
+        ],
+        batch_size=chunk,
+    )
+
+    # ---- vendas do PDV (1 item cada; histórico, não baixam estoque)
+    total = 0
+    formas = [f for f, _ in Venda.FORMA_PAGAMENTO_CHOICES]
+    with _sem_auto_now(_campo(Venda, "criado_em")):
+        for bloco in _em_blocos(range(v["vendas"] if produtos else 0), chunk):
+            vendas, itens = [], []
+            for i in bloco:
+                empresa = empresas[i % len(empresas)]
+                opcoes = produtos_por_empresa[empresa.id] or produtos
+                produto = opcoes[rnd.randrange(len(opcoes))]
+                qtd = rnd.randint(1, 3)
+                vendas.append(
+                    Venda(
+                        empresa_id=produto.empresa_id,
+                        operador=operador,
+                        criado_em=_momento(730),
+                        forma_pagamento=formas[rnd.randrange(len(formas))],
+                        total=produto.preco_venda * qtd,
+                    )
+                )
+                itens.append((produto, qtd))
+            Venda.objects.bulk_create(vendas)
+            VendaItem.objects.bulk_create(
+                [
+                    VendaItem(
+                        vendas=venda, produto=produto, qtd=qtd, preco_unit=produto.preco_venda
+                    )
+                    for venda, (produto, qtd) in zip(vendas, itens)
+                ]
+            )
+            total += len(vendas)
+    resultado["vendas"] = total
+
+    # ---- transações
+    total = 0
+    for bloco in _em_blocos(
+        (
+            Transacao(
+                empresa=empresas[i % len(empresas)],
+                tipo="receita" if rnd.random() < 0.55 else "despesa",
+                categoria=CATEGORIAS[rnd.randrange(len(CATEGORIAS))],
+                descricao=f"Lançamento bench {i}",
+                valor=Decimal(rnd.randint(1000, 50000)) / 100,
+                data=hoje - timedelta(days=rnd.randint(0, 730)),
+            )
+            for i in range(v["transacoes"])
+        ),
+        chunk,
+    ):
+        Transacao.objects.bulk_create(bloco)
+        total += len(bloco)
+    resultado["transacoes"] = total
+    # bulk_create não passa pelos signals: resumo diário montado de uma vez
+    for empresa in empresas:
+        reconstruir_resumo(empresa=empresa)
+
+    # ---- agendamentos: 1 ano para trás e 1 mês à frente, slots de 30 min a partir das 08h
+    total = 0
+    status = ["agendado"] * 6 + ["concluido"] * 3 + ["cancelado"]
+    with _sem_auto_now(_campo(Agendamento, "criado_em")):
+        for bloco in _em_blocos(
+            (
+                Agendamento(
+                    empresa=empresas[i % len(empresas)],
+                    nome=f"Tutor {i}",
+                    pet_nome=f"Pet {i}",
+                    email=f"bench{i}@example.com",
+                    data=hoje + timedelta(days=rnd.randint(-365, 30)),
+                    hora=_slot(),
+                    servico=servico,
+                    criado_em=_momento(365),
+                    status=status[rnd.randrange(len(status))],
+                )
+                for i in range(v["agendamentos"])
+            ),
+            chunk,
+        ):
+            Agendamento.objects.bulk_create(bloco)
+            total += len(bloco)
+    resultado["agendamentos"] = total
+    for empresa in empresas:
+        reconstruir_contagem(empresa=empresa)
+
+    # ---- histórico da IA do usuário bench (metade HistoricoIA, metade RecomendacaoIA)
+    tipos_hist = [t for t, _ in HistoricoIA.TIPOS]
+    tipos_rec = [t for t, _ in RecomendacaoIA.TIPO_OPCOES]
+    origens = ["manual", "auto", "lote"]
+    hist, rec = [], []
+    for i in range(v["historico_ia"]):
+        if i % 2:
+            tipo = tipos_rec[rnd.randrange(len(tipos_rec))]
+            texto = f"Recomendação bench {i}"
+            rec.append(
+                RecomendacaoIA(
+                    usuario=operador,
+                    texto=texto,
+                    tipo=tipo,
+                    # bulk_create não chama save()
+                    tipo_normalizado=normalizar_tipo_ia(tipo, texto),
+                    criado_em=_momento(180),
+                )
+            )
+        else:
+            tipo = tipos_hist[rnd.randrange(len(tipos_hist))]
+            origem = origens[rnd.randrange(len(origens))]
+            hist.append(
+                HistoricoIA(
+                    usuario=operador,
+                    texto=f"Dica bench {i}",
+                    tipo=tipo,
+                    tipo_normalizado=normalizar_tipo_ia(tipo, "", origem),
+                    origem=origem,
+                    criado_em=_momento(180),
+                )
+            )
+    with _sem_auto_now(_campo(HistoricoIA, "criado_em"), _campo(RecomendacaoIA, "criado_em")):
+        HistoricoIA.objects.bulk_create(hist, batch_size=chunk)
+        RecomendacaoIA.objects.bulk_create(rec, batch_size=chunk)
+    resultado["historico_ia"] = len(hist) + len(rec)
+
+    return resultado
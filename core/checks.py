@@ -0,0 +1,45 @@
+# core/checks.py
+import os
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+def _workers():
+    try:
+        return int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+
+@register(Tags.caches)
+def cache_compartilhado(app_configs, **kwargs):
+    """
+    A versão dos dados de cada empresa (core.services_empresa) mora no cache:
+    com locmem cada worker tem a sua e as respostas em cache não invalidam
+    entre processos. Vários workers com locmem é erro; produção é aviso.
+    """
+    if settings.CACHES.get("default", {}).get("BACKEND") != LOCMEM:
+        return []
+
+    dica = "Defina REDIS_URL ou CACHE_BACKEND (ex.: django.core.cache.backends.db.DatabaseCache)."
+    if _workers() > 1:
+        return [
+            Error(
+                f"Cache locmem com WEB_CONCURRENCY={_workers()}: cada worker vê uma "
+                "versão diferente dos dados e serve respostas desatualizadas.",
+                hint=dica,
+                id="core.E001",
+            )
+        ]
+    if getattr(settings, "ENV", "dev") == "prod":
+        return [
+            Warning(
+                "Cache locmem em produção: só é seguro com um único processo.",
+                hint=dica,
+                id="core.W001",
+            )
+        ]
+    return []
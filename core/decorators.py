@@ -1,7 +1,16 @@
 # core/decorators.py
-from django.http import JsonResponse
+import hashlib
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.utils import timezone
+
+from core.services_empresa import versao_empresa
 
 def bloquear_demo(view_func):
     def _wrapped(request, *args, **kwargs):
@@ -36,3 +45,52 @@ def bloquear_demo(view_func):
         return view_func(request, *args, **kwargs)
 
     return _wrapped
+
+
+def cache_por_empresa(timeout=None):
+    """
+    Cache da resposta JSON (GET, status 200) por (empresa, versão dos dados,
+    view, querystring normalizada). A versão sobe a cada Transacao/Venda/item
+    gravado (core.services_empresa.invalidar_respostas_empresa), então recarregar
+    o dashboard sem mudança nos dados não roda SQL na view.
+    Sem empresa no request (anônimo / sem perfil) a view roda normal.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            empresa = getattr(request, "empresa", None)
+            if request.method != "GET" or not empresa:
+                return view_func(request, *args, **kwargs)
+
+            params = sorted(
+                (k, sorted(v.strip() for v in vs if v.strip()))
+                for k, vs in request.GET.lists()
+                if k != "_"  # cache-buster do jQuery
+            )
+            # o dia entra na chave: período padrão das views é relativo a hoje
+            assinatura = hashlib.md5(
+                json.dumps([timezone.localdate(), args, kwargs, params], default=str).encode()
+            ).hexdigest()
+            chave = (
+                f"core:resposta:{empresa.pk}:{versao_empresa(empresa.pk)}:"
+                f"{view_func.__module__}.{view_func.__name__}:{assinatura}"
+            )
+
+            guardada = cache.get(chave)
+            if guardada is not None:
+                conteudo, content_type = guardada
+                return HttpResponse(conteudo, content_type=content_type)
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                cache.set(
+                    chave,
+                    (response.content, response["Content-Type"]),
+                    timeout if timeout is not None else settings.CACHE_RESPOSTAS_TIMEOUT,
+                )
+            return response
+
+        return _wrapped
+
+    return decorator
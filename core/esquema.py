@@ -0,0 +1,98 @@
+# core/esquema.py
+"""
+Mapa de campos dos models, montado uma vez no CoreConfig.ready().
+
+Várias views descobrem em runtime como os models se chamam (FK "venda" ou
+"vendas", "qtd" ou "quantidade"...). Em vez de olhar o _meta (ou pior, testar
+com .exists() no banco) a cada request, consultam este mapa.
+"""
+from django.apps import apps
+
+# {"app.model": {nome: field}} — inclui relações reversas (como _meta.get_fields())
+CAMPOS = {}
+# {"app.model": frozenset(nomes)} — só campos concretos (como _meta.fields)
+CONCRETOS = {}
+
+
+def carregar():
+    """
+    Chamado no CoreConfig.ready(), com todos os apps registrados.
+    """
+    CAMPOS.clear()
+    CONCRETOS.clear()
+    for model in apps.get_models():
+        label = model._meta.label_lower
+        CAMPOS[label] = {f.name: f for f in model._meta.get_fields() if hasattr(f, "name")}
+        CONCRETOS[label] = frozenset(f.name for f in model._meta.fields)
+
+
+def _label(model):
+    return model.lower() if isinstance(model, str) else model._meta.label_lower
+
+
+def _campos(model):
+    label = _label(model)
+    if label not in CAMPOS:  # chamado antes do ready() (ex.: import em migração)
+        carregar()
+    return CAMPOS.get(label, {})
+
+
+def campo(model, nome):
+    """
+    O field `nome` do model, ou None.
+    """
+    return _campos(model).get(nome)
+
+
+def tem_campo(model, nome):
+    return nome in _campos(model)
+
+
+def campos_concretos(model):
+    _campos(model)
+    return CONCRETOS.get(_label(model), frozenset())
+
+
+def primeiro_campo(model, candidatos):
+    """
+    Primeiro nome de `candidatos` que existe no model, ou None.
+    """
+    campos = _campos(model)
+    return next((nome for nome in candidatos if nome in campos), None)
+
+
+def caminho_valido(model, caminho):
+    """
+    "venda__empresa" / "venda__data": True se dá para filtrar por esse caminho
+    (cada parte antes da última precisa ser relação).
+    """
+    partes = caminho.split("__")
+    atual = model
+    for i, parte in enumerate(partes):
+        f = campo(atual, parte)
+        if f is None:
+            return False
+        if i < len(partes) - 1:
+            if not f.is_relation or f.related_model is None:
+                return False
+            atual = f.related_model
+    return True
+
+
+def fk_para(model, alvo, candidatos):
+    """
+    Nome do FK de `model` para o model `alvo` entre `candidatos`, ou None.
+    """
+    for nome in candidatos:
+        f = campo(model, nome)
+        if f is not None and f.is_relation and f.related_model is alvo:
+            return nome
+    return None
+
+
+def tipo_interno(model, nome):
+    """
+    get_internal_type() do campo ("DateField", "DateTimeField"...), ou None.
+    """
+    f = campo(model, nome)
+    return f.get_internal_type() if f is not None else None
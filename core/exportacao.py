@@ -0,0 +1,87 @@
+# core/exportacao.py
+"""
+CSV em streaming: as linhas saem do banco (queryset.iterator) direto para a
+resposta, em blocos, sem montar o arquivo inteiro na memória.
+
+    linhas = qs.values_list("id", "data", "valor").iterator(chunk_size=TAMANHO_LOTE)
+    return resposta_csv(request, "receitas", ["id", "data", "valor"], linhas)
+
+?gzip=1 devolve o mesmo CSV comprimido (.csv.gz).
+"""
+import csv
+import zlib
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# linhas por ida ao cursor do banco e por bloco enviado ao cliente
+TAMANHO_LOTE = 2000
+
+BOM = "\ufeff"  # Excel reconhece UTF-8
+
+
+class _Eco:
+    """
+    "Arquivo" que só devolve o que recebeu: o csv.writer formata e a gente
+    junta as linhas num bloco.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def blocos_csv(cabecalho, linhas, delimiter=";", bom=True):
+    """
+    Gera blocos de texto CSV (cabeçalho no primeiro) com até TAMANHO_LOTE linhas.
+    """
+    writer = csv.writer(_Eco(), delimiter=delimiter)
+    yield (BOM if bom else "") + writer.writerow(cabecalho)
+
+    bloco = []
+    for linha in linhas:
+        bloco.append(writer.writerow(linha))
+        if len(bloco) >= TAMANHO_LOTE:
+            yield "".join(bloco)
+            bloco = []
+    if bloco:
+        yield "".join(bloco)
+
+
+def comprimir(blocos, encoding="utf-8"):
+    """
+    gzip incremental dos blocos (não segura o arquivo inteiro).
+    """
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabeçalho gzip
+    for bloco in blocos:
+        dados = z.compress(bloco.encode(encoding))
+        if dados:
+            yield dados
+    yield z.flush()
+
+
+def quer_gzip(request):
+    return (request.GET.get("gzip") or "").strip().lower() in ("1", "true", "sim")
+
+
+def resposta_csv(request, nome_base, cabecalho, linhas, delimiter=";", bom=True, carimbo=True):
+    """
+    StreamingHttpResponse com o CSV de `linhas` (iterável de tuplas).
+    nome_base vira "nome_base_AAAAMMDD_HHMM.csv" (ou .csv.gz com ?gzip=1).
+    """
+    nome = nome_base
+    if carimbo:
+        nome += timezone.localtime().strftime("_%Y%m%d_%H%M")
+    blocos = blocos_csv(cabecalho, linhas, delimiter=delimiter, bom=bom)
+
+    if quer_gzip(request):
+        resp = StreamingHttpResponse(comprimir(blocos), content_type="application/gzip")
+        nome += ".csv.gz"
+    else:
+        resp = StreamingHttpResponse(
+            (b.encode("utf-8") for b in blocos), content_type="text/csv; charset=utf-8"
+        )
+        nome += ".csv"
+
+    resp["Content-Disposition"] = f'attachment; filename="{nome}"'
+    resp["X-Accel-Buffering"] = "no"  # nginx: não segura a resposta até o fim
+    return resp
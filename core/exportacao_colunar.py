@@ -0,0 +1,351 @@
+# core/exportacao_colunar.py
+"""
+Exportação colunar (Parquet ou Arrow IPC) do histórico para o contador/BI.
+
+Fontes: transacoes (financeiro.Transacao), movimentos_estoque
+(estoque.MovimentoEstoque + arquivo) e vendas_itens (pdv.VendaItem).
+Os tipos vêm dos campos do model: DecimalField vira decimal128 com a mesma
+precisão, DateField vira date32 e DateTimeField vira timestamp UTC. Nada
+é convertido para texto.
+
+Incremental por marca d'água: o comando guarda a marca em
+<destino>/<fonte>/_marca*.json e só escreve linhas novas. O endpoint recebe
+?desde=<id> e devolve a nova marca no header X-Marca-Dagua.
+Linha alterada depois de exportada não é reenviada; use --completo.
+
+A marca NÃO é simplesmente o maior id exportado: o id sai da sequence no
+INSERT, mas a linha só aparece no COMMIT. Um checkout demorado pode gravar o
+id 100 depois que o 101 já foi exportado. Por isso a marca para antes do
+primeiro "buraco" entre os últimos JANELA_IDS ids (settings.
+EXPORT_COLUNAR_JANELA_IDS, padrão 1000): o buraco pode ser transação ainda
+aberta. Buraco de rollback/exclusão segura a marca até JANELA_IDS ids novos
+passarem por ele. Consequências:
+- o comando relê a partir da marca e pula os ids que já exportou acima dela
+  (lista guardada no _marca*.json): cada linha sai uma vez só;
+- o endpoint é sem estado: linhas acima da marca podem vir de novo na
+  próxima chamada — quem consome deduplica por id;
+- linha que commita mais de JANELA_IDS ids atrasada ainda se perde; use
+  --completo de tempos em tempos se isso for possível no seu volume.
+
+Particionado (--particionar): <fonte>/empresa=N/mes=AAAA-MM/part-*.parquet
+(layout "hive", lido direto por pyarrow.dataset, DuckDB, Spark...).
+"""
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.ipc  # noqa: F401
+import pyarrow.parquet  # noqa: F401
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from core.exportacao import TAMANHO_LOTE
+
+FORMATOS = {"parquet": ".parquet", "arrow": ".arrow"}
+JANELA_IDS = getattr(settings, "EXPORT_COLUNAR_JANELA_IDS", 1000)
+
+
+@dataclass(frozen=True)
+class Fonte:
+    modelos: tuple  # "app.Model", lidos nessa ordem
+    colunas: tuple  # (nome da coluna, caminho no ORM)
+    empresa: str  # caminho do id da empresa
+    data: str  # caminho da data (partição por mês)
+
+
+FONTES = {
+    "transacoes": Fonte(
+        modelos=("financeiro.Transacao",),
+        colunas=(
+            ("id", "id"),
+            ("empresa_id", "empresa_id"),
+            ("data", "data"),
+            ("tipo", "tipo"),
+            ("categoria", "categoria"),
+            ("descricao", "descricao"),
+            ("valor", "valor"),
+        ),
+        empresa="empresa_id",
+        data="data",
+    ),
+    "movimentos_estoque": Fonte(
+        # arquivo primeiro: mesmo id do movimento original
+        modelos=("estoque.MovimentoEstoqueArquivo", "estoque.MovimentoEstoque"),
+        colunas=(
+            ("id", "id"),
+            ("empresa_id", "empresa_id"),
+            ("produto_id", "produto_id"),
+            ("lote_id", "lote_id"),
+            ("tipo", "tipo"),
+            ("quantidade", "quantidade"),
+            ("data", "data"),
+            ("observacao", "observacao"),
+        ),
+        empresa="empresa_id",
+        data="data",
+    ),
+    "vendas_itens": Fonte(
+        modelos=("pdv.VendaItem",),
+        colunas=(
+            ("id", "id"),
+            ("venda_id", "vendas_id"),
+            ("empresa_id", "vendas__empresa_id"),
+            ("criado_em", "vendas__criado_em"),
+            ("produto_id", "produto_id"),
+            ("qtd", "qtd"),
+            ("preco_unit", "preco_unit"),
+        ),
+        empresa="vendas__empresa_id",
+        data="vendas__criado_em",
+    ),
+}
+
+
+def _campo_do_caminho(model, caminho):
+    """
+    Field final de "vendas__criado_em" / "empresa_id" (FK vira o campo alvo).
+    """
+    partes = caminho.split("__")
+    for parte in partes[:-1]:
+        model = model._meta.get_field(parte).related_model
+    f = model._meta.get_field(partes[-1])  # aceita attname ("empresa_id")
+    return f.target_field if f.is_relation else f
+
+
+def _tipo_arrow(field):
+    tipo = field.get_internal_type()
+    if tipo == "DecimalField":
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if tipo == "DateField":
+        return pa.date32()
+    if tipo == "DateTimeField":
+        return pa.timestamp("us", tz="UTC")
+    if tipo.endswith("IntegerField") or tipo.endswith("AutoField"):
+        return pa.int64()
+    if tipo == "BooleanField":
+        return pa.bool_()
+    if tipo == "FloatField":
+        return pa.float64()
+    return pa.string()
+
+
+def esquema_arrow(fonte):
+    model = apps.get_model(fonte.modelos[-1])
+    return pa.schema(
+        [
+            (nome, _tipo_arrow(_campo_do_caminho(model, caminho)))
+            for nome, caminho in fonte.colunas
+        ]
+    )
+
+
+def _mes(valor):
+    if isinstance(valor, datetime):
+        valor = timezone.localtime(valor)
+    return f"{valor:%Y-%m}"
+
+
+def _linhas(fonte, desde_id=0, empresa_id=None, particionar=False, pular=frozenset()):
+    """
+    Tuplas na ordem de fonte.colunas, lidas com cursor no servidor.
+    Particionado: ordenado por (empresa, data) para escrever uma partição por vez.
+    `pular`: ids acima da marca que já foram exportados.
+    """
+    caminhos = [c for _, c in fonte.colunas]
+    ordem = (fonte.empresa, fonte.data, "id") if particionar else ("id",)
+    for label in fonte.modelos:
+        qs = apps.get_model(label).objects.filter(id__gt=desde_id)
+        if empresa_id:
+            qs = qs.filter(**{fonte.empresa: empresa_id})
+        for linha in qs.order_by(*ordem).values_list(*caminhos).iterator(chunk_size=TAMANHO_LOTE):
+            if linha[0] not in pular:
+                yield linha
+
+
+def marca_segura(fonte, desde_id, ultimo_id):
+    """
+    Marca d'água que não pula linha de transação ainda aberta: o id antes do
+    primeiro buraco entre max(desde_id, ultimo_id - JANELA_IDS) e ultimo_id.
+    Confere a tabela inteira (todas as empresas): buraco de outra empresa
+    também pode ser transação aberta de quem compartilha a sequence.
+    """
+    if ultimo_id <= desde_id:
+        return desde_id
+    piso = max(desde_id, ultimo_id - JANELA_IDS)
+    existentes = set()
+    for label in fonte.modelos:
+        existentes.update(
+            apps.get_model(label)
+            .objects.filter(id__gt=piso, id__lte=ultimo_id)
+            .values_list("id", flat=True)
+        )
+    for id_ in range(piso + 1, ultimo_id + 1):
+        if id_ not in existentes:
+            return id_ - 1
+    return ultimo_id
+
+
+class _Escritor:
+    """
+    Um arquivo de saída (Parquet ou Arrow IPC), escrito em row groups/lotes.
+    """
+
+    def __init__(self, schema, destino, formato):
+        self.schema = schema
+        if formato == "parquet":
+            self._w = pa.parquet.ParquetWriter(destino, schema, compression="zstd")
+        else:
+            self._w = pa.ipc.new_file(destino, schema)
+
+    def escrever(self, linhas):
+        colunas = list(zip(*linhas))
+        arrays = [pa.array(col, type=campo.type) for col, campo in zip(colunas, self.schema)]
+        self._w.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def fechar(self):
+        self._w.close()
+
+
+def escrever_arquivo(fonte, destino, desde_id=0, empresa_id=None, formato="parquet"):
+    """
+    Escreve as linhas com id > desde_id num único arquivo (caminho ou file object).
+    Retorna (linhas, maior id, próxima marca d'água) — ver marca_segura.
+    """
+    escritor = _Escritor(esquema_arrow(fonte), destino, formato)
+    total, ultimo_id = 0, desde_id
+    lote = []
+    try:
+        for linha in _linhas(fonte, desde_id, empresa_id):
+            lote.append(linha)
+            if len(lote) >= TAMANHO_LOTE:
+                escritor.escrever(lote)
+                total += len(lote)
+                ultimo_id = max(ultimo_id, max(linha[0] for linha in lote))
+                lote = []
+        if lote:
+            escritor.escrever(lote)
+            total += len(lote)
+            ultimo_id = max(ultimo_id, max(linha[0] for linha in lote))
+    finally:
+        escritor.fechar()
+    return total, ultimo_id, marca_segura(fonte, desde_id, ultimo_id)
+
+
+def _arquivo_marca(pasta, empresa_id):
+    nome = f"_marca_empresa_{empresa_id}.json" if empresa_id else "_marca.json"
+    return os.path.join(pasta, nome)
+
+
+def ler_marca(pasta, empresa_id=None):
+    """
+    (marca, ids já exportados acima dela). Marca antiga (sem "acima") vale
+    como está, sem reler nada.
+    """
+    try:
+        with open(_arquivo_marca(pasta, empresa_id), encoding="utf-8") as f:
+            dados = json.load(f)
+    except FileNotFoundError:
+        return 0, frozenset()
+    return int(dados.get("ultimo_id") or 0), frozenset(dados.get("acima") or ())
+
+
+def exportar(
+    nome_fonte, destino, empresa_id=None, particionar=False, formato="parquet", completo=False
+):
+    """
+    Exporta a fonte para <destino>/<nome_fonte>/ a partir da marca d'água salva
+    (ou do zero com completo=True) e grava a nova marca no fim.
+
+    Retorna {"linhas", "arquivos", "desde_id", "ultimo_id"} (ultimo_id: maior id
+    já exportado; a marca gravada pode ficar abaixo dele, ver marca_segura).
+    """
+    fonte = FONTES[nome_fonte]
+    schema = esquema_arrow(fonte)
+    extensao = FORMATOS[formato]
+
+    pasta = os.path.join(destino, nome_fonte)
+    os.makedirs(pasta, exist_ok=True)
+    desde_id, pular = (0, frozenset()) if completo else ler_marca(pasta, empresa_id)
+    carimbo = timezone.now().strftime("%Y%m%dT%H%M%S%f")  # com a marca parada, só ele distingue
+
+    idx_empresa = next(i for i, (_, c) in enumerate(fonte.colunas) if c == fonte.empresa)
+    idx_data = next(i for i, (_, c) in enumerate(fonte.colunas) if c == fonte.data)
+
+    arquivos = []
+    estado = {
+        "chave": None,
+        "escritor": None,
+        "lote": [],
+        "linhas": 0,
+        "ultimo_id": max(pular, default=desde_id),
+        "acima": set(pular),  # candidatos a ficar acima da marca nova
+    }
+
+    def _abrir(chave):
+        sub = pasta
+        if chave is not None:
+            sub = os.path.join(pasta, f"empresa={chave[0]}", f"mes={chave[1]}")
+            os.makedirs(sub, exist_ok=True)
+        nome = f"part-{desde_id + 1}-{carimbo}-{len(arquivos):05d}{extensao}"
+        caminho = os.path.join(sub, nome)
+        arquivos.append(caminho)
+        return _Escritor(schema, caminho, formato)
+
+    def _descarregar():
+        lote = estado["lote"]
+        if not lote:
+            return
+        if estado["escritor"] is None:
+            estado["escritor"] = _abrir(estado["chave"])
+        estado["escritor"].escrever(lote)
+        estado["linhas"] += len(lote)
+        estado["ultimo_id"] = max(estado["ultimo_id"], max(linha[0] for linha in lote))
+        # a marca nova fica no máximo JANELA_IDS abaixo do maior id: o resto não precisa
+        piso = estado["ultimo_id"] - JANELA_IDS
+        estado["acima"] = {i for i in estado["acima"] if i > piso}
+        estado["acima"].update(linha[0] for linha in lote if linha[0] > piso)
+        estado["lote"] = []
+
+    def _fechar():
+        _descarregar()
+        if estado["escritor"] is not None:
+            estado["escritor"].fechar()
+            estado["escritor"] = None
+
+    try:
+        for linha in _linhas(fonte, desde_id, empresa_id, particionar, pular):
+            chave = (linha[idx_empresa], _mes(linha[idx_data])) if particionar else None
+            if chave != estado["chave"]:
+                _fechar()
+                estado["chave"] = chave
+            estado["lote"].append(linha)
+            if len(estado["lote"]) >= TAMANHO_LOTE:
+                _descarregar()
+    finally:
+        _fechar()
+
+    marca = marca_segura(fonte, desde_id, estado["ultimo_id"])
+    acima = sorted(i for i in estado["acima"] if i > marca)
+    if estado["linhas"] or marca != desde_id:
+        with open(_arquivo_marca(pasta, empresa_id), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "ultimo_id": marca,
+                    "acima": acima,
+                    "exportado_em": timezone.now().isoformat(),
+                    "linhas": estado["linhas"],
+                    "particionado": particionar,
+                    "formato": formato,
+                },
+                f,
+            )
+
+    return {
+        "linhas": estado["linhas"],
+        "arquivos": arquivos,
+        "desde_id": desde_id,
+        "ultimo_id": estado["ultimo_id"],
+    }
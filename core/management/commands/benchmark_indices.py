@@ -0,0 +1,185 @@
+# core/management/commands/benchmark_indices.py
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from agendamentos.models import Agendamento
+from core.bench import semear
+from core.models import Empresa
+from estoque.models import LoteProduto, MovimentoEstoque
+from financeiro.models import Transacao
+from pdv.models import Venda
+
+# índices compostos das migrações agendamentos.0009 / estoque.0010 / financeiro.0015 / pdv.0007
+INDICES = [
+    "transacao_emp_tipo_data",
+    "transacao_emp_data",
+    "mov_emp_prod_tipo",
+    "mov_lote_tipo",
+    "mov_emp_data",
+    "lote_emp_prod_validade",
+    "lote_emp_validade",
+    "agend_emp_data_hora",
+    "pdv_venda_emp_criado",
+]
+
+RE_TEMPO = re.compile(r"Execution Time: ([\d.]+) ms")
+RE_LEITURA = re.compile(
+    r"(Seq Scan on \S+|Index (?:Only )?Scan using \S+|Bitmap Index Scan on \S+)"
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara o plano (EXPLAIN ANALYZE) das consultas quentes com e sem os índices "
+        "compostos. Roda tudo numa transação desfeita no final; o DROP INDEX trava as "
+        "tabelas enquanto roda, então não use em produção."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--semear",
+            type=int,
+            default=0,
+            help=(
+                "Gera N movimentos/transações (core.bench, como o seed_bench) antes de medir. "
+                "Ex.: 1000000"
+            ),
+        )
+        parser.add_argument(
+            "--empresa", type=int, help="ID da empresa (padrão: a com mais movimentos)."
+        )
+        parser.add_argument("--plano", action="store_true", help="Mostra o plano completo.")
+
+    def _casos(self, empresa):
+        hoje = timezone.localdate()
+        inicio = hoje - timedelta(days=30)
+
+        lote = (
+            LoteProduto.objects.filter(empresa=empresa, movimentos__isnull=False)
+            .order_by("id")
+            .first()
+        )
+        if lote is None:
+            raise CommandError("Empresa sem movimentos com lote. Use --semear.")
+
+        return [
+            (
+                "Transacao (empresa, tipo, data)",
+                Transacao.objects.filter(empresa=empresa, tipo="despesa", data__gte=inicio),
+            ),
+            (
+                "Transacao (empresa, data)",
+                Transacao.objects.filter(empresa=empresa, data__gte=inicio),
+            ),
+            (
+                "MovimentoEstoque (empresa, produto, tipo)",
+                MovimentoEstoque.objects.filter(
+                    empresa=empresa, produto_id=lote.produto_id, tipo="S"
+                ),
+            ),
+            ("MovimentoEstoque (lote, tipo)", MovimentoEstoque.objects.filter(lote=lote, tipo="E")),
+            (
+                "MovimentoEstoque (empresa, data)",
+                MovimentoEstoque.objects.filter(
+                    empresa=empresa, data__gte=timezone.now() - timedelta(days=30)
+                ),
+            ),
+            (
+                "LoteProduto FIFO (empresa, produto, validade)",
+                LoteProduto.objects.filter(
+                    empresa=empresa, produto_id=lote.produto_id, validade__isnull=False
+                ).order_by("validade"),
+            ),
+            (
+                "LoteProduto índice de validade (empresa, validade)",
+                LoteProduto.objects.filter(
+                    empresa=empresa, validade__isnull=False, validade__lte=hoje + timedelta(days=15)
+                ).order_by("validade"),
+            ),
+            (
+                "Agendamento do dia (empresa, data, hora)",
+                Agendamento.objects.filter(empresa=empresa, data=hoje).order_by("hora"),
+            ),
+            (
+                "Venda PDV do período (empresa, criado_em)",
+                Venda.objects.filter(
+                    empresa=empresa, criado_em__gte=timezone.now() - timedelta(days=30)
+                ).order_by("-criado_em"),
+            ),
+        ]
+
+    def _medir(self, casos):
+        resultados = []
+        for _, qs in casos:
+            plano = qs.explain(analyze=True)
+            tempo = RE_TEMPO.search(plano)
+            resultados.append((plano, float(tempo.group(1)) if tempo else None))
+        return resultados
+
+    def _resumo(self, plano):
+        # só os nós de leitura (Seq Scan / Index Scan / Bitmap Index Scan): é o que muda
+        nos = RE_LEITURA.findall(plano)
+        return " + ".join(dict.fromkeys(nos)) or plano.splitlines()[0].split("  (cost=")[0]
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        if connection.vendor != "postgresql":
+            raise CommandError("benchmark_indices precisa de Postgres.")
+
+        if opts["semear"]:
+            self.stdout.write(f"🌱 Semeando {opts['semear']} linhas (desfeito no final)...")
+            n = opts["semear"]
+            info = semear(
+                volumes={
+                    "movimentos": n,
+                    "transacoes": n,
+                    "lotes": n // 20,
+                    "agendamentos": n // 10,
+                    "vendas": n // 5,
+                    "historico_ia": 0,
+                }
+            )
+            with connection.cursor() as cursor:
+                for model in (MovimentoEstoque, LoteProduto, Transacao, Agendamento, Venda):
+                    cursor.execute(f"ANALYZE {model._meta.db_table}")
+            self.stdout.write(
+                ", ".join(f"{k}={v}" for k, v in info.items() if k != "empresas")
+            )
+
+        if opts.get("empresa"):
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+        else:
+            empresa = (
+                Empresa.objects.annotate(n=Count("movimentos_estoque"))
+                .order_by("-n", "id")
+                .first()
+            )
+        if empresa is None:
+            raise CommandError("Empresa não encontrada.")
+
+        casos = self._casos(empresa)
+        com = self._medir(casos)
+
+        sid = transaction.savepoint()
+        with connection.cursor() as cursor:
+            for nome in INDICES:
+                cursor.execute(f'DROP INDEX IF EXISTS "{nome}"')
+        sem = self._medir(casos)
+        transaction.savepoint_rollback(sid)
+
+        self.stdout.write(f"\n📊 Empresa {empresa.id} — {empresa.nome}\n")
+        for (titulo, _), (plano_com, t_com), (plano_sem, t_sem) in zip(casos, com, sem):
+            self.stdout.write(self.style.MIGRATE_HEADING(titulo))
+            self.stdout.write(f"   sem índice: {self._resumo(plano_sem)} | {t_sem} ms")
+            self.stdout.write(f"   com índice: {self._resumo(plano_com)} | {t_com} ms")
+            if opts["plano"]:
+                self.stdout.write("\n" + plano_sem + "\n---\n" + plano_com + "\n")
+
+        # nada do que foi semeado / removido fica no banco
+        transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS("\n✅ Benchmark concluído (transação desfeita)."))
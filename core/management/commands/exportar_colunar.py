@@ -0,0 +1,60 @@
+# core/management/commands/exportar_colunar.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.exportacao_colunar import FONTES, FORMATOS, exportar
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta transações, movimentos de estoque e itens de venda em Parquet/Arrow, "
+        "com tipos preservados. Incremental: só linhas novas desde a última exportação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("destino", help="Pasta de saída (uma subpasta por fonte).")
+        parser.add_argument(
+            "--fonte",
+            action="append",
+            choices=sorted(FONTES),
+            help="Fonte a exportar (repita para várias; padrão: todas).",
+        )
+        parser.add_argument(
+            "--empresa", type=int, default=None, help="ID da empresa (padrão: todas)."
+        )
+        parser.add_argument(
+            "--particionar",
+            action="store_true",
+            help="Separa em empresa=N/mes=AAAA-MM/ (layout hive).",
+        )
+        parser.add_argument("--formato", choices=sorted(FORMATOS), default="parquet")
+        parser.add_argument(
+            "--completo",
+            action="store_true",
+            help="Ignora a marca d'água e exporta tudo de novo.",
+        )
+
+    def handle(self, *args, **opts):
+        fontes = opts["fonte"] or sorted(FONTES)
+        for nome in fontes:
+            inicio = time.monotonic()
+            r = exportar(
+                nome,
+                opts["destino"],
+                empresa_id=opts["empresa"],
+                particionar=opts["particionar"],
+                formato=opts["formato"],
+                completo=opts["completo"],
+            )
+
+            if not r["linhas"]:
+                self.stdout.write(f"• {nome}: nada novo desde id {r['desde_id']}.")
+                continue
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ {nome}: {r['linhas']} linha(s) em {len(r['arquivos'])} arquivo(s) "
+                    f"(ids {r['desde_id'] + 1}..{r['ultimo_id']}, "
+                    f"{time.monotonic() - inicio:.1f}s)."
+                )
+            )
@@ -0,0 +1,70 @@
+# core/management/commands/seed_bench.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.bench import VOLUMES_PADRAO, limpar, semear
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera massa de dados determinística (empresas bench-N) para medir dashboards e PDV. "
+        "Apaga a massa bench anterior antes de gerar."
+    )
+
+    def add_arguments(self, parser):
+        for nome, padrao in VOLUMES_PADRAO.items():
+            parser.add_argument(
+                f"--{nome.replace('_', '-')}", type=int, default=padrao, dest=nome,
+                help=f"Quantidade de {nome} (padrão: {padrao}).",
+            )
+        parser.add_argument(
+            "--semente", type=int, default=42, help="Semente do gerador (padrão: 42)."
+        )
+        parser.add_argument(
+            "--data-base",
+            help="AAAA-MM-DD usada como 'hoje' (padrão: hoje). Fixe para repetir a mesma massa.",
+        )
+        parser.add_argument(
+            "--chunk", type=int, default=5000, help="Tamanho do bloco do bulk_create."
+        )
+        parser.add_argument("--limpar", action="store_true", help="Só apaga a massa bench e sai.")
+
+    def handle(self, *args, **opts):
+        data_base = None
+        if opts.get("data_base"):
+            try:
+                data_base = datetime.strptime(opts["data_base"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("Use --data-base no formato AAAA-MM-DD.")
+
+        if opts["empresas"] < 1:
+            raise CommandError("--empresas precisa ser >= 1.")
+
+        inicio = time.monotonic()
+        with transaction.atomic():
+            apagadas = limpar()
+            if apagadas:
+                self.stdout.write(f"🧹 Massa bench anterior apagada ({apagadas} linhas).")
+
+            if opts["limpar"]:
+                return
+
+            info = semear(
+                volumes={nome: opts[nome] for nome in VOLUMES_PADRAO},
+                semente=opts["semente"],
+                data_base=data_base,
+                chunk=opts["chunk"],
+            )
+
+        for nome, total in info.items():
+            if nome != "empresas":
+                self.stdout.write(f"   {nome}: {total}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ seed_bench: empresas {info['empresas']} em {time.monotonic() - inicio:.1f}s "
+                f"(usuário 'bench')."
+            )
+        )
@@ -0,0 +1,151 @@
+# core/metricas.py
+"""
+Métricas por view (SQL, tempo, tamanho da resposta) coletadas pelo
+MetricasRequestMiddleware e expostas em /metrics (formato texto do Prometheus).
+
+Os números ficam em memória, por processo: cada worker do gunicorn responde
+pelos próprios requests desde que subiu.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+# limites do histograma de latência (segundos)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_RE_LISTA = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+
+def forma_sql(sql):
+    """
+    "Forma" da query: o SQL já vem com %s no lugar dos valores; só junta
+    listas de IN de tamanhos diferentes, para `id IN (1,2)` e `id IN (1,2,3)`
+    contarem como a mesma query.
+    """
+    return _RE_ESPACOS.sub(" ", _RE_LISTA.sub("(%s...)", sql)).strip()
+
+
+class ColetorSQL:
+    """
+    execute_wrapper: conta queries, soma o tempo e agrupa por forma.
+    """
+
+    def __init__(self):
+        self.total = 0
+        self.segundos = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.total += 1
+            self.formas[forma_sql(sql)] += 1
+
+    def mais_repetida(self):
+        """
+        (forma, vezes) da query que mais se repetiu, ou (None, 0).
+        """
+        if not self.formas:
+            return None, 0
+        return self.formas.most_common(1)[0]
+
+
+class _Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dados = defaultdict(self._novo)
+
+    @staticmethod
+    def _novo():
+        return {
+            "requests": 0,
+            "segundos": 0.0,
+            "sql_queries": 0,
+            "sql_segundos": 0.0,
+            "bytes": 0,
+            "repetidas": 0,
+            "buckets": [0] * len(BUCKETS),
+        }
+
+    def registrar(self, view, metodo, segundos, sql_queries, sql_segundos, tamanho, repetida):
+        with self._lock:
+            d = self._dados[(view, metodo)]
+            d["requests"] += 1
+            d["segundos"] += segundos
+            d["sql_queries"] += sql_queries
+            d["sql_segundos"] += sql_segundos
+            d["bytes"] += tamanho
+            d["repetidas"] += int(repetida)
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    d["buckets"][i] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def copia(self):
+        with self._lock:
+            return {k: {**v, "buckets": list(v["buckets"])} for k, v in self._dados.items()}
+
+
+registro = _Registro()
+
+
+def _rotulos(view, metodo, le=None):
+    view = view.replace("\\", "\\\\").replace('"', '\\"')
+    extra = f',le="{le}"' if le is not None else ""
+    return f'{{view="{view}",metodo="{metodo}"{extra}}}'
+
+
+def texto_prometheus():
+    """
+    Exposição no formato texto do Prometheus (version 0.0.4).
+    """
+    dados = sorted(registro.copia().items())
+    linhas = []
+
+    def _metrica(nome, tipo, ajuda, valores):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        linhas.extend(valores)
+
+    histograma = []
+    for (view, metodo), d in dados:
+        for limite, n in zip(BUCKETS, d["buckets"]):
+            histograma.append(f"spaco_request_segundos_bucket{_rotulos(view, metodo, limite)} {n}")
+        histograma += [
+            f"spaco_request_segundos_bucket{_rotulos(view, metodo, '+Inf')} {d['requests']}",
+            f"spaco_request_segundos_sum{_rotulos(view, metodo)} {d['segundos']:.6f}",
+            f"spaco_request_segundos_count{_rotulos(view, metodo)} {d['requests']}",
+        ]
+    _metrica("spaco_request_segundos", "histogram", "Tempo total do request por view.", histograma)
+
+    for nome, chave, tipo, ajuda, fmt in (
+        ("spaco_sql_queries_total", "sql_queries", "counter", "Queries SQL executadas.", "{}"),
+        ("spaco_sql_segundos_total", "sql_segundos", "counter", "Tempo gasto em SQL.", "{:.6f}"),
+        ("spaco_resposta_bytes_total", "bytes", "counter", "Bytes de resposta.", "{}"),
+        (
+            "spaco_queries_repetidas_total",
+            "repetidas",
+            "counter",
+            "Requests que repetiram a mesma forma de query acima do limite (N+1).",
+            "{}",
+        ),
+    ):
+        _metrica(
+            nome,
+            tipo,
+            ajuda,
+            [
+                f"{nome}{_rotulos(view, metodo)} {fmt.format(d[chave])}"
+                for (view, metodo), d in dados
+            ],
+        )
+
+    return "\n".join(linhas) + "\n"
@@ -0,0 +1,89 @@
+# core/middleware.py
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils.functional import SimpleLazyObject
+
+from core.metricas import ColetorSQL, registro
+from core.services_empresa import empresa_do_request
+
+logger = logging.getLogger("core.metricas")
+
+
+class MetricasRequestMiddleware:
+    """
+    Mede cada request: queries SQL (quantidade e tempo, via execute_wrapper),
+    tempo total e tamanho da resposta. Agrega por view em core.metricas e
+    loga uma linha JSON por request no logger "core.metricas".
+
+    Se a mesma forma de query se repetir mais de METRICAS_LIMITE_REPETICAO
+    vezes no request (cara de N+1), loga um WARNING com a query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == "/metrics":
+            return self.get_response(request)
+
+        coletor = ColetorSQL()
+        inicio = time.perf_counter()
+        with connection.execute_wrapper(coletor):
+            response = self.get_response(request)
+        segundos = time.perf_counter() - inicio
+
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else "") or "desconhecida"
+        tamanho = 0 if response.streaming else len(response.content)
+
+        limite = getattr(settings, "METRICAS_LIMITE_REPETICAO", 10)
+        forma, vezes = coletor.mais_repetida()
+        repetida = vezes > limite
+
+        registro.registrar(
+            view, request.method, segundos, coletor.total, coletor.segundos, tamanho, repetida
+        )
+
+        logger.info(
+            "[METRICAS] %s",
+            json.dumps(
+                {
+                    "view": view,
+                    "metodo": request.method,
+                    "status": response.status_code,
+                    "ms": round(segundos * 1000, 2),
+                    "sql_queries": coletor.total,
+                    "sql_ms": round(coletor.segundos * 1000, 2),
+                    "bytes": tamanho,
+                },
+                ensure_ascii=False,
+            ),
+        )
+        if repetida:
+            logger.warning(
+                "[METRICAS] %s repetiu a mesma query %sx (limite %s): %s",
+                view, vezes, limite, forma[:500],
+            )
+
+        return response
+
+
+class EmpresaRequestMiddleware:
+    """
+    request.empresa: empresa do perfil do usuário logado (ou None), resolvida
+    só quando usada e no máximo uma vez por request (cache em
+    core.services_empresa). Fica depois do AuthenticationMiddleware.
+
+    É um objeto preguiçoso: teste com `if not request.empresa`, não com `is None`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.empresa = SimpleLazyObject(lambda: empresa_do_request(request))
+        return self.get_response(request)
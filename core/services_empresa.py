@@ -0,0 +1,109 @@
+# core/services_empresa.py
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Perfil
+
+# Empresa do usuário logado: resolvida uma vez e guardada no cache por usuário
+# (vale para todas as sessões dele). Invalidada quando o Perfil ou a Empresa
+# mudam (core/signals.py). Perfil.objects.update(...) não dispara signal:
+# depois de um update em massa, chame invalidar_empresa_usuario.
+TIMEOUT_EMPRESA = 60 * 30
+
+_SEM_EMPRESA = 0  # guardado no cache para "usuário sem perfil/empresa"
+
+
+def _chave(user_id):
+    return f"core:empresa_usuario:{user_id}"
+
+
+def empresa_do_usuario(user):
+    """
+    Empresa do perfil do usuário (ou None). 0 queries quando está no cache.
+    """
+    if not getattr(user, "is_authenticated", False):
+        return None
+
+    chave = _chave(user.pk)
+    empresa = cache.get(chave)
+    if empresa is None:
+        perfil = Perfil.objects.select_related("empresa").filter(user_id=user.pk).first()
+        empresa = perfil.empresa if perfil and perfil.empresa_id else _SEM_EMPRESA
+        cache.set(chave, empresa, TIMEOUT_EMPRESA)
+
+    return empresa or None
+
+
+def empresa_do_request(request):
+    """
+    Mesma coisa, guardando no request (request.empresa usa isto).
+    """
+    if not hasattr(request, "_empresa_cache"):
+        request._empresa_cache = empresa_do_usuario(getattr(request, "user", None))
+    return request._empresa_cache
+
+
+def invalidar_empresa_usuario(*user_ids):
+    """
+    Apaga a empresa em cache dos usuários, depois do commit.
+    """
+    chaves = [_chave(uid) for uid in user_ids if uid]
+    if chaves:
+        transaction.on_commit(lambda: cache.delete_many(chaves))
+
+
+def invalidar_empresa(empresa_id):
+    """
+    A empresa mudou (nome, política de lote...): todo usuário dela relê.
+    """
+    user_ids = list(Perfil.objects.filter(empresa_id=empresa_id).values_list("user_id", flat=True))
+    invalidar_empresa_usuario(*user_ids)
+
+
+# ---------------------------------------------------------------------------
+# Versão dos dados da empresa: sobe a cada Transacao/Venda/item gravado
+# (core/signals.py). Respostas em cache (core.decorators.cache_por_empresa)
+# levam a versão na chave, então invalidar é só subir o número.
+# O número mora no cache: ele tem de ser compartilhado entre os workers
+# (Redis/banco; locmem só com um processo - config/settings.py, core/checks.py).
+# ---------------------------------------------------------------------------
+
+
+def _chave_versao(empresa_id, escopo=None):
+    if escopo:
+        return f"core:versao_empresa:{escopo}:{empresa_id}"
+    return f"core:versao_empresa:{empresa_id}"
+
+
+def versao_empresa(empresa_id, escopo=None):
+    """
+    `escopo`: conjunto de dados com versão própria (ex.: "agenda"), que não
+    deve expirar junto com as respostas financeiras.
+    """
+    chave = _chave_versao(empresa_id, escopo)
+    versao = cache.get(chave)
+    if versao is None:
+        # começa num número novo (não 1): se a chave sumiu do cache, as
+        # respostas antigas não voltam a valer
+        cache.add(chave, time.time_ns(), None)
+        versao = cache.get(chave)
+    return versao
+
+
+def invalidar_respostas_empresa(empresa_id, escopo=None):
+    """
+    Sobe a versão da empresa depois do commit (respostas antigas expiram sozinhas).
+    """
+    if not empresa_id:
+        return
+    chave = _chave_versao(empresa_id, escopo)
+
+    def _subir():
+        try:
+            cache.incr(chave)
+        except ValueError:
+            cache.add(chave, time.time_ns(), None)
+
+    transaction.on_commit(_subir)
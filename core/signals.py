@@ -1,9 +1,15 @@
 # core/signals.py
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from core.models import Perfil, Empresa
+from core.services_empresa import (
+    invalidar_empresa,
+    invalidar_empresa_usuario,
+    invalidar_respostas_empresa,
+)
 
 
 def _get_empresa_padrao():
@@ -28,3 +34,47 @@ def criar_perfil_automatico(sender, instance, created, **kwargs):
 
     # Cria perfil SEMPRE com empresa preenchida (empresa_id NOT NULL)
     Perfil.objects.create(user=instance, empresa=empresa)
+
+
+@receiver(post_save, sender=Perfil)
+@receiver(post_delete, sender=Perfil)
+def invalidar_empresa_do_perfil(sender, instance, **kwargs):
+    invalidar_empresa_usuario(instance.user_id)
+
+
+@receiver(post_save, sender=Empresa)
+def invalidar_empresa_alterada(sender, instance, created, **kwargs):
+    if not created:
+        invalidar_empresa(instance.pk)
+
+
+def _empresa_id_do_lancamento(instance):
+    empresa_id = getattr(instance, "empresa_id", None)
+    if empresa_id:
+        return empresa_id
+    # itens de venda: empresa vem da venda (FK "venda" no app vendas, "vendas" no PDV)
+    for campo in ("venda", "vendas"):
+        try:
+            venda = getattr(instance, campo, None)
+        except ObjectDoesNotExist:
+            return None
+        if venda is not None:
+            return getattr(venda, "empresa_id", None)
+    return None
+
+
+@receiver(post_save, sender="financeiro.Transacao")
+@receiver(post_delete, sender="financeiro.Transacao")
+@receiver(post_save, sender="pdv.Venda")
+@receiver(post_delete, sender="pdv.Venda")
+@receiver(post_save, sender="pdv.VendaItem")
+@receiver(post_delete, sender="pdv.VendaItem")
+@receiver(post_save, sender="vendas.Venda")
+@receiver(post_delete, sender="vendas.Venda")
+@receiver(post_save, sender="vendas.ItemVenda")
+@receiver(post_delete, sender="vendas.ItemVenda")
+def invalidar_respostas_dashboard(sender, instance, **kwargs):
+    """
+    Dados de dashboard mudaram: respostas em cache da empresa deixam de valer.
+    """
+    invalidar_respostas_empresa(_empresa_id_do_lancamento(instance))
@@ -1,7 +1,72 @@
+import tempfile
+
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, JsonResponse
+from django.views.decorators.http import require_GET
+
+from core.exportacao_colunar import FONTES, FORMATOS, escrever_arquivo
+from core.metricas import texto_prometheus
 
 
 @login_required
 def home(request):
     return render(request, "home.html")
+
+
+def metricas(request):
+    """
+    /metrics (texto do Prometheus) — só staff.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("not_allowed")
+    return HttpResponse(texto_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@login_required
+@require_GET
+def exportar_colunar(request, fonte):
+    """
+    /export/colunar/<fonte>/?desde=<id>&empresa=<id>&formato=parquet|arrow — só staff.
+    Devolve as linhas com id > desde num arquivo só; a próxima marca d'água
+    vem no header X-Marca-Dagua (guarde e mande de volta em ?desde=). A marca
+    pode ficar abaixo do maior id enviado (transação ainda aberta, ver
+    core.exportacao_colunar): linhas podem vir repetidas, deduplique por id.
+    """
+    if not request.user.is_staff:
+        return HttpResponseForbidden("not_allowed")
+    if fonte not in FONTES:
+        return JsonResponse(
+            {"ok": False, "error": "fonte_invalida", "fontes": sorted(FONTES)}, status=404
+        )
+
+    formato = request.GET.get("formato") or "parquet"
+    if formato not in FORMATOS:
+        return JsonResponse({"ok": False, "error": "formato_invalido"}, status=400)
+    try:
+        desde = int(request.GET.get("desde") or 0)
+        empresa_id = int(request.GET.get("empresa") or 0) or None
+    except ValueError:
+        return JsonResponse({"ok": False, "error": "parametro_invalido"}, status=400)
+
+    # Parquet grava o rodapé no fim: escreve em disco e devolve em streaming
+    arquivo = tempfile.TemporaryFile()
+    try:
+        linhas, ultimo_id, marca = escrever_arquivo(
+            FONTES[fonte], arquivo, desde_id=desde, empresa_id=empresa_id, formato=formato
+        )
+    except Exception:
+        arquivo.close()
+        raise
+    arquivo.seek(0)
+
+    resp = FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=f"{fonte}_{desde + 1}_{ultimo_id}{FORMATOS[formato]}",
+        content_type="application/vnd.apache."
+        + ("parquet" if formato == "parquet" else "arrow.file"),
+    )
+    resp["X-Marca-Dagua"] = str(marca)
+    resp["X-Linhas"] = str(linhas)
+    return resp
@@ -1,28 +1,18 @@
 from django.contrib import admin
-from django.db.models import Sum, Case, When, F, DecimalField
+from django.db.models import F
 
-from .models import ItemEstoque, Produto, MovimentoEstoque, LoteProduto
+from .models import (
+    ItemEstoque,
+    LoteProduto,
+    MovimentoEstoque,
+    Produto,
+    SaldoProduto,
+    SnapshotEstoque,
+)
+from .services_saldo import saldo_subquery
 
 
 # -------- Filtro lateral "com estoque baixo" --------
-class EstoqueBaixoFilter(admin.SimpleListFilter):
-    title = "Estoque"
-    parameter_name = "estoque_baixo"
-
-    def lookups(self, request, model_admin):
-        return [
-            ("baixo", "Baixo / Em falta"),
-        ]
-
-    def queryset(self, request, queryset):
-        valor = self.value()
-        if valor == "baixo":
-            # só considera produtos que controlam estoque
-            # e compara saldo_calc com o estoque_minimo do próprio produto
-            return queryset.filter(controla_estoque=True, saldo_calc__lte=F("estoque_minimo"))
-        return queryset
-
-
 class EstoqueBaixoFilter(admin.SimpleListFilter):
     title = "Estoque"
     parameter_name = "estoque_baixo"
@@ -68,17 +58,11 @@ class ProdutoAdmin(admin.ModelAdmin):
         if not obj.pk:
             return 0
 
-        agg = obj.movimentos.aggregate(
-            saldo=Sum(
-                Case(
-                    When(tipo="E", then=F("quantidade")),
-                    When(tipo="S", then=-F("quantidade")),
-                    default=0,
-                    output_field=DecimalField(),
-                )
-            )
-        )
-        return agg["saldo"] or 0
+        # já vem anotado do get_queryset (saldo materializado)
+        saldo = getattr(obj, "saldo_calc", None)
+        if saldo is None:
+            saldo = SaldoProduto.saldo_de(obj.empresa_id, obj.pk)
+        return saldo
 
     # -------- STATUS VISUAL --------
     @admin.display(description="Status")
@@ -99,16 +83,7 @@ class ProdutoAdmin(admin.ModelAdmin):
     # -------- Anotação para o filtro usar --------
     def get_queryset(self, request):
         qs = super().get_queryset(request)
-        return qs.annotate(
-            saldo_calc=Sum(
-                Case(
-                    When(movimentos__tipo="E", then=F("movimentos__quantidade")),
-                    When(movimentos__tipo="S", then=-F("movimentos__quantidade")),
-                    default=0,
-                    output_field=DecimalField(),
-                )
-            )
-        )
+        return qs.annotate(saldo_calc=saldo_subquery())
 
 
 @admin.register(LoteProduto)
@@ -121,6 +96,9 @@ class LoteProdutoAdmin(admin.ModelAdmin):
     def saldo_lote(self, obj):
         return obj.saldo_atual
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("produto").com_saldo()
+
 
 @admin.register(MovimentoEstoque)
 class MovimentoEstoqueAdmin(admin.ModelAdmin):
@@ -129,5 +107,19 @@ class MovimentoEstoqueAdmin(admin.ModelAdmin):
     search_fields = ("produto__nome", "observacao", "lote__codigo")
 
 
-admin.site.register(ItemEstoque)
+@admin.register(SaldoProduto)
+class SaldoProdutoAdmin(admin.ModelAdmin):
+    list_display = ("produto", "empresa", "saldo", "atualizado_em")
+    list_filter = ("empresa",)
+    search_fields = ("produto__nome",)
+    readonly_fields = ("empresa", "produto", "saldo", "atualizado_em")
 
+
+@admin.register(SnapshotEstoque)
+class SnapshotEstoqueAdmin(admin.ModelAdmin):
+    list_display = ("saldo_em", "produto", "lote", "saldo", "entradas", "saidas")
+    list_filter = ("empresa", "saldo_em")
+    search_fields = ("produto__nome", "lote__codigo")
+
+
+admin.site.register(ItemEstoque)
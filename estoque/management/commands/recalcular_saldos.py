@@ -0,0 +1,50 @@
+# estoque/management/commands/recalcular_saldos.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from estoque.services_saldo import recalcular_saldos
+
+
+class Command(BaseCommand):
+    help = "Reconstrói/verifica SaldoProduto e SaldoLote a partir dos movimentos de estoque."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empresa",
+            type=int,
+            default=None,
+            help="ID da empresa (padrão: todas).",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Só verifica e lista divergências, sem gravar nada.",
+        )
+
+    def handle(self, *args, **opts):
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if empresa is None:
+                raise CommandError(f"Empresa {opts['empresa']} não encontrada.")
+
+        verificar = opts["verificar"]
+        divergencias = recalcular_saldos(empresa=empresa, corrigir=not verificar)
+
+        for d in divergencias:
+            self.stdout.write(
+                f"- empresa={d['empresa_id']} {d['tipo']}={d[d['tipo'] + '_id']} "
+                f"gravado={d['gravado']} calculado={d['calculado']}"
+            )
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS("✅ Saldos consistentes com os movimentos."))
+        elif verificar:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {len(divergencias)} saldo(s) divergente(s). "
+                    "Rode sem --verificar para corrigir."
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(divergencias)} saldo(s) corrigido(s)."))
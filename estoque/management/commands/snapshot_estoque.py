@@ -0,0 +1,93 @@
+# estoque/management/commands/snapshot_estoque.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from core.models import Empresa
+from estoque.models import MovimentoEstoque
+from estoque.services_snapshot import arquivar_movimentos, gerar_snapshot, ultimo_snapshot
+
+
+def _proximo_mes(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera os snapshots mensais de estoque (saldo de fechamento por produto/lote) "
+        "até o último mês fechado e, opcionalmente, arquiva os movimentos cobertos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--ate",
+            default=None,
+            help="Último mês a fechar, formato AAAA-MM (padrão: mês passado).",
+        )
+        parser.add_argument(
+            "--empresa",
+            type=int,
+            default=None,
+            help="ID da empresa (padrão: todas).",
+        )
+        parser.add_argument(
+            "--arquivar",
+            action="store_true",
+            help="Move os movimentos já cobertos pelo snapshot para o arquivo frio.",
+        )
+
+    def handle(self, *args, **opts):
+        hoje = timezone.localdate()
+        if opts["ate"]:
+            try:
+                ano, mes = (int(x) for x in opts["ate"].split("-"))
+            except ValueError:
+                raise CommandError("--ate deve estar no formato AAAA-MM.")
+        else:
+            ano, mes = (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+
+        if (ano, mes) >= (hoje.year, hoje.month):
+            raise CommandError("Só dá para fechar meses que já terminaram.")
+
+        empresas = Empresa.objects.all()
+        if opts["empresa"]:
+            empresas = empresas.filter(pk=opts["empresa"])
+            if not empresas.exists():
+                raise CommandError(f"Empresa {opts['empresa']} não encontrada.")
+
+        for empresa in empresas.order_by("id"):
+            ultimo = ultimo_snapshot(empresa)
+            if ultimo:
+                # regera o último (pode ter chegado movimento no dia) e segue em ordem
+                atual = (ultimo.year, ultimo.month)
+            else:
+                primeiro = MovimentoEstoque.objects.filter(empresa=empresa).aggregate(
+                    p=Min("data")
+                )["p"]
+                if primeiro is None:
+                    continue
+                primeiro = timezone.localtime(primeiro)
+                atual = (primeiro.year, primeiro.month)
+
+            meses = 0
+            linhas = 0
+            while atual <= (ano, mes):
+                linhas += gerar_snapshot(empresa, *atual)
+                meses += 1
+                atual = _proximo_mes(*atual)
+
+            if not meses:
+                continue
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"✅ {empresa.nome}: {meses} mês(es) fechado(s), {linhas} linha(s) de snapshot."
+                )
+            )
+
+            if opts["arquivar"]:
+                saldo_em = ultimo_snapshot(empresa)
+                total = arquivar_movimentos(empresa, saldo_em)
+                self.stdout.write(
+                    f"   🧊 {total} movimento(s) até {saldo_em:%d/%m/%Y} movido(s) para o arquivo."
+                )
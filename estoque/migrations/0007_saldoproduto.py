@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Case, DecimalField, F, Sum, When
+
+
+def popular_saldos(apps, schema_editor):
+    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
+    SaldoProduto = apps.get_model("estoque", "SaldoProduto")
+    db = schema_editor.connection.alias
+
+    rows = (
+        MovimentoEstoque.objects.using(db)
+        .order_by()
+        .values("empresa_id", "produto_id")
+        .annotate(
+            saldo=Sum(
+                Case(
+                    When(tipo="E", then=F("quantidade")),
+                    When(tipo="S", then=-F("quantidade")),
+                    default=0,
+                    output_field=DecimalField(max_digits=14, decimal_places=3),
+                )
+            )
+        )
+    )
+
+    SaldoProduto.objects.using(db).bulk_create(
+        [
+            SaldoProduto(empresa_id=r["empresa_id"], produto_id=r["produto_id"], saldo=r["saldo"] or 0)
+            for r in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('estoque', '0006_produto_estoque_minimo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoProduto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Saldo')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_produto', to='core.empresa')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos', to='estoque.produto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de produto',
+                'verbose_name_plural': 'Saldos de produto',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='saldoproduto',
+            constraint=models.UniqueConstraint(fields=('empresa', 'produto'), name='uniq_saldo_produto_empresa_produto'),
+        ),
+        # popula com o saldo atual de cada produto
+        migrations.RunPython(popular_saldos, migrations.RunPython.noop),
+    ]
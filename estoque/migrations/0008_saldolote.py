@@ -0,0 +1,63 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Case, DecimalField, F, Sum, When
+
+
+def popular_saldos_lote(apps, schema_editor):
+    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
+    SaldoLote = apps.get_model("estoque", "SaldoLote")
+    db = schema_editor.connection.alias
+
+    rows = (
+        MovimentoEstoque.objects.using(db)
+        .filter(lote__isnull=False)
+        .order_by()
+        .values("empresa_id", "lote_id")
+        .annotate(
+            saldo=Sum(
+                Case(
+                    When(tipo="E", then=F("quantidade")),
+                    When(tipo="S", then=-F("quantidade")),
+                    default=0,
+                    output_field=DecimalField(max_digits=14, decimal_places=3),
+                )
+            )
+        )
+    )
+
+    SaldoLote.objects.using(db).bulk_create(
+        [
+            SaldoLote(empresa_id=r["empresa_id"], lote_id=r["lote_id"], saldo=r["saldo"] or 0)
+            for r in rows
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('estoque', '0007_saldoproduto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoLote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Saldo')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='saldos_lote', to='core.empresa')),
+                ('lote', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='saldo_registro', to='estoque.loteproduto')),
+            ],
+            options={
+                'verbose_name': 'Saldo de lote',
+                'verbose_name_plural': 'Saldos de lote',
+            },
+        ),
+        # popula com o saldo atual de cada lote
+        migrations.RunPython(popular_saldos_lote, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('estoque', '0008_saldolote'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimentoEstoqueArquivo',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('tipo', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1, verbose_name='Tipo')),
+                ('quantidade', models.DecimalField(decimal_places=3, max_digits=10, verbose_name='Quantidade')),
+                ('data', models.DateTimeField(verbose_name='Data')),
+                ('observacao', models.CharField(blank=True, max_length=255, verbose_name='Observação')),
+                ('arquivado_em', models.DateTimeField(auto_now_add=True, verbose_name='Arquivado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimentos_estoque_arquivo', to='core.empresa')),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimentos_arquivo', to='estoque.loteproduto')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimentos_arquivo', to='estoque.produto')),
+            ],
+            options={
+                'verbose_name': 'Movimento de estoque (arquivo)',
+                'verbose_name_plural': 'Movimentos de estoque (arquivo)',
+                'ordering': ['-data'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo_em', models.DateField(help_text='Último dia do mês fechado.', verbose_name='Saldo em')),
+                ('saldo', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Saldo')),
+                ('entradas', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Entradas no mês')),
+                ('saidas', models.DecimalField(decimal_places=3, default=0, max_digits=14, verbose_name='Saídas no mês')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots_estoque', to='core.empresa')),
+                ('lote', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='estoque.loteproduto')),
+                ('produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='estoque.produto')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de estoque',
+                'verbose_name_plural': 'Snapshots de estoque',
+                'ordering': ['-saldo_em', 'produto'],
+                'indexes': [models.Index(fields=['empresa', 'saldo_em'], name='snap_estoque_empresa_data')],
+            },
+        ),
+    ]
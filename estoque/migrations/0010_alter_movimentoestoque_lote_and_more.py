@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estoque', '0009_snapshotestoque_movimentoestoquearquivo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='movimentoestoque',
+            name='lote',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movimentos', to='estoque.loteproduto', verbose_name='Lote'),
+        ),
+        migrations.AddIndex(
+            model_name='loteproduto',
+            index=models.Index(condition=models.Q(('validade__isnull', False)), fields=['empresa', 'produto', 'validade'], name='lote_emp_prod_validade'),
+        ),
+        migrations.AddIndex(
+            model_name='loteproduto',
+            index=models.Index(condition=models.Q(('validade__isnull', False)), fields=['empresa', 'validade'], name='lote_emp_validade'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['empresa', 'produto', 'tipo'], name='mov_emp_prod_tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['lote', 'tipo'], name='mov_lote_tipo'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentoestoque',
+            index=models.Index(fields=['empresa', 'data'], name='mov_emp_data'),
+        ),
+    ]
@@ -1,6 +1,9 @@
 # estoque/models.py
-from django.db import models
-from django.db.models import Sum, F, Case, When, DecimalField
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, Case, When, Value, DecimalField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError
 
 from core.models import Empresa
@@ -72,12 +75,27 @@ class Produto(models.Model):
         return self.nome
 
 
+class LoteProdutoQuerySet(models.QuerySet):
+    def com_saldo(self):
+        """
+        Anota `saldo` (Decimal) a partir do saldo materializado do lote (SaldoLote).
+        Subquery (e não JOIN) para continuar compatível com select_for_update().
+        """
+        dec = DecimalField(max_digits=14, decimal_places=3)
+        sub = SaldoLote.objects.filter(lote_id=OuterRef("pk")).values("saldo")[:1]
+        return self.annotate(
+            saldo=Coalesce(Subquery(sub, output_field=dec), Decimal("0.000"), output_field=dec)
+        )
+
+
 class LoteProduto(models.Model):
     """
     Lote de um produto com validade opcional.
     Serve para rastrear de qual lote vieram as entradas/saídas.
     """
 
+    objects = LoteProdutoQuerySet.as_manager()
+
     empresa = models.ForeignKey(
         Empresa,
         on_delete=models.PROTECT,
@@ -110,6 +128,19 @@ class LoteProduto(models.Model):
         verbose_name = "Lote de produto"
         verbose_name_plural = "Lotes de produto"
         ordering = ["produto", "validade", "codigo"]
+        indexes = [
+            # parciais: só lote com validade entra em alerta / ordem de vencimento
+            models.Index(
+                fields=["empresa", "produto", "validade"],
+                name="lote_emp_prod_validade",
+                condition=models.Q(validade__isnull=False),
+            ),
+            models.Index(
+                fields=["empresa", "validade"],
+                name="lote_emp_validade",
+                condition=models.Q(validade__isnull=False),
+            ),
+        ]
 
     def __str__(self):
         base = self.produto.nome
@@ -127,28 +158,135 @@ class LoteProduto(models.Model):
     @property
     def saldo_atual(self):
         """
-        Calcula o saldo do lote somando os movimentos vinculados a ele.
-        (entradas - saídas)
+        Saldo do lote (entradas - saídas), lido do SaldoLote.
+        Em loops use LoteProduto.objects.com_saldo(): o valor já vem anotado e
+        aqui não sai nenhuma query.
         """
-        agg = self.movimentos.aggregate(
-            saldo=Sum(
-                Case(
-                    When(tipo="E", then=F("quantidade")),
-                    When(tipo="S", then=-F("quantidade")),
-                    default=0,
-                    output_field=DecimalField(),
-                )
+        saldo = getattr(self, "saldo", None)
+        if saldo is not None:
+            return saldo
+        if not self.pk:
+            return Decimal("0")
+        return SaldoLote.saldos_de([self.pk]).get(self.pk, Decimal("0"))
+
+
+class MovimentoEstoqueManager(models.Manager):
+    def registrar_lote(self, movimentos, validar=True, batch_size=500):
+        """
+        Grava vários movimentos de uma vez (ex.: nota de fornecedor com centenas de linhas).
+
+        Em vez de save()/full_clean() + post_save por linha:
+          - trava os produtos envolvidos e lê os saldos em 1 query (SaldoProduto);
+          - valida as mesmas regras do clean() em memória, linha a linha, com o
+            saldo "andando" dentro do lote (uma saída pode usar a entrada anterior);
+          - insere com bulk_create e aplica SaldoProduto/SaldoLote em lote;
+          - cria as despesas de entrada (financeiro.Transacao) também em lote.
+
+        `movimentos`: instâncias NÃO salvas de MovimentoEstoque.
+        validar=False pula a checagem de saldo (quem chamou já validou com lock).
+        Lança ValidationError (nada é gravado) se alguma linha for inválida.
+        """
+        movimentos = list(movimentos)
+        if not movimentos:
+            return []
+
+        with transaction.atomic(using=self.db):
+            produtos = (
+                Produto.objects.using(self.db)
+                .select_for_update()
+                .in_bulk({m.produto_id for m in movimentos})
             )
-        )
-        return agg["saldo"] or 0
+
+            saldos = {}
+            if validar:
+                saldos = dict(
+                    SaldoProduto.objects.using(self.db)
+                    .filter(produto_id__in=list(produtos))
+                    .values_list("produto_id", "saldo")
+                )
+
+            erros = {}
+            deltas_produto = {}
+            deltas_lote = {}
+
+            for i, mov in enumerate(movimentos):
+                produto = produtos.get(mov.produto_id)
+                if produto is None:
+                    erros[i] = ["Produto não encontrado."]
+                    continue
+
+                # mesma regra do save(): empresa do movimento é a do produto
+                mov.produto = produto
+                mov.empresa_id = produto.empresa_id
+
+                delta = self.model.delta_saldo(mov.tipo, mov.quantidade)
+
+                if validar:
+                    try:
+                        # validação de campos em memória (sem as queries de FK)
+                        mov.clean_fields(exclude=["empresa", "produto", "lote"])
+                    except ValidationError as e:
+                        erros[i] = e.messages
+                        continue
+
+                    if mov.tipo == "S" and produto.controla_estoque:
+                        saldo = saldos.get(produto.id, Decimal("0"))
+                        if mov.quantidade > max(saldo, 0):
+                            erros[i] = [
+                                f"Estoque insuficiente para {produto}. "
+                                f"Saldo atual: {max(saldo, 0)}."
+                            ]
+                            continue
+                    saldos[produto.id] = saldos.get(produto.id, Decimal("0")) + delta
+
+                chave = (mov.empresa_id, produto.id)
+                deltas_produto[chave] = deltas_produto.get(chave, 0) + delta
+                if mov.lote_id:
+                    chave = (mov.empresa_id, mov.lote_id)
+                    deltas_lote[chave] = deltas_lote.get(chave, 0) + delta
+
+            if erros:
+                raise ValidationError(
+                    [f"Linha {i + 1}: {'; '.join(msgs)}" for i, msgs in sorted(erros.items())]
+                )
+
+            criados = self.bulk_create(movimentos, batch_size=batch_size)
+            SaldoProduto.aplicar_deltas(deltas_produto)
+            SaldoLote.aplicar_deltas(deltas_lote)
+
+            # equivalente em lote ao post_save criar_despesa_entrada_estoque
+            from estoque.signals import montar_despesa_entrada
+
+            despesas = [d for d in (montar_despesa_entrada(m) for m in criados) if d is not None]
+            if despesas:
+                type(despesas[0]).objects.bulk_create(despesas, batch_size=batch_size)
+                # sem post_save no bulk_create: resumo diário e cache dos
+                # dashboards do financeiro atualizados aqui
+                from core.services_empresa import invalidar_respostas_empresa
+                from financeiro.models import ResumoDiarioFinanceiro
+
+                ResumoDiarioFinanceiro.aplicar_transacoes(despesas)
+                for empresa_id in {d.empresa_id for d in despesas}:
+                    invalidar_respostas_empresa(empresa_id)
+
+            # bulk_create não dispara post_save: índice de validade invalidado aqui
+            from estoque.services_lotes import invalidar_indice_validade
+
+            for empresa_id in {m.empresa_id for m in criados}:
+                invalidar_indice_validade(empresa_id)
+
+        return criados
 
 
 class MovimentoEstoque(models.Model):
     """
     Registro de entradas/saídas de estoque.
     PDV e ajustes de estoque geram movimentos automaticamente.
+    Para muitos movimentos de uma vez use MovimentoEstoque.objects.registrar_lote(...).
     """
 
+    objects = MovimentoEstoqueManager()
+
     TIPO_CHOICES = [
         ("E", "Entrada"),
         ("S", "Saída"),
@@ -181,12 +319,19 @@ class MovimentoEstoque(models.Model):
         blank=True,
         related_name="movimentos",
         verbose_name="Lote",
+        db_index=False,  # coberto pelo índice composto mov_lote_tipo (lote, tipo)
     )
 
     class Meta:
         verbose_name = "Movimento de estoque"
         verbose_name_plural = "Movimentos de estoque"
         ordering = ["-data"]
+        indexes = [
+            models.Index(fields=["empresa", "produto", "tipo"], name="mov_emp_prod_tipo"),
+            models.Index(fields=["lote", "tipo"], name="mov_lote_tipo"),
+            # séries mensais / snapshot / arquivamento (faixa de data por empresa)
+            models.Index(fields=["empresa", "data"], name="mov_emp_data"),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} de {self.quantidade} de {self.produto}"
@@ -208,22 +353,20 @@ class MovimentoEstoque(models.Model):
             and self.produto_id
             and getattr(self.produto, "controla_estoque", False)
         ):
-            qs = type(self).objects.filter(produto=self.produto, empresa=self.produto.empresa)
+            # saldo materializado (SaldoProduto) em vez de somar todo o histórico
+            saldo_atual = SaldoProduto.saldo_de(self.produto.empresa_id, self.produto_id)
 
+            # edição: o próprio movimento já está no saldo, devolve a contribuição antiga
             if self.pk:
-                qs = qs.exclude(pk=self.pk)
-
-            agg = qs.aggregate(
-                saldo=Sum(
-                    Case(
-                        When(tipo="E", then=F("quantidade")),
-                        When(tipo="S", then=-F("quantidade")),
-                        default=0,
-                        output_field=DecimalField(),
-                    )
+                anterior = (
+                    type(self)
+                    .objects.filter(pk=self.pk, produto_id=self.produto_id)
+                    .values("tipo", "quantidade")
+                    .first()
                 )
-            )
-            saldo_atual = agg["saldo"] or 0
+                if anterior:
+                    saldo_atual -= self.delta_saldo(anterior["tipo"], anterior["quantidade"])
+
             if saldo_atual < 0:
                 saldo_atual = 0
 
@@ -234,8 +377,327 @@ class MovimentoEstoque(models.Model):
                     }
                 )
 
+    @staticmethod
+    def delta_saldo(tipo, quantidade):
+        """
+        Efeito do movimento no saldo: entrada soma, saída subtrai.
+        """
+        quantidade = Decimal(str(quantidade or 0))
+        if tipo == "E":
+            return quantidade
+        if tipo == "S":
+            return -quantidade
+        return Decimal("0")
+
     def save(self, *args, **kwargs):
         if self.produto_id:
             self.empresa = self.produto.empresa
         self.full_clean()
-        return super().save(*args, **kwargs)
+
+        # movimento + saldo materializado na MESMA transação
+        with transaction.atomic():
+            anterior = None
+            if self.pk:
+                anterior = (
+                    type(self)
+                    .objects.filter(pk=self.pk)
+                    .values("empresa_id", "produto_id", "lote_id", "tipo", "quantidade")
+                    .first()
+                )
+
+            result = super().save(*args, **kwargs)
+
+            if anterior:
+                delta_anterior = -self.delta_saldo(anterior["tipo"], anterior["quantidade"])
+                SaldoProduto.aplicar_delta(
+                    anterior["empresa_id"], anterior["produto_id"], delta_anterior
+                )
+                SaldoLote.aplicar_delta(anterior["empresa_id"], anterior["lote_id"], delta_anterior)
+
+            delta = self.delta_saldo(self.tipo, self.quantidade)
+            SaldoProduto.aplicar_delta(self.empresa_id, self.produto_id, delta)
+            SaldoLote.aplicar_delta(self.empresa_id, self.lote_id, delta)
+
+        return result
+
+
+class SaldoProduto(models.Model):
+    """
+    Saldo materializado por (empresa, produto).
+    Atualizado na mesma transação de cada MovimentoEstoque (save/delete),
+    assim as leituras de saldo não precisam varrer o histórico inteiro.
+    Se desconfiar de divergência: python manage.py recalcular_saldos --verificar
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="saldos_produto",
+    )
+
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.CASCADE,
+        related_name="saldos",
+    )
+
+    saldo = models.DecimalField("Saldo", max_digits=14, decimal_places=3, default=0)
+
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Saldo de produto"
+        verbose_name_plural = "Saldos de produto"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "produto"],
+                name="uniq_saldo_produto_empresa_produto",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.produto} — saldo {self.saldo}"
+
+    @classmethod
+    def aplicar_delta(cls, empresa_id, produto_id, delta):
+        """
+        Soma `delta` no saldo de forma atômica (UPDATE ... SET saldo = saldo + delta).
+        Cria a linha na primeira movimentação do produto.
+        """
+        if not empresa_id or not produto_id:
+            return
+
+        delta = Decimal(str(delta or 0))
+        if delta == 0:
+            return
+
+        filtros = {"empresa_id": empresa_id, "produto_id": produto_id}
+        atualizados = cls.objects.filter(**filtros).update(saldo=F("saldo") + delta)
+        if not atualizados:
+            cls.objects.get_or_create(defaults={"saldo": Decimal("0")}, **filtros)
+            cls.objects.filter(**filtros).update(saldo=F("saldo") + delta)
+
+    @classmethod
+    def aplicar_deltas(cls, deltas):
+        """
+        Versão em lote de aplicar_delta: {(empresa_id, produto_id): delta}.
+        Custo fixo (INSERT ... ON CONFLICT DO NOTHING + 1 UPDATE com CASE),
+        independente de quantos produtos vierem.
+        """
+        deltas = {
+            chave: Decimal(str(delta))
+            for chave, delta in deltas.items()
+            if chave[0] and chave[1] and delta
+        }
+        if not deltas:
+            return
+
+        cls.objects.bulk_create(
+            [cls(empresa_id=e, produto_id=p, saldo=Decimal("0")) for e, p in deltas],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(produto_id__in=[p for _, p in deltas]).update(
+            saldo=F("saldo")
+            + Case(
+                *[When(produto_id=p, then=Value(d)) for (_, p), d in deltas.items()],
+                default=Value(Decimal("0")),
+                output_field=DecimalField(max_digits=14, decimal_places=3),
+            )
+        )
+
+    @classmethod
+    def saldo_de(cls, empresa_id, produto_id):
+        """
+        Saldo atual do produto (1 query por chave, sem agregação).
+        """
+        saldo = (
+            cls.objects.filter(empresa_id=empresa_id, produto_id=produto_id)
+            .values_list("saldo", flat=True)
+            .first()
+        )
+        return saldo if saldo is not None else Decimal("0")
+
+
+class SaldoLote(models.Model):
+    """
+    Saldo materializado por lote (entradas - saídas dos movimentos do lote).
+    Mantido junto com SaldoProduto a cada MovimentoEstoque com lote.
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="saldos_lote",
+    )
+
+    lote = models.OneToOneField(
+        LoteProduto,
+        on_delete=models.CASCADE,
+        related_name="saldo_registro",
+    )
+
+    saldo = models.DecimalField("Saldo", max_digits=14, decimal_places=3, default=0)
+
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Saldo de lote"
+        verbose_name_plural = "Saldos de lote"
+
+    def __str__(self):
+        return f"{self.lote} — saldo {self.saldo}"
+
+    @classmethod
+    def aplicar_delta(cls, empresa_id, lote_id, delta):
+        """
+        Soma `delta` no saldo do lote (UPDATE atômico). Movimento sem lote não faz nada.
+        """
+        if not empresa_id or not lote_id:
+            return
+
+        delta = Decimal(str(delta or 0))
+        if delta == 0:
+            return
+
+        atualizados = cls.objects.filter(lote_id=lote_id).update(saldo=F("saldo") + delta)
+        if not atualizados:
+            cls.objects.get_or_create(
+                lote_id=lote_id, defaults={"empresa_id": empresa_id, "saldo": Decimal("0")}
+            )
+            cls.objects.filter(lote_id=lote_id).update(saldo=F("saldo") + delta)
+
+    @classmethod
+    def aplicar_deltas(cls, deltas):
+        """
+        Versão em lote de aplicar_delta: {(empresa_id, lote_id): delta}.
+        """
+        deltas = {
+            chave: Decimal(str(delta))
+            for chave, delta in deltas.items()
+            if chave[0] and chave[1] and delta
+        }
+        if not deltas:
+            return
+
+        cls.objects.bulk_create(
+            [cls(empresa_id=e, lote_id=lote_id, saldo=Decimal("0")) for e, lote_id in deltas],
+            ignore_conflicts=True,
+        )
+        cls.objects.filter(lote_id__in=[lote_id for _, lote_id in deltas]).update(
+            saldo=F("saldo")
+            + Case(
+                *[When(lote_id=lote_id, then=Value(d)) for (_, lote_id), d in deltas.items()],
+                default=Value(Decimal("0")),
+                output_field=DecimalField(max_digits=14, decimal_places=3),
+            )
+        )
+
+    @classmethod
+    def saldos_de(cls, lote_ids):
+        """
+        Saldos de vários lotes em 1 query: {lote_id: Decimal}.
+        Lote sem linha ainda não teve movimento (saldo 0).
+        """
+        lote_ids = list(lote_ids)
+        if not lote_ids:
+            return {}
+        saldos = dict(cls.objects.filter(lote_id__in=lote_ids).values_list("lote_id", "saldo"))
+        return {lid: saldos.get(lid, Decimal("0")) for lid in lote_ids}
+
+
+class SnapshotEstoque(models.Model):
+    """
+    Saldo de fechamento mensal por (empresa, produto, lote).
+    lote vazio = movimentos do produto sem lote.
+
+    Gerado por: python manage.py snapshot_estoque
+    Saldo "real" = último snapshot + movimentos depois dele (ver services_snapshot).
+    entradas/saidas guardam o que movimentou no mês (série do dashboard).
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="snapshots_estoque",
+    )
+
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.CASCADE,
+        related_name="snapshots",
+    )
+
+    lote = models.ForeignKey(
+        LoteProduto,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="snapshots",
+    )
+
+    saldo_em = models.DateField("Saldo em", help_text="Último dia do mês fechado.")
+
+    saldo = models.DecimalField("Saldo", max_digits=14, decimal_places=3, default=0)
+    entradas = models.DecimalField("Entradas no mês", max_digits=14, decimal_places=3, default=0)
+    saidas = models.DecimalField("Saídas no mês", max_digits=14, decimal_places=3, default=0)
+
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Snapshot de estoque"
+        verbose_name_plural = "Snapshots de estoque"
+        ordering = ["-saldo_em", "produto"]
+        indexes = [
+            models.Index(fields=["empresa", "saldo_em"], name="snap_estoque_empresa_data"),
+        ]
+
+    def __str__(self):
+        return f"{self.produto} — {self.saldo_em:%m/%Y}: {self.saldo}"
+
+
+class MovimentoEstoqueArquivo(models.Model):
+    """
+    Arquivo "frio" de movimentos já cobertos por um snapshot
+    (snapshot_estoque --arquivar). Mantém o id original.
+    Não mexe em saldo: os saldos continuam vindo de SaldoProduto/SaldoLote/snapshots.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.PROTECT,
+        related_name="movimentos_estoque_arquivo",
+    )
+
+    produto = models.ForeignKey(
+        Produto,
+        on_delete=models.PROTECT,
+        related_name="movimentos_arquivo",
+    )
+
+    tipo = models.CharField("Tipo", max_length=1, choices=MovimentoEstoque.TIPO_CHOICES)
+
+    quantidade = models.DecimalField("Quantidade", max_digits=10, decimal_places=3)
+
+    data = models.DateTimeField("Data")
+
+    observacao = models.CharField("Observação", max_length=255, blank=True)
+
+    lote = models.ForeignKey(
+        LoteProduto,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="movimentos_arquivo",
+    )
+
+    arquivado_em = models.DateTimeField("Arquivado em", auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Movimento de estoque (arquivo)"
+        verbose_name_plural = "Movimentos de estoque (arquivo)"
+        ordering = ["-data"]
+
+    def __str__(self):
+        return f"[arquivo] {self.get_tipo_display()} de {self.quantidade} de {self.produto}"
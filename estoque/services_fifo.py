@@ -1,10 +1,12 @@
 from decimal import Decimal
 from django.db import transaction
 from django.core.exceptions import ValidationError
+from django.db.models import Case, When
+from django.utils import timezone
 from django.utils.timezone import now
 
 
-from .models import LoteProduto  # 👈 seu model, conforme o traceback
+from .models import LoteProduto, MovimentoEstoque, SaldoProduto
 
 
 class EstoqueInsuficienteError(Exception):
@@ -57,12 +59,12 @@ def consumir_estoque_fifo(produto, quantidade):
     if quantidade <= 0:
         raise ValidationError("Quantidade deve ser maior que zero.")
 
-    # 🔹 Agora só filtramos por produto e ordenamos para FIFO
-    lotes = LoteProduto.objects.filter(produto=produto).order_by(
-        "validade", "id"
-    )  # validade existe no seu model
+    # 🔹 1 query: lotes do produto já com saldo (SaldoLote), ordenados para FIFO
+    lotes = list(
+        LoteProduto.objects.filter(produto=produto).com_saldo().order_by("validade", "id")
+    )
 
-    if not lotes.exists():
+    if not lotes:
         raise EstoqueInsuficienteError(f"Não há lotes cadastrados para o produto '{produto}'.")
 
     restante = quantidade
@@ -72,30 +74,15 @@ def consumir_estoque_fifo(produto, quantidade):
         if restante <= 0:
             break
 
-        # 🔹 Aqui usamos a propriedade/atributo saldo_atual em Python
-        saldo = getattr(lote, "saldo_atual", None)
-
-        if saldo is None:
-            # Se cair aqui, quer dizer que o model não tem nem campo nem @property saldo_atual
-            raise ValueError(
-                "O model LoteProduto não possui atributo/propriedade 'saldo_atual'. "
-                "Ajuste o services_fifo.py para usar a sua forma de calcular o saldo."
-            )
+        saldo = lote.saldo  # anotado por com_saldo()
 
         if saldo <= 0:
             continue
         validar_lote_para_venda(lote)
-        
+
         consumir = min(saldo, restante)
 
-        # Se saldo_atual for field real, isso salva no banco;
-        # se for @property calculada, depois a gente ajusta a lógica.
-        if hasattr(type(lote), "_meta") and "saldo_atual" in [f.name for f in lote._meta.fields]:
-            lote.saldo_atual = saldo - consumir
-            lote.save(update_fields=["saldo_atual"])
-        else:
-            # Por enquanto só segue; mais pra frente podemos amarrar com Movimentos
-            pass
+        # o saldo do lote só muda quando o MovimentoEstoque "S" for gravado
 
         movimentos.append(
             {
@@ -120,3 +107,110 @@ def consumir_estoque_fifo(produto, quantidade):
         "quantidade_atendida": quantidade_atendida,
         "lotes": movimentos,
     }
+
+
+def planejar_fifo_carrinho(empresa, quantidades, travar=False):
+    """
+    Motor de alocação FIFO para o carrinho inteiro (PDV).
+
+    Parâmetros:
+        empresa: empresa da venda.
+        quantidades: {produto_id: quantidade} — só produtos que controlam estoque.
+        travar: True dentro da venda (select_for_update nos lotes).
+
+    Em 2 queries, para todos os produtos de uma vez:
+        - saldos dos produtos (SaldoProduto)
+        - lotes candidatos com saldo (SaldoLote), já na ordem FIFO
+    e numa passada calcula o plano, os lotes vencidos e a suficiência.
+
+    Retorna {produto_id: {
+        "saldo": Decimal,            # saldo do produto
+        "alocacoes": [(lote, qtd)],  # plano FIFO
+        "vencidos": [ {...} ],       # mesmo formato que o front já usa
+        "faltando": Decimal,         # > 0 se os lotes não cobrem a quantidade
+    }}
+    """
+    quantidades = {pid: Decimal(str(q)) for pid, q in quantidades.items()}
+    if not quantidades:
+        return {}
+
+    hoje = timezone.localdate()
+
+    saldos = dict(
+        SaldoProduto.objects.filter(empresa=empresa, produto_id__in=list(quantidades))
+        .values_list("produto_id", "saldo")
+    )
+
+    lotes = LoteProduto.objects.filter(
+        empresa=empresa, produto_id__in=list(quantidades)
+    ).select_related("produto")
+    if travar:
+        lotes = lotes.select_for_update(of=("self",))
+
+    # FIFO robusto: validade NULL vai pro final
+    lotes = (
+        lotes.com_saldo()
+        .filter(saldo__gt=0)
+        .annotate(validade_null=Case(When(validade__isnull=True, then=1), default=0))
+        .order_by("produto_id", "validade_null", "validade", "criado_em", "codigo")
+    )
+
+    plano = {
+        pid: {
+            "saldo": saldos.get(pid, Decimal("0")),
+            "alocacoes": [],
+            "vencidos": [],
+            "faltando": qtd,
+        }
+        for pid, qtd in quantidades.items()
+    }
+
+    for lote in lotes:
+        item = plano[lote.produto_id]
+        restante = item["faltando"]
+        if restante <= 0:
+            continue
+
+        usar = lote.saldo if lote.saldo < restante else restante
+        item["alocacoes"].append((lote, usar))
+        item["faltando"] = restante - usar
+
+        if lote.validade and lote.validade < hoje:
+            item["vencidos"].append(
+                {
+                    "lote_id": lote.id,
+                    "lote": getattr(lote, "codigo", None) or str(lote),
+                    "validade": lote.validade.isoformat(),
+                    "qtd": float(usar),
+                }
+            )
+
+    return plano
+
+
+def registrar_saidas_fifo(empresa, plano, observacao="Saída PDV", venda_id=None):
+    """
+    Grava as saídas do plano (planejar_fifo_carrinho) de uma vez via
+    MovimentoEstoque.objects.registrar_lote (bulk_create + saldos em lote).
+
+    validar=False: a validação já foi feita pelo plano, com os lotes
+    travados na mesma transação.
+    """
+    obs = observacao
+    if venda_id:
+        obs = f"{obs} (Venda #{venda_id})"
+
+    movimentos = [
+        MovimentoEstoque(
+            empresa=empresa,
+            produto_id=pid,
+            lote=lote,
+            tipo="S",
+            quantidade=qtd,
+            observacao=obs,
+        )
+        for pid, item in plano.items()
+        for lote, qtd in item["alocacoes"]
+    ]
+
+    return MovimentoEstoque.objects.registrar_lote(movimentos, validar=False)
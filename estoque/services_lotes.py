@@ -1,72 +1,141 @@
 # estoque/services_lotes.py
 from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
+
 from .models import LoteProduto
 
+# Índice de validade: lotes com saldo e validade até o horizonte, por empresa.
+# Fica no cache com a data na chave (renova sozinho na virada do dia) e é
+# invalidado quando chega movimento ou o lote muda (estoque/signals.py).
+HORIZONTE_INDICE_DIAS = 365
+TIMEOUT_INDICE = 60 * 60 * 24
 
-def buscar_lotes_prestes_vencer(dias_aviso=30):
-    hoje = timezone.localdate()
-    limite = hoje + timedelta(days=dias_aviso)
+PRIORIDADE_NIVEL = {"ACAO_IMEDIATA": 0, "ALERTA_7_DIAS": 1, "ALERTA_15_DIAS": 2}
 
-    qs = LoteProduto.objects.filter(validade__isnull=False, validade__lte=limite).order_by(
-        "validade", "id"
-    )
 
-    resultados = []
+def status_critico(dias_para_vencer, saldo):
+    """
+    Retorna o status do lote para o ranking crítico.
+    - <= 0: ACAO_IMEDIATA (vencido)
+    - 1..7: ALERTA_7_DIAS
+    - 8..15: ALERTA_15_DIAS
+    - >15: None (não entra no ranking)
+    """
+    if saldo is None or float(saldo) <= 0:
+        return None  # sem saldo não é "crítico acionável" no ranking
 
-    for lote in qs:
-        saldo = getattr(lote, "saldo_atual", None)
-        if saldo is not None and saldo <= 0:
-            # lote sem saldo não entra em alerta
-            continue
+    d = int(dias_para_vencer or 0)
 
-        validade = lote.validade
-        dias_restantes = (validade - hoje).days
+    if d <= 0:
+        return "ACAO_IMEDIATA"
+    if d <= 7:
+        return "ALERTA_7_DIAS"
+    if d <= 15:
+        return "ALERTA_15_DIAS"
+    return None
+
+
+def _chave_indice(empresa_id, hoje):
+    return f"estoque:indice_validade:{empresa_id}:{hoje.isoformat()}"
 
-        if dias_restantes < 0:
-            status = "vencido"
-        else:
-            status = "prestes_vencer"
 
-        resultados.append(
+def _montar_indice(empresa, hoje):
+    """
+    1 query: saldo do lote vem do SaldoLote e lote sem saldo já fica de fora.
+    Já sai na ordem de validade (vencidos primeiro, depois os mais próximos).
+    """
+    limite = hoje + timedelta(days=HORIZONTE_INDICE_DIAS)
+
+    qs = LoteProduto.objects.filter(validade__isnull=False, validade__lte=limite)
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+
+    qs = (
+        qs.com_saldo()
+        .filter(saldo__gt=0)
+        .order_by("validade", "id")
+        .values("id", "codigo", "validade", "saldo", "produto_id", "produto__nome")
+    )
+
+    itens = []
+    for r in qs:
+        dias = (r["validade"] - hoje).days
+        itens.append(
             {
-                "lote": lote,
-                "produto": lote.produto,
-                "dias_restantes": dias_restantes,
-                "status": status,
-                "saldo_atual": saldo,
+                "lote_id": r["id"],
+                "codigo": (r["codigo"] or "").strip(),
+                "produto_id": r["produto_id"],
+                "produto_nome": r["produto__nome"],
+                "validade": r["validade"],
+                "dias_restantes": dias,
+                "saldo": r["saldo"],
+                "status": "vencido" if dias < 0 else "prestes_vencer",
+                "nivel": status_critico(dias, r["saldo"]),  # ACAO_IMEDIATA / ALERTA_* / None
             }
         )
+    return itens
 
-    # 🔥 ordena: 1º vencidos, depois prestes a vencer, e dentro disso pela validade
-    resultados.sort(
-        key=lambda item: (
-            0 if item["status"] == "vencido" else 1,
-            item["dias_restantes"],
-        )
-    )
 
-    return resultados
+def indice_validade(empresa):
+    """
+    Índice de validade da empresa (lista de dicts, ordem de validade).
+    Dashboard, PDV e IA leem daqui: só monta de novo no 1º acesso do dia
+    ou depois de um movimento.
+    """
+    hoje = timezone.localdate()
+    chave = _chave_indice(getattr(empresa, "pk", empresa), hoje)
+
+    itens = cache.get(chave)
+    if itens is None:
+        itens = _montar_indice(empresa, hoje)
+        cache.set(chave, itens, TIMEOUT_INDICE)
+    return itens
+
+
+def invalidar_indice_validade(empresa_id):
+    """
+    Descarta o índice da empresa depois do commit (antes disso outro request
+    poderia remontar com o saldo antigo).
+    """
+    if not empresa_id:
+        return
+    chave = _chave_indice(empresa_id, timezone.localdate())
+    transaction.on_commit(lambda: cache.delete(chave))
+
 
+def buscar_lotes_prestes_vencer(dias_aviso=30, empresa=None):
+    """
+    Lotes vencidos / vencendo em até `dias_aviso` dias (máx. HORIZONTE_INDICE_DIAS).
+    Com empresa lê o índice em cache; sem empresa monta a visão geral na hora.
+    """
+    if empresa is not None:
+        itens = indice_validade(empresa)
+    else:
+        itens = _montar_indice(None, timezone.localdate())
+
+    return [it for it in itens if it["dias_restantes"] <= dias_aviso]
 
-def gerar_textos_alerta_lotes(dias_aviso=30):
-    lotes = buscar_lotes_prestes_vencer(dias_aviso=dias_aviso)
+
+def gerar_textos_alerta_lotes(dias_aviso=30, empresa=None):
+    lotes = buscar_lotes_prestes_vencer(dias_aviso=dias_aviso, empresa=empresa)
 
     mensagens = []
 
     for item in lotes:
-        lote = item["lote"]
-        produto = item["produto"]
         dias = item["dias_restantes"]
         status = item["status"]
-        saldo = item.get("saldo_atual")
+        saldo = item.get("saldo")
+        validade = item["validade"]
 
-        codigo = getattr(lote, "codigo", "") or f"ID {lote.id}"
+        codigo = item["codigo"] or f"ID {item['lote_id']}"
 
         if status == "vencido":
             msg_base = (
-                f"Atenção: o lote {codigo} do produto '{produto.nome}' "
-                f"está VENCIDO desde {lote.validade.strftime('%d/%m/%Y')}"
+                f"Atenção: o lote {codigo} do produto '{item['produto_nome']}' "
+                f"está VENCIDO desde {validade.strftime('%d/%m/%Y')}"
             )
         else:
             if dias == 0:
@@ -77,8 +146,8 @@ def gerar_textos_alerta_lotes(dias_aviso=30):
                 quando = f"vence em {dias} dias"
 
             msg_base = (
-                f"Alerta: o lote {codigo} do produto '{produto.nome}' "
-                f"{quando} ({lote.validade.strftime('%d/%m/%Y')})"
+                f"Alerta: o lote {codigo} do produto '{item['produto_nome']}' "
+                f"{quando} ({validade.strftime('%d/%m/%Y')})"
             )
 
         # complemento opcional com saldo
@@ -91,26 +160,14 @@ def gerar_textos_alerta_lotes(dias_aviso=30):
             {
                 "tipo": status,  # "vencido" ou "prestes_vencer"
                 "texto": msg,
-                "lote_id": lote.id,
-                "produto_id": produto.id,
-                "produto_nome": produto.nome,
+                "lote_id": item["lote_id"],
+                "produto_id": item["produto_id"],
+                "produto_nome": item["produto_nome"],
                 "lote_codigo": codigo,
-                "validade": lote.validade.isoformat(),
+                "validade": validade.isoformat(),
                 "dias_restantes": dias,
                 "saldo_atual": float(saldo) if saldo is not None else None,
             }
         )
 
     return mensagens
-
-from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
-
-
-@login_required
-def dashboard_estoque_dados(request):
-    """
-    Endpoint que fornece dados agregados do estoque para o dashboard.
-    (stub inicial – depois a gente incrementa)
-    """
-    return JsonResponse({"ok": True, "message": "Dashboard de estoque - dados iniciais"})
@@ -0,0 +1,152 @@
+# estoque/services_saldo.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import SaldoLote, SaldoProduto
+from .services_lotes import invalidar_indice_validade
+from .services_snapshot import saldos_consolidados
+
+DEC_SALDO = DecimalField(max_digits=14, decimal_places=3)
+
+
+def saldo_produto(produto):
+    """
+    Saldo atual do produto lido da tabela materializada (sem varrer movimentos).
+    """
+    return SaldoProduto.saldo_de(produto.empresa_id, produto.pk)
+
+
+def saldos_produtos(empresa, produto_ids=None):
+    """
+    Saldos de vários produtos em 1 query.
+    Retorna {produto_id: Decimal}. Produto sem linha = sem movimento (saldo 0).
+    """
+    qs = SaldoProduto.objects.filter(empresa=empresa)
+    if produto_ids is not None:
+        qs = qs.filter(produto_id__in=list(produto_ids))
+    return dict(qs.values_list("produto_id", "saldo"))
+
+
+def saldo_subquery(produto_ref="pk"):
+    """
+    Expressão para annotate em querysets de Produto:
+        Produto.objects.annotate(saldo=saldo_subquery())
+    """
+    sub = SaldoProduto.objects.filter(produto_id=OuterRef(produto_ref)).values("saldo")[:1]
+    return Coalesce(Subquery(sub, output_field=DEC_SALDO), Decimal("0.000"), output_field=DEC_SALDO)
+
+
+def saldos_lotes(lote_ids):
+    """
+    Saldos de vários lotes em 1 query: {lote_id: Decimal}.
+    """
+    return SaldoLote.saldos_de(lote_ids)
+
+
+def _saldos_por_movimentos(chaves, empresa=None):
+    """
+    Saldo "de verdade" (usado só no rebuild/verificação): último snapshot
+    mensal + movimentos depois dele (ver services_snapshot).
+    `chaves`: campos do agrupamento, ex. ("empresa_id", "produto_id").
+    """
+    return saldos_consolidados(chaves, empresa=empresa)
+
+
+def _comparar(gravados, calculados, campo, corrigir, novo):
+    """
+    Diferença entre saldos gravados ({chave: obj}) e calculados ({chave: Decimal}).
+    Corrige em memória e devolve (divergencias, novos, alterados).
+    """
+    divergencias = []
+    novos = []
+    alterados = []
+
+    for chave in set(gravados) | set(calculados):
+        obj = gravados.get(chave)
+        calculado = calculados.get(chave, Decimal("0"))
+        gravado = obj.saldo if obj else None
+
+        if gravado is not None and gravado == calculado:
+            continue
+        if gravado is None and calculado == 0:
+            continue
+
+        divergencias.append(
+            {
+                "tipo": campo,
+                "empresa_id": chave[0],
+                f"{campo}_id": chave[1],
+                "gravado": gravado,
+                "calculado": calculado,
+            }
+        )
+
+        if not corrigir:
+            continue
+
+        if obj is None:
+            novos.append(novo(chave, calculado))
+        else:
+            obj.saldo = calculado
+            alterados.append(obj)
+
+    return divergencias, novos, alterados
+
+
+@transaction.atomic
+def recalcular_saldos(empresa=None, corrigir=True):
+    """
+    Compara SaldoProduto/SaldoLote com a soma dos movimentos e (opcionalmente) corrige.
+
+    Trava as linhas de saldo antes de agregar: movimentos concorrentes ficam
+    esperando no UPDATE do saldo e somam em cima do valor recalculado.
+
+    Retorna lista de divergências:
+        [{"tipo": "produto"|"lote", "empresa_id", "produto_id"|"lote_id",
+          "gravado", "calculado"}, ...]
+    """
+    divergencias = []
+
+    # ---- produtos
+    saldos_qs = SaldoProduto.objects.select_for_update()
+    if empresa is not None:
+        saldos_qs = saldos_qs.filter(empresa=empresa)
+
+    div, novos, alterados = _comparar(
+        {(s.empresa_id, s.produto_id): s for s in saldos_qs},
+        _saldos_por_movimentos(("empresa_id", "produto_id"), empresa=empresa),
+        "produto",
+        corrigir,
+        lambda chave, saldo: SaldoProduto(empresa_id=chave[0], produto_id=chave[1], saldo=saldo),
+    )
+    divergencias.extend(div)
+    if novos:
+        SaldoProduto.objects.bulk_create(novos, batch_size=500)
+    if alterados:
+        SaldoProduto.objects.bulk_update(alterados, ["saldo"], batch_size=500)
+
+    # ---- lotes
+    lotes_qs = SaldoLote.objects.select_for_update()
+    if empresa is not None:
+        lotes_qs = lotes_qs.filter(empresa=empresa)
+
+    div, novos, alterados = _comparar(
+        {(s.empresa_id, s.lote_id): s for s in lotes_qs},
+        _saldos_por_movimentos(("empresa_id", "lote_id"), empresa=empresa),
+        "lote",
+        corrigir,
+        lambda chave, saldo: SaldoLote(empresa_id=chave[0], lote_id=chave[1], saldo=saldo),
+    )
+    divergencias.extend(div)
+    if novos:
+        SaldoLote.objects.bulk_create(novos, batch_size=500)
+    if alterados:
+        SaldoLote.objects.bulk_update(alterados, ["saldo"], batch_size=500)
+    if corrigir:
+        for empresa_id in {d["empresa_id"] for d in div}:
+            invalidar_indice_validade(empresa_id)
+
+    return divergencias
@@ -0,0 +1,238 @@
+# estoque/services_snapshot.py
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Max, Sum, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import MovimentoEstoque, MovimentoEstoqueArquivo, SnapshotEstoque
+
+DEC = DecimalField(max_digits=14, decimal_places=3)
+
+
+def ultimo_dia_mes(ano, mes):
+    if mes == 12:
+        return date(ano, 12, 31)
+    return date(ano, mes + 1, 1) - timedelta(days=1)
+
+
+def inicio_apos(saldo_em):
+    """
+    Primeiro instante (timezone local) depois do dia `saldo_em`.
+    Movimentos com data >= isso ficam fora do snapshot.
+    """
+    return timezone.make_aware(datetime.combine(saldo_em + timedelta(days=1), time.min))
+
+
+def _movimentos_por_chave(qs, chaves):
+    """
+    Agrupa movimentos em {chave: (entradas, saidas)}.
+    """
+    rows = (
+        qs.order_by()
+        .values(*chaves)
+        .annotate(
+            entradas=Sum(Case(When(tipo="E", then=F("quantidade")), default=0, output_field=DEC)),
+            saidas=Sum(Case(When(tipo="S", then=F("quantidade")), default=0, output_field=DEC)),
+        )
+    )
+    return {
+        tuple(r[c] for c in chaves): (r["entradas"] or Decimal("0"), r["saidas"] or Decimal("0"))
+        for r in rows
+    }
+
+
+def ultimo_snapshot(empresa):
+    """
+    Data (saldo_em) do snapshot mais recente da empresa, ou None.
+    """
+    return SnapshotEstoque.objects.filter(empresa=empresa).aggregate(u=Max("saldo_em"))["u"]
+
+
+@transaction.atomic
+def gerar_snapshot(empresa, ano, mes):
+    """
+    Fecha o mês: saldo por (produto, lote) = snapshot anterior + movimentos do período.
+
+    O período é lido do movimento "vivo" + arquivo, então dá para regerar um
+    mês mesmo depois de arquivado. Regerar um mês do meio deixa os seguintes
+    desatualizados: regere em ordem (o comando snapshot_estoque já faz isso).
+
+    Retorna a quantidade de linhas gravadas.
+    """
+    saldo_em = ultimo_dia_mes(ano, mes)
+    fim = inicio_apos(saldo_em)
+
+    anterior = (
+        SnapshotEstoque.objects.filter(empresa=empresa, saldo_em__lt=saldo_em)
+        .aggregate(u=Max("saldo_em"))["u"]
+    )
+
+    chaves = ("produto_id", "lote_id")
+    base = {}
+    filtro_periodo = {"empresa": empresa, "data__lt": fim}
+    if anterior:
+        base = {
+            (r["produto_id"], r["lote_id"]): r["saldo"]
+            for r in SnapshotEstoque.objects.filter(empresa=empresa, saldo_em=anterior).values(
+                "produto_id", "lote_id", "saldo"
+            )
+        }
+        filtro_periodo["data__gte"] = inicio_apos(anterior)
+
+    periodo = defaultdict(lambda: (Decimal("0"), Decimal("0")))
+    for modelo in (MovimentoEstoque, MovimentoEstoqueArquivo):
+        for chave, (e, s) in _movimentos_por_chave(
+            modelo.objects.filter(**filtro_periodo), chaves
+        ).items():
+            pe, ps = periodo[chave]
+            periodo[chave] = (pe + e, ps + s)
+
+    linhas = []
+    for chave in set(base) | set(periodo):
+        entradas, saidas = periodo.get(chave, (Decimal("0"), Decimal("0")))
+        saldo = base.get(chave, Decimal("0")) + entradas - saidas
+        if saldo == 0 and entradas == 0 and saidas == 0:
+            continue
+        linhas.append(
+            SnapshotEstoque(
+                empresa=empresa,
+                produto_id=chave[0],
+                lote_id=chave[1],
+                saldo_em=saldo_em,
+                saldo=saldo,
+                entradas=entradas,
+                saidas=saidas,
+            )
+        )
+
+    SnapshotEstoque.objects.filter(empresa=empresa, saldo_em=saldo_em).delete()
+    SnapshotEstoque.objects.bulk_create(linhas, batch_size=500)
+    return len(linhas)
+
+
+@transaction.atomic
+def arquivar_movimentos(empresa, saldo_em, batch_size=2000):
+    """
+    Move para MovimentoEstoqueArquivo os movimentos cobertos pelo snapshot `saldo_em`.
+
+    O DELETE é SQL direto (sem post_delete) de propósito: o movimento só mudou
+    de tabela, o saldo materializado não pode ser estornado. Nada aponta para
+    MovimentoEstoque, então não há cascata a seguir.
+    Retorna a quantidade de movimentos arquivados.
+    """
+    if not SnapshotEstoque.objects.filter(empresa=empresa, saldo_em=saldo_em).exists():
+        raise ValueError(f"Sem snapshot em {saldo_em:%d/%m/%Y} para arquivar.")
+
+    qs = MovimentoEstoque.objects.filter(empresa=empresa, data__lt=inicio_apos(saldo_em))
+    campos = (
+        "id", "empresa_id", "produto_id", "lote_id", "tipo", "quantidade", "data", "observacao"
+    )
+    tabela = connection.ops.quote_name(MovimentoEstoque._meta.db_table)
+    apagar = f"DELETE FROM {tabela} WHERE id = ANY(%s)"
+
+    total = 0
+    while True:
+        linhas = list(qs.order_by("id").values(*campos)[:batch_size])
+        if not linhas:
+            break
+
+        MovimentoEstoqueArquivo.objects.bulk_create(
+            [MovimentoEstoqueArquivo(**r) for r in linhas], ignore_conflicts=True
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(apagar, [[r["id"] for r in linhas]])
+        total += len(linhas)
+
+    return total
+
+
+def saldos_consolidados(chaves, empresa=None):
+    """
+    Saldo por chave = último snapshot da empresa + movimentos depois dele.
+    Empresa sem snapshot soma o histórico inteiro (como antes).
+
+    `chaves`: ("empresa_id", "produto_id") ou ("empresa_id", "lote_id").
+    Retorna {chave: Decimal}.
+    """
+    por_lote = "lote_id" in chaves
+    resultado = defaultdict(lambda: Decimal("0"))
+
+    ultimos = SnapshotEstoque.objects.values("empresa_id").annotate(u=Max("saldo_em")).order_by()
+    if empresa is not None:
+        ultimos = ultimos.filter(empresa=empresa)
+
+    com_snapshot = []
+    for row in ultimos:
+        com_snapshot.append(row["empresa_id"])
+
+        snaps = SnapshotEstoque.objects.filter(empresa_id=row["empresa_id"], saldo_em=row["u"])
+        if por_lote:
+            snaps = snaps.filter(lote__isnull=False)
+        for r in snaps.order_by().values(*chaves).annotate(s=Sum("saldo")):
+            resultado[tuple(r[c] for c in chaves)] += r["s"] or Decimal("0")
+
+        movs = MovimentoEstoque.objects.filter(
+            empresa_id=row["empresa_id"], data__gte=inicio_apos(row["u"])
+        )
+        if por_lote:
+            movs = movs.filter(lote__isnull=False)
+        for chave, (e, s) in _movimentos_por_chave(movs, chaves).items():
+            resultado[chave] += e - s
+
+    movs = MovimentoEstoque.objects.exclude(empresa_id__in=com_snapshot)
+    if empresa is not None:
+        movs = movs.filter(empresa=empresa)
+    if por_lote:
+        movs = movs.filter(lote__isnull=False)
+    for chave, (e, s) in _movimentos_por_chave(movs, chaves).items():
+        resultado[chave] += e - s
+
+    return dict(resultado)
+
+
+def serie_mensal_movimentos(empresa):
+    """
+    Entradas x saídas por mês da empresa.
+    Meses fechados vêm dos snapshots; só o que veio depois do último snapshot
+    é agrupado a partir dos movimentos.
+
+    Retorna [{"mes": date(1º dia), "entradas": Decimal, "saidas": Decimal}, ...] em ordem.
+    """
+    meses = {}
+
+    ultimo = ultimo_snapshot(empresa)
+    movs = MovimentoEstoque.objects.filter(empresa=empresa)
+
+    if ultimo:
+        fechados = (
+            SnapshotEstoque.objects.filter(empresa=empresa)
+            .order_by()
+            .values("saldo_em")
+            .annotate(e=Sum("entradas"), s=Sum("saidas"))
+        )
+        for r in fechados:
+            mes = r["saldo_em"].replace(day=1)
+            meses[mes] = {"mes": mes, "entradas": r["e"] or 0, "saidas": r["s"] or 0}
+        movs = movs.filter(data__gte=inicio_apos(ultimo))
+
+    abertos = (
+        movs.annotate(m=TruncMonth("data"))
+        .order_by()
+        .values("m", "tipo")
+        .annotate(total=Sum("quantidade"))
+    )
+    for r in abertos:
+        if not r["m"]:
+            continue
+        mes = r["m"].date() if hasattr(r["m"], "date") else r["m"]
+        item = meses.setdefault(mes, {"mes": mes, "entradas": 0, "saidas": 0})
+        if r["tipo"] == "E":
+            item["entradas"] += r["total"] or 0
+        else:
+            item["saidas"] += abs(r["total"] or 0)
+
+    return [meses[m] for m in sorted(meses)]
@@ -1,12 +1,13 @@
 # estoque/signals.py
 from decimal import Decimal
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.apps import apps
 
-from estoque.models import MovimentoEstoque
+from estoque.models import LoteProduto, MovimentoEstoque, SaldoLote, SaldoProduto
+from estoque.services_lotes import invalidar_indice_validade
 
 
 def _get_custo_unit(produto):
@@ -24,21 +25,20 @@ def _get_custo_unit(produto):
     return Decimal("0")
 
 
-@receiver(post_save, sender=MovimentoEstoque)
-def criar_despesa_entrada_estoque(sender, instance: MovimentoEstoque, created: bool, **kwargs):
-    # Só na criação
-    if not created:
-        return
-
+def montar_despesa_entrada(instance: MovimentoEstoque):
+    """
+    Monta (sem salvar) a Transacao de despesa de uma ENTRADA de estoque.
+    Retorna None quando não há despesa a lançar.
+    Usado pelo post_save abaixo e pelo MovimentoEstoque.objects.registrar_lote().
+    """
     # Só para ENTRADA
     if instance.tipo != "E":
-        return
+        return None
 
     # Só se controla estoque
     if not getattr(instance.produto, "controla_estoque", False):
-        return
+        return None
 
-    empresa = instance.empresa
     produto = instance.produto
 
     # Calcula valor (se não tiver custo cadastrado, não cria despesa pra não “mentir” no financeiro)
@@ -47,23 +47,60 @@ def criar_despesa_entrada_estoque(sender, instance: MovimentoEstoque, created: b
     valor = (custo_unit * qtd).quantize(Decimal("0.01"))
 
     if valor <= 0:
-        return
+        return None
 
     Transacao = apps.get_model("financeiro", "Transacao")
 
-    # Anti-duplicação simples por descrição única
-    descricao = f"Entrada estoque (Mov #{instance.id}) - {produto.nome}"
+    return Transacao(
+        empresa_id=instance.empresa_id,
+        tipo="despesa",
+        valor=valor,
+        # Anti-duplicação simples por descrição única
+        descricao=f"Entrada estoque (Mov #{instance.id}) - {produto.nome}",
+        categoria="Estoque",
+        data=(getattr(instance, "data", None) or timezone.now()).date(),
+    )
+
 
-    if Transacao.objects.filter(empresa=empresa, descricao=descricao).exists():
+@receiver(post_save, sender=MovimentoEstoque)
+def criar_despesa_entrada_estoque(sender, instance: MovimentoEstoque, created: bool, **kwargs):
+    # Só na criação
+    if not created:
+        return
+
+    despesa = montar_despesa_entrada(instance)
+    if despesa is None:
         return
 
-    trans_kwargs = {
-        "empresa": empresa,
-        "tipo": "despesa",
-        "valor": valor,
-        "descricao": descricao,
-        "categoria": "Estoque",
-        "data": (getattr(instance, "data", None) or timezone.now()).date(),
-    }
+    Transacao = type(despesa)
+
+    duplicada = Transacao.objects.filter(
+        empresa_id=despesa.empresa_id, descricao=despesa.descricao
+    ).exists()
+    if duplicada:
+        return
+
+    despesa.save()
+
 
-    Transacao.objects.create(**trans_kwargs)
+@receiver(post_delete, sender=MovimentoEstoque)
+def atualizar_saldo_exclusao_movimento(sender, instance: MovimentoEstoque, **kwargs):
+    """
+    Movimento apagado (admin, queryset.delete etc.) devolve sua contribuição ao saldo.
+    Roda dentro da transação do delete.
+    """
+    delta = -MovimentoEstoque.delta_saldo(instance.tipo, instance.quantidade)
+    SaldoProduto.aplicar_delta(instance.empresa_id, instance.produto_id, delta)
+    SaldoLote.aplicar_delta(instance.empresa_id, instance.lote_id, delta)
+
+
+@receiver(post_save, sender=MovimentoEstoque)
+@receiver(post_delete, sender=MovimentoEstoque)
+@receiver(post_save, sender=LoteProduto)
+@receiver(post_delete, sender=LoteProduto)
+def invalidar_indice_validade_empresa(sender, instance, **kwargs):
+    """
+    Saldo ou validade de lote mudou: o índice de validade da empresa
+    (services_lotes.indice_validade) é remontado no próximo acesso.
+    """
+    invalidar_indice_validade(instance.empresa_id)
@@ -5,47 +5,21 @@ from datetime import timedelta
 
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum, Case, When, F, DecimalField
-from django.db.models.functions import TruncMonth
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
-from core.models import Perfil
 from django.apps import apps
 
 
 
-from .models import MovimentoEstoque, Produto, LoteProduto
-from .services_lotes import gerar_textos_alerta_lotes
+from .models import MovimentoEstoque, Produto, SaldoProduto
+from .services_lotes import PRIORIDADE_NIVEL, gerar_textos_alerta_lotes, indice_validade
+from .services_saldo import saldo_subquery
+from .services_snapshot import serie_mensal_movimentos
 
 
 from django.views.decorators.http import require_GET
 
-from .services_lotes import gerar_textos_alerta_lotes
-
-
-
-
-def _status_critico(dias_para_vencer: int, saldo: float) -> str | None:
-    """
-    Retorna o status do lote para o ranking crítico.
-    - <= 0: ACAO_IMEDIATA (vencido)
-    - 1..7: ALERTA_7_DIAS
-    - 8..15: ALERTA_15_DIAS
-    - >15: None (não entra no ranking)
-    """
-    if saldo is None or float(saldo) <= 0:
-        return None  # sem saldo não é "crítico acionável" no ranking
-
-    d = int(dias_para_vencer or 0)
-
-    if d <= 0:
-        return "ACAO_IMEDIATA"
-    if d <= 7:
-        return "ALERTA_7_DIAS"
-    if d <= 15:
-        return "ALERTA_15_DIAS"
-    return None
-
 
 # ==============================
 # 1) DASHBOARD DE ESTOQUE (HTML)
@@ -58,21 +32,13 @@ def dashboard_estoque(request):
     - Ranking dos produtos por saldo
     - Série mensal de entradas x saídas
     """
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return render(request, "estoque/dashboard_estoque.html", {"erro": "Usuário sem empresa."})
-    empresa = perfil.empresa
 
     # 1) Produtos com saldo e vendidos
     produtos_qs = Produto.objects.filter(empresa=empresa,controla_estoque=True, ativo=True).annotate(
-        saldo=Sum(
-            Case(
-                When(movimentos__tipo="E", then=F("movimentos__quantidade")),
-                When(movimentos__tipo="S", then=-F("movimentos__quantidade")),
-                default=0,
-                output_field=DecimalField(),
-            )
-        ),
+        saldo=saldo_subquery(),
         vendidos=Sum(
             Case(
                 When(movimentos__tipo="S", then=F("movimentos__quantidade")),
@@ -94,30 +60,14 @@ def dashboard_estoque(request):
     dados_vendidos = [float(p.vendidos or 0) for p in produtos_rank]
     # saídas → positivo
 
-    # 2) Série mensal entradas x saídas
-    mov_qs = (
-        MovimentoEstoque.objects.filter(empresa=empresa)
-        .annotate(mes=TruncMonth("data"))
-        .values("mes", "tipo")
-        .annotate(total=Sum("quantidade"))
-        .order_by("mes", "tipo")
-    )
-
-    meses = {}
-    for item in mov_qs:
-        mes_label = item["mes"].strftime("%m/%Y") if item["mes"] else "N/D"
-        if mes_label not in meses:
-            meses[mes_label] = {"E": 0, "S": 0}
-        if item["tipo"] == "E":
-            meses[mes_label]["E"] += float(item["total"] or 0)
-        else:
-            meses[mes_label]["S"] += float(abs(item["total"] or 0))
+    # 2) Série mensal entradas x saídas (meses fechados vêm dos snapshots)
+    serie = serie_mensal_movimentos(empresa)
 
-    labels_meses = list(meses.keys())
-    dados_entradas = [meses[m]["E"] for m in labels_meses]
-    dados_saidas = [meses[m]["S"] for m in labels_meses]
+    labels_meses = [item["mes"].strftime("%m/%Y") for item in serie]
+    dados_entradas = [float(item["entradas"] or 0) for item in serie]
+    dados_saidas = [float(item["saidas"] or 0) for item in serie]
 
-    alertas_lotes = gerar_textos_alerta_lotes(dias_aviso=30)
+    alertas_lotes = gerar_textos_alerta_lotes(dias_aviso=30, empresa=empresa)
 
     context = {
         "labels_produtos": labels_produtos,
@@ -144,12 +94,10 @@ def dashboard_estoque_dados(request):
       - top_produtos: saldo atual e quantidade vendida por produto
       - movimento_mensal: entradas x saídas por mês
     """
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    empresa = request.user.perfil.empresa
-
     movimentos = MovimentoEstoque.objects.filter(empresa=empresa).select_related("produto")
         
 
@@ -161,17 +109,8 @@ def dashboard_estoque_dados(request):
         .order_by("-qtd_vendida")[:10]
     )
 
-    # saldo atual por produto (entradas - saídas)
-    saldos = movimentos.values("produto__nome").annotate(
-        saldo=Sum(
-            Case(
-                When(tipo="E", then=F("quantidade")),
-                When(tipo="S", then=-F("quantidade")),
-                default=0,
-                output_field=DecimalField(),
-            )
-        )
-    )
+    # saldo atual por produto (entradas - saídas), do saldo materializado
+    saldos = SaldoProduto.objects.filter(empresa=empresa).values("produto__nome", "saldo")
     map_saldo = {s["produto__nome"]: s["saldo"] for s in saldos}
 
     top_produtos = []
@@ -185,31 +124,20 @@ def dashboard_estoque_dados(request):
             }
         )
 
-    # -------- Entradas x Saídas por mês --------
-    mov_mes = (
-        movimentos.annotate(mes=TruncMonth("data"))
-        .values("mes", "tipo")
-        .annotate(total=Sum("quantidade"))
-        .order_by("mes")
-    )
-
-    series = {}
-    for row in mov_mes:
-        if not row["mes"]:
-            continue
-        mes_label = row["mes"].strftime("%m/%Y")
-        if mes_label not in series:
-            series[mes_label] = {"mes": mes_label, "entradas": 0, "saidas": 0}
-
-        if row["tipo"] == "E":
-            series[mes_label]["entradas"] = float(row["total"] or 0)
-        else:
-            series[mes_label]["saidas"] = float(row["total"] or 0)
+    # -------- Entradas x Saídas por mês (meses fechados vêm dos snapshots) --------
+    series = [
+        {
+            "mes": item["mes"].strftime("%m/%Y"),
+            "entradas": float(item["entradas"] or 0),
+            "saidas": float(item["saidas"] or 0),
+        }
+        for item in serie_mensal_movimentos(empresa)
+    ]
 
     payload = {
         "ok": True,
         "top_produtos": top_produtos,
-        "movimento_mensal": list(series.values()),
+        "movimento_mensal": series,
     }
     return JsonResponse(payload)
 
@@ -230,7 +158,7 @@ def ia_lotes_validade_view(request):
     except ValueError:
         dias = 15
 
-    msgs = gerar_textos_alerta_lotes(dias_aviso=dias)
+    msgs = gerar_textos_alerta_lotes(dias_aviso=dias, empresa=request.empresa or None)
     total = len(msgs)
 
 
@@ -276,7 +204,9 @@ def api_lotes_prestes_vencer(request):
     except ValueError:
         dias_aviso = 30
 
-    msgs = gerar_textos_alerta_lotes(dias_aviso=dias_aviso)
+    msgs = gerar_textos_alerta_lotes(
+        dias_aviso=dias_aviso, empresa=request.empresa or None
+    )
 
     data = {
         "ok": True,
@@ -286,40 +216,21 @@ def api_lotes_prestes_vencer(request):
     }
     return JsonResponse(data, json_dumps_params={"ensure_ascii": False})
 
-from django.db.models.functions import Coalesce
 
 @login_required
 def api_ranking_estoque_critico(request):
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    empresa = perfil.empresa
-
     try:
         top = int(request.GET.get("top", 10))
     except ValueError:
         top = 10
 
-    dec_out = DecimalField(max_digits=10, decimal_places=3)
-
-    saldo_expr = Coalesce(
-        Sum(
-            Case(
-                When(movimentos__tipo="E", then=F("movimentos__quantidade")),
-                When(movimentos__tipo="S", then=-F("movimentos__quantidade")),
-                default=Decimal("0.000"),
-                output_field=dec_out,
-            ),
-            output_field=dec_out,
-        ),
-        Decimal("0.000"),
-        output_field=dec_out,
-    )
-
     qs = (
         Produto.objects.filter(empresa=empresa, ativo=True, controla_estoque=True)
-        .annotate(saldo=saldo_expr)
+        .annotate(saldo=saldo_subquery())
         .filter(saldo__lte=F("estoque_minimo"))
         .order_by("saldo", "nome")[:top]
     )
@@ -357,21 +268,14 @@ def api_ranking_critico(request):
         top = 10
 
     # pega empresa do perfil
-    empresa = request.user.perfil.empresa
+    empresa = request.empresa
+    if not empresa:
+        return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
     # saldo por produto (entradas - saídas)
     qs = (
         Produto.objects.filter(empresa=empresa, controla_estoque=True, ativo=True)
-        .annotate(
-            saldo=Sum(
-                Case(
-                    When(movimentos__tipo="E", then=F("movimentos__quantidade")),
-                    When(movimentos__tipo="S", then=-F("movimentos__quantidade")),
-                    default=0,
-                    output_field=DecimalField(),
-                )
-            )
-        )
+        .annotate(saldo=saldo_subquery())
     )
 
     itens = []
@@ -402,101 +306,35 @@ def api_ranking_critico(request):
 
 
 
-def _saldo_lote_atual(lote, empresa=None):
-    """
-    Saldo do lote = soma(movimentos E) - soma(movimentos S)
-    """
-    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
-
-    qs = MovimentoEstoque.objects.filter(lote=lote)
-
-    # filtra por empresa se o movimento tiver empresa
-    if empresa and any(f.name == "empresa" for f in MovimentoEstoque._meta.fields):
-        qs = qs.filter(empresa=empresa)
-
-    agg = qs.aggregate(
-        saldo=Sum(
-            Case(
-                When(tipo="E", then=F("quantidade")),
-                When(tipo="S", then=-F("quantidade")),
-                default=0,
-                output_field=DecimalField(),
-            )
-        )
-    )
-    return agg["saldo"] or Decimal("0")
-
-
 @require_GET
 @login_required
 def api_lotes_criticos(request):
-    perfil = (
-        Perfil.objects.filter(user=request.user)
-        .select_related("empresa")
-        .first()
-    )
-    if not perfil or not getattr(perfil, "empresa_id", None):
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa vinculada."}, status=400)
 
-    empresa = perfil.empresa
-    hoje = timezone.localdate()
-
-    qs = LoteProduto.objects.select_related("produto").all()
-
-    # filtra por empresa se existir no LoteProduto
-    if hasattr(LoteProduto, "empresa_id"):
-        qs = qs.filter(empresa=empresa)
-
-    # ordena por validade e FIFO
-    qs = qs.order_by("validade", "criado_em", "codigo")[:80]  # pega um pouco mais e filtramos por saldo
-
+    # índice de validade em cache (o mesmo do dashboard, PDV e IA);
+    # >15 dias fica fora do ranking crítico
     items = []
-
-    for lote in qs:
-        saldo_dec = _saldo_lote_atual(lote, empresa=empresa)
-
-        # só entra se tiver saldo > 0
-        if saldo_dec <= 0:
-            continue
-
-        validade = lote.validade
-        if validade is None:
-            continue  # sem validade não entra no ranking crítico
-
-        dias = (validade - hoje).days
-        saldo = float(saldo_dec)
-
-        status = _status_critico(dias, saldo)
+    for it in indice_validade(empresa):
+        status = it["nivel"]
         if not status:
-            continue  # >15 dias fica fora
-
-        # prioridade: mais urgente primeiro
-        if status == "ACAO_IMEDIATA":
-            prioridade = 0
-        elif status == "ALERTA_7_DIAS":
-            prioridade = 1
-        else:  # ALERTA_15_DIAS
-            prioridade = 2
+            continue
 
         items.append({
-            "produto_id": lote.produto_id,
-            "produto": getattr(lote.produto, "nome", str(lote.produto_id)),
-            "lote_id": lote.id,
-            "lote": getattr(lote, "codigo", None) or str(lote),
-            "validade": validade.isoformat(),
-            "dias_para_vencer": dias,
-            "saldo": saldo,
-            "prioridade": prioridade,
+            "produto_id": it["produto_id"],
+            "produto": it["produto_nome"],
+            "lote_id": it["lote_id"],
+            "lote": it["codigo"] or f"ID {it['lote_id']}",
+            "validade": it["validade"].isoformat(),
+            "dias_para_vencer": it["dias_restantes"],
+            "saldo": float(it["saldo"]),
+            "prioridade": PRIORIDADE_NIVEL[status],
             "status": status,
         })
 
     # ordena por criticidade (mais urgente primeiro)
-    items.sort(
-        key=lambda x: (
-            x["prioridade"],
-            x["dias_para_vencer"] if x["dias_para_vencer"] is not None else 9999
-        )
-    )
+    items.sort(key=lambda x: (x["prioridade"], x["dias_para_vencer"]))
 
     # limita top 50 já ordenado
     items = items[:50]
@@ -511,12 +349,10 @@ def lotes_criticos_page(request):
 @require_GET
 @login_required
 def top_produtos_vendidos_api(request):
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    empresa = perfil.empresa
-
     try:
         dias = int(request.GET.get("dias", "30"))
     except Exception:
@@ -3,6 +3,7 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
 
+
 from .services_lotes import buscar_lotes_prestes_vencer
 
 
@@ -26,37 +27,29 @@ def lotes_criticos(request):
     dias = max(1, min(dias, 365))
     limit = max(1, min(limit, 20))
 
-    lotes = buscar_lotes_prestes_vencer(dias_aviso=dias)
-
-    # Ordena: vencidos primeiro, depois os mais próximos de vencer
-    def _key(it):
-        status = it.get("status")
-        dias_rest = it.get("dias_restantes", 999999)
-        vencido_first = 0 if status == "vencido" else 1
-        return (vencido_first, dias_rest)
+    empresa = request.empresa
+    if not empresa:
+        return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    lotes = sorted(lotes, key=_key)[:limit]
+    # índice de validade da empresa (cache), já na ordem: vencidos e depois os mais próximos
+    lotes = buscar_lotes_prestes_vencer(dias_aviso=dias, empresa=empresa)[:limit]
 
     items = []
     for it in lotes:
-        lote = it["lote"]
-        produto = it["produto"]
-
-        codigo = (getattr(lote, "codigo", "") or "").strip() or f"ID {lote.id}"
-        saldo = getattr(lote, "saldo_atual", 0)  # seu @property
+        lote_id = it["lote_id"]
 
         items.append(
             {
-                "lote_id": lote.id,
-                "produto_id": produto.id,
-                "produto_nome": produto.nome,
-                "lote_codigo": codigo,
-                "validade": lote.validade.isoformat() if lote.validade else None,
-                "dias_restantes": it.get("dias_restantes"),
-                "status": it.get("status"),  # "vencido" | "prestes_vencer"
-                "saldo_lote": float(saldo or 0),
+                "lote_id": lote_id,
+                "produto_id": it["produto_id"],
+                "produto_nome": it["produto_nome"],
+                "lote_codigo": it["codigo"] or f"ID {lote_id}",
+                "validade": it["validade"].isoformat(),
+                "dias_restantes": it["dias_restantes"],
+                "status": it["status"],  # "vencido" | "prestes_vencer"
+                "saldo_lote": float(it["saldo"] or 0),
                 # link pro admin (ajusta o app_label/model se o seu for diferente)
-                "admin_url": f"/admin/estoque/loteproduto/{lote.id}/change/",
+                "admin_url": f"/admin/estoque/loteproduto/{lote_id}/change/",
             }
         )
 
@@ -4,7 +4,6 @@ from django.http import JsonResponse
 from django.utils import timezone
 from django.views.decorators.http import require_GET
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Case, When, F, DecimalField
 from .models import LoteProduto
 
 
@@ -17,18 +16,9 @@ def lotes_criticos(request):
     hoje = timezone.localdate()
     limite = hoje + timedelta(days=dias)
 
-    saldo_expr = Sum(
-        Case(
-            When(movimentos__tipo="E", then=F("movimentos__quantidade")),
-            When(movimentos__tipo="S", then=-F("movimentos__quantidade")),
-            default=0,
-            output_field=DecimalField(),
-        )
-    )
-
     qs = (
         LoteProduto.objects.filter(validade__isnull=False, validade__lte=limite)
-        .annotate(saldo=saldo_expr)
+        .com_saldo()
         .filter(saldo__gt=0)
         .select_related("produto")
         .order_by("validade", "id")[:limit]
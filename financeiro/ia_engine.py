@@ -80,6 +80,24 @@ def _escolher_texto(textos: List[str]) -> str:
     return random.choice(textos)
 
 
+def regressao_linear(valores: List[float]) -> Optional[tuple]:
+    """
+    Mínimos quadrados sobre (0, v0), (1, v1)...: devolve (inclinacao, intercepto).
+    Com menos de 2 pontos não há tendência: None.
+    """
+    n = len(valores)
+    if n < 2:
+        return None
+    sumx = n * (n - 1) / 2
+    sumx2 = (n - 1) * n * (2 * n - 1) / 6
+    sumy = sum(valores)
+    sumxy = sum(x * y for x, y in enumerate(valores))
+    denom = (n * sumx2 - sumx * sumx) or 1
+    a = (n * sumxy - sumx * sumy) / denom
+    b = (sumy - a * sumx) / n
+    return a, b
+
+
 def _classificar_tipo(
     mes_atual: MesResumo,
     variacao_saldo_pct: Optional[float],
@@ -116,8 +134,8 @@ def _classificar_tipo(
 
 def analisar_serie_mensal(series: List[Dict]) -> Dict:
     """
-    Recebe a mesma estrutura de 'series' usada no JSON da view
-    ia_resumo_mensal_series e devolve um dicionário com:
+    Recebe a 'series' do services_serie.serie_mensal (a mesma do JSON da
+    view ia_resumo_mensal_series) e devolve um dicionário com:
 
     - tipo          -> 'positiva' | 'alerta' | 'neutra'
     - resumo        -> texto principal
@@ -161,6 +179,14 @@ def analisar_serie_mensal(series: List[Dict]) -> Dict:
 
     tipo = _classificar_tipo(mes_atual, variacao_saldo_pct)
 
+    # Tendência do saldo na janela inteira (R$ por mês) e projeção do próximo
+    tendencia_saldo: Optional[float] = None
+    previsao_saldo: Optional[float] = None
+    reta = regressao_linear([m.saldo for m in meses])
+    if reta is not None:
+        tendencia_saldo, intercepto = reta
+        previsao_saldo = tendencia_saldo * len(meses) + intercepto
+
     # Escolhe o texto principal conforme o tipo
     if tipo == "positiva":
         base = _escolher_texto(TEXTOS_POSITIVOS)
@@ -197,5 +223,7 @@ def analisar_serie_mensal(series: List[Dict]) -> Dict:
             "total_receitas": mes_atual.total_receitas,
             "total_despesas": mes_atual.total_despesas,
             "variacao_saldo_pct": variacao_saldo_pct,
+            "tendencia_saldo": tendencia_saldo,
+            "previsao_saldo": previsao_saldo,
         },
     }
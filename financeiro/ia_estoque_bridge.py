@@ -1,16 +1,19 @@
 # financeiro/ia_estoque_bridge.py
 from django.utils import timezone
+
+from core.services_empresa import empresa_do_usuario
 from estoque.services_lotes import gerar_textos_alerta_lotes
 from financeiro.models import HistoricoIA  # AQUI é o certo, tem campo 'origem'
 
 
 def anexar_alertas_estoque_no_texto(
-    texto_base: str, dias_aviso: int = 30, max_itens: int = 3
+    texto_base: str, dias_aviso: int = 30, max_itens: int = 3, empresa=None
 ) -> str:
     """
     Anexa alertas de estoque vencido / a vencer no texto principal da IA.
+    Com `empresa`, lê o índice de validade em cache da empresa.
     """
-    msgs = gerar_textos_alerta_lotes(dias_aviso=dias_aviso)
+    msgs = gerar_textos_alerta_lotes(dias_aviso=dias_aviso, empresa=empresa)
 
     if not msgs:
         return texto_base or ""
@@ -31,14 +34,19 @@ def registrar_alertas_lote_no_historico(
     usuario=None,
     dias_aviso: int = 30,
     max_itens: int = 5,
+    empresa=None,
 ):
     """
     Cria registros na tabela HistoricoIA para cada alerta de lote vencido / prestes a vencer.
 
     - NÃO duplica alertas com mesmo texto + origem='lote' + usuário.
     - Retorna (total_criados, lista_de_ids).
+    - Sem `empresa`, usa a empresa do usuário (core.services_empresa, em cache).
     """
-    msgs = gerar_textos_alerta_lotes(dias_aviso=dias_aviso)
+    if empresa is None and usuario is not None:
+        empresa = empresa_do_usuario(usuario)
+
+    msgs = gerar_textos_alerta_lotes(dias_aviso=dias_aviso, empresa=empresa)
 
     if not msgs:
         return 0, []
@@ -0,0 +1,57 @@
+# financeiro/management/commands/classificar_textos_ia.py
+from django.core.management.base import BaseCommand
+
+from financeiro.models import HistoricoIA, Insight, RecomendacaoIA
+from financeiro.services.classificador import reclassificar
+
+MODELOS = {
+    "recomendacao": RecomendacaoIA,
+    "historico": HistoricoIA,
+    "insight": Insight,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Reclassifica (positiva/alerta/neutra) os textos da IA já gravados e atualiza "
+        "tipo_normalizado. Use depois de mudar as regras do classificador."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modelo",
+            action="append",
+            choices=sorted(MODELOS),
+            help="Tabela a reclassificar (repita para várias; padrão: todas).",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Só conta as linhas com tipo desatualizado, sem gravar nada.",
+        )
+
+    def handle(self, *args, **opts):
+        verificar = opts["verificar"]
+        total = 0
+        for nome in opts["modelo"] or sorted(MODELOS):
+            model = MODELOS[nome]
+            campo_tipo, campo_texto = model.CAMPOS_CLASSIFICACAO
+            mudou = reclassificar(
+                model.objects.all(), campo_tipo, campo_texto, gravar=not verificar
+            )
+            n = sum(mudou.values())
+            total += n
+            detalhe = ", ".join(f"{t}={q}" for t, q in mudou.items() if q)
+            self.stdout.write(f"• {nome}: {n} linha(s)" + (f" ({detalhe})" if detalhe else ""))
+
+        if not total:
+            self.stdout.write(self.style.SUCCESS("✅ Tipos gravados batem com o classificador."))
+        elif verificar:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {total} linha(s) com tipo desatualizado. "
+                    "Rode sem --verificar para corrigir."
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {total} linha(s) reclassificada(s)."))
@@ -0,0 +1,54 @@
+# financeiro/management/commands/reconstruir_resumo_financeiro.py
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Empresa
+from financeiro.services_resumo import reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = "Reconstrói/verifica o ResumoDiarioFinanceiro a partir das transações."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--empresa",
+            type=int,
+            default=None,
+            help="ID da empresa (padrão: todas).",
+        )
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Só verifica e lista divergências, sem gravar nada.",
+        )
+
+    def handle(self, *args, **opts):
+        empresa = None
+        if opts["empresa"]:
+            empresa = Empresa.objects.filter(pk=opts["empresa"]).first()
+            if empresa is None:
+                raise CommandError(f"Empresa {opts['empresa']} não encontrada.")
+
+        verificar = opts["verificar"]
+        divergencias = reconstruir_resumo(empresa=empresa, corrigir=not verificar)
+
+        for d in divergencias[:50]:
+            self.stdout.write(
+                f"- empresa={d['empresa_id']} {d['dia']} {d['tipo']} '{d['categoria']}' "
+                f"gravado={d['gravado']} calculado={d['calculado']}"
+            )
+        if len(divergencias) > 50:
+            self.stdout.write(f"  ... e mais {len(divergencias) - 50}")
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS("✅ Resumo diário consistente com as transações."))
+        elif verificar:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {len(divergencias)} linha(s) divergente(s). "
+                    "Rode sem --verificar para corrigir."
+                )
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"✅ {len(divergencias)} linha(s) do resumo corrigida(s).")
+            )
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0014_transacao_empresa_alter_transacao_vendas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['empresa', 'tipo', 'data'], name='transacao_emp_tipo_data'),
+        ),
+        migrations.AddIndex(
+            model_name='transacao',
+            index=models.Index(fields=['empresa', 'data'], name='transacao_emp_data'),
+        ),
+    ]
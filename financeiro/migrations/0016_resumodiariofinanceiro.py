@@ -0,0 +1,68 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def popular_resumo(apps, schema_editor):
+    Transacao = apps.get_model("financeiro", "Transacao")
+    ResumoDiarioFinanceiro = apps.get_model("financeiro", "ResumoDiarioFinanceiro")
+    db = schema_editor.connection.alias
+
+    rows = (
+        Transacao.objects.using(db)
+        .order_by()
+        .values("empresa_id", "data", "tipo", cat=Coalesce("categoria", Value("")))
+        .annotate(soma=Sum("valor"), n=Count("id"))
+    )
+
+    ResumoDiarioFinanceiro.objects.using(db).bulk_create(
+        [
+            ResumoDiarioFinanceiro(
+                empresa_id=r["empresa_id"],
+                dia=r["data"],
+                tipo=r["tipo"],
+                categoria=r["cat"],
+                total=r["soma"] or 0,
+                quantidade=r["n"],
+            )
+            for r in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('financeiro', '0015_transacao_transacao_emp_tipo_data_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiarioFinanceiro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(max_length=10)),
+                ('categoria', models.CharField(blank=True, default='', max_length=100)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_financeiros', to='core.empresa')),
+            ],
+            options={
+                'verbose_name': 'Resumo diário financeiro',
+                'verbose_name_plural': 'Resumos diários financeiros',
+                'indexes': [models.Index(fields=['dia'], name='resumo_fin_dia')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumodiariofinanceiro',
+            constraint=models.UniqueConstraint(fields=('empresa', 'dia', 'tipo', 'categoria'), name='uniq_resumo_fin_emp_dia_tipo_cat'),
+        ),
+        # popula com as transações que já existem
+        migrations.RunPython(popular_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('financeiro', '0016_resumodiariofinanceiro'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieMensalFinanceira',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês.')),
+                ('receitas', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('despesas', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('quantidade', models.IntegerField(default=0)),
+                ('fechado_em', models.DateTimeField(auto_now_add=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_mensais_financeiras', to='core.empresa')),
+            ],
+            options={
+                'verbose_name': 'Série mensal financeira',
+                'verbose_name_plural': 'Séries mensais financeiras',
+                'ordering': ['empresa', 'mes'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='seriemensalfinanceira',
+            constraint=models.UniqueConstraint(fields=('empresa', 'mes'), name='uniq_serie_fin_emp_mes'),
+        ),
+    ]
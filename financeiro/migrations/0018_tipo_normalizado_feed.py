@@ -0,0 +1,66 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:21
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def popular_tipo_normalizado(apps, schema_editor):
+    # mesma regra de financeiro.models.normalizar_tipo_ia
+    from financeiro.models import TIPOS_FEED, normalizar_tipo_ia
+
+    db = schema_editor.connection.alias
+    for nome in ("RecomendacaoIA", "HistoricoIA"):
+        Model = apps.get_model("financeiro", nome)
+        qs = Model.objects.using(db)
+        tem_origem = nome == "HistoricoIA"
+
+        if tem_origem:
+            qs.filter(origem="lote").update(tipo_normalizado="alerta")
+            qs = qs.exclude(origem="lote")
+        qs.annotate(t=Lower("tipo")).filter(t__in=TIPOS_FEED).update(tipo_normalizado=Lower("tipo"))
+
+        # tipo fora dos três: classifica o texto (em lotes, um UPDATE por tipo)
+        resto = qs.annotate(t=Lower("tipo")).exclude(t__in=TIPOS_FEED)
+        por_tipo = {t: [] for t in TIPOS_FEED}
+        for pk, tipo, texto in resto.values_list("pk", "tipo", "texto").iterator(chunk_size=2000):
+            por_tipo[normalizar_tipo_ia(tipo, texto)].append(pk)
+        for tipo, ids in por_tipo.items():
+            for i in range(0, len(ids), 5000):
+                Model.objects.using(db).filter(pk__in=ids[i : i + 5000]).update(tipo_normalizado=tipo)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0017_seriemensalfinanceira'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicoia',
+            name='tipo_normalizado',
+            field=models.CharField(default='neutra', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='recomendacaoia',
+            name='tipo_normalizado',
+            field=models.CharField(default='neutra', editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='historicoia',
+            index=models.Index(fields=['usuario', '-criado_em', '-id'], name='hist_ia_usuario_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='historicoia',
+            index=models.Index(fields=['usuario', 'tipo_normalizado', '-criado_em', '-id'], name='hist_ia_usuario_tipo_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='recomendacaoia',
+            index=models.Index(fields=['usuario', '-criado_em', '-id'], name='rec_ia_usuario_feed'),
+        ),
+        migrations.AddIndex(
+            model_name='recomendacaoia',
+            index=models.Index(fields=['usuario', 'tipo_normalizado', '-criado_em', '-id'], name='rec_ia_usuario_tipo_feed'),
+        ),
+        migrations.RunPython(popular_tipo_normalizado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+def popular_tipo_normalizado(apps, schema_editor):
+    # mesma regra do save(): financeiro.models.normalizar_tipo_ia(kind, text)
+    from financeiro.services.classificador import reclassificar
+
+    Insight = apps.get_model("financeiro", "Insight")
+    reclassificar(Insight.objects.using(schema_editor.connection.alias), "kind", "text")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0018_tipo_normalizado_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='insight',
+            name='tipo_normalizado',
+            field=models.CharField(db_index=True, default='neutra', editable=False, max_length=10),
+        ),
+        migrations.RunPython(popular_tipo_normalizado, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:10
+
+from django.db import migrations
+
+
+def reclassificar_tudo(apps, schema_editor):
+    # vocabulário do classificador passou a ser a união das listas antigas:
+    # mesmo trabalho do `manage.py classificar_textos_ia`, só nas linhas que mudam
+    from financeiro.services.classificador import reclassificar
+
+    db = schema_editor.connection.alias
+    for modelo, campo_tipo, campo_texto in (
+        ("RecomendacaoIA", "tipo", "texto"),
+        ("HistoricoIA", "tipo", "texto"),
+        ("Insight", "kind", "text"),
+    ):
+        Model = apps.get_model("financeiro", modelo)
+        reclassificar(Model.objects.using(db), campo_tipo, campo_texto)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0019_insight_tipo_normalizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(reclassificar_tudo, migrations.RunPython.noop),
+    ]
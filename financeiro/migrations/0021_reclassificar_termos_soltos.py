@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:40
+
+from django.db import migrations
+
+
+def reclassificar_tudo(apps, schema_editor):
+    # "margem"/"subiu"/"bom"/"ok" soltos saíram do classificador e despesa que
+    # sobe virou alerta: regrava só as linhas cujo tipo muda
+    from financeiro.services.classificador import reclassificar
+
+    db = schema_editor.connection.alias
+    for modelo, campo_tipo, campo_texto in (
+        ("RecomendacaoIA", "tipo", "texto"),
+        ("HistoricoIA", "tipo", "texto"),
+        ("Insight", "kind", "text"),
+    ):
+        Model = apps.get_model("financeiro", modelo)
+        reclassificar(Model.objects.using(db), campo_tipo, campo_texto)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('financeiro', '0020_reclassificar_vocabulario'),
+    ]
+
+    operations = [
+        migrations.RunPython(reclassificar_tudo, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,14 @@
+from datetime import datetime
+from decimal import Decimal
+
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
 from core.models import Empresa
 
+from .services.classificador import TIPOS as TIPOS_FEED, classificar_texto
+
 class Transacao(models.Model):
     TIPO_CHOICES = [
         ("receita", "Receita"),
@@ -30,12 +37,217 @@ class Transacao(models.Model):
         verbose_name="Venda relacionada",
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["empresa", "tipo", "data"], name="transacao_emp_tipo_data"),
+            models.Index(fields=["empresa", "data"], name="transacao_emp_data"),
+        ]
+
     def __str__(self):
         return f"{self.descricao} - {self.tipo} - R$ {self.valor}"
 
+    CAMPOS_RESUMO = ("empresa_id", "data", "tipo", "categoria", "valor")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        # como estava no banco: o post_save tira essa contribuição do resumo diário
+        # (com .only()/.defer() o pre_save busca de novo)
+        if set(cls.CAMPOS_RESUMO) <= set(field_names):
+            obj._resumo_original = obj.contribuicao_resumo()
+        return obj
+
+    def contribuicao_resumo(self):
+        """
+        ((empresa_id, dia, tipo, categoria), valor) desta transação no
+        ResumoDiarioFinanceiro, ou None se faltar empresa/data.
+        """
+        if not self.empresa_id or not self.data:
+            return None
+        dia = self.data.date() if isinstance(self.data, datetime) else self.data
+        chave = (self.empresa_id, dia, self.tipo or "", self.categoria or "")
+        return chave, Decimal(str(self.valor or 0))
+
+
+class ResumoDiarioFinanceiro(models.Model):
+    """
+    Soma e quantidade de transações por (empresa, dia, tipo, categoria).
+    Mantido a cada Transacao salva/apagada (financeiro/signals.py), assim os
+    gráficos do dashboard custam pelo número de dias, não de transações.
+    queryset.update()/bulk_create não disparam signal: depois deles (ou se
+    desconfiar de divergência) rode `python manage.py reconstruir_resumo_financeiro`.
+
+    Categoria vazia e NULL viram "" (os gráficos tratam os dois igual).
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="resumos_financeiros",
+    )
+    dia = models.DateField()
+    tipo = models.CharField(max_length=10)
+    categoria = models.CharField(max_length=100, blank=True, default="")
+    total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo diário financeiro"
+        verbose_name_plural = "Resumos diários financeiros"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "dia", "tipo", "categoria"],
+                name="uniq_resumo_fin_emp_dia_tipo_cat",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["dia"], name="resumo_fin_dia"),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.dia} {self.tipo} {self.categoria or '-'}: "
+            f"R$ {self.total} ({self.quantidade})"
+        )
+
+    @classmethod
+    def aplicar_delta(cls, chave, valor, quantidade):
+        """
+        Soma valor/quantidade na linha da chave (empresa_id, dia, tipo, categoria)
+        de forma atômica (UPDATE ... SET total = total + valor). Cria a linha
+        no primeiro lançamento do dia. Linhas que zeram ficam (o rebuild limpa).
+        """
+        if chave is None or (not valor and not quantidade):
+            return
+
+        empresa_id, dia, tipo, categoria = chave
+        filtros = {"empresa_id": empresa_id, "dia": dia, "tipo": tipo, "categoria": categoria}
+        novos = {"total": F("total") + valor, "quantidade": F("quantidade") + quantidade}
+        if not cls.objects.filter(**filtros).update(**novos):
+            if quantidade < 0:
+                # nada a desfazer (resumo ainda não montado ou empresa sendo apagada)
+                return
+            # INSERT ... ON CONFLICT DO NOTHING: sem savepoint e seguro com lançamento concorrente
+            cls.objects.bulk_create([cls(**filtros)], ignore_conflicts=True)
+            cls.objects.filter(**filtros).update(**novos)
+        SerieMensalFinanceira.reabrir(empresa_id, dia)
+
+    @classmethod
+    def aplicar_transacoes(cls, transacoes, sinal=1):
+        """
+        Versão em lote (bulk_create de Transacao): agrupa por chave antes de gravar.
+        sinal=-1 retira as transações do resumo.
+        """
+        deltas = {}
+        for t in transacoes:
+            contribuicao = t.contribuicao_resumo()
+            if contribuicao is None:
+                continue
+            chave, valor = contribuicao
+            total, qtd = deltas.get(chave, (Decimal("0"), 0))
+            deltas[chave] = (total + sinal * valor, qtd + sinal)
+
+        for chave, (valor, qtd) in deltas.items():
+            cls.aplicar_delta(chave, valor, qtd)
+
+
+TRAVA_SERIE = -1  # 2ª metade da chave do advisory lock (SerieMensalFinanceira.travar)
+
+
+class SerieMensalFinanceira(models.Model):
+    """
+    Ponto mensal fechado (receitas, despesas, saldo) por empresa, usado pela
+    série da IA e pelos alertas de período (financeiro/services_serie.py).
+
+    Só mês que já terminou é gravado; o mês corrente é sempre somado na hora
+    a partir do ResumoDiarioFinanceiro. Lançamento com data num mês fechado
+    apaga o ponto (reabrir) e a próxima leitura fecha de novo.
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="series_mensais_financeiras",
+    )
+    mes = models.DateField(help_text="Primeiro dia do mês.")
+    receitas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    despesas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    saldo = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    quantidade = models.IntegerField(default=0)
+    fechado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Série mensal financeira"
+        verbose_name_plural = "Séries mensais financeiras"
+        ordering = ["empresa", "mes"]
+        constraints = [
+            models.UniqueConstraint(fields=["empresa", "mes"], name="uniq_serie_fin_emp_mes"),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} saldo R$ {self.saldo}"
+
+    @classmethod
+    def travar(cls, empresa_id):
+        """
+        Advisory lock da série da empresa até o fim da transação: fechar mês
+        (services_serie) e reabrir não se cruzam, senão um ponto somado antes
+        de um lançamento retroativo seria gravado depois do reabrir e ficaria
+        velho. Chave (empresa_id, -1): a agenda usa (empresa_id, dia.toordinal()).
+        """
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(%s, %s)", [empresa_id, TRAVA_SERIE])
+
+    @classmethod
+    def reabrir(cls, empresa_id, dia):
+        """
+        Descarta o ponto do mês de `dia` se ele já estava fechado.
+        Mês corrente (ou futuro) nunca é gravado: não custa query.
+        """
+        mes = dia.replace(day=1)
+        if mes < timezone.localdate().replace(day=1):
+            with transaction.atomic():
+                cls.travar(empresa_id)
+                cls.objects.filter(empresa_id=empresa_id, mes=mes).delete()
+
+
+# --- Classificação dos textos da IA (Insight, RecomendacaoIA, HistoricoIA) ---
+def normalizar_tipo_ia(tipo, texto, origem=""):
+    """
+    Tipo do feed do histórico (positiva/alerta/neutra), calculado uma vez no
+    save() e guardado em tipo_normalizado: o feed filtra e conta no banco.
+    Alerta de lote é sempre alerta; tipo fora dos três é classificado pelo texto.
+    """
+    if origem == "lote":
+        return "alerta"
+    t = (tipo or "").strip().lower()
+    if t in TIPOS_FEED:
+        return t
+    return classificar_texto(texto)
+
+
+class _TipoNormalizadoMixin:
+    """
+    Preenche tipo_normalizado em todo save() (bulk_create não passa aqui:
+    preencha com normalizar_tipo_ia antes). Linhas antigas ou regra nova do
+    classificador: python manage.py classificar_textos_ia.
+    """
+
+    CAMPOS_CLASSIFICACAO = ("tipo", "texto")  # (tipo declarado, texto)
+
+    def save(self, *args, **kwargs):
+        campo_tipo, campo_texto = self.CAMPOS_CLASSIFICACAO
+        self.tipo_normalizado = normalizar_tipo_ia(
+            getattr(self, campo_tipo), getattr(self, campo_texto), getattr(self, "origem", "")
+        )
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "tipo_normalizado"}
+        super().save(*args, **kwargs)
+
 
 # --- Insights (dicas do painel) ---
-class Insight(models.Model):
+class Insight(_TipoNormalizadoMixin, models.Model):
     KIND_CHOICES = [
         ("financeiro", "Financeiro"),
         ("meta", "Meta"),
@@ -52,6 +264,13 @@ class Insight(models.Model):
     # ✅ novo campo para compatibilidade com o teste
     generated_by = models.CharField(max_length=16, default="manual")
 
+    # positiva / alerta / neutra, gravado no save() (filtro por tipo vira WHERE)
+    tipo_normalizado = models.CharField(
+        max_length=10, default="neutra", editable=False, db_index=True
+    )
+
+    CAMPOS_CLASSIFICACAO = ("kind", "text")
+
     def __init__(self, *args, **kwargs):
         # aceita alias usado nos testes: category_dominante -> categoria_dominante
         alias = kwargs.pop("category_dominante", None)
@@ -64,7 +283,7 @@ class Insight(models.Model):
 
 
 # --- Histórico de recomendações da IA ---
-class RecomendacaoIA(models.Model):
+class RecomendacaoIA(_TipoNormalizadoMixin, models.Model):
     TIPO_OPCOES = [
         ("economia", "Economia"),
         ("alerta", "Alerta"),
@@ -75,13 +294,24 @@ class RecomendacaoIA(models.Model):
     usuario = models.ForeignKey(User, on_delete=models.CASCADE)
     texto = models.TextField()
     tipo = models.CharField(max_length=20, choices=TIPO_OPCOES, default="economia")
+    tipo_normalizado = models.CharField(max_length=10, default="neutra", editable=False)
     criado_em = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # feed do histórico: keyset por (criado_em, id), com e sem filtro de tipo
+            models.Index(fields=["usuario", "-criado_em", "-id"], name="rec_ia_usuario_feed"),
+            models.Index(
+                fields=["usuario", "tipo_normalizado", "-criado_em", "-id"],
+                name="rec_ia_usuario_tipo_feed",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.tipo.upper()} - {self.texto[:50]}..."
 
 
-class HistoricoIA(models.Model):
+class HistoricoIA(_TipoNormalizadoMixin, models.Model):
     TIPOS = [
         ("positiva", "Positiva"),
         ("alerta", "Alerta"),
@@ -98,6 +328,17 @@ class HistoricoIA(models.Model):
 
     usuario = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
 
+    tipo_normalizado = models.CharField(max_length=10, default="neutra", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["usuario", "-criado_em", "-id"], name="hist_ia_usuario_feed"),
+            models.Index(
+                fields=["usuario", "tipo_normalizado", "-criado_em", "-id"],
+                name="hist_ia_usuario_tipo_feed",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.tipo.upper()} - {self.criado_em:%d/%m/%Y %H:%M}"
 
@@ -0,0 +1,225 @@
+# financeiro/services/classificador.py
+"""
+Classificador único dos textos da IA: positiva / alerta / neutra.
+
+As listas de palavras viram uma regex compilada por grupo (alternação de
+termos escapados, casando só palavra inteira), montada uma vez no import:
+cada grupo é uma passada sobre o texto, em vez de um `k in texto` por palavra.
+
+As listas são a união das que existiam em services/ia.py, services/ia_utils.py
+e ia/services/classify.py, menos os termos soltos que decidiam sozinhos sem
+dizer o sentido ("margem", "subiu", "bom", "ok"): fica só a forma qualificada
+("margem positiva", "bom desempenho"). Despesa/custo que sobe é alerta; fora
+isso, alerta vence positiva, que vence neutra.
+
+O resultado é gravado em tipo_normalizado no save() de RecomendacaoIA,
+HistoricoIA e Insight (financeiro/models.py). Mudou alguma regra aqui?
+Rode `python manage.py classificar_textos_ia` para reclassificar o histórico.
+"""
+import re
+
+from core.esquema import tem_campo
+
+TIPOS = ("positiva", "alerta", "neutra")
+
+PALAVRAS_ALERTA = (
+    "saldo negativo",
+    "margem negativa",
+    "negativo",
+    "déficit",
+    "deficit",
+    "prejuízo",
+    "prejuizo",
+    "atraso",
+    "queda",
+    "caiu",
+    "aumento de despesas",
+    "despesa subiu",
+    "despesas subiram",
+    "estourou",
+    "ultrapassou",
+    "acima do previsto",
+    "fora da meta",
+    "risco",
+    "atenção",
+    "alerta",
+    "urgente",
+    # services/ia_utils.py (usado pelo admin)
+    "cuidado",
+    "gasto excessivo",
+    "gastos excessivos",
+    # ia/services/classify.py
+    "abaixo da média",
+    "abaixo da media",
+    "estouro",
+    "reduza",
+    "corte",
+    "contingencie",
+    "evite",
+    "baixa liquidez",
+    "inadimplência",
+    "inadimplencia",
+)
+
+PALAVRAS_POSITIVA = (
+    "saldo positivo",
+    "margem positiva",
+    "positivo",
+    "superávit",
+    "superavit",
+    "lucro",
+    "cresceu",
+    "aumentou receita",
+    "recorde",
+    "ótimo",
+    "otimo",
+    "excelente",
+    "parabéns",
+    "parabens",
+    "saudável",
+    "saudavel",
+    # services/ia_utils.py (usado pelo admin)
+    "sobra",
+    "melhorou",
+    "acima da meta",
+    # ia/services/classify.py
+    "acima da média",
+    "acima da media",
+    "bom desempenho",
+    "margem boa",
+    "margem alta",
+    "crescimento",
+    "melhora",
+    "ótima",
+    "otima",
+    "reforce a reserva",
+    "aplique",
+    "aporte extra",
+    "investir",
+)
+
+PALAVRAS_NEUTRA = (
+    "neutro",
+    "estável",
+    "estavel",
+    "sem variação",
+    "sem variacao",
+    "manteve",
+    "regular",
+    "dentro da meta",
+    # ia/services/classify.py
+    "mantido",
+    "acompanhar",
+    "monitorar",
+    "verifique",
+    "observe",
+)
+
+
+def _compilar(palavras):
+    """
+    Um termo só casa como palavra inteira (limite de palavra nos dois lados:
+    "ok" não casa em "book"/"token"), aceitando plural ("atrasos", "riscos") e
+    qualquer espaço entre as palavras de um termo composto.
+    """
+    # termos mais longos primeiro: a alternação para no primeiro que casar
+    termos = sorted(set(palavras), key=len, reverse=True)
+    alternacao = "|".join(re.escape(p).replace(r"\ ", r"\s+") for p in termos)
+    return re.compile(rf"\b(?:{alternacao})(?:e?s)?\b")
+
+
+_RE_ALERTA = _compilar(PALAVRAS_ALERTA)
+_RE_POSITIVA = _compilar(PALAVRAS_POSITIVA)
+_RE_NEUTRA = _compilar(PALAVRAS_NEUTRA)
+
+# heurística de percentuais (quando nenhuma palavra decidiu)
+_RE_PCT = re.compile(r"(-?\d+[.,]?\d*)\s*%")
+_RE_RECEITA = re.compile(r"receita|fatur")
+_RE_DESPESA = re.compile(r"despesa|cust")
+_RE_QUEDA_DESPESA = _compilar(("queda", "redução", "reducao", "diminuiu"))
+_RE_ALTA_DESPESA = _compilar(("aumento", "subiu", "cresceu"))
+# "custo com ração subiu": verbo de alta até 3 palavras depois da despesa
+_RE_DESPESA_SUBIU = re.compile(
+    r"\b(?:despesa|cust)\w*\s+(?:\S+\s+){0,3}?"
+    r"(?:subiu|subiram|aumentou|aumentaram|cresceu|cresceram)\b"
+)
+_RE_QUEDA_RECEITA = _compilar(("queda", "caiu", "diminuiu", "redução", "reducao"))
+_RE_ALTA_RECEITA = _compilar(("subiu", "cresceu", "aumentou"))
+
+
+def _primeiro_percentual(t):
+    for bruto in _RE_PCT.findall(t):
+        try:
+            return float(bruto.replace(",", "."))
+        except ValueError:
+            continue
+    return None
+
+
+def classificar_texto(texto) -> str:
+    """
+    'alerta' se houver termo de alerta (ou despesa que subiu), senão
+    'positiva', senão 'neutra';
+    sem termo nenhum, olha o primeiro percentual do texto e o contexto
+    (margem, receita, despesa). Sem conclusão: 'neutra'.
+    """
+    if not texto:
+        return "neutra"
+    t = str(texto).lower().strip()
+
+    if _RE_ALERTA.search(t) or _RE_DESPESA_SUBIU.search(t):
+        return "alerta"
+    if _RE_POSITIVA.search(t):
+        return "positiva"
+    if _RE_NEUTRA.search(t):
+        return "neutra"
+
+    pct = _primeiro_percentual(t)
+    if pct is None:
+        return "neutra"
+
+    ctx = t[:500]
+    if "margem" in ctx:
+        if pct >= 5:
+            return "positiva"
+        if pct < 0:
+            return "alerta"
+    if _RE_DESPESA.search(ctx):
+        if _RE_QUEDA_DESPESA.search(ctx) and pct <= -3:
+            return "positiva"
+        if _RE_ALTA_DESPESA.search(ctx) and pct >= 5:
+            return "alerta"
+    if _RE_RECEITA.search(ctx):
+        if _RE_QUEDA_RECEITA.search(ctx) and pct <= -3:
+            return "alerta"
+        if _RE_ALTA_RECEITA.search(ctx) and pct >= 3:
+            return "positiva"
+    return "neutra"
+
+
+def reclassificar(qs, campo_tipo="tipo", campo_texto="texto", gravar=True, lote=5000):
+    """
+    Recalcula tipo_normalizado das linhas de qs e grava só as que mudaram,
+    um UPDATE por tipo (em lotes de ids). Devolve {tipo: linhas alteradas};
+    com gravar=False só conta.
+    Usado pela migração de backfill e pelo comando classificar_textos_ia.
+    """
+    from ..models import normalizar_tipo_ia  # models importa este módulo
+
+    campos = ["pk", campo_tipo, campo_texto, "tipo_normalizado"]
+    if tem_campo(qs.model, "origem"):
+        campos.append("origem")
+
+    mudou = {t: [] for t in TIPOS}
+    for pk, tipo, texto, atual, *origem in qs.values_list(*campos).iterator(chunk_size=2000):
+        novo = normalizar_tipo_ia(tipo, texto, origem[0] if origem else "")
+        if novo != atual:
+            mudou[novo].append(pk)
+
+    if not gravar:
+        return {t: len(ids) for t, ids in mudou.items()}
+    base = qs.model._default_manager.using(qs.db)
+    for tipo, ids in mudou.items():
+        for i in range(0, len(ids), lote):
+            base.filter(pk__in=ids[i : i + lote]).update(tipo_normalizado=tipo)
+    return {t: len(ids) for t, ids in mudou.items()}
@@ -1,15 +1,14 @@
 # financeiro/services/ia.py
 
 from datetime import timedelta
-import re
-import unicodedata
-from typing import Optional
 
 from django.db import transaction
 from django.db.models import Sum
 from django.utils import timezone
 from django.apps import apps
 
+from .classificador import classificar_texto
+
 
 # ---------- util interno: resolve o modelo só quando precisar ----------
 def _get_recomendacao_model():
@@ -34,120 +33,8 @@ def _get_recomendacao_model():
 
 # ---------- Classificador ----------
 def _map_tipo(texto: str) -> str:
-    if not texto:
-        return "neutra"
-
-    t = str(texto).lower().strip()
-
-    kw_alerta = {
-        "saldo negativo",
-        "margem negativa",
-        "negativo",
-        "déficit",
-        "deficit",
-        "prejuízo",
-        "prejuizo",
-        "atraso",
-        "queda",
-        "caiu",
-        "aumento de despesas",
-        "despesa subiu",
-        "despesas subiram",
-        "estourou",
-        "ultrapassou",
-        "acima do previsto",
-        "fora da meta",
-        "risco",
-        "atenção",
-        "alerta",
-        "urgente",
-    }
-    kw_positiva = {
-        "saldo positivo",
-        "margem positiva",
-        "positivo",
-        "superávit",
-        "superavit",
-        "lucro",
-        "margem",
-        "cresceu",
-        "subiu",
-        "aumentou receita",
-        "recorde",
-        "ótimo",
-        "otimo",
-        "excelente",
-        "parabéns",
-        "parabens",
-        "saudável",
-        "saudavel",
-    }
-    kw_neutra = {
-        "neutro",
-        "estável",
-        "estavel",
-        "sem variação",
-        "sem variacao",
-        "manteve",
-        "regular",
-        "dentro da meta",
-        "ok",
-    }
-
-    if any(k in t for k in kw_alerta):
-        return "alerta"
-    if any(k in t for k in kw_positiva):
-        return "positiva"
-    if any(k in t for k in kw_neutra):
-        return "neutra"
-
-    # Heurística com percentuais
-    pct_matches = re.findall(r"(-?\d+[.,]?\d*)\s*%", t)
-
-    def to_float(s: str) -> Optional[float]:
-        try:
-            return float(s.replace(",", "."))
-        except Exception:
-            return None
-
-    if pct_matches:
-        pct = next((to_float(s) for s in pct_matches if to_float(s) is not None), None)
-        t_ctx = t[:500]
-        if pct is not None:
-            if "margem" in t_ctx:
-                if pct >= 5:
-                    return "positiva"
-                if pct < 0:
-                    return "alerta"
-            receita_ref = ("receita" in t_ctx) or ("fatur" in t_ctx)
-            despesa_ref = ("despesa" in t_ctx) or ("cust" in t_ctx)
-
-            if (
-                despesa_ref
-                and any(x in t_ctx for x in ("queda", "redução", "reducao", "diminuiu"))
-                and pct <= -3
-            ):
-                return "positiva"
-            if (
-                despesa_ref
-                and any(x in t_ctx for x in ("aumento", "subiu", "cresceu"))
-                and pct >= 5
-            ):
-                return "alerta"
-            if (
-                receita_ref
-                and any(x in t_ctx for x in ("queda", "caiu", "diminuiu", "redução", "reducao"))
-                and pct <= -3
-            ):
-                return "alerta"
-            if (
-                receita_ref
-                and any(x in t_ctx for x in ("subiu", "cresceu", "aumentou"))
-                and pct >= 3
-            ):
-                return "positiva"
-
-    return "neutra"
+    """Mantido pelo nome antigo: usa o classificador compilado."""
+    return classificar_texto(texto)
 
 
 def _moeda(v):
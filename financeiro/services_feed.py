@@ -0,0 +1,92 @@
+# financeiro/services_feed.py
+"""
+Feed do histórico da IA (RecomendacaoIA + HistoricoIA) montado no banco:
+UNION ALL das duas tabelas ordenado por (criado_em, fonte, id), paginado por
+keyset (cursor) — o custo de uma página não depende do tamanho do histórico.
+O tipo já vem normalizado do save() (tipo_normalizado).
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import CharField, Count, Q, Value
+
+from .models import TIPOS_FEED, HistoricoIA, RecomendacaoIA
+
+# fonte entra na ordenação para desempatar ids iguais das duas tabelas
+FONTES = (("h", HistoricoIA), ("r", RecomendacaoIA))
+CAMPOS = ("id", "criado_em", "fonte", "tipo_normalizado", "texto")
+ORDEM = ("-criado_em", "-fonte", "-id")
+
+
+def codificar_cursor(item):
+    bruto = f"{item['criado_em'].isoformat()}|{item['fonte']}|{item['id']}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """
+    (criado_em, fonte, id) do último item da página anterior, ou None se inválido.
+    """
+    if not cursor:
+        return None
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        criado_em, fonte, pk = bruto.split("|")
+        return datetime.fromisoformat(criado_em), fonte, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _depois_do_cursor(fonte, cursor):
+    """
+    Q para "vem depois do cursor" na ordem decrescente (criado_em, fonte, id).
+    """
+    criado_em, fonte_cursor, pk = cursor
+    cond = Q(criado_em__lt=criado_em)
+    if fonte < fonte_cursor:
+        cond |= Q(criado_em=criado_em)
+    elif fonte == fonte_cursor:
+        cond |= Q(criado_em=criado_em, id__lt=pk)
+    return cond
+
+
+def pagina_feed(user, tipo=None, limit=20, cursor=None, offset=0):
+    """
+    Uma página do feed: (itens, tem_mais). Cada item é um dict com CAMPOS.
+    Com cursor usa keyset; sem cursor aceita offset (compatibilidade).
+    Cada lado do UNION já vem limitado e ordenado pelo índice (usuario, criado_em, id).
+    """
+    corte = offset + limit + 1 if cursor is None else limit + 1
+    partes = []
+    for fonte, model in FONTES:
+        qs = model.objects.filter(usuario=user)
+        if tipo in TIPOS_FEED:
+            qs = qs.filter(tipo_normalizado=tipo)
+        if cursor is not None:
+            qs = qs.filter(_depois_do_cursor(fonte, cursor))
+        qs = qs.annotate(fonte=Value(fonte, output_field=CharField())).values(*CAMPOS)
+        partes.append(qs.order_by(*ORDEM)[:corte])
+
+    unidos = partes[0].union(*partes[1:], all=True).order_by(*ORDEM)
+    inicio = 0 if cursor is not None else offset
+    linhas = list(unidos[inicio : inicio + limit + 1])
+    return linhas[:limit], len(linhas) > limit
+
+
+def contagem_por_tipo(user):
+    """
+    {"positiva", "alerta", "neutra", "total"} das duas tabelas numa query só.
+    """
+    partes = [
+        model.objects.filter(usuario=user)
+        .values("tipo_normalizado")
+        .annotate(n=Count("id"))
+        .order_by()
+        for _, model in FONTES
+    ]
+    contagem = {t: 0 for t in TIPOS_FEED}
+    for row in partes[0].union(*partes[1:], all=True):
+        if row["tipo_normalizado"] in contagem:
+            contagem[row["tipo_normalizado"]] += row["n"]
+    contagem["total"] = sum(contagem.values())
+    return contagem
@@ -0,0 +1,141 @@
+# financeiro/services_resumo.py
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import ResumoDiarioFinanceiro, SerieMensalFinanceira, Transacao
+
+# aliases de tipo que aparecem no banco (mesmos do views_financeiro)
+TIPOS_RECEITA = ("receita", "Receita", "R")
+TIPOS_DESPESA = ("despesa", "Despesa", "D")
+
+ZERO = Decimal("0.00")
+
+
+def _base(inicio, fim, empresa=None):
+    qs = ResumoDiarioFinanceiro.objects.filter(dia__gte=inicio, dia__lte=fim, quantidade__gt=0)
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+    return qs
+
+
+def serie_diaria(inicio, fim, empresa=None):
+    """
+    {dia: {"receita": Decimal, "despesa": Decimal}} entre inicio e fim (inclusive).
+    Dia sem lançamento não aparece; quem monta o gráfico preenche com zero.
+    """
+    qs = (
+        _base(inicio, fim, empresa)
+        .values("dia")
+        .annotate(
+            receita=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_RECEITA)), ZERO),
+            despesa=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_DESPESA)), ZERO),
+        )
+        .order_by("dia")
+    )
+    return {r["dia"]: {"receita": r["receita"], "despesa": r["despesa"]} for r in qs}
+
+
+def totais_periodo(inicio, fim, empresa=None):
+    """
+    {"receita": Decimal, "despesa": Decimal} somados no período (inclusive).
+    """
+    return _base(inicio, fim, empresa).aggregate(
+        receita=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_RECEITA)), ZERO),
+        despesa=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_DESPESA)), ZERO),
+    )
+
+
+def totais_por_categoria(inicio, fim, tipos=None, empresa=None):
+    """
+    [(categoria, total), ...] do maior para o menor. Categoria vazia vem como "".
+    `tipos`: ex. TIPOS_DESPESA (padrão: todos os tipos juntos).
+    """
+    qs = _base(inicio, fim, empresa)
+    if tipos is not None:
+        qs = qs.filter(tipo__in=tipos)
+    qs = qs.values("categoria").annotate(soma=Sum("total")).order_by("-soma", "categoria")
+    return [(r["categoria"], r["soma"] or ZERO) for r in qs]
+
+
+@transaction.atomic
+def reconstruir_resumo(empresa=None, corrigir=True):
+    """
+    Compara o ResumoDiarioFinanceiro com a soma das transações e (opcionalmente) corrige.
+    Trava as linhas do resumo antes de agregar, como o recalcular_saldos do estoque.
+
+    Retorna lista de divergências:
+        [{"empresa_id", "dia", "tipo", "categoria", "gravado", "calculado"}, ...]
+    onde gravado/calculado são (total, quantidade) ou None.
+    """
+    gravados_qs = ResumoDiarioFinanceiro.objects.select_for_update()
+    transacoes = Transacao.objects.all()
+    if empresa is not None:
+        gravados_qs = gravados_qs.filter(empresa=empresa)
+        transacoes = transacoes.filter(empresa=empresa)
+
+    gravados = {(r.empresa_id, r.dia, r.tipo, r.categoria): r for r in gravados_qs}
+    somas = (
+        transacoes.values("empresa_id", "data", "tipo", cat=Coalesce("categoria", Value("")))
+        .annotate(soma=Sum("valor"), n=Count("id"))
+        .order_by()
+    )
+    calculados = {
+        (r["empresa_id"], r["data"], r["tipo"], r["cat"]): (r["soma"], r["n"]) for r in somas
+    }
+
+    divergencias = []
+    novos, alterados, vazios = [], [], []
+    for chave in set(gravados) | set(calculados):
+        obj = gravados.get(chave)
+        gravado = (obj.total, obj.quantidade) if obj else None
+        calculado = calculados.get(chave)
+
+        if gravado == calculado:
+            continue
+        if calculado is None and gravado == (0, 0):
+            vazios.append(obj.pk)  # linha zerada por exclusões: só limpa
+            continue
+
+        divergencias.append(
+            {
+                "empresa_id": chave[0],
+                "dia": chave[1],
+                "tipo": chave[2],
+                "categoria": chave[3],
+                "gravado": gravado,
+                "calculado": calculado,
+            }
+        )
+        if calculado is None:
+            vazios.append(obj.pk)
+        elif obj is None:
+            novos.append(
+                ResumoDiarioFinanceiro(
+                    empresa_id=chave[0], dia=chave[1], tipo=chave[2], categoria=chave[3],
+                    total=calculado[0], quantidade=calculado[1],
+                )
+            )
+        else:
+            obj.total, obj.quantidade = calculado
+            alterados.append(obj)
+
+    if corrigir:
+        if vazios:
+            ResumoDiarioFinanceiro.objects.filter(pk__in=vazios).delete()
+        if novos:
+            ResumoDiarioFinanceiro.objects.bulk_create(novos, batch_size=1000)
+        if alterados:
+            ResumoDiarioFinanceiro.objects.bulk_update(
+                alterados, ["total", "quantidade"], batch_size=1000
+            )
+        if divergencias:
+            # pontos mensais fechados em cima do resumo errado (services_serie)
+            fechados = SerieMensalFinanceira.objects.all()
+            if empresa is not None:
+                fechados = fechados.filter(empresa=empresa)
+            fechados.delete()
+
+    return divergencias
@@ -0,0 +1,134 @@
+# financeiro/services_serie.py
+from contextlib import nullcontext
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import ResumoDiarioFinanceiro, SerieMensalFinanceira
+from .services_resumo import TIPOS_DESPESA, TIPOS_RECEITA, ZERO
+
+
+def _primeiro_dia(d):
+    return d.replace(day=1)
+
+
+def _proximo_mes(d):
+    return date(d.year + 1, 1, 1) if d.month == 12 else date(d.year, d.month + 1, 1)
+
+
+def meses_entre(inicio, fim):
+    """
+    Primeiro dia de cada mês de inicio até fim (inclusive).
+    """
+    meses = []
+    mes = _primeiro_dia(inicio)
+    while mes <= fim:
+        meses.append(mes)
+        mes = _proximo_mes(mes)
+    return meses
+
+
+def _somar_meses(meses, empresa=None):
+    """
+    {mes: (receitas, despesas, quantidade)} somando o resumo diário dos meses.
+    """
+    qs = ResumoDiarioFinanceiro.objects.filter(
+        dia__gte=meses[0],
+        dia__lt=_proximo_mes(meses[-1]),
+        quantidade__gt=0,
+    )
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+
+    rows = (
+        qs.annotate(m=TruncMonth("dia"))
+        .values("m")
+        .annotate(
+            receitas=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_RECEITA)), ZERO),
+            despesas=Coalesce(Sum("total", filter=Q(tipo__in=TIPOS_DESPESA)), ZERO),
+            n=Sum("quantidade"),
+        )
+        .order_by()
+    )
+    pedidos = set(meses)
+    return {r["m"]: (r["receitas"], r["despesas"], r["n"]) for r in rows if r["m"] in pedidos}
+
+
+def _ponto(mes, receitas, despesas):
+    receitas = float(receitas)
+    despesas = float(despesas)
+    saldo = receitas - despesas
+    return {
+        "ano": mes.year,
+        "mes": mes.month,
+        "label": f"{mes.month:02d}/{mes.year}",
+        "total_receitas": receitas,
+        "total_despesas": despesas,
+        "saldo": saldo,
+        "margem": (saldo / receitas * 100.0) if receitas > 0 else 0.0,
+    }
+
+
+def serie_mensal(inicio, fim, empresa=None):
+    """
+    Série mensal (receitas, despesas, saldo, margem) de inicio até fim, no
+    formato que o ia_engine.analisar_serie_mensal e os alertas consomem.
+    Mês sem lançamento não entra (como o TruncMonth antigo).
+
+    Com empresa: meses já encerrados vêm do SerieMensalFinanceira e os que
+    faltam são somados uma vez e gravados (fechados). Só o mês corrente é
+    recalculado a cada chamada. Sem empresa: soma tudo do resumo diário.
+    """
+    meses = meses_entre(inicio, fim)
+    if not meses:
+        return []
+
+    mes_corrente = _primeiro_dia(timezone.localdate())
+    pontos = {}
+    if empresa is not None:
+        pontos = {
+            p.mes: (p.receitas, p.despesas, p.quantidade)
+            for p in SerieMensalFinanceira.objects.filter(empresa=empresa, mes__in=meses)
+        }
+
+    faltando = [m for m in meses if m not in pontos]
+    if faltando:
+        fecha = empresa is not None and faltando[0] < mes_corrente
+        # Fechando mês: soma e grava sob a trava do reabrir, senão um lançamento
+        # retroativo no meio do caminho deixaria gravado um ponto já velho.
+        with transaction.atomic() if fecha else nullcontext():
+            if fecha:
+                SerieMensalFinanceira.travar(empresa.pk)
+            somados = _somar_meses(faltando, empresa)
+            fechar = []
+            for mes in faltando:
+                receitas, despesas, n = somados.get(mes, (ZERO, ZERO, 0))
+                pontos[mes] = (receitas, despesas, n)
+                if empresa is not None and mes < mes_corrente:
+                    fechar.append(
+                        SerieMensalFinanceira(
+                            empresa_id=empresa.pk,
+                            mes=mes,
+                            receitas=receitas,
+                            despesas=despesas,
+                            saldo=receitas - despesas,
+                            quantidade=n,
+                        )
+                    )
+            if fechar:
+                # outro request pode ter fechado o mesmo mês no meio tempo
+                SerieMensalFinanceira.objects.bulk_create(fechar, ignore_conflicts=True)
+
+    return [_ponto(mes, *pontos[mes][:2]) for mes in meses if pontos[mes][2]]
+
+
+def serie_ano_corrente(empresa=None, hoje=None):
+    """
+    (inicio, fim, série) de 1º de janeiro até hoje: a janela das views da IA.
+    """
+    fim = hoje or timezone.localdate()
+    inicio = fim.replace(month=1, day=1)
+    return inicio, fim, serie_mensal(inicio, fim, empresa=empresa)
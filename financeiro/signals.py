@@ -0,0 +1,42 @@
+# financeiro/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from financeiro.models import ResumoDiarioFinanceiro, Transacao
+
+
+@receiver(pre_save, sender=Transacao)
+def guardar_resumo_original(sender, instance: Transacao, **kwargs):
+    """
+    Update de instância que não veio inteira do banco (.only(), pk montado à mão):
+    busca os valores antigos para o post_save conseguir desfazer no resumo.
+    """
+    if instance._state.adding or hasattr(instance, "_resumo_original"):
+        return
+    antiga = Transacao.objects.filter(pk=instance.pk).only(*Transacao.CAMPOS_RESUMO).first()
+    instance._resumo_original = antiga.contribuicao_resumo() if antiga else None
+
+
+@receiver(post_save, sender=Transacao)
+def atualizar_resumo_transacao_salva(sender, instance: Transacao, created, **kwargs):
+    """
+    Tira a contribuição antiga (se era update) e soma a nova, na mesma
+    transação do save.
+    """
+    antiga = None if created else getattr(instance, "_resumo_original", None)
+    nova = instance.contribuicao_resumo()
+    if antiga == nova:
+        return
+
+    if antiga is not None:
+        ResumoDiarioFinanceiro.aplicar_delta(antiga[0], -antiga[1], -1)
+    if nova is not None:
+        ResumoDiarioFinanceiro.aplicar_delta(nova[0], nova[1], 1)
+    instance._resumo_original = nova
+
+
+@receiver(post_delete, sender=Transacao)
+def atualizar_resumo_transacao_apagada(sender, instance: Transacao, **kwargs):
+    contribuicao = getattr(instance, "_resumo_original", None) or instance.contribuicao_resumo()
+    if contribuicao is not None:
+        ResumoDiarioFinanceiro.aplicar_delta(contribuicao[0], -contribuicao[1], -1)
@@ -7,6 +7,7 @@ from .views_insights import metrics_despesas_por_categoria_view
 from . import views_financeiro
 from .views_ia import ia_gerar_dica_30d
 from .views_insights import gerar_insight_view
+from .views_insights import export_despesas_csv, export_insights_csv, export_receitas_csv
 from . import views_financeiro as views
 from . import views_financeiro as v
 from .views_financeiro import gerar_insight, listar_insights
@@ -68,6 +69,10 @@ urlpatterns = [
     path("ia/historico/feed/", v.ia_historico_feed, name="ia_historico_feed"),
     path("ia/historico/", v.ia_historico, name="ia_historico"),
     path("ia/historico/export/csv/", historico_ia_csv_v2, name="ia_historico_export_csv_v2"),
+    # Exportações CSV (streaming; ?gzip=1 comprime)
+    path("export/receitas/csv/", export_receitas_csv, name="export_receitas_csv"),
+    path("export/despesas/csv/", export_despesas_csv, name="export_despesas_csv"),
+    path("export/insights/csv/", export_insights_csv, name="export_insights_csv"),
     # Insights utilitários/APIs extras
     path(
         "metrics/despesas-por-categoria/",
@@ -1,10 +1,7 @@
 # -----------------------------
 # 📦 Importações padrão (stdlib)
 # -----------------------------
-import hashlib
 import logging
-import re
-from collections import defaultdict
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 import builtins
@@ -16,25 +13,19 @@ from django.apps import apps
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from estoque.views import api_lotes_criticos
-from django.db.models.functions import TruncMonth
 from django.utils.timezone import now
 from django.core.paginator import Paginator
-from django.db import DatabaseError, models
+from django.db import DatabaseError
 from django.db.models import (
     Sum,
     Q,
     Count,
-    Value,
-    CharField,
-    Case,
-    When,
     DecimalField,
     F,
     ExpressionWrapper,
 )
 from psycopg import logger
 from .services.ia import _map_tipo as map_tipo_ia
-from django.db.models.functions import TruncDate, Coalesce, Abs, Cast
 from django.http import JsonResponse
 from django.shortcuts import redirect, render
 from django.utils import timezone
@@ -53,10 +44,16 @@ from core.decorators import bloquear_demo
 from ia.services.analysis import analisar_30d_dict
 
 # Modelos
-from .models import Transacao, Insight
+from .models import TIPOS_FEED, Insight, Transacao
+from .services_resumo import serie_diaria, totais_por_categoria, totais_periodo
+from .services_serie import serie_ano_corrente
+from .services_feed import codificar_cursor, contagem_por_tipo, decodificar_cursor, pagina_feed
+from core import esquema
+from core.decorators import cache_por_empresa
 
 # Serviços locais de IA (geração e classificador oficial que já usa no projeto)
-from .services.ia import generate_tip_last_30d, _map_tipo as map_tipo_oficial
+from .services.ia import generate_tip_last_30d
+from .services.classificador import classificar_texto
 from financeiro.ia_estoque_bridge import registrar_alertas_lote_no_historico
 from financeiro.models import HistoricoIA, RecomendacaoIA
 
@@ -118,121 +115,12 @@ def _map_tipo_painel(categoria: str, cor: str, metrics: dict) -> str:
     return "economia"
 
 
-def _map_tipo_texto(texto: str) -> str:
-    """
-    Classificação textual simplificada para dicas salvas no histórico:
-    """
-    t = (texto or "").lower()
-    positivas = (
-        "ótimo",
-        "excelente",
-        "superávit",
-        "superavit",
-        "positivo",
-        "acima da meta",
-        "lucro",
-        "margem positiva",
-        "continue assim",
-        "reforce a reserva",
-        "aporte",
-    )
-    alertas = (
-        "alerta",
-        "atenção",
-        "atencao",
-        "risco",
-        "queda",
-        "negativo",
-        "déficit",
-        "deficit",
-        "evite",
-        "abaixo da meta",
-        "corte",
-        "reduza",
-        "atraso",
-        "inadimpl",
-    )
-    if any(k in t for k in alertas):
-        return "alerta"
-    if any(k in t for k in positivas):
-        return "positiva"
-    if re.search(r"(-\s*\d+([.,]\d+)?%?)", t):
-        return "alerta"
-    return "neutra"
-
-
-def _fallback_classify(txt: str) -> str:
-    t = (txt or "").lower()
-    if any(
-        k in t
-        for k in [
-            "alerta",
-            "atenção",
-            "risco",
-            "evite",
-            "corte",
-            "reduza",
-            "atraso",
-            "déficit",
-            "negativo",
-            "queda",
-            "abaixo",
-            "gasto excessivo",
-            "gastos excessivos",
-            "estouro de caixa",
-            "inadimpl",
-        ]
-    ):
-        return "alerta"
-    if any(
-        k in t
-        for k in [
-            "saldo positivo",
-            "positivo",
-            "ótimo",
-            "excelente",
-            "parabéns",
-            "superávit",
-            "acima da meta",
-            "margem",
-            "reforce a reserva",
-            "aporte extra",
-            "continue assim",
-        ]
-    ):
-        return "positiva"
-    return "neutra"
-
-
 def map_tipo_textual(texto: str) -> str:
     """
-    Normaliza o texto de dica em:
-      - 'positiva'
-      - 'alerta'
-      - 'neutra'
+    Normaliza o texto de dica em 'positiva' | 'alerta' | 'neutra'
+    (classificador compilado em services/classificador.py).
     """
-    tx = (texto or "").strip()
-    if not tx:
-        return "neutra"
-
-    # 1) classificador oficial (do services.ia)
-    k = ""
-    try:
-        k = (map_tipo_oficial(tx) or "").strip().lower()
-    except Exception:
-        k = ""
-
-    if k in ("positiva", "alerta", "neutra"):
-        return k
-
-    # 2) helper local
-    k2 = (_map_tipo_texto(tx) or "").strip().lower()
-    if k2 in ("positiva", "alerta", "neutra"):
-        return k2
-
-    # 3) fallback
-    return _fallback_classify(tx)
-
+    return classificar_texto(texto)
 
 
 # -----------------------------------------------------------------------------
@@ -243,9 +131,8 @@ def _date_range_kwargs(model, field_name: str, start, end, inclusive_end=True):
     Retorna kwargs corretos para filtrar por faixa de datas
     (DateField vs DateTimeField).
     """
-    f = model._meta.get_field(field_name)
     end_op = "lte" if inclusive_end else "lt"
-    if f.get_internal_type() == "DateTimeField":
+    if esquema.tipo_interno(model, field_name) == "DateTimeField":
         return {f"{field_name}__date__gte": start, f"{field_name}__date__{end_op}": end}
     return {f"{field_name}__gte": start, f"{field_name}__{end_op}": end}
 
@@ -485,10 +372,12 @@ def enviar_dica_30d(request):
         periodo=periodo_dict,
     )
 
-    notificar_dica_financeira_teste(
+    # tenta já: fora do runserver não há scheduler drenando a fila
+    notificacao = notificar_dica_financeira_teste(
         mensagem_formatada,
         canal="telegram",
         usuario=request.user,
+        enviar_agora=True,
     )
 
     return JsonResponse(
@@ -500,6 +389,8 @@ def enviar_dica_30d(request):
                 "tipo": rec.tipo,
                 "periodo": periodo_dict,
             },
+            # "enviado" ou "pendente" (o worker tenta de novo) ou "erro"
+            "status_notificacao": notificacao.status,
         }
     )
 
@@ -538,11 +429,7 @@ def ia_historico_feed(request):
     results = []
 
     if HModel:
-        date_field = "created_at"
-        try:
-            HModel._meta.get_field("created_at")
-        except Exception:
-            date_field = "criado_em"
+        date_field = "created_at" if esquema.tem_campo(HModel, "created_at") else "criado_em"
 
         qs = HModel.objects.filter(usuario=request.user)
 
@@ -687,123 +574,13 @@ def ia_historico(request):
     return JsonResponse({"ok": True, "items": items})
 
 
-# -----------------------------------------------------------------------------
-# Resumo mensal — SÉRIE (opcional)
-# -----------------------------------------------------------------------------
-@login_required
-def ia_resumo_mensal_series(request):
-    tz = timezone.get_current_timezone()
-    hoje = timezone.now().astimezone(tz)
-
-    def _primeiro_dia_mes(d: datetime) -> datetime:
-        return d.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-    def _add_mes(d: datetime) -> datetime:
-        y, m = d.year, d.month
-        if m == 12:
-            return d.replace(year=y + 1, month=1)
-        return d.replace(month=m + 1)
-
-    inicio_janela = _primeiro_dia_mes(hoje) - timedelta(days=31 * 6)
-    inicio_janela = _primeiro_dia_mes(inicio_janela)
-
-    rows = Insight.objects.filter(created_at__gte=inicio_janela).values_list("created_at", "kind")
-
-    agg = defaultdict(lambda: {"positiva": 0, "alerta": 0, "neutra": 0, "total": 0})
-    for created_at, kind in rows:
-        dt = timezone.localtime(created_at, tz)
-        mes = _primeiro_dia_mes(dt)
-        key = mes.strftime("%Y-%m-01")
-        k = (kind or "neutra").lower()
-        if k not in ("positiva", "alerta", "neutra"):
-            k = "neutra"
-        agg[key][k] += 1
-        agg[key]["total"] += 1
-
-    labels = []
-    cur = inicio_janela
-    for _ in range(7):
-        labels.append(cur.strftime("%Y-%m-01"))
-        cur = _add_mes(cur)
-
-    totais, pos, alerta, neutra = [], [], [], []
-    for key in labels:
-        d = agg[key]
-        totais.append(d["total"])
-        pos.append(d["positiva"])
-        alerta.append(d["alerta"])
-        neutra.append(d["neutra"])
-
-    n = len(totais)
-    if n >= 2:
-        xs = list(range(n))
-        sumx = sum(xs)
-        sumy = sum(totais)
-        sumxy = sum(x * y for x, y in zip(xs, totais))
-        sumx2 = sum(x * x for x in xs)
-        denom = (n * sumx2 - sumx * sumx) or 1
-        a = (n * sumxy - sumx * sumy) / denom
-        b = (sumy - a * sumx) / n
-        next_x = n
-        forecast_total = max(0, round(a * next_x + b))
-    else:
-        forecast_total = totais[-1] if n == 1 else 0
-
-    last = datetime.strptime(labels[-1], "%Y-%m-01")
-    next_label = (last.replace(day=28) + timedelta(days=4)).replace(day=1).strftime("%Y-%m-01")
-
-    return JsonResponse(
-        {
-            "labels": labels,
-            "total": totais,
-            "positivas": pos,
-            "alertas": alerta,
-            "neutras": neutra,
-            "forecast_next": {"label": next_label, "total": forecast_total},
-        }
-    )
-
-
 @login_required
 def ia_alertas_periodos_criticos(request):
     """
     Analisa a série mensal (receitas, despesas, saldo)
     e retorna alertas de períodos críticos / pontos de atenção.
     """
-    hoje = now().date()
-    inicio = hoje.replace(month=1, day=1)
-    fim = hoje
-
-    qs = (
-        Transacao.objects.filter(data__gte=inicio, data__lte=fim)
-        .annotate(mes=TruncMonth("data"))
-        .values("mes")
-        .annotate(
-            total_receitas=Sum("valor", filter=Q(tipo__in=TIPO_RECEITA)),
-            total_despesas=Sum("valor", filter=Q(tipo__in=TIPO_DESPESA)),
-        )
-        .order_by("mes")
-    )
-
-    series = []
-    for row in qs:
-        mes = row["mes"]
-        receitas = float(row["total_receitas"] or 0)
-        despesas = float(row["total_despesas"] or 0)
-        saldo = receitas - despesas
-        margem = (saldo / receitas * 100.0) if receitas > 0 else 0.0
-
-        series.append(
-            {
-                "ano": mes.year,
-                "mes": mes.month,
-                "label": f"{mes.month:02d}/{mes.year}",
-                "total_receitas": receitas,
-                "total_despesas": despesas,
-                "saldo": saldo,
-                "margem": margem,
-            }
-        )
+    _, _, series = serie_ano_corrente(empresa=getattr(request, "empresa", None) or None)
 
     # se tiver pouco dado, não inventa alerta
     if len(series) < 2:
@@ -930,27 +707,10 @@ def dados_financeiros_filtrados(request):
         if not dt_inicio or not dt_fim or dt_inicio > dt_fim:
             return JsonResponse({"error": "Período inválido."}, status=400)
 
-        base = Transacao.objects.filter(
-            **_date_range_kwargs(Transacao, "data", dt_inicio, dt_fim, inclusive_end=True)
-        )
-
-        rec_qs = (
-            base.filter(tipo__in=TIPO_RECEITA)
-            .annotate(dia=TruncDate("data"))
-            .values("dia")
-            .annotate(total=Sum("valor"))
-            .order_by("dia")
-        )
-        dep_qs = (
-            base.filter(tipo__in=TIPO_DESPESA)
-            .annotate(dia=TruncDate("data"))
-            .values("dia")
-            .annotate(total=Sum("valor"))
-            .order_by("dia")
-        )
-
-        rec_map = {row["dia"]: float(row["total"] or 0) for row in rec_qs}
-        dep_map = {row["dia"]: float(row["total"] or 0) for row in dep_qs}
+        # resumo diário materializado: custo pelo número de dias, não de transações
+        serie = serie_diaria(dt_inicio, dt_fim)
+        rec_map = {dia: float(v["receita"]) for dia, v in serie.items()}
+        dep_map = {dia: float(v["despesa"]) for dia, v in serie.items()}
 
         dias, receitas, despesas, saldo = [], [], [], []
         cur = dt_inicio
@@ -986,15 +746,14 @@ def ia_resumo_mensal(request):
     except ValueError:
         return JsonResponse({"error": "Parâmetros 'ano' e 'mes' inválidos."}, status=400)
 
-    dt_inicio = date(ano, mes, 1)
-    dt_fim = date(ano + (1 if mes == 12 else 0), (mes % 12) + 1, 1)  # exclusivo
-
-    base = Transacao.objects.filter(
-        **_date_range_kwargs(Transacao, "data", dt_inicio, dt_fim, inclusive_end=False)
-    )
+    try:
+        dt_inicio, dt_fim = _month_bounds(date(ano, mes, 1))
+    except ValueError:
+        return JsonResponse({"error": "Parâmetros 'ano' e 'mes' inválidos."}, status=400)
 
-    rec_total = float(base.filter(tipo="receita").aggregate(soma=Sum("valor")).get("soma") or 0)
-    dep_total = float(base.filter(tipo="despesa").aggregate(soma=Sum("valor")).get("soma") or 0)
+    totais = totais_periodo(dt_inicio, dt_fim)
+    rec_total = float(totais["receita"])
+    dep_total = float(totais["despesa"])
 
     saldo = rec_total - dep_total
     perc_pos = round((saldo / rec_total) * 100, 1) if rec_total > 0 else 0.0
@@ -1046,6 +805,7 @@ def _to_float(x) -> float:
 
 @login_required
 @require_GET
+@cache_por_empresa()
 def dados_grafico_filtrados(request):
     """
     GET /financeiro/dados_grafico_filtrados/?inicio=YYYY-MM-DD&fim=YYYY-MM-DD&categoria=...&debug=1
@@ -1060,82 +820,48 @@ def dados_grafico_filtrados(request):
     if fim < ini:
         ini, fim = fim, ini
 
-    # 2) Base
-    qs = Transacao.objects.all()
-    data_field = Transacao._meta.get_field("data")
-
-    if isinstance(data_field, models.DateTimeField):
-        filtro = {"data__date__range": (ini, fim)}
-        trunc_expr = TruncDate("data")
-    else:
-        filtro = {"data__range": (ini, fim)}
-        trunc_expr = F("data")
-
-    base = qs.filter(**filtro)
-
-    # 3) Decimal seguro
-    DEC = DecimalField(max_digits=18, decimal_places=2)
-    ZERO_DEC = Value(Decimal("0.00"), output_field=DEC)
-
-    # 4) Agregação diária
-    agreg = (
-        base.annotate(dia=trunc_expr)
-        .values("dia")
-        .annotate(
-            rec=Coalesce(Sum(Cast("valor", DEC), filter=Q(tipo__in=TIPO_RECEITA)), ZERO_DEC),
-            des=Coalesce(Sum(Cast("valor", DEC), filter=Q(tipo__in=TIPO_DESPESA)), ZERO_DEC),
-        )
-        .order_by("dia")
-    )
+    # multiempresa: só os lançamentos da empresa do usuário
+    empresa = getattr(request, "empresa", None) or None
 
-    mapa = {row["dia"]: row for row in agreg}
+    # 2) Agregação diária (resumo materializado por dia/tipo/categoria)
+    mapa = serie_diaria(ini, fim, empresa=empresa)
 
-    # 5) Séries completas (mesmo sem dados)
+    # 3) Séries completas (mesmo sem dados)
     dias_labels, receitas, despesas, saldo = [], [], [], []
 
     for d in _daterange(ini, fim):
         dias_labels.append(d.strftime("%d/%m"))
         row = mapa.get(d)
-        r = _to_float(row["rec"]) if row else 0.0
-        de = _to_float(row["des"]) if row else 0.0
+        r = _to_float(row["receita"]) if row else 0.0
+        de = _to_float(row["despesa"]) if row else 0.0
         receitas.append(r)
         despesas.append(de)
         saldo.append(r - de)
 
-    # 6) Pizza — agora **blindada**
-    categorias = []
-    valores = []
-
-    if "categoria" in {f.name for f in Transacao._meta.get_fields()}:
-
-        cat_qs = (
-            base.filter(tipo__in=TIPO_DESPESA)
-            .values("categoria")
-            .annotate(total=Coalesce(Sum(Cast("valor", DEC)), ZERO_DEC))
-            .order_by("-total")
-        )
-
-        raw = [(row["categoria"] or "Outras", _to_float(row["total"])) for row in cat_qs]
-        raw.sort(key=lambda x: x[1], reverse=True)
+    # 4) Pizza — despesas por categoria, top 5 + "Outras"
+    raw = [
+        (cat or "Outras", _to_float(total))
+        for cat, total in totais_por_categoria(ini, fim, tipos=TIPO_DESPESA, empresa=empresa)
+    ]
 
-        TOP_N = 5
-        top = raw[:TOP_N]
-        resto = raw[TOP_N:]
-        outras_total = sum(v for _, v in resto) if resto else 0.0
+    TOP_N = 5
+    top = raw[:TOP_N]
+    resto = raw[TOP_N:]
+    outras_total = sum(v for _, v in resto) if resto else 0.0
 
-        categorias = [n for n, _ in top]
-        valores = [v for _, v in top]
+    categorias = [n for n, _ in top]
+    valores = [v for _, v in top]
 
-        if outras_total > 0:
-            categorias.append("Outras")
-            valores.append(outras_total)
+    if outras_total > 0:
+        categorias.append("Outras")
+        valores.append(outras_total)
 
-    # 7) Se **pizza vazia**, retorna "Sem categoria"
+    # 5) Se **pizza vazia**, retorna "Sem categoria"
     if not categorias:
         categorias = ["Sem categoria"]
         valores = [0]
 
-    # 8) JSON final
+    # 6) JSON final
     resp = {
         "ok": True,
         "inicio": ini.isoformat(),
@@ -1293,8 +1019,7 @@ def categorias_transacao(request):
     """
     try:
         # Verifica se existe o campo categoria
-        fields = {f.name for f in Transacao._meta.get_fields()}
-        if "categoria" not in fields:
+        if not esquema.tem_campo(Transacao, "categoria"):
             return JsonResponse({"ok": True, "categorias": [], "valores": []})
 
         # Agrupamento por categoria
@@ -1320,6 +1045,11 @@ def categorias_transacao(request):
 
 @login_required
 def ia_historico_feed_v2(request):
+    """
+    Feed do histórico (RecomendacaoIA + HistoricoIA), mais novo primeiro.
+    Paginação: ?cursor=<next_cursor da página anterior> (keyset; custo constante)
+    ou ?offset= (antigo). Filtro: ?tipo=positiva|alerta|neutra.
+    """
     user = request.user
 
     filtro_raw = (request.GET.get("filtro") or request.GET.get("tipo") or "").strip().lower()
@@ -1336,78 +1066,44 @@ def ia_historico_feed_v2(request):
     except ValueError:
         offset = 0
 
-    base_rec = list(RecomendacaoIA.objects.filter(usuario=user).order_by("-criado_em"))
-    base_hist = list(HistoricoIA.objects.filter(usuario=user).order_by("-criado_em"))
-
-    base_all = base_rec + base_hist
-    base_all.sort(key=lambda x: x.criado_em or timezone.now(), reverse=True)
-
-    tz = timezone.get_current_timezone()
-    normalizados = []
-    counts = {"positiva": 0, "alerta": 0, "neutra": 0}
-    total = 0
-
-    for rec in base_all:
-        if getattr(rec, "origem", "") == "lote":
-            tnorm = "alerta"
-        else:
-            tnorm = (getattr(rec, "tipo", "") or "").strip().lower()
-
-        texto = getattr(rec, "texto", "") or ""
-
-        if tnorm not in ("positiva", "alerta", "neutra"):
-            tnorm = map_tipo_textual(texto) or "neutra"
-
-        if tnorm not in ("positiva", "alerta", "neutra"):
-            tnorm = "neutra"
+    cursor = decodificar_cursor(request.GET.get("cursor"))
+    if cursor is not None:
+        offset = 0
 
-        counts[tnorm] += 1
-        total += 1
+    page_items, has_more = pagina_feed(
+        user, tipo=tipo_param, limit=limit, cursor=cursor, offset=offset
+    )
+    counts = contagem_por_tipo(user)
 
-        dt_local = timezone.localtime(rec.criado_em, tz) if rec.criado_em else None
+    filtro_label = tipo_param or "todas"
+    total_filtrado = counts[tipo_param] if tipo_param else counts["total"]
 
-        normalizados.append(
+    tz = timezone.get_current_timezone()
+    items = []
+    for it in page_items:
+        dt_local = timezone.localtime(it["criado_em"], tz)
+        items.append(
             {
-                "id": rec.id,
-                "tipo": tnorm,
-                "texto": texto,
-                "criado_em": rec.criado_em.isoformat() if rec.criado_em else "",
-                "criado_em_fmt": dt_local.strftime("%d/%m/%Y %H:%M") if dt_local else "",
-                "_stamp": rec.criado_em.timestamp() if rec.criado_em else 0,
+                "id": it["id"],
+                "tipo": it["tipo_normalizado"],
+                "texto": it["texto"] or "",
+                "criado_em": it["criado_em"].isoformat(),
+                "criado_em_fmt": dt_local.strftime("%d/%m/%Y %H:%M"),
             }
         )
 
-    if tipo_param in ("positiva", "alerta", "neutra"):
-        filtrados = [it for it in normalizados if it["tipo"] == tipo_param]
-        filtro_label = tipo_param
-    else:
-        filtrados = normalizados
-        filtro_label = "todas"
-
-    total_filtrado = len(filtrados)
-    page_items = filtrados[offset : offset + limit]
-    has_more = total_filtrado > (offset + len(page_items))
-
     resp = {
         "ok": True,
         "filtro": filtro_label,
-        "count": {**counts, "total": total},
-        "items": [
-            {
-                "id": it["id"],
-                "tipo": it["tipo"],
-                "texto": it["texto"],
-                "criado_em": it["criado_em"],
-                "criado_em_fmt": it["criado_em_fmt"],
-            }
-            for it in page_items
-        ],
+        "count": counts,
+        "items": items,
         "limit": limit,
         "offset": offset,
-        "returned": len(page_items),
+        "returned": len(items),
         "total_filtered": total_filtrado,
         "has_more": has_more,
         "hasMore": has_more,
+        "next_cursor": codificar_cursor(page_items[-1]) if has_more and page_items else None,
     }
 
     if request.GET.get("debug") == "1":
@@ -1435,12 +1131,16 @@ def ia_historico_feed_v2(request):
 @login_required
 @require_GET
 def listar_insights(request):
-    qs = Insight.objects.all().order_by("-id")[:50]
+    qs = Insight.objects.all().order_by("-id")
+    tipo = (request.GET.get("tipo") or "").strip().lower()
+    if tipo in TIPOS_FEED:
+        qs = qs.filter(tipo_normalizado=tipo)  # classificado no save()
     items = []
-    for ins in qs:
+    for ins in qs[:50]:
         items.append(
             {
                 "id": ins.id,
+                "tipo": ins.tipo_normalizado,
                 "texto": getattr(ins, "texto", "") or getattr(ins, "descricao", "") or "",
                 "categoria_dominante": getattr(ins, "categoria_dominante", None),
             }
@@ -1453,7 +1153,7 @@ def listar_insights(request):
 def gerar_insight(request):
     dica, metrics, saved_id = generate_tip_last_30d(Transacao, usuario=request.user, auto_save=True)
 
-    fields = {f.name for f in Insight._meta.get_fields() if hasattr(f, "attname")}
+    fields = esquema.campos_concretos(Insight)
     data = {}
 
     if "usuario" in fields:
@@ -1545,40 +1245,8 @@ def ia_resumo_mensal_series(request):
       ]
     }
     """
-    hoje = now().date()
-
-    # aqui podemos ser simples: pegar tudo desde janeiro do ano atual
-    inicio = hoje.replace(month=1, day=1)
-    fim = hoje
-
-    qs = (
-        Transacao.objects.filter(data__gte=inicio, data__lte=fim)  # <<< sem __date
-        .annotate(mes=TruncMonth("data"))
-        .values("mes")
-        .annotate(
-            total_receitas=Sum("valor", filter=Q(tipo="R")),
-            total_despesas=Sum("valor", filter=Q(tipo="D")),
-        )
-        .order_by("mes")
-    )
-
-    series = []
-    for row in qs:
-        mes = row["mes"]
-        receitas = row["total_receitas"] or 0
-        despesas = row["total_despesas"] or 0
-        saldo = receitas - despesas
-
-        series.append(
-            {
-                "ano": mes.year,
-                "mes": mes.month,
-                "label": f"{mes.month:02d}/{mes.year}",
-                "total_receitas": float(receitas),
-                "total_despesas": float(despesas),
-                "saldo": float(saldo),
-            }
-        )
+    # meses fechados vêm prontos; só o mês corrente é somado (services_serie)
+    inicio, fim, series = serie_ano_corrente(empresa=getattr(request, "empresa", None) or None)
 
     data = {
         "ok": True,
@@ -1602,40 +1270,8 @@ def ia_analise_mensal_preview(request):
     Gera uma análise inteligente do mês atual,
     usando os dados da série mensal consolidada.
     """
-    # Reaproveitamos a mesma lógica da ia_resumo_mensal_series
-    hoje = now().date()
-    inicio = hoje.replace(month=1, day=1)
-    fim = hoje
-
-    qs = (
-        Transacao.objects.filter(data__gte=inicio, data__lte=fim)
-        .annotate(mes=TruncMonth("data"))
-        .values("mes")
-        .annotate(
-            total_receitas=Sum("valor", filter=Q(tipo="R")),
-            total_despesas=Sum("valor", filter=Q(tipo="D")),
-        )
-        .order_by("mes")
-    )
-
-    # Normalizamos igual ao endpoint de séries
-    series = []
-    for row in qs:
-        mes = row["mes"]
-        receitas = float(row["total_receitas"] or 0)
-        despesas = float(row["total_despesas"] or 0)
-        saldo = receitas - despesas
-
-        series.append(
-            {
-                "ano": mes.year,
-                "mes": mes.month,
-                "label": f"{mes.month:02d}/{mes.year}",
-                "total_receitas": receitas,
-                "total_despesas": despesas,
-                "saldo": saldo,
-            }
-        )
+    # Mesma série da ia_resumo_mensal_series
+    _, _, series = serie_ano_corrente(empresa=getattr(request, "empresa", None) or None)
 
     # Chama o motor da IA
     resultado = analisar_serie_mensal(series)
@@ -1656,18 +1292,11 @@ def ranking_categorias_mensal(request):
     hoje = now().date()
     mes = hoje.month
     ano = hoje.year
-
-    qs = (
-        Transacao.objects.filter(data__year=ano, data__month=mes)
-        .values("categoria")  # << agora é direto no campo
-        .annotate(total=Sum("valor"))
-        .order_by("-total")
-    )
+    inicio, fim = _month_bounds(hoje)
 
     categorias = []
-    for row in qs:
-        nome = row["categoria"] or "Sem categoria"
-        categorias.append({"categoria": nome, "total": float(row["total"] or 0)})
+    for nome, total in totais_por_categoria(inicio, fim):
+        categorias.append({"categoria": nome or "Sem categoria", "total": float(total or 0)})
 
     return JsonResponse({"ok": True, "mes_label": f"{mes:02d}/{ano}", "categorias": categorias})
 
@@ -1837,15 +1466,12 @@ def ia_alertas_financeiros(request):
 
 
 def _pick_field(model, candidates):
-    """Retorna o primeiro campo existente no model."""
-    names = {f.name for f in model._meta.get_fields() if hasattr(f, "name")}
-    for c in candidates:
-        if c in names:
-            return c
-    return None
+    """Retorna o primeiro campo existente no model (mapa do core.esquema)."""
+    return esquema.primeiro_campo(model, candidates)
 
 
 @require_GET
+@cache_por_empresa()
 def api_servico_lider(request):
     """
     Insight: serviço que mais gerou receita nos últimos N dias (default 30).
@@ -1896,7 +1522,7 @@ def api_servico_lider(request):
 
     # --- filtrar por empresa (se existir) ---
     if campo_empresa:
-        empresa = getattr(getattr(request.user, "perfil", None), "empresa", None)
+        empresa = getattr(request, "empresa", None) or None
         if empresa is not None:
             qs = qs.filter(**{campo_empresa: empresa})
 
@@ -1972,6 +1598,7 @@ def api_servico_lider(request):
 
 
 @require_GET
+@cache_por_empresa()
 def api_categoria_lider_receitas(request):
     """
     Retorna a categoria que mais gerou receita nos últimos N dias (default 30).
@@ -1993,7 +1620,7 @@ def api_categoria_lider_receitas(request):
     )
 
     # multiempresa ✅
-    empresa = getattr(getattr(request.user, "perfil", None), "empresa", None)
+    empresa = getattr(request, "empresa", None) or None
     if empresa is not None:
         qs = qs.filter(empresa=empresa)
 
@@ -2050,14 +1677,11 @@ def api_categoria_lider_receitas(request):
     })
 
 def _has_field(model, name: str) -> bool:
-    try:
-        model._meta.get_field(name)
-        return True
-    except Exception:
-        return False
+    return esquema.tem_campo(model, name)
 
 
 @require_GET
+@cache_por_empresa()
 def api_produto_lider_pdv(request):
     """
     Retorna o produto mais vendido (e o segundo) no PDV nos últimos N dias.
@@ -2079,28 +1703,17 @@ def api_produto_lider_pdv(request):
     # Vamos construir filtros dinamicamente
     filtros = {}
     if venda_fk:
-        # data
-        # tenta: venda__data, venda__created_at, venda__criado_em, venda__data_venda
+        # data: venda__data, venda__data_venda, venda__criado_em ou venda__created_at
+        # (caminhos conferidos no mapa de campos, sem consultar o banco)
         for campo_data in ["data", "data_venda", "criado_em", "created_at"]:
-            filtros_teste = {f"{venda_fk}__{campo_data}__gte": dt_ini}
-            try:
-                ItemVenda.objects.filter(**filtros_teste).exists()
-                filtros.update(filtros_teste)
+            if esquema.caminho_valido(ItemVenda, f"{venda_fk}__{campo_data}"):
+                filtros[f"{venda_fk}__{campo_data}__gte"] = dt_ini
                 break
-            except Exception:
-                pass
 
         # empresa (multiempresa)
-        empresa = getattr(getattr(request.user, "perfil", None), "empresa", None)
-        if empresa is not None:
-            for campo_emp in ["empresa", "empresa_id"]:
-                filtros_teste = {f"{venda_fk}__{campo_emp}": empresa}
-                try:
-                    ItemVenda.objects.filter(**filtros_teste).exists()
-                    filtros.update(filtros_teste)
-                    break
-                except Exception:
-                    pass
+        empresa = getattr(request, "empresa", None) or None
+        if empresa is not None and esquema.caminho_valido(ItemVenda, f"{venda_fk}__empresa"):
+            filtros[f"{venda_fk}__empresa"] = empresa
 
     else:
         # Se não houver FK pra Venda, ao menos filtra por data do item se existir
@@ -2109,7 +1722,7 @@ def api_produto_lider_pdv(request):
                 filtros[f"{campo_data_item}__gte"] = dt_ini
                 break
 
-    qs = ItemVenda.objects.all()
+    qs = ItemVenda.objects.filter(**filtros)
 
 
     # ========= Agrupamento por produto =========
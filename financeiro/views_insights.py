@@ -1,14 +1,13 @@
 # financeiro/views_insights.py
-import csv
-from collections import defaultdict
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 
 from django.contrib.auth.decorators import login_required
 from django.core.cache import cache
 from django.core.paginator import Paginator
 from django.db.models import Sum
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
+from django.utils import timezone
 from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_GET, require_http_methods, require_POST
 
@@ -19,6 +18,9 @@ Transacao = mdl.Transacao
 from .services.insights import generate_simple_insight 
 from .utils import _normalize_period, _to_float  # Funções auxiliares de período e conversão 
 from .models import Transacao
+from .services_resumo import TIPOS_DESPESA, TIPOS_RECEITA, serie_diaria, totais_periodo
+from core.decorators import cache_por_empresa
+from core.exportacao import TAMANHO_LOTE, resposta_csv
 
 
 # Referências obrigatórias
@@ -71,11 +73,6 @@ def _normalize_period(request):
     return di, df
 
 
-def _sum_decimal(qs, field="valor"):
-    agg = qs.aggregate(total=Sum(field))
-    return agg["total"] or Decimal("0")
-
-
 def _to_float(v):
     try:
         return float(v)
@@ -95,21 +92,32 @@ def _daterange(a, b):
 RATE_SECONDS = 30  # rate-limit entre cliques
 
 
-@login_required(login_url="/admin/login/")
-@require_http_methods(["GET"])
-def listar_insights_view(request):
-    page = int(request.GET.get("page", 1))
-    per_page = int(request.GET.get("per_page", 20))
-
-    # filtros por período (pela data de criação do insight)
+def _insights_filtrados(request):
+    """
+    Insights do mais novo ao mais antigo, filtrados por ?data_inicio=&data_fim=
+    (data de criação) e ?tipo=positiva|alerta|neutra (tipo_normalizado, indexado).
+    """
     di = _parse_ymd(request.GET.get("data_inicio"))
     df = _parse_ymd(request.GET.get("data_fim"))
+    tipo = (request.GET.get("tipo") or "").strip().lower()
 
     qs = Insight.objects.order_by("-created_at")
     if di:
         qs = qs.filter(created_at__date__gte=di)
     if df:
         qs = qs.filter(created_at__date__lte=df)
+    if tipo in mdl.TIPOS_FEED:
+        qs = qs.filter(tipo_normalizado=tipo)
+    return qs
+
+
+@login_required(login_url="/admin/login/")
+@require_http_methods(["GET"])
+def listar_insights_view(request):
+    page = int(request.GET.get("page", 1))
+    per_page = int(request.GET.get("per_page", 20))
+
+    qs = _insights_filtrados(request)
 
     paginator = Paginator(qs, per_page)
     page_obj = paginator.get_page(page)
@@ -121,7 +129,8 @@ def listar_insights_view(request):
             "title": ins.title,
             "text": ins.text,
             "kind": ins.kind,
-            "categoria_dominante": ins.category_dominante,
+            "tipo": ins.tipo_normalizado,
+            "categoria_dominante": ins.categoria_dominante,
         }
         for ins in page_obj.object_list
     ]
@@ -156,7 +165,8 @@ def gerar_insight_view(request):
             "title": ins.title,
             "text": ins.text,
             "kind": ins.kind,
-            "categoria_dominante": ins.category_dominante,
+            "tipo": ins.tipo_normalizado,
+            "categoria_dominante": ins.categoria_dominante,
             "created_at": ins.created_at.strftime("%d/%m/%Y %H:%M"),
         }
     )
@@ -165,54 +175,44 @@ def gerar_insight_view(request):
 @login_required(login_url="/admin/login/")
 @require_GET
 def export_insights_csv(request):
-    di = _parse_ymd(request.GET.get("data_inicio"))
-    df = _parse_ymd(request.GET.get("data_fim"))
-
-    qs = Insight.objects.order_by("-created_at")
-    if di:
-        qs = qs.filter(created_at__date__gte=di)
-    if df:
-        qs = qs.filter(created_at__date__lte=df)
+    qs = _insights_filtrados(request)
 
-    stamp = datetime.now().strftime("%Y%m%d_%H%M")
-    filename = f"insights_{stamp}.csv"
-
-    resp = HttpResponse(content_type="text/csv; charset=utf-8")
-    resp["Content-Disposition"] = f'attachment; filename="{filename}"'
-    resp.write("\ufeff")  # BOM p/ Excel
-
-    w = csv.writer(resp, delimiter=";")
-    w.writerow(["id", "created_at", "kind", "title", "text", "categoria_dominante"])
-    for ins in qs:
-        w.writerow(
-            [
-                ins.id,
-                ins.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                ins.kind,
-                ins.title,
-                ins.text,
-                ins.category_dominante or "",
-            ]
+    rows = qs.values_list(
+        "id", "created_at", "kind", "tipo_normalizado", "title", "text", "categoria_dominante"
+    )
+    linhas = (
+        (
+            pk,
+            timezone.localtime(criado).strftime("%Y-%m-%d %H:%M:%S"),
+            kind,
+            tipo,
+            title,
+            text,
+            cat or "",
         )
-    return resp
-
-
-def _export_csv_response(filename_base):
-    stamp = datetime.now().strftime("%Y%m%d_%H%M")
-    resp = HttpResponse(content_type="text/csv; charset=utf-8")
-    resp["Content-Disposition"] = f'attachment; filename="{filename_base}_{stamp}.csv"'
-    resp.write("\ufeff")  # BOM
-    return resp
+        for pk, criado, kind, tipo, title, text, cat in rows.iterator(chunk_size=TAMANHO_LOTE)
+    )
+    return resposta_csv(
+        request,
+        "insights",
+        ["id", "created_at", "kind", "tipo", "title", "text", "categoria_dominante"],
+        linhas,
+    )
 
 
-@login_required(login_url="/admin/login/")
-@require_GET
-def export_receitas_csv(request):
+def _export_transacoes_csv(request, tipos, nome_base):
+    """
+    CSV das transações da empresa do usuário, dos `tipos` pedidos, em streaming.
+    Filtros: ?data_inicio=&data_fim= (YYYY-MM-DD), ?categoria=, ?gzip=1.
+    """
     di = _parse_ymd(request.GET.get("data_inicio"))
     df = _parse_ymd(request.GET.get("data_fim"))
     categoria = request.GET.get("categoria")
 
-    qs = Transacao.objects.order_by("-data")
+    qs = Transacao.objects.filter(tipo__in=tipos).order_by("-data", "-id")
+    empresa = getattr(request, "empresa", None) or None
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
     if di:
         qs = qs.filter(data__gte=di)
     if df:
@@ -220,51 +220,25 @@ def export_receitas_csv(request):
     if categoria and categoria.lower() not in ("todas", "toda"):
         qs = qs.filter(categoria=categoria)
 
-    resp = _export_csv_response("receitas")
-    w = csv.writer(resp, delimiter=";")
-    w.writerow(["id", "data", "categoria", "descricao", "valor"])
-    for r in qs:
-        w.writerow(
-            [
-                r.id,
-                r.data.strftime("%Y-%m-%d"),
-                getattr(r, "categoria", "") or "",
-                getattr(r, "descricao", "") or "",
-                r.valor,
-            ]
-        )
-    return resp
+    rows = qs.values_list("id", "data", "categoria", "descricao", "valor")
+    linhas = (
+        (pk, data, cat or "", desc or "", valor)
+        for pk, data, cat, desc, valor in rows.iterator(chunk_size=TAMANHO_LOTE)
+    )
+    cabecalho = ["id", "data", "categoria", "descricao", "valor"]
+    return resposta_csv(request, nome_base, cabecalho, linhas)
 
 
 @login_required(login_url="/admin/login/")
 @require_GET
-def export_despesas_csv(request):
-    di = _parse_ymd(request.GET.get("data_inicio"))
-    df = _parse_ymd(request.GET.get("data_fim"))
-    categoria = request.GET.get("categoria")
+def export_receitas_csv(request):
+    return _export_transacoes_csv(request, TIPOS_RECEITA, "receitas")
 
-    qs = Transacao.objects.order_by("-data")
-    if di:
-        qs = qs.filter(data__gte=di)
-    if df:
-        qs = qs.filter(data__lte=df)
-    if categoria and categoria.lower() not in ("todas", "toda"):
-        qs = qs.filter(categoria=categoria)
 
-    resp = _export_csv_response("despesas")
-    w = csv.writer(resp, delimiter=";")
-    w.writerow(["id", "data", "categoria", "descricao", "valor"])
-    for d in qs:
-        w.writerow(
-            [
-                d.id,
-                d.data.strftime("%Y-%m-%d"),
-                getattr(d, "categoria", "") or "",
-                getattr(d, "descricao", "") or "",
-                d.valor,
-            ]
-        )
-    return resp
+@login_required(login_url="/admin/login/")
+@require_GET
+def export_despesas_csv(request):
+    return _export_transacoes_csv(request, TIPOS_DESPESA, "despesas")
 
 
 @login_required(login_url="/admin/login/")
@@ -292,12 +266,15 @@ def delete_insights_view(request):
 
 @login_required(login_url="/admin/login/")
 @require_GET
+@cache_por_empresa()
 def metrics_resumo_view(request):
     di, df = _normalize_period(request)
 
-    # período atual
-    r_now = _sum_decimal(Transacao.objects.filter(data__gte=di, data__lte=df))
-    d_now = _sum_decimal(Transacao.objects.filter(data__gte=di, data__lte=df))
+    empresa = getattr(request, "empresa", None) or None
+
+    # período atual (resumo diário; antes receitas e despesas somavam todos os tipos)
+    atual = totais_periodo(di, df, empresa=empresa)
+    r_now, d_now = atual["receita"], atual["despesa"]
     s_now = r_now - d_now
 
     # período anterior (mesmo nº de dias)
@@ -305,8 +282,8 @@ def metrics_resumo_view(request):
     prev_end = di - timedelta(days=1)
     prev_start = prev_end - timedelta(days=dias - 1)
 
-    r_prev = _sum_decimal(Transacao.objects.filter(data__gte=prev_start, data__lte=prev_end))
-    d_prev = _sum_decimal(Transacao.objects.filter(data__gte=prev_start, data__lte=prev_end))
+    anterior = totais_periodo(prev_start, prev_end, empresa=empresa)
+    r_prev, d_prev = anterior["receita"], anterior["despesa"]
     s_prev = r_prev - d_prev
 
     def pct(curr, prev):
@@ -353,22 +330,10 @@ def metrics_resumo_view(request):
 def metrics_serie_diaria_view(request):
     di, df = _normalize_period(request)
 
-    r_map = defaultdict(Decimal)
-    d_map = defaultdict(Decimal)
-
-    for row in (
-        Transacao.objects.filter(data__gte=di, data__lte=df)
-        .values("data")
-        .annotate(total=Sum("valor"))
-    ):
-        r_map[row["data"]] = row["total"] or Decimal("0")
-
-    for row in (
-        Transacao.objects.filter(data__gte=di, data__lte=df)
-        .values("data")
-        .annotate(total=Sum("valor"))
-    ):
-        d_map[row["data"]] = row["total"] or Decimal("0")
+    # resumo diário materializado (antes as duas séries somavam todos os tipos)
+    serie = serie_diaria(di, df, empresa=getattr(request, "empresa", None) or None)
+    r_map = {dia: v["receita"] for dia, v in serie.items()}
+    d_map = {dia: v["despesa"] for dia, v in serie.items()}
 
     labels, receitas, despesas = [], [], []
     for dia in _daterange(di, df):
@@ -392,15 +357,20 @@ def metrics_serie_diaria_view(request):
 
 @login_required(login_url="/admin/login/")
 @require_GET
+@cache_por_empresa()
 def metrics_despesas_por_categoria_view(request):
     di, df = _normalize_period(request)
 
     # Se seu modelo tiver "categoria", use values("categoria") e row.get("categoria")
     AGRUPADOR = "descricao"  # altere para "categoria" se existir esse campo
 
+    qs = Transacao.objects.filter(tipo="despesa", data__gte=di, data__lte=df)
+    empresa = getattr(request, "empresa", None) or None
+    if empresa is not None:
+        qs = qs.filter(empresa=empresa)
+
     qs = (
-        Transacao.objects.filter(tipo="despesa", data__gte=di, data__lte=df)
-        .values(AGRUPADOR)
+        qs.values(AGRUPADOR)
         .annotate(total=Sum("valor"))
         .order_by("-total")
     )
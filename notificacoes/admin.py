@@ -13,8 +13,10 @@ class NotificacaoAdmin(admin.ModelAdmin):
         "destino",
         "titulo",
         "status",
+        "tentativas",
         "criado_em",
         "enviado_em",
+        "proxima_tentativa_em",
     )
     list_filter = ("canal", "status", "criado_em")
     search_fields = ("destino", "titulo", "mensagem")
@@ -1,8 +1,12 @@
 import logging
+from collections import defaultdict
 from datetime import timedelta
-from django.utils import timezone
+
 from django.db.models import Sum
-from django.apps import apps
+from django.utils import timezone
+
+from financeiro.models import ResumoDiarioFinanceiro
+from financeiro.services_resumo import TIPOS_DESPESA, TIPOS_RECEITA
 
 
 logger = logging.getLogger(__name__)
@@ -35,38 +39,85 @@ def _get_periodo_semana():
 # ============================================================
 # ANÁLISE DA SEMANA — RESUMO PRINCIPAL
 # ============================================================
-Transacao = apps.get_model("financeiro", "Transacao")
-
-
-def analisar_financas_semana(user):
-    """
-    Retorna um dicionário com:
-      inicio, fim, receitas, despesas, saldo, margem
-    """
-    inicio, fim = _get_periodo_semana()
-
-    # FIX ✔: campo data é DateField → usar data__gte e data__lte
-    qs = Transacao.objects.filter(data__gte=inicio, data__lte=fim)
-
-    # Receitas = tipos: receita / R
-    receitas = float(qs.filter(tipo__in=["receita", "R"]).aggregate(soma=Sum("valor"))["soma"] or 0)
 
-    # Despesas = tipos: despesa / D
-    despesas = float(qs.filter(tipo__in=["despesa", "D"]).aggregate(soma=Sum("valor"))["soma"] or 0)
 
+def _metricas(inicio, fim, receitas, despesas, categorias):
     saldo = receitas - despesas
-    margem = (saldo / receitas * 100) if receitas > 0 else 0
-
     return {
         "inicio": str(inicio),
         "fim": str(fim),
         "receitas": receitas,
         "despesas": despesas,
         "saldo": saldo,
-        "margem": margem,
+        "margem": (saldo / receitas * 100) if receitas > 0 else 0,
+        # [(categoria, valor), ...] das despesas, da maior para a menor
+        "categorias_despesa": sorted(categorias.items(), key=lambda c: (-c[1], c[0])),
     }
 
 
+def metricas_semana_por_empresa(inicio=None, fim=None, empresa_ids=None):
+    """
+    Métricas da semana de todas as empresas numa query só (agrupada no
+    ResumoDiarioFinanceiro por empresa, tipo e categoria):
+      {empresa_id: {inicio, fim, receitas, despesas, saldo, margem, categorias_despesa}}
+    Empresa sem lançamento na semana não aparece: use .get(id) or metricas_vazias().
+    Não existe total "de todas as empresas": cada usuário só vê a própria.
+    """
+    if inicio is None or fim is None:
+        inicio, fim = _get_periodo_semana()
+
+    qs = ResumoDiarioFinanceiro.objects.filter(
+        dia__gte=inicio, dia__lte=fim, quantidade__gt=0, tipo__in=TIPOS_RECEITA + TIPOS_DESPESA
+    )
+    if empresa_ids is not None:
+        qs = qs.filter(empresa_id__in=empresa_ids)
+    linhas = qs.values("empresa_id", "tipo", "categoria").annotate(soma=Sum("total")).order_by()
+
+    receitas = defaultdict(float)
+    despesas = defaultdict(float)
+    categorias = defaultdict(lambda: defaultdict(float))
+    for r in linhas:
+        valor = float(r["soma"] or 0)
+        chave = r["empresa_id"]
+        if r["tipo"] in TIPOS_RECEITA:
+            receitas[chave] += valor
+        else:
+            despesas[chave] += valor
+            categorias[chave][r["categoria"] or "Sem categoria"] += valor
+
+    return {
+        chave: _metricas(inicio, fim, receitas[chave], despesas[chave], categorias[chave])
+        for chave in {*receitas, *despesas}
+    }
+
+
+def metricas_vazias(inicio=None, fim=None):
+    if inicio is None or fim is None:
+        inicio, fim = _get_periodo_semana()
+    return _metricas(inicio, fim, 0.0, 0.0, {})
+
+
+def empresa_id_do_usuario(user):
+    # id (não a Empresa) pelo perfil já carregado (select_related no job);
+    # a Empresa em si vem de core.services_empresa.empresa_do_usuario
+    perfil = getattr(user, "perfil", None)
+    return getattr(perfil, "empresa_id", None)
+
+
+def analisar_financas_semana(user):
+    """
+    Retorna um dicionário com:
+      inicio, fim, receitas, despesas, saldo, margem, categorias_despesa
+    Da empresa do usuário; sem empresa vinculada, tudo zerado. Para vários
+    usuários de uma vez use metricas_semana_por_empresa.
+    """
+    empresa_id = empresa_id_do_usuario(user)
+    if empresa_id is None:
+        return metricas_vazias()
+    metricas = metricas_semana_por_empresa(empresa_ids=[empresa_id]).get(empresa_id)
+    return metricas or metricas_vazias()
+
+
 # ============================================================
 # DETECTAR ALERTAS INTELIGENTES
 # ============================================================
@@ -105,11 +156,13 @@ def detectar_alertas_semana(metrics):
 # ============================================================
 
 
-def montar_mensagem_final(user):
+def montar_mensagem_final(user, metrics=None):
     """
     Monta o texto final que será enviado via Telegram.
+    `metrics`: já calculadas (metricas_semana_por_empresa); senão, calcula.
     """
-    metrics = analisar_financas_semana(user)
+    if metrics is None:
+        metrics = analisar_financas_semana(user)
     alertas = detectar_alertas_semana(metrics)
 
     receitas_brl = _format_brl(metrics["receitas"])
@@ -126,6 +179,14 @@ def montar_mensagem_final(user):
     msg.append(f"💵 *Saldo:* {saldo_brl}")
     msg.append(f"📈 *Margem:* {metrics['margem']:.1f}%\n")
 
+    # ---------------- MAIORES DESPESAS ----------------
+    maiores = metrics.get("categorias_despesa", [])[:3]
+    if maiores:
+        msg.append("🧾 *Maiores despesas:*")
+        for categoria, valor in maiores:
+            msg.append(f"• {categoria}: {_format_brl(valor)}")
+        msg.append("")
+
     # ---------------- ALERTAS ----------------
     if alertas:
         msg.append("⚠️ *Alertas Detectados:*")
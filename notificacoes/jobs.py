@@ -1,8 +1,14 @@
 import logging
 from django.contrib.auth import get_user_model
 
-from notificacoes.engine_notificacoes import montar_mensagem_final
-from notificacoes.services import notificar_dica_financeira_teste
+from notificacoes.engine_notificacoes import (
+    empresa_id_do_usuario,
+    metricas_semana_por_empresa,
+    metricas_vazias,
+    montar_mensagem_final,
+)
+from notificacoes.models import CanalNotificacaoUsuario, Notificacao
+from notificacoes.outbox import enfileirar_lote
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +22,9 @@ User = get_user_model()
 
 def executar_notificacoes_semanais(canal="telegram", dry_run=False, only_user_id=None):
     """
-    Dispara (ou simula) o envio de notificações semanais
-    para os usuários ativos do sistema.
+    Enfileira (ou simula) as notificações semanais dos usuários ativos.
+    Nada de HTTP aqui: quem entrega é o worker da fila
+    (notificacoes.outbox / manage.py processar_notificacoes).
 
     Parâmetros:
       - canal: "telegram" (padrão) ou "whatsapp" (quando estiver liberado)
@@ -31,24 +38,33 @@ def executar_notificacoes_semanais(canal="telegram", dry_run=False, only_user_id
     (simulação, sem enviar)
 
     >>> executar_notificacoes_semanais(canal="telegram", dry_run=False)
-    (envio real via Telegram)
+    (enfileira para envio via Telegram)
     """
+    users = User.objects.filter(is_active=True).select_related("perfil")
     if only_user_id is not None:
-        users = User.objects.filter(id=only_user_id, is_active=True)
+        users = users.filter(id=only_user_id)
         logger.info(f"[NOTIF_WEEKLY] Rodando APENAS para user_id={only_user_id}")
-    else:
-        users = User.objects.filter(is_active=True)
-        logger.info(f"[NOTIF_WEEKLY] Rodando para {users.count()} usuários ativos")
-
-    enviados = 0
+    users = list(users)
+    logger.info(f"[NOTIF_WEEKLY] Rodando para {len(users)} usuários ativos")
+
+    # métricas de todas as empresas e destinos de todos os usuários de uma vez:
+    # o número de queries não cresce com o número de usuários
+    metricas = metricas_semana_por_empresa()
+    destinos = dict(
+        CanalNotificacaoUsuario.objects.filter(
+            usuario__in=[u.id for u in users], canal=canal, ativo=True
+        ).values_list("usuario_id", "destino")
+    )
+
+    fila = []
     falhas = 0
 
     for user in users:
         try:
-            logger.info(f"[NOTIF_WEEKLY] Processando usuário: {user.username} (id={user.id})")
-
             # 1) Monta a mensagem bonitona usando o motor da semana
-            msg = montar_mensagem_final(user)
+            # sem empresa (ou semana sem lançamento): zerado, nunca número de outra empresa
+            metrics = metricas.get(empresa_id_do_usuario(user)) or metricas_vazias()
+            msg = montar_mensagem_final(user, metrics)
 
             if dry_run:
                 # Só loga o que faria
@@ -57,26 +73,28 @@ def executar_notificacoes_semanais(canal="telegram", dry_run=False, only_user_id
                 )
                 continue
 
-            # 2) Dispara via central de notificações (já existente no projeto)
-            notificar_dica_financeira_teste(
-                mensagem=msg,
-                canal=canal,
-                usuario=user,
-            )
-
-            enviados += 1
-            logger.info(
-                f"[NOTIF_WEEKLY] Notificação enviada com sucesso para {user.username} via {canal}"
+            # 2) Vai para a fila (o worker entrega)
+            fila.append(
+                Notificacao(
+                    usuario=user,
+                    canal=canal,
+                    destino=destinos.get(user.id, "TESTE_LOCAL"),
+                    titulo="Resumo da semana",
+                    mensagem=msg,
+                )
             )
-        except Exception as e:
+        except Exception:
             falhas += 1
             logger.exception(
-                f"[NOTIF_WEEKLY] Falha ao enviar notificação para {user.username} (id={user.id})"
+                f"[NOTIF_WEEKLY] Falha ao montar notificação para {user.username} (id={user.id})"
             )
 
+    if fila:
+        enfileirar_lote(fila)
+
     resumo = {
-        "usuarios_processados": users.count(),
-        "enviados": enviados,
+        "usuarios_processados": len(users),
+        "enfileirados": len(fila),
         "falhas": falhas,
         "canal": canal,
         "dry_run": dry_run,
@@ -105,9 +123,13 @@ No shell do Django:
 Simular (sem enviar nada), só pra ver logs:
   >>> executar_notificacoes_semanais(dry_run=True)
 
-Enviar pra todo mundo ativo via Telegram:
+Enfileirar pra todo mundo ativo via Telegram:
   >>> executar_notificacoes_semanais(canal="telegram", dry_run=False)
 
+Entregar o que está na fila (o scheduler faz isso a cada minuto):
+  >>> from notificacoes.outbox import processar_fila
+  >>> processar_fila()
+
 Enviar APENAS para um usuário específico (ex: id=1):
   >>> executar_notificacoes_semanais(only_user_id=1, canal="telegram", dry_run=False)
 """
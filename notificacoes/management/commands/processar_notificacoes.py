@@ -0,0 +1,44 @@
+# notificacoes/management/commands/processar_notificacoes.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from notificacoes.outbox import processar_fila
+
+
+class Command(BaseCommand):
+    help = (
+        "Entrega as notificações pendentes (fila de saída) em paralelo, com retentativa "
+        "e backoff exponencial. Com --loop fica rodando e consulta a fila periodicamente. "
+        "Fora do runserver o scheduler não sobe: em produção rode "
+        "`processar_notificacoes --loop 30` como processo próprio."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Threads de envio (padrão: settings.NOTIF_WORKERS).",
+        )
+        parser.add_argument(
+            "--lote", type=int, default=100, help="Notificações reservadas por vez."
+        )
+        parser.add_argument(
+            "--loop",
+            type=float,
+            default=None,
+            metavar="SEGUNDOS",
+            help="Não sai: espera SEGUNDOS entre uma drenagem e outra.",
+        )
+
+    def handle(self, *args, **opts):
+        while True:
+            r = processar_fila(workers=opts["workers"], lote=opts["lote"])
+            if r["lotes"] or opts["loop"] is None:
+                self.stdout.write(
+                    f"• enviados={r['enviados']} reagendados={r['reagendados']} erros={r['erros']}"
+                )
+            if opts["loop"] is None:
+                break
+            time.sleep(opts["loop"])
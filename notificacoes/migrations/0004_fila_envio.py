@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notificacoes', '0003_execucaoiaauto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificacao',
+            name='proxima_tentativa_em',
+            field=models.DateTimeField(blank=True, help_text='Quando o worker pode (re)tentar o envio. Vazio = imediatamente.', null=True),
+        ),
+        migrations.AddField(
+            model_name='notificacao',
+            name='tentativas',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notificacao',
+            index=models.Index(fields=['status', 'proxima_tentativa_em'], name='notif_fila_idx'),
+        ),
+    ]
@@ -56,8 +56,19 @@ class Notificacao(models.Model):
     criado_em = models.DateTimeField(auto_now_add=True)
     enviado_em = models.DateTimeField(null=True, blank=True)
 
+    # fila de saída (notificacoes/outbox.py): status "pendente" é a fila
+    tentativas = models.PositiveSmallIntegerField(default=0)
+    proxima_tentativa_em = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Quando o worker pode (re)tentar o envio. Vazio = imediatamente.",
+    )
+
     class Meta:
         ordering = ["-criado_em"]
+        indexes = [
+            models.Index(fields=["status", "proxima_tentativa_em"], name="notif_fila_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.canal}] {self.titulo or self.mensagem[:40]}"
@@ -0,0 +1,327 @@
+# notificacoes/outbox.py
+"""
+Fila de saída das notificações (outbox) sobre o próprio modelo Notificacao.
+
+- Quem quer notificar só grava: enfileirar(...) cria a linha com status
+  "pendente" (nenhuma chamada HTTP no request / no job semanal).
+- O worker (processar_fila / manage.py processar_notificacoes) reserva lotes
+  com SELECT ... FOR UPDATE SKIP LOCKED — vários workers não pegam a mesma
+  linha — e entrega em paralelo num pool de threads, cada thread com sua
+  requests.Session (conexões keep-alive reaproveitadas).
+- Falha temporária (rede, timeout, 429, 5xx) volta para a fila com backoff
+  exponencial; só vira "erro" quando acabam as tentativas. Falha permanente
+  (config ausente, 4xx) vira "erro" na hora.
+- Cada canal tem um limite de mensagens por segundo, compartilhado pelas threads.
+
+As chamadas HTTP rodam nas threads; o banco só é tocado na thread do worker.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import Notificacao
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = (5, 15)  # (conexão, leitura) em segundos
+RESERVA = timedelta(minutes=5)  # linha reservada some da fila por esse tempo
+
+
+def _cfg(nome, padrao):
+    return getattr(settings, nome, padrao)
+
+
+# ============================================================
+# 🔵 Enfileirar
+# ============================================================
+def enfileirar(canal, destino, mensagem, usuario=None, titulo="", reservada=False):
+    """
+    Grava a notificação como pendente; o worker entrega. Devolve a Notificacao.
+    reservada=True: já nasce fora da fila por RESERVA, para quem chamou tentar
+    o envio na hora (services.enviar_notificacao) sem um worker pegar junto.
+    """
+    agora = timezone.now()
+    return Notificacao.objects.create(
+        usuario=usuario,
+        canal=canal,
+        destino=destino or "",
+        titulo=titulo,
+        mensagem=mensagem,
+        status="pendente",
+        proxima_tentativa_em=agora + RESERVA if reservada else agora,
+    )
+
+
+def enfileirar_lote(notificacoes):
+    """
+    Vários Notificacao(...) ainda não salvos num INSERT só (job semanal).
+    """
+    agora = timezone.now()
+    for n in notificacoes:
+        n.status = "pendente"
+        n.proxima_tentativa_em = agora
+    return Notificacao.objects.bulk_create(notificacoes, batch_size=500)
+
+
+# ============================================================
+# 🔵 Entrega (roda nas threads do pool, sem tocar no banco)
+# ============================================================
+@dataclass
+class Resultado:
+    ok: bool
+    erro: str = ""
+    permanente: bool = False  # não adianta tentar de novo
+    esperar: float | None = None  # Retry-After pedido pela API (segundos)
+
+
+class FalhaEnvio(Exception):
+    def __init__(self, msg, permanente=False, esperar=None):
+        super().__init__(msg)
+        self.permanente = permanente
+        self.esperar = esperar
+
+
+class LimiteTaxa:
+    """
+    Balde de fichas por canal: no máximo `por_segundo` envios/s somando todas
+    as threads. acquire() dorme o necessário.
+    """
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0.0
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            agora = time.monotonic()
+            vez = max(agora, self._proximo)
+            self._proximo = vez + self.intervalo
+        if vez > agora:
+            time.sleep(vez - agora)
+
+
+_sessoes = threading.local()
+
+
+def _sessao():
+    """
+    requests.Session por thread (Session não é thread-safe), com pool de
+    conexões: o mesmo host é reaproveitado entre mensagens.
+    """
+    sessao = getattr(_sessoes, "sessao", None)
+    if sessao is None:
+        sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+        sessao.mount("https://", adaptador)
+        sessao.mount("http://", adaptador)
+        _sessoes.sessao = sessao
+    return sessao
+
+
+def _checar_resposta(resp, api):
+    if resp.ok:
+        return
+    esperar = None
+    try:
+        corpo = resp.json()
+        esperar = (corpo.get("parameters") or {}).get("retry_after")  # Telegram
+    except ValueError:
+        corpo = resp.text[:300]
+    if esperar is None and resp.headers.get("Retry-After", "").isdigit():
+        esperar = int(resp.headers["Retry-After"])
+    # 408 / 429 / 5xx são temporários; os demais 4xx não mudam com nova tentativa
+    temporario = resp.status_code in (408, 429) or resp.status_code >= 500
+    raise FalhaEnvio(
+        f"Erro do {api}: status={resp.status_code}, body={corpo}",
+        permanente=not temporario,
+        esperar=esperar,
+    )
+
+
+def _enviar_telegram(notif):
+    token = _cfg("TELEGRAM_BOT_TOKEN", "")
+    if not token:
+        raise FalhaEnvio("TELEGRAM_BOT_TOKEN não configurado no settings.", permanente=True)
+    if not notif.destino:
+        raise FalhaEnvio("Notificação sem destino para envio no Telegram.", permanente=True)
+
+    base = _cfg("TELEGRAM_API_URL", "https://api.telegram.org")
+    resp = _sessao().post(
+        f"{base}/bot{token}/sendMessage",
+        json={"chat_id": notif.destino, "text": notif.mensagem},
+        timeout=TIMEOUT,
+    )
+    _checar_resposta(resp, "Telegram")
+    try:
+        ok = resp.json().get("ok")
+    except ValueError:
+        ok = False
+    if not ok:
+        raise FalhaEnvio(f"Erro do Telegram API: body={resp.text[:300]}", permanente=True)
+
+
+def _enviar_whatsapp(notif):
+    token = _cfg("WHATSAPP_CLOUD_TOKEN", "")
+    phone_id = _cfg("WHATSAPP_PHONE_ID", "")
+    destino = notif.destino or _cfg("WHATSAPP_TO_DEFAULT", "")
+    if not token or not phone_id:
+        # mesmo comportamento de antes: sem credencial, só registra no log
+        logger.info("[FAKE WHATSAPP] Enviando para %s: %s", destino, notif.mensagem)
+        return
+
+    base = _cfg("WHATSAPP_API_URL", "https://graph.facebook.com/v21.0")
+    resp = _sessao().post(
+        f"{base}/{phone_id}/messages",
+        headers={"Authorization": f"Bearer {token}"},
+        json={
+            "messaging_product": "whatsapp",
+            "to": destino,
+            "type": "text",
+            "text": {"preview_url": False, "body": notif.mensagem},
+        },
+        timeout=TIMEOUT,
+    )
+    _checar_resposta(resp, "WhatsApp")
+
+
+ENVIADORES = {
+    "telegram": _enviar_telegram,
+    "whatsapp": _enviar_whatsapp,
+}
+
+
+def entregar(notif, limites=None) -> Resultado:
+    """
+    Uma tentativa de envio. Não grava nada: devolve o Resultado.
+    """
+    enviador = ENVIADORES.get(notif.canal)
+    if enviador is None:
+        return Resultado(False, f"Canal não suportado: {notif.canal}", permanente=True)
+    if limites and notif.canal in limites:
+        limites[notif.canal].acquire()
+    try:
+        enviador(notif)
+    except FalhaEnvio as exc:
+        return Resultado(False, str(exc), permanente=exc.permanente, esperar=exc.esperar)
+    except requests.RequestException as exc:
+        return Resultado(False, f"Falha na requisição: {exc}")
+    return Resultado(True)
+
+
+# ============================================================
+# 🔵 Estado na fila (thread do worker)
+# ============================================================
+def atraso_backoff(tentativas, esperar=None):
+    """
+    Segundos até a próxima tentativa: base * 2^(n-1), com teto e jitter de
+    ±10%; Retry-After da API tem prioridade se for maior.
+    """
+    base = _cfg("NOTIF_BACKOFF_BASE", 30)
+    atraso = min(_cfg("NOTIF_BACKOFF_MAX", 3600), base * 2 ** max(tentativas - 1, 0))
+    atraso *= random.uniform(0.9, 1.1)
+    return max(atraso, esperar or 0)
+
+
+def registrar_resultado(notif, resultado, agora=None):
+    """
+    Aplica o Resultado na linha: enviado, de volta à fila com backoff, ou erro.
+    """
+    agora = agora or timezone.now()
+    notif.tentativas += 1
+    notif.erro_msg = resultado.erro
+    if resultado.ok:
+        notif.status = "enviado"
+        notif.enviado_em = agora
+        notif.proxima_tentativa_em = None
+    elif resultado.permanente or notif.tentativas >= _cfg("NOTIF_MAX_TENTATIVAS", 5):
+        notif.status = "erro"
+        notif.proxima_tentativa_em = None
+    else:
+        notif.status = "pendente"
+        notif.proxima_tentativa_em = agora + timedelta(
+            seconds=atraso_backoff(notif.tentativas, resultado.esperar)
+        )
+    notif.save(
+        update_fields=["status", "erro_msg", "enviado_em", "tentativas", "proxima_tentativa_em"]
+    )
+    return notif
+
+
+def reservar_lote(tamanho=100, agora=None):
+    """
+    Pega até `tamanho` pendentes vencidas e empurra proxima_tentativa_em para
+    daqui a RESERVA: outro worker não as vê enquanto esta entrega roda, e se
+    o worker morrer elas voltam sozinhas depois disso.
+    """
+    agora = agora or timezone.now()
+    with transaction.atomic():
+        lote = list(
+            Notificacao.objects.select_for_update(skip_locked=True)
+            .filter(status="pendente")
+            .filter(Q(proxima_tentativa_em__isnull=True) | Q(proxima_tentativa_em__lte=agora))
+            .order_by("proxima_tentativa_em", "id")[:tamanho]
+        )
+        if lote:
+            Notificacao.objects.filter(pk__in=[n.pk for n in lote]).update(
+                proxima_tentativa_em=agora + RESERVA
+            )
+    return lote
+
+
+def processar_fila(workers=None, lote=100, max_lotes=None):
+    """
+    Drena a fila: reserva um lote, entrega em paralelo (pool de `workers`
+    threads) e grava cada resultado conforme termina. Para quando não há
+    pendente vencida (ou após `max_lotes`). Devolve o resumo.
+    """
+    workers = workers or _cfg("NOTIF_WORKERS", 8)
+    limites = {
+        canal: LimiteTaxa(por_seg)
+        for canal, por_seg in _cfg("NOTIF_LIMITE_POR_CANAL", {}).items()
+    }
+    resumo = {"enviados": 0, "reagendados": 0, "erros": 0}
+    lotes = 0
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notif") as pool:
+        while max_lotes is None or lotes < max_lotes:
+            pendentes = reservar_lote(lote)
+            if not pendentes:
+                break
+            lotes += 1
+            futuros = {pool.submit(entregar, n, limites): n for n in pendentes}
+            # na ordem em que terminam: uma entrega lenta não segura as já
+            # prontas até a reserva (RESERVA) vencer e outro worker repetir
+            for futuro in as_completed(futuros):
+                notif = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except Exception as exc:  # bug no enviador: não derruba o lote
+                    logger.exception("[NOTIF_FILA] Falha inesperada na notificação %s", notif.pk)
+                    resultado = Resultado(False, str(exc))
+                registrar_resultado(notif, resultado)
+                if notif.status == "enviado":
+                    resumo["enviados"] += 1
+                elif notif.status == "erro":
+                    resumo["erros"] += 1
+                    logger.warning("[NOTIF_FILA] %s falhou de vez: %s", notif.pk, notif.erro_msg)
+                else:
+                    resumo["reagendados"] += 1
+
+    resumo["lotes"] = lotes
+    if lotes:
+        logger.info("[NOTIF_FILA] %s", resumo)
+    return resumo
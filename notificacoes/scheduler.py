@@ -6,6 +6,7 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from django.utils import timezone
 
 from .jobs import executar_notificacoes_semanais
+from .outbox import processar_fila
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +15,15 @@ _scheduler = None
 
 def start():
     """
-    Inicia o scheduler em background e cadastra o job semanal.
+    Inicia o scheduler em background e cadastra o job semanal e o da fila.
     Esse cara será chamado no AppConfig.ready().
 
     Observação importante:
     - No runserver com autoreload, existem 2 processos.
       RUN_MAIN == "true" só no processo filho (o que realmente serve requests).
       Então iniciamos o scheduler apenas nele.
+    - Fora do runserver (gunicorn etc.) ele não sobe: a fila precisa de um
+      processo `manage.py processar_notificacoes --loop 30` rodando.
     """
     global _scheduler
 
@@ -51,6 +54,17 @@ def start():
         replace_existing=True,
     )
 
+    # drena a fila de saída (status "pendente"), inclusive as retentativas
+    scheduler.add_job(
+        processar_fila,
+        "interval",
+        minutes=1,
+        id="notificacoes_fila",
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+    )
+
     scheduler.start()
     _scheduler = scheduler
     logger.info("[NOTIF_SCHED] Scheduler de notificações semanais INICIADO.")
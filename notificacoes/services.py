@@ -1,85 +1,36 @@
 # notificacoes/services.py
 import logging
-import requests
-from django.conf import settings
-from django.utils import timezone
 
 from .models import Notificacao, CanalNotificacaoUsuario
+from .outbox import enfileirar, entregar, registrar_resultado
 
 logger = logging.getLogger(__name__)
 
 
 # ============================================================
-# 🔵 CAMADA CENTRAL — decide qual canal enviar (Telegram/WhatsApp)
+# 🔵 CAMADA CENTRAL — envio imediato (Telegram/WhatsApp)
 # ============================================================
 def enviar_notificacao(notificacao: Notificacao):
-    try:
-        if notificacao.canal == "telegram":
-            _enviar_telegram(notificacao)
-
-        elif notificacao.canal == "whatsapp":
-            _enviar_whatsapp(notificacao)
-
-        else:
-            raise ValueError(f"Canal não suportado: {notificacao.canal}")
-
-        notificacao.status = "enviado"
-        notificacao.erro_msg = ""
-        notificacao.enviado_em = timezone.now()
-
-    except Exception as exc:
-        logger.exception("Falha ao enviar notificação")
-        notificacao.status = "erro"
-        notificacao.erro_msg = str(exc)
-
-    notificacao.save(update_fields=["status", "erro_msg", "enviado_em"])
-    return notificacao
-
-
-# ============================================================
-# 🔵 TELEGRAM REAL — usando o token do settings
-# ============================================================
-def _enviar_telegram(notificacao: Notificacao):
-    token = getattr(settings, "TELEGRAM_BOT_TOKEN", "")
-    if not token:
-        raise ValueError("TELEGRAM_BOT_TOKEN não configurado no settings.")
-
-    if not notificacao.destino:
-        raise ValueError("Notificação sem destino para envio no Telegram.")
-
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
-
-    payload = {
-        "chat_id": notificacao.destino,
-        "text": notificacao.mensagem,
-    }
-
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-        data = resp.json()
-    except Exception as exc:
-        raise RuntimeError(f"Falha na requisição ao Telegram: {exc}")
-
-    if not resp.ok or not data.get("ok"):
-        raise RuntimeError(f"Erro do Telegram API: status={resp.status_code}, body={data}")
-
-
-# ============================================================
-# 🟢 WHATSAPP FAKE POR ENQUANTO
-# ============================================================
-def _enviar_whatsapp(notificacao: Notificacao):
-    print(f"[FAKE WHATSAPP] Enviando para {notificacao.destino}: {notificacao.mensagem}")
-    # Aqui depois entra:
-    # - PHONE_NUMBER_ID
-    # - WHATSAPP_TOKEN
-    # E a chamada real da API do WhatsApp Cloud API
-    return True
+    """
+    Uma tentativa de envio agora, na thread de quem chamou. Falha temporária
+    deixa a notificação pendente para o worker (outbox) tentar de novo.
+    O caminho normal é enfileirar() e deixar o worker entregar.
+    """
+    return registrar_resultado(notificacao, entregar(notificacao))
 
 
 # ============================================================
 # 🔵 Envio manual da dica — usado para testes
 # ============================================================
-def notificar_dica_financeira_teste(mensagem: str, canal: str = "telegram", usuario=None):
+def notificar_dica_financeira_teste(
+    mensagem: str, canal: str = "telegram", usuario=None, enviar_agora=False
+):
+    """
+    Enfileira a dica para o canal ativo do usuário (ou TESTE_LOCAL).
+    enviar_agora=True faz uma tentativa já, neste request: quem responde
+    "enviado" ao usuário não depende de haver worker drenando a fila.
+    Falha temporária fica pendente para o worker tentar de novo.
+    """
     canal = (canal or "").lower()
     destino = "TESTE_LOCAL"
 
@@ -101,16 +52,18 @@ def notificar_dica_financeira_teste(mensagem: str, canal: str = "telegram", usua
     else:
         print("[DEBUG NOTIF] nenhum canal ativo encontrado, usando TESTE_LOCAL")
 
-    notif = Notificacao.objects.create(
+    # sem enviar_agora, quem envia é o worker (manage.py processar_notificacoes)
+    notificacao = enfileirar(
+        canal,
+        destino,
+        mensagem,
         usuario=usuario,
-        canal=canal,
-        destino=destino,
         titulo="Dica financeira da IA",
-        mensagem=mensagem,
+        reservada=enviar_agora,
     )
-
-    enviar_notificacao(notif)
-    return notif
+    if enviar_agora:
+        enviar_notificacao(notificacao)
+    return notificacao
 
 
 # ============================================================
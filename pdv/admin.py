@@ -1,6 +1,6 @@
 from django.contrib import admin
 from .models import Venda, VendaItem
-from .models import OverrideLoteVencido
+from .models import ChaveIdempotencia, OverrideLoteVencido
 
 
 class VendaItemInline(admin.TabularInline):
@@ -74,4 +74,13 @@ class OverrideLoteVencidoAdmin(admin.ModelAdmin):
     list_display = ("id", "empresa", "tipo", "usuario", "motivo", "criado_em")
     list_filter = ("empresa", "tipo", "criado_em")
     search_fields = ("motivo", "usuario__username", "usuario__email", "produto__nome", "lote__codigo")
-    ordering = ("-criado_em",)
\ No newline at end of file
+    ordering = ("-criado_em",)
+
+
+@admin.register(ChaveIdempotencia)
+class ChaveIdempotenciaAdmin(admin.ModelAdmin):
+    list_display = ("id", "empresa", "operador", "chave", "status_http", "venda", "criado_em")
+    list_filter = ("empresa", "criado_em")
+    search_fields = ("chave", "operador__username", "venda__id")
+    ordering = ("-criado_em",)
+    readonly_fields = [f.name for f in ChaveIdempotencia._meta.fields]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pdv', '0006_overridelotevencido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venda',
+            index=models.Index(fields=['empresa', 'criado_em'], name='pdv_venda_emp_criado'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0005_empresa_politica_lote_vencido'),
+        ('pdv', '0007_venda_pdv_venda_emp_criado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chave', models.CharField(max_length=100)),
+                ('hash_corpo', models.CharField(max_length=64)),
+                ('status_http', models.PositiveSmallIntegerField()),
+                ('resposta', models.JSONField()),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdv_chaves_idempotencia', to='core.empresa')),
+                ('operador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdv_chaves_idempotencia', to=settings.AUTH_USER_MODEL)),
+                ('venda', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chaves_idempotencia', to='pdv.venda')),
+            ],
+            options={
+                'verbose_name': 'Chave de idempotência',
+                'verbose_name_plural': 'Chaves de idempotência',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='chaveidempotencia',
+            constraint=models.UniqueConstraint(fields=('empresa', 'operador', 'chave'), name='uniq_pdv_idem_emp_op_chave'),
+        ),
+    ]
@@ -39,6 +39,11 @@ class Venda(models.Model):
     status = models.CharField(max_length=20, default="concluida")  # futuro: cancelada, estornada
     justificativa_lote = models.CharField(max_length=255, blank=True, default="")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["empresa", "criado_em"], name="pdv_venda_emp_criado"),
+        ]
+
     def __str__(self):
         return f"Venda #{self.id} - {self.total} - {self.criado_em:%d/%m %H:%M}"
 
@@ -146,3 +151,51 @@ class OverrideLoteVencido(models.Model):
 
     def __str__(self):
         return f"Override #{self.id} ({self.tipo}) - {self.criado_em:%d/%m %H:%M}"
+
+
+class ChaveIdempotencia(models.Model):
+    """
+    Resposta da primeira chamada bem-sucedida com um Idempotency-Key
+    (pdv/services_idempotencia.py). Reenvio com a mesma chave devolve esta
+    resposta, sem refazer a venda.
+    """
+
+    empresa = models.ForeignKey(
+        Empresa,
+        on_delete=models.CASCADE,
+        related_name="pdv_chaves_idempotencia",
+    )
+
+    operador = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="pdv_chaves_idempotencia",
+    )
+
+    chave = models.CharField(max_length=100)
+    # sha256 do corpo: mesma chave, outro carrinho = erro
+    hash_corpo = models.CharField(max_length=64)
+    status_http = models.PositiveSmallIntegerField()
+    resposta = models.JSONField()
+
+    venda = models.ForeignKey(
+        "pdv.Venda",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="chaves_idempotencia",
+    )
+
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Chave de idempotência"
+        verbose_name_plural = "Chaves de idempotência"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["empresa", "operador", "chave"], name="uniq_pdv_idem_emp_op_chave"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.chave} ({self.operador_id}) -> {self.status_http}"
@@ -0,0 +1,103 @@
+# pdv/services_idempotencia.py
+"""
+Idempotency-Key nas APIs do PDV: o front pode reenviar o POST (timeout,
+Wi-Fi da loja caindo) sem criar outra venda.
+
+- Chave já gravada (por empresa + operador): devolve a resposta guardada,
+  numa SELECT sem lock — não trava produto nem roda FIFO de novo.
+- Chave nova: roda a view numa transação com advisory lock da chave, de modo
+  que duas tentativas simultâneas não vendem duas vezes (a segunda espera a
+  primeira e devolve a resposta dela). Só resposta 2xx é gravada: erro de
+  negócio (estoque, lote vencido) pode ser tentado de novo com a mesma chave.
+- Mesma chave com outro corpo: 422.
+
+Sem o header, a view roda como antes.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.db import connection, transaction
+from django.http import JsonResponse
+
+from .models import ChaveIdempotencia
+
+HEADER = "Idempotency-Key"
+TAMANHO_MAXIMO = ChaveIdempotencia._meta.get_field("chave").max_length
+
+
+def _travar_chave(empresa_id, operador_id, chave):
+    # forma de uma chave bigint: não colide com os locks (int4, int4) da agenda
+    digest = hashlib.sha256(f"pdv:{empresa_id}:{operador_id}:{chave}".encode()).digest()
+    with connection.cursor() as cursor:
+        trava = int.from_bytes(digest[:8], "big", signed=True)
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [trava])
+
+
+def _resposta_gravada(filtros, hash_corpo):
+    """
+    JsonResponse da chave já usada, ou None se ela ainda não existe.
+    """
+    gravada = (
+        ChaveIdempotencia.objects.filter(**filtros)
+        .values("hash_corpo", "status_http", "resposta")
+        .first()
+    )
+    if gravada is None:
+        return None
+    if gravada["hash_corpo"] != hash_corpo:
+        return JsonResponse(
+            {"ok": False, "erro": f"{HEADER} já usada com outro conteúdo. Gere uma chave nova."},
+            status=422,
+        )
+    resposta = JsonResponse(gravada["resposta"], status=gravada["status_http"])
+    resposta["Idempotent-Replayed"] = "true"
+    return resposta
+
+
+def idempotente(view_func):
+    """
+    Decorator para views POST que respondem JsonResponse e usam request.empresa.
+    Fica por dentro do @login_required (precisa do usuário).
+    """
+
+    @wraps(view_func)
+    def _wrapped(request, *args, **kwargs):
+        chave = (request.headers.get(HEADER) or "").strip()
+        empresa = getattr(request, "empresa", None) or None
+        if not chave or empresa is None:
+            return view_func(request, *args, **kwargs)
+        if len(chave) > TAMANHO_MAXIMO:
+            return JsonResponse(
+                {"ok": False, "erro": f"{HEADER} maior que {TAMANHO_MAXIMO} caracteres."},
+                status=400,
+            )
+
+        filtros = {"empresa_id": empresa.pk, "operador_id": request.user.pk, "chave": chave}
+        hash_corpo = hashlib.sha256(request.body).hexdigest()
+
+        # reenvio de venda já concluída: uma SELECT e pronto
+        gravada = _resposta_gravada(filtros, hash_corpo)
+        if gravada is not None:
+            return gravada
+
+        with transaction.atomic():
+            _travar_chave(empresa.pk, request.user.pk, chave)
+            # outra tentativa com a mesma chave pode ter terminado enquanto esperávamos o lock
+            gravada = _resposta_gravada(filtros, hash_corpo)
+            if gravada is not None:
+                return gravada
+
+            resposta = view_func(request, *args, **kwargs)
+            if 200 <= resposta.status_code < 300:
+                dados = json.loads(resposta.content)
+                ChaveIdempotencia.objects.create(
+                    **filtros,
+                    hash_corpo=hash_corpo,
+                    status_http=resposta.status_code,
+                    resposta=dados,
+                    venda_id=dados.get("venda_id") if isinstance(dados, dict) else None,
+                )
+        return resposta
+
+    return _wrapped
@@ -247,6 +247,41 @@
   // ========= Finalizar (BACKEND REAL) =========
   let finalizando = false;
 
+  function novaChaveIdempotencia() {
+    if (window.crypto?.randomUUID) return window.crypto.randomUUID();
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+  }
+
+  // timeout / rede caiu / 5xx: tenta de novo com a mesma Idempotency-Key
+  async function postComRetentativa(url, corpo, chave, tentativas = 4, timeoutMs = 15000) {
+    let ultimoErro = null;
+    for (let i = 0; i < tentativas; i++) {
+      if (i > 0) await new Promise((r) => setTimeout(r, 500 * 2 ** (i - 1)));
+      const ctrl = new AbortController();
+      const timer = setTimeout(() => ctrl.abort(), timeoutMs);
+      try {
+        const res = await fetch(url, {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+            "X-Requested-With": "XMLHttpRequest",
+            "X-CSRFToken": getCsrfToken(),
+            "Idempotency-Key": chave,
+          },
+          credentials: "same-origin",
+          body: corpo,
+          signal: ctrl.signal,
+        });
+        if (res.status < 500 || i === tentativas - 1) return res;
+      } catch (err) {
+        ultimoErro = err;
+      } finally {
+        clearTimeout(timer);
+      }
+    }
+    throw ultimoErro || new Error("Sem resposta do servidor.");
+  }
+
   btnFinalizar.addEventListener("click", async () => {
     if (finalizando) return; // evita clique duplo
     const total = calcTotal();
@@ -370,21 +405,16 @@
     btnFinalizar.textContent = "FINALIZANDO...";
 
     try {
-      const res = await fetch("/pdv/api/finalizar/", {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          "X-Requested-With": "XMLHttpRequest",
-          "X-CSRFToken": getCsrfToken(),
-        },
-        credentials: "same-origin",
-        body: JSON.stringify({
-          itens,
-          forma_pagamento: "pix",
-          observacao: "",
-          justificativa_lote: justificativaLote || "",
-        }),
+      // mesma chave e mesmo corpo em todas as tentativas: o backend devolve a
+      // venda já registrada em vez de vender de novo
+      const chaveIdempotencia = novaChaveIdempotencia();
+      const corpo = JSON.stringify({
+        itens,
+        forma_pagamento: "pix",
+        observacao: "",
+        justificativa_lote: justificativaLote || "",
       });
+      const res = await postComRetentativa("/pdv/api/finalizar/", corpo, chaveIdempotencia);
 
       // lê JSON (se vier)
       let data = null;
@@ -3,26 +3,28 @@ from decimal import Decimal
 
 
 from django.apps import apps
-from core.models import Perfil
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.db.models import Sum, Case, When, F, DecimalField, Count,ExpressionWrapper
+from django.db.models import Sum, F, DecimalField, Count,ExpressionWrapper
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
 from django.views.decorators.http import require_POST
+from core import esquema
 from core.decorators import bloquear_demo
 
 from django.db.models.functions import Coalesce
 from functools import wraps
 
 from urllib3 import request
-from core.models import Perfil
 from .models import Venda, VendaItem
 import traceback
 
 from django.views.decorators.http import require_GET
 from pdv.models import OverrideLoteVencido 
+from estoque.services_fifo import planejar_fifo_carrinho, registrar_saidas_fifo
+from estoque.services_lotes import indice_validade
+from .services_idempotencia import idempotente
 
 
 def json_guard(view_func):
@@ -50,9 +52,9 @@ def json_guard(view_func):
 @login_required
 def pdv_home(request):
     # Empresa SEMPRE do perfil do usuário logado (safe)
-    perfil = Perfil.objects.filter(user=request.user).select_related("empresa").first()
+    empresa = request.empresa
 
-    if not perfil or not getattr(perfil, "empresa_id", None):
+    if not empresa:
         return render(
             request,
             "pdv/pdv.html",
@@ -65,15 +67,13 @@ def pdv_home(request):
             },
         )
 
-    empresa = perfil.empresa
-
     Produto = apps.get_model("estoque", "Produto")
     Venda = apps.get_model("pdv", "Venda")
 
     qs = Produto.objects.all()
 
     # filtra por empresa se existir
-    if any(f.name == "empresa" for f in Produto._meta.fields):
+    if esquema.tem_campo(Produto, "empresa"):
         qs = qs.filter(empresa=empresa)
 
     produtos = qs.order_by("nome")
@@ -111,113 +111,17 @@ def pdv_home(request):
 
 
 
-def _saldo_produto_atual(produto, empresa=None):
-    """
-    Saldo atual do produto somando movimentos (E - S).
-    Se MovimentoEstoque tiver empresa, filtra.
-    """
-    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
-
-    qs = MovimentoEstoque.objects.filter(produto=produto)
-    if empresa and any(f.name == "empresa" for f in MovimentoEstoque._meta.fields):
-        qs = qs.filter(empresa=empresa)
-
-    agg = qs.aggregate(
-        saldo=Sum(
-            Case(
-                When(tipo="E", then=F("quantidade")),
-                When(tipo="S", then=-F("quantidade")),
-                default=0,
-                output_field=DecimalField(),
-            )
-        )
-    )
-    return agg["saldo"] or Decimal("0")
-
-
-def _baixar_estoque_fifo(produto, qtd, empresa=None, observacao="", venda_id=None):
-    """
-    Dá baixa no estoque por FIFO usando lotes.
-    Cria movimentos tipo "S" em cada lote até completar a qtd.
-    - Filtra por empresa quando existir.
-    - Ordena por validade (NULL por último), criado_em, codigo.
-    """
-    LoteProduto = apps.get_model("estoque", "LoteProduto")
-    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
-
-    qtd = Decimal(str(qtd))
-    if qtd <= 0:
-        return
-
-    # Se o produto não controla estoque, não baixa nada
-    if not getattr(produto, "controla_estoque", False):
-        return
-
-    lotes = LoteProduto.objects.select_for_update().filter(produto=produto)
-
-    # Filtra lotes por empresa se o modelo tiver campo empresa
-    if empresa and any(f.name == "empresa" for f in LoteProduto._meta.fields):
-        lotes = lotes.filter(empresa=empresa)
-
-    # FIFO robusto: validade NULL vai pro final
-    lotes = lotes.annotate(
-        validade_null=Case(
-            When(validade__isnull=True, then=1),
-            default=0,
-        )
-    ).order_by("validade_null", "validade", "criado_em", "codigo")
-
-    restante = qtd
-
-    for lote in lotes:
-        saldo_lote = Decimal(str(getattr(lote, "saldo_atual", 0) or 0))
-        if saldo_lote <= 0:
-            continue
-
-        tirar = saldo_lote if saldo_lote < restante else restante
-        if tirar <= 0:
-            continue
-
-        obs = observacao or "Saída PDV"
-        if venda_id:
-            obs = f"{obs} (Venda #{venda_id})"
-
-        mov_kwargs = {
-            "produto": produto,
-            "tipo": "S",
-            "quantidade": tirar,
-            "lote": lote,
-            "observacao": obs,
-        }
-
-        # Empresa no movimento se existir
-        if empresa and any(f.name == "empresa" for f in MovimentoEstoque._meta.fields):
-            mov_kwargs["empresa"] = empresa
-
-        MovimentoEstoque.objects.create(**mov_kwargs)
-
-        restante -= tirar
-        if restante <= 0:
-            break
-
-    if restante > 0:
-        raise ValueError(
-            f"Estoque insuficiente em lotes para {getattr(produto,'nome',produto)} (faltou {restante})."
-        )
-
-
 @require_POST
 @login_required
 @bloquear_demo
 @json_guard
+@idempotente
 def api_finalizar_venda(request):
-    # empresa SEMPRE do perfil (safe)
-    perfil = Perfil.objects.filter(user=request.user).select_related("empresa").first()
-    if not perfil or not getattr(perfil, "empresa_id", None):
+    # empresa SEMPRE do perfil (safe; resolvida 1x por request, em cache)
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa vinculada."}, status=400)
 
-    empresa = perfil.empresa
-
     try:
         payload = json.loads(request.body.decode("utf-8")) if request.body else {}
     except json.JSONDecodeError:
@@ -255,7 +159,7 @@ def api_finalizar_venda(request):
     with transaction.atomic():
         # trava produtos
         qs = Produto.objects.select_for_update().filter(id__in=produto_ids)
-        if any(f.name == "empresa" for f in Produto._meta.fields):
+        if esquema.tem_campo(Produto, "empresa"):
             qs = qs.filter(empresa=empresa)
 
         prod_map = {p.id: p for p in qs}
@@ -264,30 +168,50 @@ def api_finalizar_venda(request):
         if faltando:
             return JsonResponse({"ok": False, "erro": f"Produtos não encontrados: {faltando}"}, status=404)
 
+        # 🧮 motor FIFO: 1 passada para o carrinho inteiro
+        # (saldo, plano por lote e lotes vencidos, com os lotes travados)
+        quantidades_estoque = {
+            pid: qtd
+            for pid, qtd in agrupado.items()
+            if getattr(prod_map[pid], "controla_estoque", False)
+        }
+        plano = planejar_fifo_carrinho(empresa, quantidades_estoque, travar=True)
+
         # valida saldo total (antes de FIFO)
-        for pid, qtd in agrupado.items():
+        for pid, qtd in quantidades_estoque.items():
             p = prod_map[pid]
-            if getattr(p, "controla_estoque", False):
-                saldo_atual = _saldo_produto_atual(p)  # se sua função já filtra por empresa ótimo
-                if Decimal(str(saldo_atual)) < Decimal(str(qtd)):
-                    return JsonResponse(
-                        {
-                            "ok": False,
-                            "erro": f"Estoque insuficiente para {getattr(p,'nome',p.id)}. Saldo: {saldo_atual}",
-                            "produto_id": pid,
-                            "max_qtd": int(Decimal(str(saldo_atual))),
-                        },
-                        status=400,
-                    )
+            saldo_atual = plano[pid]["saldo"]
+            if Decimal(str(saldo_atual)) < Decimal(str(qtd)):
+                return JsonResponse(
+                    {
+                        "ok": False,
+                        "erro": (
+                            f"Estoque insuficiente para {getattr(p, 'nome', p.id)}. "
+                            f"Saldo: {saldo_atual}"
+                        ),
+                        "produto_id": pid,
+                        "max_qtd": int(Decimal(str(saldo_atual))),
+                    },
+                    status=400,
+                )
+
+            if plano[pid]["faltando"] > 0:
+                return JsonResponse(
+                    {
+                        "ok": False,
+                        "erro": (
+                            f"Estoque insuficiente em lotes para {getattr(p,'nome',p.id)} "
+                            f"(faltou {plano[pid]['faltando']})."
+                        ),
+                        "produto_id": pid,
+                    },
+                    status=400,
+                )
 
         # 🔒 autoridade final: checagem de lote vencido (FIFO) NO BACKEND
         vencidos_detectados = []
-        for pid, qtd in agrupado.items():
-            p = prod_map[pid]
-            if getattr(p, "controla_estoque", False):
-                v = _checar_lote_vencido_fifo(empresa, p, qtd)
-                if v:
-                    vencidos_detectados.extend(v)
+        for pid in quantidades_estoque:
+            vencidos_detectados.extend(plano[pid]["vencidos"])
 
         if vencidos_detectados:
             if politica == "bloquear":
@@ -343,8 +267,27 @@ def api_finalizar_venda(request):
 
        
 
-        # cria itens + baixa FIFO
-        item_fields = {f.name for f in VendaItem._meta.fields}
+        # cria itens (1 bulk_create) + baixa FIFO (1 bulk_create)
+        # nomes dos campos do VendaItem vêm do mapa montado no ready() (core.esquema)
+        campo_venda = esquema.primeiro_campo(VendaItem, ("venda", "vendas"))
+        campo_produto = esquema.primeiro_campo(VendaItem, ("produto",))
+        campo_qtd = esquema.primeiro_campo(VendaItem, ("qtd", "quantidade"))
+        campo_preco = esquema.primeiro_campo(VendaItem, ("preco_unit", "preco_unitario", "preco"))
+
+        if not campo_venda:
+            return JsonResponse(
+                {"ok": False, "erro": "VendaItem sem FK para Venda (venda/vendas)."}, status=500
+            )
+        if not campo_produto:
+            return JsonResponse({"ok": False, "erro": "VendaItem sem campo produto."}, status=500)
+        if not campo_qtd:
+            return JsonResponse(
+                {"ok": False, "erro": "VendaItem sem campo qtd/quantidade."}, status=500
+            )
+        if not campo_preco:
+            return JsonResponse({"ok": False, "erro": "VendaItem sem campo de preço."}, status=500)
+
+        itens_venda = []
 
         for pid, qtd in agrupado.items():
             p = prod_map[pid]
@@ -361,51 +304,21 @@ def api_finalizar_venda(request):
 
             preco = Decimal(str(preco))
 
-            kwargs_item = {}
-
-            # FK da venda pode ser 'venda' ou 'vendas'
-            if "venda" in item_fields:
-                kwargs_item["venda"] = venda
-            elif "vendas" in item_fields:
-                kwargs_item["vendas"] = venda
-            else:
-                return JsonResponse({"ok": False, "erro": "VendaItem sem FK para Venda (venda/vendas)."}, status=500)
-
-            # produto
-            if "produto" in item_fields:
-                kwargs_item["produto"] = p
-            else:
-                return JsonResponse({"ok": False, "erro": "VendaItem sem campo produto."}, status=500)
-
-            # quantidade
-            if "qtd" in item_fields:
-                kwargs_item["qtd"] = int(qtd)
-            elif "quantidade" in item_fields:
-                kwargs_item["quantidade"] = int(qtd)
-            else:
-                return JsonResponse({"ok": False, "erro": "VendaItem sem campo qtd/quantidade."}, status=500)
-
-            # preço
-            if "preco_unit" in item_fields:
-                kwargs_item["preco_unit"] = preco
-            elif "preco_unitario" in item_fields:
-                kwargs_item["preco_unitario"] = preco
-            elif "preco" in item_fields:
-                kwargs_item["preco"] = preco
-            else:
-                return JsonResponse({"ok": False, "erro": "VendaItem sem campo de preço."}, status=500)
-
-            VendaItem.objects.create(**kwargs_item)
+            kwargs_item = {
+                campo_venda: venda,
+                campo_produto: p,
+                campo_qtd: int(qtd),
+                campo_preco: preco,
+            }
+
+            # venda ainda está "aberta": a blindagem do VendaItem.clean() não se aplica
+            itens_venda.append(VendaItem(**kwargs_item))
 
             total += preco * Decimal(str(qtd))
 
-            if getattr(p, "controla_estoque", False):
-                _baixar_estoque_fifo(
-                    produto=p,
-                    qtd=int(qtd),
-                    observacao="Saída PDV",
-                    venda_id=venda.id,
-                )
+        VendaItem.objects.bulk_create(itens_venda)
+
+        registrar_saidas_fifo(empresa, plano, observacao="Saída PDV", venda_id=venda.id)
 
         # fecha venda
         venda.total = total
@@ -438,14 +351,9 @@ def api_finalizar_venda(request):
         }
 
         # tenta vincular venda se existir campo
-        for fname in ("venda", "vendas"):
-            try:
-                f = Transacao._meta.get_field(fname)
-            except Exception:
-                continue
-            if getattr(f, "remote_field", None) and f.remote_field.model == venda.__class__:
-                trans_kwargs[fname] = venda
-                break
+        campo_venda_trans = esquema.fk_para(Transacao, venda.__class__, ("venda", "vendas"))
+        if campo_venda_trans:
+            trans_kwargs[campo_venda_trans] = venda
 
         Transacao.objects.create(**trans_kwargs)
 
@@ -453,64 +361,6 @@ def api_finalizar_venda(request):
 
 
 
-def _checar_lote_vencido_fifo(empresa, produto, qtd):
-    from decimal import Decimal
-    from django.db.models import Sum, Case, When, F, DecimalField
-    from django.utils import timezone
-    from django.apps import apps
-
-    LoteProduto = apps.get_model("estoque", "LoteProduto")
-    MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
-
-    hoje = timezone.localdate()
-    qtd = Decimal(str(qtd))
-    restante = qtd
-    vencidos = []
-
-    lotes = LoteProduto.objects.filter(produto=produto)
-    if any(f.name == "empresa" for f in LoteProduto._meta.fields):
-        lotes = lotes.filter(empresa=empresa)
-
-    lotes = lotes.order_by("validade", "criado_em", "codigo")
-
-    for lote in lotes:
-        movs = MovimentoEstoque.objects.filter(lote=lote)
-        if any(f.name == "empresa" for f in MovimentoEstoque._meta.fields):
-            movs = movs.filter(empresa=empresa)
-
-        saldo = movs.aggregate(
-            saldo=Sum(
-                Case(
-                    When(tipo="E", then=F("quantidade")),
-                    When(tipo="S", then=-F("quantidade")),
-                    default=0,
-                    output_field=DecimalField(),
-                )
-            )
-        )["saldo"] or Decimal("0")
-
-        if saldo <= 0:
-            continue
-
-        usar = saldo if saldo < restante else restante
-        restante -= usar
-
-        if lote.validade and lote.validade < hoje:
-            vencidos.append(
-                {
-                    "lote_id": lote.id,
-                    "lote": getattr(lote, "codigo", None) or str(lote),
-                    "validade": lote.validade.isoformat(),
-                    "qtd": float(usar),
-                }
-            )
-
-        if restante <= 0:
-            break
-
-    return vencidos
-
-
 @require_POST
 @login_required
 @bloquear_demo
@@ -518,15 +368,10 @@ def _checar_lote_vencido_fifo(empresa, produto, qtd):
 def api_pdv_check_lote_vencido(request):
 
     try:
-        perfil = (
-            Perfil.objects.filter(user=request.user)
-            .select_related("empresa")
-            .first()
-        )
-        if not perfil or not getattr(perfil, "empresa_id", None):
+        empresa = request.empresa
+        if not empresa:
             return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-        empresa = perfil.empresa
         politica = getattr(empresa, "politica_lote_vencido", None) or "justificar"
 
         produto_id = request.POST.get("produto_id")
@@ -542,11 +387,9 @@ def api_pdv_check_lote_vencido(request):
             return JsonResponse({"ok": False, "erro": "Dados inválidos."}, status=400)
 
         Produto = apps.get_model("estoque", "Produto")
-        LoteProduto = apps.get_model("estoque", "LoteProduto")
-        MovimentoEstoque = apps.get_model("estoque", "MovimentoEstoque")
 
         qs_prod = Produto.objects.filter(id=produto_id)
-        if any(f.name == "empresa" for f in Produto._meta.fields):
+        if esquema.tem_campo(Produto, "empresa"):
             qs_prod = qs_prod.filter(empresa=empresa)
 
         produto = qs_prod.first()
@@ -561,49 +404,14 @@ def api_pdv_check_lote_vencido(request):
                 "politica": politica,
             })
 
-        hoje = timezone.localdate()
-
-        lotes = LoteProduto.objects.filter(produto=produto)
-        if any(f.name == "empresa" for f in LoteProduto._meta.fields):
-            lotes = lotes.filter(empresa=empresa)
-
-        lotes = lotes.order_by("validade", "criado_em", "codigo")
-
-        restante = qtd
+        # índice de validade em cache: sem lote vencido do produto nem roda o FIFO
         vencidos = []
-
-        for lote in lotes:
-            movs = MovimentoEstoque.objects.filter(lote=lote)
-            if any(f.name == "empresa" for f in MovimentoEstoque._meta.fields):
-                movs = movs.filter(empresa=empresa)
-
-            saldo = movs.aggregate(
-                saldo=Sum(
-                    Case(
-                        When(tipo="E", then=F("quantidade")),
-                        When(tipo="S", then=-F("quantidade")),
-                        default=0,
-                        output_field=DecimalField(),
-                    )
-                )
-            )["saldo"] or Decimal("0")
-
-            if saldo <= 0:
-                continue
-
-            usar = saldo if saldo < restante else restante
-            restante -= usar
-
-            if lote.validade and lote.validade < hoje:
-                vencidos.append({
-                    "lote_id": lote.id,
-                    "lote": getattr(lote, "codigo", None) or str(lote),
-                    "validade": lote.validade.isoformat(),
-                    "qtd": float(usar),
-                })
-
-            if restante <= 0:
-                break
+        if any(
+            it["produto_id"] == produto.id and it["status"] == "vencido"
+            for it in indice_validade(empresa)
+        ):
+            # mesmo motor FIFO do finalizar (sem travar: é só consulta)
+            vencidos = planejar_fifo_carrinho(empresa, {produto.id: qtd})[produto.id]["vencidos"]
 
         if vencidos:
             if politica == "livre":
@@ -650,8 +458,7 @@ def api_pdv_check_lote_vencido(request):
 
 @login_required
 def vendas_com_lote_vencido(request):
-    perfil = request.user.perfil
-    empresa = perfil.empresa
+    empresa = request.empresa
 
     base_qs = (
             Venda.objects
@@ -720,11 +527,10 @@ def vendas_com_lote_vencido(request):
 @require_GET
 @login_required
 def overrides_resumo_api(request):
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    empresa = perfil.empresa
     hoje = timezone.localdate()
     inicio = hoje - timezone.timedelta(days=30)
 
@@ -839,11 +645,10 @@ def overrides_resumo_api(request):
 @require_GET
 @login_required
 def top_produtos_vendidos_api(request):
-    perfil = Perfil.objects.select_related("empresa").filter(user=request.user).first()
-    if not perfil or not perfil.empresa_id:
+    empresa = request.empresa
+    if not empresa:
         return JsonResponse({"ok": False, "erro": "Usuário sem empresa."}, status=400)
 
-    empresa = perfil.empresa
 
     # janela padrão: 30 dias (pode ajustar via querystring ?dias=30&top=10)
     try:
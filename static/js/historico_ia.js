@@ -52,6 +52,7 @@ function normalizeTipoIA(rawTipo) {
   let _limitAtual = PREVIEW_LIMIT;
 
   let _offsetAtual = 0;
+  let _cursorAtual = null; // next_cursor do backend (paginação keyset)
   let _hasMoreAtual = false;
   let refreshTimer = null;
 
@@ -335,7 +336,7 @@ function normalizeTipoIA(rawTipo) {
     return false;
   }
 
-  function buildQuery(limit, t, append, offset) {
+  function buildQuery(limit, t, append, offset, cursor) {
     const qs = new URLSearchParams();
     qs.set("limit", String(limit));
 
@@ -343,7 +344,8 @@ function normalizeTipoIA(rawTipo) {
     const tn = normalizeTipo(t);
     if (tn) qs.set("tipo", tn);
 
-    if (append) qs.set("offset", String(offset));
+    if (append && cursor) qs.set("cursor", cursor);
+    else if (append) qs.set("offset", String(offset));
     return `${FEED_URL}?${qs.toString()}`;
   }
 
@@ -414,7 +416,7 @@ function normalizeTipoIA(rawTipo) {
 
     if (t && shouldGateFilter(t)) return { items: [], hasMore: false, offset, count: null };
 
-    const finalUrl = buildQuery(limit, t, append, offset);
+    const finalUrl = buildQuery(limit, t, append, offset, opt.cursor || null);
 
     // ✅ cache anti refetch só vale para chamadas "sem append"
     if (!append && lastHistUrl === finalUrl) return { items: [], hasMore: _hasMoreAtual, offset, count: null };
@@ -448,7 +450,7 @@ function normalizeTipoIA(rawTipo) {
       } catch {}
     }
 
-    return { items, hasMore, offset, count: json?.count || null };
+    return { items, hasMore, offset, count: json?.count || null, nextCursor: json?.next_cursor || null };
   }
 
   // ===============================
@@ -488,6 +490,7 @@ function normalizeTipoIA(rawTipo) {
     }
 
     _hasMoreAtual = !!hasMore;
+    if (items && items.length) _cursorAtual = result.nextCursor || null;
 
     setAbaAtiva(window.__HistoricoIA?.filtro || "todas");
   }
@@ -536,6 +539,7 @@ function normalizeTipoIA(rawTipo) {
           result = await fetchHistorico(args.limit, args.tipo || "", {
             append: !!args.append,
             offset: _offsetAtual,
+            cursor: _cursorAtual,
           });
 
           updateStateAfterFetch(result, args);
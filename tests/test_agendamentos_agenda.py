@@ -0,0 +1,137 @@
+# tests/test_agendamentos_agenda.py
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from agendamentos.models import Agendamento
+from core.models import Empresa, Perfil
+from servicos.models import Servico
+
+User = get_user_model()
+
+
+class AgendaApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(nome="Pet Recepção")
+        self.outra = Empresa.objects.create(nome="Pet Vizinho")
+        self.banho = Servico.objects.create(
+            nome="Banho", preco=Decimal("50"), duracao=timedelta(minutes=40)
+        )
+        self.tosa = Servico.objects.create(
+            nome="Tosa", preco=Decimal("70.50"), duracao=timedelta(minutes=30)
+        )
+        self.segunda = date(2026, 10, 19)
+
+        user = User.objects.create_user(username="recepcao", password="123456")
+        Perfil.objects.filter(user=user).update(empresa=self.empresa)
+        self.client.login(username="recepcao", password="123456")
+        self.url = reverse("agendamentos:agenda")
+
+    def _agendar(self, dia, hora, servico=None, empresa=None, status="agendado"):
+        return Agendamento.objects.create(
+            empresa=empresa or self.empresa, nome="Tutor", pet_nome="Rex", email="t@x.com",
+            data=dia, hora=hora, servico=servico or self.banho, status=status,
+        )
+
+    def test_semana_numa_query_de_agendamentos(self):
+        for i in range(6):
+            self._agendar(
+                self.segunda + timedelta(days=i % 3), time(9 + i, 0), self.tosa if i % 2 else None
+            )
+        self._agendar(self.segunda, time(8, 0), empresa=self.outra)  # outra empresa não entra
+        self._agendar(self.segunda - timedelta(days=1), time(8, 0))  # domingo anterior, fora
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(self.url, {"data": "2026-10-22", "visao": "semana"})
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum('FROM "agendamentos_agendamento"' in s for s in sqls), 1)
+        self.assertFalse(any('FROM "servicos_servico"' in s for s in sqls))
+
+        dados = r.json()
+        self.assertEqual((dados["inicio"], dados["fim"]), ("2026-10-19", "2026-10-25"))
+        self.assertEqual(len(dados["dias"]), 7)
+        self.assertEqual([len(v) for v in dados["dias"].values()], [2, 2, 2, 0, 0, 0, 0])
+        primeiro = dados["dias"]["2026-10-19"][0]
+        campos = ("hora", "fim", "servico", "preco", "duracao_min", "pet_nome")
+        self.assertEqual(
+            {k: primeiro[k] for k in campos},
+            {
+                "hora": "09:00",
+                "fim": "09:40",
+                "servico": "Banho",
+                "preco": 50.0,
+                "duracao_min": 40,
+                "pet_nome": "Rex",
+            },
+        )
+        self.assertEqual(dados["dias"]["2026-10-20"][0]["preco"], 70.5)
+
+        self.assertEqual(self.client.get(self.url, {"visao": "mes"}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"data": "2026-02-30"}).status_code, 400)
+
+    def test_etag_responde_304_ate_a_agenda_mudar(self):
+        ag = self._agendar(self.segunda, time(10, 0))
+        r = self.client.get(self.url, {"data": self.segunda.isoformat()})
+        tag = r["ETag"]
+        self.assertIn("no-cache", r["Cache-Control"])
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(
+                self.url, {"data": self.segunda.isoformat()}, HTTP_IF_NONE_MATCH=tag
+            )
+        self.assertEqual(r.status_code, 304)
+        self.assertFalse(any("agendamentos_agendamento" in q["sql"] for q in ctx.captured_queries))
+
+        # outro dia/visão: outra ETag
+        r = self.client.get(self.url, {"data": self.segunda.isoformat(), "visao": "semana"})
+        self.assertNotEqual(r["ETag"], tag)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ag.status = "concluido"
+            ag.save()
+        r = self.client.get(self.url, {"data": self.segunda.isoformat()}, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.json()["dias"][self.segunda.isoformat()][0]["status"], "concluido")
+
+        # preço do serviço mudou: também invalida
+        tag = r["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banho.preco = Decimal("55")
+            self.banho.save()
+        r = self.client.get(self.url, {"data": self.segunda.isoformat()}, HTTP_IF_NONE_MATCH=tag)
+        self.assertEqual(r.json()["dias"][self.segunda.isoformat()][0]["preco"], 55.0)
+
+    def test_dashboard_hoje_da_empresa_do_usuario(self):
+        hoje = timezone.localdate()
+        self._agendar(hoje, time(15, 0))
+        self._agendar(hoje, time(9, 30), servico=self.tosa)
+        self._agendar(hoje, time(11, 0), empresa=self.outra)
+
+        r = self.client.get(reverse("agendamentos:dashboard_hoje"))
+        itens = r.json()["itens"]
+        self.assertEqual(
+            [(i["hora"], i["servico"]) for i in itens], [("09:30", "Tosa"), ("15:00", "Banho")]
+        )
+        r = self.client.get(reverse("agendamentos:dashboard_hoje"), HTTP_IF_NONE_MATCH=r["ETag"])
+        self.assertEqual(r.status_code, 304)
+
+        # usuário de outra empresa (ou sem empresa) não vê a agenda desta
+        sem_empresa = User.objects.create_user(username="avulso", password="123456")
+        self.client.force_login(sem_empresa)
+        r = self.client.get(reverse("agendamentos:dashboard_hoje"))
+        self.assertEqual(r.json()["itens"], [])
+
+    def test_dashboard_hoje_anonimo_vai_para_o_login(self):
+        self.client.logout()
+        r = self.client.get(reverse("agendamentos:dashboard_hoje"))
+        self.assertEqual(r.status_code, 302)
+        self.assertIn(settings.LOGIN_URL, r["Location"])
@@ -0,0 +1,110 @@
+# tests/test_agendamentos_contagem.py
+import json
+from io import StringIO
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from agendamentos.models import Agendamento, ContagemDiariaAgendamento
+from agendamentos.services_contagem import reconstruir_contagem
+from core.models import Empresa, Perfil
+from servicos.models import Servico
+
+User = get_user_model()
+
+
+class ContagemDiariaAgendamentoTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nome="Pet Contagem")
+        self.outra = Empresa.objects.create(nome="Pet Vizinho")
+        self.servico = Servico.objects.create(
+            nome="Banho", preco=Decimal("50"), duracao=timedelta(minutes=30)
+        )
+        self.dia = date(2026, 3, 10)
+
+    def _agendar(self, dia=None, status="agendado", empresa=None):
+        return Agendamento.objects.create(
+            empresa=empresa or self.empresa, nome="Tutor", email="t@x.com",
+            data=dia or self.dia, hora=time(9, 0), servico=self.servico, status=status,
+        )
+
+    def _linhas(self, empresa=None):
+        return {
+            r.dia: (r.agendados, r.concluidos, r.cancelados)
+            for r in ContagemDiariaAgendamento.objects.filter(empresa=empresa or self.empresa)
+        }
+
+    def _logar(self):
+        user = User.objects.create_user(username="recepcao", password="123456")
+        Perfil.objects.filter(user=user).update(empresa=self.empresa)
+        self.client.login(username="recepcao", password="123456")
+
+    def test_contagem_acompanha_as_mudancas_de_status(self):
+        a = self._agendar()
+        b = self._agendar()
+        c = self._agendar(dia=date(2026, 4, 2))
+        self.assertEqual(self._linhas(), {self.dia: (2, 0, 0), date(2026, 4, 2): (1, 0, 0)})
+
+        self.client.get(reverse("agendamentos:concluir_agendamento", args=[a.pk]))
+        self.client.get(reverse("agendamentos:cancelar_agendamento", args=[b.pk]))
+        self._logar()
+        self.client.post(
+            reverse("agendamentos:acao_agendamento", args=[c.pk]),
+            json.dumps({"acao": "cancelar"}), content_type="application/json",
+        )
+        self.assertEqual(self._linhas(), {self.dia: (0, 1, 1), date(2026, 4, 2): (0, 0, 1)})
+
+        # instância parcial (.only): o pre_save busca o status antigo
+        parcial = Agendamento.objects.only("id").get(pk=a.pk)
+        parcial.status = "agendado"
+        parcial.save(update_fields=["status"])
+        Agendamento.objects.get(pk=c.pk).delete()
+        self.assertEqual(self._linhas(), {self.dia: (1, 0, 1), date(2026, 4, 2): (0, 0, 0)})
+        self.assertEqual(reconstruir_contagem(empresa=self.empresa, corrigir=False), [])
+
+        # update em massa não dispara signal: o rebuild acha e corrige
+        Agendamento.objects.filter(empresa=self.empresa).update(status="concluido")
+        call_command(
+            "reconstruir_contagem_agendamentos", empresa=self.empresa.pk, stdout=StringIO()
+        )
+        self.assertEqual(self._linhas(), {self.dia: (0, 2, 0)})
+        self.assertEqual(reconstruir_contagem(corrigir=False), [])
+
+    def test_dashboard_le_da_contagem_numa_query(self):
+        self._agendar()
+        self._agendar(status="concluido")
+        self._agendar(dia=date(2026, 4, 2), status="cancelado")
+        self._agendar(dia=date(2026, 5, 20))  # fora do período
+        self._agendar(empresa=self.outra)  # outra empresa não entra
+        self._logar()
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(
+                reverse("agendamentos:dashboard_dados_ajax"),
+                {"data_inicio": "2026-03-01", "data_fim": "2026-04-30"},
+            )
+        self.assertEqual(
+            r.json(),
+            {
+                "contagem_status": [
+                    {"status": "agendado", "total": 1},
+                    {"status": "concluido", "total": 1},
+                    {"status": "cancelado", "total": 1},
+                ],
+                "evolucao_mensal": [{"mes": "2026-03", "total": 2}, {"mes": "2026-04", "total": 1}],
+            },
+        )
+        sqls = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(sum("agendamentos_contagemdiariaagendamento" in s for s in sqls), 1)
+        self.assertFalse(any('"agendamentos_agendamento"' in s for s in sqls))
+
+        r = self.client.get(reverse("agendamentos:listar_agendamentos"))
+        self.assertEqual(
+            r.context["contagem"], {"pendente": 0, "agendado": 2, "concluido": 1, "cancelado": 1}
+        )
@@ -0,0 +1,85 @@
+# tests/test_agendamentos_disponibilidade.py
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from agendamentos.models import Agendamento
+from agendamentos.services_disponibilidade import horarios_livres
+from core.models import Empresa
+from servicos.models import Servico
+
+
+class DisponibilidadeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(nome="Pet A")
+        self.outra = Empresa.objects.create(nome="Pet B")
+        self.banho = Servico.objects.create(
+            nome="Banho", preco=Decimal("50"), duracao=timedelta(minutes=40)
+        )
+        self.tosa = Servico.objects.create(
+            nome="Tosa", preco=Decimal("70"), duracao=timedelta(minutes=30)
+        )
+        self.dia = timezone.localdate() + timedelta(days=3)
+        self.agora = timezone.make_aware(datetime.combine(timezone.localdate(), time(7, 0)))
+
+    def _agendar(self, hora, servico=None, empresa=None, dia=None, status="agendado"):
+        return Agendamento.objects.create(
+            empresa=empresa or self.empresa, nome="Tutor", email="t@x.com",
+            data=dia or self.dia, hora=hora, servico=servico or self.banho, status=status,
+        )
+
+    def _livres(self, dias=1, servico=None):
+        return horarios_livres(
+            self.empresa.pk, servico or self.tosa, inicio=self.dia, dias=dias, agora=self.agora
+        )
+
+    def test_sobreposicao_pela_duracao(self):
+        self._agendar(time(10, 0))  # banho de 40 min: ocupa 10:00–10:40
+        self._agendar(time(10, 0), empresa=self.outra)  # outra empresa não conta
+        self._agendar(time(14, 0), status="cancelado")  # cancelado libera o horário
+
+        horas = self._livres()[self.dia]
+        for ocupado in ("09:45", "10:00", "10:15", "10:30"):
+            self.assertNotIn(time.fromisoformat(ocupado), horas)
+        for livre in ("09:30", "10:45", "14:00", "17:30"):
+            self.assertIn(time.fromisoformat(livre), horas)
+        self.assertNotIn(time(17, 45), horas)  # tosa de 30 min passaria do fechamento
+
+    def test_varios_dias_numa_query_e_cache_ate_mudar(self):
+        self._agendar(time(9, 0))
+        self._agendar(time(9, 0), dia=self.dia + timedelta(days=2))
+
+        with CaptureQueriesContext(connection) as ctx:
+            livres = self._livres(dias=7)
+        self.assertEqual(len(livres), 7)
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        with CaptureQueriesContext(connection) as ctx:
+            self._livres(dias=7)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._agendar(time(11, 0), servico=self.tosa)
+        self.assertNotIn(time(11, 0), self._livres()[self.dia])
+
+    def test_endpoint_publico(self):
+        self._agendar(time(8, 0))
+        url = reverse("agendamentos:horarios_livres")
+        r = self.client.get(
+            url,
+            {"empresa": self.empresa.pk, "servico": self.tosa.pk, "inicio": self.dia, "dias": 2},
+        )
+        dados = r.json()
+        self.assertEqual(dados["duracao_min"], 30)
+        self.assertEqual(
+            list(dados["dias"]), [self.dia.isoformat(), (self.dia + timedelta(days=1)).isoformat()]
+        )
+        self.assertEqual(dados["dias"][self.dia.isoformat()][0], "08:45")
+        self.assertEqual(self.client.get(url, {"servico": self.tosa.pk}).status_code, 400)
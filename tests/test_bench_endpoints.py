@@ -0,0 +1,118 @@
+# tests/test_bench_endpoints.py
+"""
+Benchmark dos endpoints quentes (pytest-benchmark) sobre a massa do core.bench.
+
+    pytest tests/test_bench_endpoints.py --benchmark-json=bench.json
+    pytest tests/test_bench_endpoints.py --benchmark-compare --benchmark-compare-fail=median:20%
+
+Volume pelo ambiente, ex.: BENCH_MOVIMENTOS=200000 (padrão pequeno para o CI).
+Cada teste guarda queries / p50 / p95 no extra_info do relatório e falha se o
+número de queries passar do teto (regressão tipo N+1).
+"""
+import json
+import os
+import statistics
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.bench import USUARIO, limpar, semear
+from estoque.models import SaldoProduto
+
+pytest.importorskip("pytest_benchmark")
+
+pytestmark = [pytest.mark.bench, pytest.mark.django_db]
+
+VOLUMES_CI = {
+    "empresas": 2,
+    "produtos": 40,
+    "lotes": 400,
+    "movimentos": 4_000,
+    "vendas": 1_000,
+    "transacoes": 4_000,
+    "agendamentos": 500,
+    "historico_ia": 300,
+}
+VOLUMES = {k: int(os.environ.get(f"BENCH_{k.upper()}", v)) for k, v in VOLUMES_CI.items()}
+RODADAS = int(os.environ.get("BENCH_RODADAS", 15))
+
+
+@pytest.fixture(scope="module")
+def massa(django_db_setup, django_db_blocker):
+    with django_db_blocker.unblock():
+        limpar()
+        info = semear(volumes=VOLUMES)
+        cache.clear()
+        yield info
+        limpar()
+        get_user_model().objects.filter(username=USUARIO).delete()
+
+
+@pytest.fixture
+def cliente(client, massa):
+    client.force_login(get_user_model().objects.get(username=USUARIO))
+    return client
+
+
+def _medir(benchmark, chamar, teto_queries):
+    with CaptureQueriesContext(connection) as ctx:
+        r = chamar()
+    assert r.status_code == 200, r.content[:300]
+    queries = len(ctx.captured_queries)  # antes do pedantic: cada request zera o log
+
+    benchmark.pedantic(chamar, rounds=RODADAS, iterations=1, warmup_rounds=1)
+
+    benchmark.extra_info["queries"] = queries
+    if benchmark.stats:  # None com --benchmark-disable
+        tempos = benchmark.stats.stats.data
+        p = statistics.quantiles(tempos, n=20, method="inclusive")
+        benchmark.extra_info["p50_ms"] = round(statistics.median(tempos) * 1000, 2)
+        benchmark.extra_info["p95_ms"] = round(p[18] * 1000, 2)
+
+    assert queries <= teto_queries, f"{queries} queries (teto {teto_queries})"
+
+
+def test_api_finalizar_venda(benchmark, cliente, massa):
+    produtos = list(
+        SaldoProduto.objects.filter(empresa_id=massa["empresas"][0])
+        .order_by("-saldo", "produto_id")
+        .values_list("produto_id", flat=True)[:3]
+    )
+    payload = json.dumps(
+        {
+            "itens": [{"produto_id": pid, "qtd": 1} for pid in produtos],
+            "forma_pagamento": "pix",
+            "justificativa_lote": "benchmark",
+        }
+    )
+    url = reverse("pdv:api_finalizar")
+
+    _medir(
+        benchmark,
+        lambda: cliente.post(url, data=payload, content_type="application/json"),
+        teto_queries=30,
+    )
+
+
+def test_dashboard_estoque_dados(benchmark, cliente):
+    url = reverse("estoque:dashboard_estoque_dados")
+    _medir(benchmark, lambda: cliente.get(url), teto_queries=15)
+
+
+def test_dados_grafico_filtrados(benchmark, cliente):
+    url = reverse("financeiro:dados_grafico_filtrados")
+    _medir(benchmark, lambda: cliente.get(url, {"inicio": "2000-01-01"}), teto_queries=8)
+
+
+def test_ia_historico_feed_v2(benchmark, cliente):
+    url = reverse("financeiro:ia_historico_feed_v2")
+    _medir(benchmark, lambda: cliente.get(url, {"limit": 20}), teto_queries=8)
+
+
+def test_api_lotes_criticos(benchmark, cliente):
+    url = reverse("estoque:api_ranking_critico")
+    _medir(benchmark, lambda: cliente.get(url), teto_queries=6)
@@ -0,0 +1,99 @@
+# tests/test_cache_dashboard.py
+import os
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.checks import cache_compartilhado
+from core.models import Empresa, Perfil
+from financeiro.models import Transacao
+
+User = get_user_model()
+
+URL_PARAMS = {"inicio": "2026-03-01", "fim": "2026-03-31"}
+
+
+class CacheDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(nome="Loja Cache")
+        self.outra = Empresa.objects.create(nome="Outra Loja")
+        for username, empresa in (("gerente", self.empresa), ("vizinho", self.outra)):
+            user = User.objects.create_user(username=username, password="123456")
+            Perfil.objects.filter(user=user).update(empresa=empresa)
+        self.client.login(username="gerente", password="123456")
+
+    def _lancar(self, empresa, valor):
+        with self.captureOnCommitCallbacks(execute=True):
+            Transacao.objects.create(
+                empresa=empresa, tipo="receita", categoria="Banho", descricao="Banho",
+                valor=Decimal(valor), data=date(2026, 3, 5),
+            )
+
+    def _get(self, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(
+                reverse("financeiro:dados_grafico_filtrados"), {**URL_PARAMS, **extra}
+            )
+        self.assertEqual(r.status_code, 200)
+        # sessão e usuário sempre vão ao banco; o resto é da view
+        da_view = [
+            q for q in ctx.captured_queries
+            if "django_session" not in q["sql"] and "auth_user" not in q["sql"]
+        ]
+        return sum(r.json()["receitas"]), len(da_view)
+
+    def test_recarregar_nao_roda_sql_e_escrita_invalida(self):
+        self._lancar(self.empresa, "40.00")
+
+        total, queries = self._get()
+        self.assertEqual(total, 40.0)
+        self.assertGreater(queries, 0)
+
+        # mesma consulta (com o cache-buster "_" do jQuery): 0 SQL
+        self.assertEqual(self._get(_="123"), (40.0, 0))
+
+        # lançamento de outra empresa não mexe no cache desta
+        self._lancar(self.outra, "999.00")
+        self.assertEqual(self._get(), (40.0, 0))
+
+        # lançamento da empresa sobe a versão: recalcula
+        self._lancar(self.empresa, "10.00")
+        total, queries = self._get()
+        self.assertEqual(total, 50.0)
+        self.assertGreater(queries, 0)
+
+
+DB_CACHE = {"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                        "LOCATION": "core_cache"}}
+
+
+class CacheCompartilhadoCheckTests(SimpleTestCase):
+    def _ids(self, workers="1"):
+        antes = os.environ.get("WEB_CONCURRENCY")
+        os.environ["WEB_CONCURRENCY"] = workers
+        try:
+            return [m.id for m in cache_compartilhado(None)]
+        finally:
+            if antes is None:
+                os.environ.pop("WEB_CONCURRENCY")
+            else:
+                os.environ["WEB_CONCURRENCY"] = antes
+
+    def test_locmem_com_varios_workers_e_erro(self):
+        self.assertEqual(self._ids("1"), [])
+        self.assertEqual(self._ids("4"), ["core.E001"])
+
+    @override_settings(ENV="prod")
+    def test_locmem_em_producao_avisa(self):
+        self.assertEqual(self._ids(), ["core.W001"])
+
+    @override_settings(ENV="prod", CACHES=DB_CACHE)
+    def test_cache_compartilhado_passa(self):
+        self.assertEqual(self._ids("4"), [])
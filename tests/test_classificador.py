@@ -0,0 +1,112 @@
+# tests/test_classificador.py
+import io
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from financeiro.models import Insight, RecomendacaoIA
+from financeiro.services.classificador import classificar_texto
+
+User = get_user_model()
+
+
+class ClassificarTextoTests(SimpleTestCase):
+    def test_palavras_e_prioridade(self):
+        self.assertEqual(classificar_texto("Saldo negativo em março"), "alerta")
+        self.assertEqual(classificar_texto("Lucro recorde, parabéns!"), "positiva")
+        # alerta vence positiva no mesmo texto
+        self.assertEqual(classificar_texto("Margem caiu, atenção ao lucro"), "alerta")
+        self.assertEqual(classificar_texto("Cenário estável"), "neutra")
+        self.assertEqual(classificar_texto(""), "neutra")
+        self.assertEqual(classificar_texto(None), "neutra")
+
+    def test_vocabulario_dos_classificadores_antigos(self):
+        # ia_utils (admin) e ia/services/classify.py: mesmas frases, mesmo tipo
+        from financeiro.services.ia_utils import _map_tipo
+
+        casos = {
+            "Cuidado com gasto excessivo": "alerta",
+            "Evite novas compras a prazo": "alerta",
+            "Reduza o estoque parado": "alerta",
+            "Inadimplência subindo entre clientes": "alerta",
+            "Estouro no orçamento de ração": "alerta",
+            "Baixa liquidez no fim do mês": "alerta",
+            "Bom desempenho no caixa": "positiva",
+            "O resultado melhorou": "positiva",
+            "Houve sobra no caixa": "positiva",
+            "Vendas acima da meta": "positiva",
+            "Lucro consistente": "positiva",
+            "Vale monitorar os custos fixos": "neutra",
+        }
+        for texto, tipo in casos.items():
+            with self.subTest(texto=texto):
+                self.assertEqual(classificar_texto(texto), tipo)
+                self.assertEqual(_map_tipo(texto), tipo)
+
+    def test_termos_casam_palavra_inteira(self):
+        # "ok" dentro de "facebook" não decide neutra antes da heurística de percentual
+        self.assertEqual(classificar_texto("Faturamento do facebook aumentou 12%"), "positiva")
+        self.assertEqual(classificar_texto("Está ok por enquanto"), "neutra")
+        self.assertEqual(classificar_texto("Veja o token e o look do site"), "neutra")
+        self.assertEqual(classificar_texto("Dois atrasos de fornecedor"), "alerta")  # plural
+        self.assertEqual(classificar_texto("Saldo   negativo"), "alerta")
+
+    def test_termo_solto_nao_decide_sozinho(self):
+        # "margem", "subiu", "bom" e "ok" sem qualificação não dizem o sentido
+        casos = {
+            "Margem apertada este mês": "neutra",
+            "Custo com ração subiu 30%": "alerta",
+            "Despesas com energia aumentaram": "alerta",
+            "Bom mês para o caixa": "neutra",
+            "Margem positiva no trimestre": "positiva",
+            "Margem boa nas vendas de banho": "positiva",
+            "Receita cresceu e despesa estável": "positiva",
+        }
+        for texto, tipo in casos.items():
+            with self.subTest(texto=texto):
+                self.assertEqual(classificar_texto(texto), tipo)
+
+    def test_heuristica_de_percentual(self):
+        self.assertEqual(classificar_texto("Receitas: redução de -8% no trimestre"), "alerta")
+        self.assertEqual(classificar_texto("Faturamento aumentou 12,5% no período"), "positiva")
+        self.assertEqual(classificar_texto("Custos com redução de -4% no mês"), "positiva")
+        self.assertEqual(classificar_texto("Variação de 2% no período"), "neutra")
+
+
+class TipoNormalizadoInsightTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="ana", password="123456")
+        self.client.login(username="ana", password="123456")
+
+    def test_save_grava_tipo_e_listagem_filtra_no_banco(self):
+        Insight.objects.create(title="a", text="Despesas estourou o orçamento", kind="financeiro")
+        Insight.objects.create(title="b", text="Excelente mês", kind="meta")
+        Insight.objects.create(title="c", text="Nada a dizer", kind="alerta")  # kind alerta manda
+
+        self.assertEqual(
+            sorted(Insight.objects.values_list("title", "tipo_normalizado")),
+            [("a", "alerta"), ("b", "positiva"), ("c", "alerta")],
+        )
+        dados = self.client.get(reverse("financeiro:listar_insights"), {"tipo": "alerta"}).json()
+        self.assertEqual(dados["count"], 2)
+        self.assertEqual({it["tipo"] for it in dados["items"]}, {"alerta"})
+
+    def test_comando_reclassifica_so_o_que_mudou(self):
+        rec = RecomendacaoIA.objects.create(usuario=self.user, texto="Lucro subiu", tipo="economia")
+        ok = RecomendacaoIA.objects.create(usuario=self.user, texto="Risco de caixa", tipo="meta")
+        # simula linha antiga / regra mudada: update() não passa pelo save()
+        RecomendacaoIA.objects.filter(pk=rec.pk).update(tipo_normalizado="neutra")
+
+        saida = io.StringIO()
+        call_command("classificar_textos_ia", verificar=True, stdout=saida)
+        self.assertIn("recomendacao: 1 linha(s) (positiva=1)", saida.getvalue())
+        rec.refresh_from_db()
+        self.assertEqual(rec.tipo_normalizado, "neutra")  # --verificar não grava
+
+        call_command("classificar_textos_ia", modelo=["recomendacao"], stdout=io.StringIO())
+        self.assertEqual(
+            dict(RecomendacaoIA.objects.values_list("pk", "tipo_normalizado")),
+            {rec.pk: "positiva", ok.pk: "alerta"},
+        )
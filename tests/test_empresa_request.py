@@ -0,0 +1,50 @@
+# tests/test_empresa_request.py
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Empresa, Perfil
+from core.services_empresa import empresa_do_usuario
+
+User = get_user_model()
+
+
+class EmpresaRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.create(nome="Loja A")
+        self.user = User.objects.create_user(username="caixa", password="123456")
+        Perfil.objects.filter(user=self.user).update(empresa=self.empresa)
+        self.client.login(username="caixa", password="123456")
+
+    def _queries_perfil(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        return [q["sql"] for q in ctx.captured_queries if "core_perfil" in q["sql"]]
+
+    def test_empresa_resolvida_uma_vez_e_invalidada_no_perfil(self):
+        url = reverse("estoque:dashboard_estoque_dados")
+        self.assertEqual(len(self._queries_perfil(url)), 1)
+        self.assertEqual(self._queries_perfil(url), [])  # já no cache
+
+        outra = Empresa.objects.create(nome="Loja B")
+        with self.captureOnCommitCallbacks(execute=True):
+            perfil = Perfil.objects.get(user=self.user)
+            perfil.empresa = outra
+            perfil.save()
+
+        self.assertEqual(len(self._queries_perfil(url)), 1)
+        self.assertEqual(empresa_do_usuario(self.user), outra)
+
+    def test_alterar_empresa_invalida_cache(self):
+        self.assertEqual(empresa_do_usuario(self.user).politica_lote_vencido, "justificar")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.empresa.politica_lote_vencido = "bloquear"
+            self.empresa.save()
+
+        self.assertEqual(empresa_do_usuario(self.user).politica_lote_vencido, "bloquear")
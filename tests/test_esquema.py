@@ -0,0 +1,28 @@
+# tests/test_esquema.py
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import esquema
+from financeiro.models import Transacao
+from pdv.models import Venda, VendaItem
+from vendas.models import ItemVenda
+
+
+class EsquemaTests(TestCase):
+    def test_mapa_resolve_campos_e_caminhos(self):
+        self.assertIn("pdv.vendaitem", esquema.CAMPOS)  # montado no ready()
+        self.assertEqual(esquema.primeiro_campo(VendaItem, ("venda", "vendas")), "vendas")
+        self.assertEqual(esquema.primeiro_campo(ItemVenda, ("qtd", "quantidade")), "quantidade")
+        self.assertTrue(esquema.caminho_valido(ItemVenda, "venda__empresa"))
+        self.assertFalse(esquema.caminho_valido(ItemVenda, "venda__criado_em"))
+        self.assertIsNone(esquema.fk_para(Transacao, Venda, ("venda", "vendas")))
+        self.assertEqual(esquema.tipo_interno(Transacao, "data"), "DateField")
+
+    def test_produto_lider_sem_consultas_de_sondagem(self):
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(reverse("financeiro:api_produto_lider_pdv"))
+        self.assertEqual(r.status_code, 200)
+        # só o ranking (antes: um .exists() por campo candidato)
+        self.assertFalse([q for q in ctx.captured_queries if "SELECT 1 AS" in q["sql"]])
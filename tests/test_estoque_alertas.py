@@ -0,0 +1,80 @@
+# tests/test_estoque_alertas.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import Empresa, Perfil
+from estoque.models import LoteProduto, MovimentoEstoque, Produto
+from estoque.services_lotes import gerar_textos_alerta_lotes, indice_validade
+from financeiro.ia_estoque_bridge import registrar_alertas_lote_no_historico
+
+
+class IndiceValidadeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empresa = Empresa.objects.order_by("id").first()
+        self.produto = Produto.objects.create(
+            empresa=self.empresa, nome="Vermífugo", tipo="PRODUTO", controla_estoque=True
+        )
+        hoje = timezone.localdate()
+        self.lotes = {}
+        for codigo, dias in (("V", -2), ("H", 0), ("S", 5), ("Q", 12), ("L", 40)):
+            lote = LoteProduto.objects.create(
+                produto=self.produto, codigo=codigo, validade=hoje + timedelta(days=dias)
+            )
+            MovimentoEstoque.objects.create(
+                empresa=self.empresa,
+                produto=self.produto,
+                lote=lote,
+                tipo="E",
+                quantidade=Decimal("4"),
+            )
+            self.lotes[codigo] = lote
+
+    def test_niveis_e_cache(self):
+        itens = indice_validade(self.empresa)
+        self.assertEqual(
+            [(it["codigo"], it["status"], it["nivel"]) for it in itens],
+            [
+                ("V", "vencido", "ACAO_IMEDIATA"),
+                ("H", "prestes_vencer", "ACAO_IMEDIATA"),
+                ("S", "prestes_vencer", "ALERTA_7_DIAS"),
+                ("Q", "prestes_vencer", "ALERTA_15_DIAS"),
+                ("L", "prestes_vencer", None),
+            ],
+        )
+
+        # dashboard / IA leem o mesmo índice, sem voltar ao banco
+        with self.assertNumQueries(0):
+            msgs = gerar_textos_alerta_lotes(dias_aviso=30, empresa=self.empresa)
+        self.assertEqual([m["lote_codigo"] for m in msgs], ["V", "H", "S", "Q"])
+
+    def test_movimento_invalida_indice(self):
+        self.assertEqual(len(indice_validade(self.empresa)), 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MovimentoEstoque.objects.create(
+                empresa=self.empresa,
+                produto=self.produto,
+                lote=self.lotes["V"],
+                tipo="S",
+                quantidade=Decimal("4"),
+            )
+
+        # lote vencido zerou: sai do índice
+        codigos = [it["codigo"] for it in indice_validade(self.empresa)]
+        self.assertEqual(codigos, ["H", "S", "Q", "L"])
+
+    def test_historico_usa_a_empresa_do_usuario(self):
+        user = get_user_model().objects.create_user(username="estoquista", password="123456")
+        Perfil.objects.filter(user=user).update(empresa=self.empresa)
+
+        criados, _ = registrar_alertas_lote_no_historico(usuario=user, dias_aviso=30)
+        self.assertEqual(criados, 4)
+        # mesmo texto para o mesmo usuário não duplica
+        de_novo = registrar_alertas_lote_no_historico(usuario=user, dias_aviso=30)
+        self.assertEqual(de_novo, (0, []))
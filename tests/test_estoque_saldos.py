@@ -0,0 +1,146 @@
+# tests/test_estoque_saldos.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Empresa
+from estoque.models import (
+    LoteProduto,
+    MovimentoEstoque,
+    MovimentoEstoqueArquivo,
+    Produto,
+    SaldoLote,
+    SaldoProduto,
+)
+from estoque.services_fifo import consumir_estoque_fifo
+from estoque.services_saldo import recalcular_saldos
+from estoque.services_snapshot import (
+    arquivar_movimentos,
+    gerar_snapshot,
+    inicio_apos,
+    serie_mensal_movimentos,
+    ultimo_dia_mes,
+)
+
+
+class SaldoProdutoTests(TestCase):
+    def setUp(self):
+        # empresa padrão criada pela migração estoque.0004
+        self.empresa = Empresa.objects.order_by("id").first()
+        self.produto = Produto.objects.create(
+            empresa=self.empresa, nome="Ração 10kg", tipo="PRODUTO", controla_estoque=True
+        )
+
+    def _mov(self, tipo, qtd, lote=None):
+        return MovimentoEstoque.objects.create(
+            empresa=self.empresa,
+            produto=self.produto,
+            tipo=tipo,
+            quantidade=Decimal(qtd),
+            lote=lote,
+        )
+
+    def _saldo(self):
+        return SaldoProduto.saldo_de(self.empresa.id, self.produto.id)
+
+    def test_movimentos_atualizam_saldo(self):
+        self._mov("E", "10")
+        saida = self._mov("S", "3")
+        self.assertEqual(self._saldo(), Decimal("7"))
+
+        saida.quantidade = Decimal("5")
+        saida.save()
+        self.assertEqual(self._saldo(), Decimal("5"))
+
+        saida.delete()
+        self.assertEqual(self._saldo(), Decimal("10"))
+
+    def test_saida_maior_que_saldo_bloqueia(self):
+        self._mov("E", "2")
+        with self.assertRaises(ValidationError):
+            self._mov("S", "3")
+        self.assertEqual(self._saldo(), Decimal("2"))
+
+    def test_recalcular_corrige_divergencia(self):
+        self._mov("E", "4")
+        SaldoProduto.objects.filter(produto=self.produto).update(saldo=Decimal("99"))
+
+        divergencias = recalcular_saldos(corrigir=False)
+        self.assertEqual(len(divergencias), 1)
+        self.assertEqual(self._saldo(), Decimal("99"))
+
+        recalcular_saldos()
+        self.assertEqual(self._saldo(), Decimal("4"))
+        self.assertEqual(recalcular_saldos(corrigir=False), [])
+
+    def test_saldo_por_lote_e_fifo_sem_n_mais_1(self):
+        lotes = [
+            LoteProduto.objects.create(produto=self.produto, codigo=f"L{i}") for i in range(5)
+        ]
+        for lote in lotes:
+            self._mov("E", "2", lote=lote)
+        self._mov("S", "1", lote=lotes[0])
+
+        self.assertEqual(SaldoLote.saldos_de([lotes[0].id])[lotes[0].id], Decimal("1"))
+        self.assertEqual(lotes[1].saldo_atual, Decimal("2"))
+
+        with CaptureQueriesContext(connection) as ctx:
+            plano = consumir_estoque_fifo(self.produto, 6)
+        self.assertEqual(plano["quantidade_atendida"], Decimal("6"))
+        # 1 query para todos os lotes (+ savepoint do atomic), independente da quantidade de lotes
+        self.assertLessEqual(len(ctx.captured_queries), 3)
+
+    def test_registrar_lote_valida_e_grava_em_bloco(self):
+        lote = LoteProduto.objects.create(produto=self.produto, codigo="NF-1")
+        linhas = [
+            MovimentoEstoque(produto=self.produto, lote=lote, tipo="E", quantidade=Decimal("1"))
+            for _ in range(50)
+        ]
+        linhas.append(MovimentoEstoque(produto=self.produto, tipo="S", quantidade=Decimal("20")))
+
+        with CaptureQueriesContext(connection) as ctx:
+            criados = MovimentoEstoque.objects.registrar_lote(linhas)
+        self.assertEqual(len(criados), 51)
+        self.assertLessEqual(len(ctx.captured_queries), 10)
+
+        self.assertEqual(self._saldo(), Decimal("30"))
+        self.assertEqual(lote.saldo_atual, Decimal("50"))
+
+        with self.assertRaises(ValidationError):
+            MovimentoEstoque.objects.registrar_lote(
+                [MovimentoEstoque(produto=self.produto, tipo="S", quantidade=Decimal("31"))]
+            )
+        self.assertEqual(self._saldo(), Decimal("30"))
+        self.assertEqual(recalcular_saldos(corrigir=False), [])
+
+    def test_snapshot_e_arquivo_mantem_saldo(self):
+        lote = LoteProduto.objects.create(produto=self.produto, codigo="S1")
+        antigos = [self._mov("E", "10", lote=lote), self._mov("S", "4", lote=lote)]
+
+        # joga os movimentos para o mês passado (data é auto_now_add)
+        hoje = timezone.localdate()
+        ano, mes = (hoje.year - 1, 12) if hoje.month == 1 else (hoje.year, hoje.month - 1)
+        saldo_em = ultimo_dia_mes(ano, mes)
+        MovimentoEstoque.objects.filter(pk__in=[m.pk for m in antigos]).update(
+            data=inicio_apos(saldo_em) - timedelta(days=2)
+        )
+        self._mov("E", "1", lote=lote)
+
+        self.assertEqual(gerar_snapshot(self.empresa, ano, mes), 1)
+        self.assertEqual(arquivar_movimentos(self.empresa, saldo_em), 2)
+        self.assertEqual(MovimentoEstoqueArquivo.objects.count(), 2)
+
+        # saldo materializado intacto e rebuild (snapshot + movimentos depois) bate
+        self.assertEqual(self._saldo(), Decimal("7"))
+        self.assertEqual(recalcular_saldos(corrigir=False), [])
+
+        serie = serie_mensal_movimentos(self.empresa)
+        self.assertEqual(
+            [(item["entradas"], item["saidas"]) for item in serie],
+            [(Decimal("10"), Decimal("4")), (Decimal("1"), 0)],
+        )
@@ -0,0 +1,107 @@
+# tests/test_exportacao_colunar.py
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core.exportacao_colunar import ler_marca
+from core.models import Empresa
+from financeiro.models import Transacao
+
+User = get_user_model()
+
+
+class ExportacaoColunarTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nome="Loja BI")
+        self.destino = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.destino, ignore_errors=True)
+
+    def _lancar(self, valor, dia):
+        return Transacao.objects.create(
+            empresa=self.empresa, tipo="receita", categoria="Banho", descricao="x",
+            valor=Decimal(valor), data=dia,
+        )
+
+    def _exportar(self, **opts):
+        call_command(
+            "exportar_colunar", self.destino, fonte=["transacoes"], stdout=io.StringIO(), **opts
+        )
+
+    def test_tipos_preservados_e_incremental(self):
+        self._lancar("10.50", date(2026, 1, 5))
+        self._exportar()
+
+        pasta = os.path.join(self.destino, "transacoes")
+        tabela = ds.dataset(pasta, format="parquet").to_table()
+        self.assertEqual(tabela.schema.field("valor").type, pa.decimal128(10, 2))
+        self.assertEqual(tabela.schema.field("data").type, pa.date32())
+        self.assertEqual(tabela.column("valor").to_pylist(), [Decimal("10.50")])
+
+        # segunda rodada: só a linha nova
+        self._exportar()  # nada novo: não cria arquivo
+        novo = self._lancar("3.00", date(2026, 2, 1))
+        self._exportar()
+        arquivos = sorted(f for f in os.listdir(pasta) if f.endswith(".parquet"))
+        self.assertEqual(len(arquivos), 2)
+        ultimo = pq.read_table(os.path.join(pasta, arquivos[-1]))
+        self.assertEqual(ultimo.column("id").to_pylist(), [novo.id])
+
+    def test_id_menor_que_commita_depois_nao_se_perde(self):
+        a = self._lancar("1.00", date(2026, 1, 5))
+        atrasada = self._lancar("2.00", date(2026, 1, 6))
+        c = self._lancar("3.00", date(2026, 1, 7))
+        # simula o checkout demorado: o id do meio ainda não está visível
+        dados_atrasada = {"id": atrasada.id, "valor": atrasada.valor, "data": atrasada.data}
+        Transacao.objects.filter(pk=atrasada.pk).delete()
+        self._exportar()
+
+        pasta = os.path.join(self.destino, "transacoes")
+        marca, acima = ler_marca(pasta)
+        self.assertLess(marca, atrasada.id)  # a marca para antes do buraco
+        self.assertIn(c.id, acima)
+
+        # commit atrasado: sai na próxima rodada, e c não sai de novo
+        Transacao.objects.create(
+            empresa=self.empresa, tipo="receita", categoria="Banho", descricao="x", **dados_atrasada
+        )
+        self._exportar()
+        tabela = ds.dataset(pasta, format="parquet").to_table()
+        self.assertEqual(sorted(tabela.column("id").to_pylist()), [a.id, atrasada.id, c.id])
+
+    def test_particionado_por_empresa_e_mes(self):
+        self._lancar("1.00", date(2026, 1, 5))
+        self._lancar("2.00", date(2026, 1, 9))
+        self._lancar("3.00", date(2026, 2, 1))
+        self._exportar(particionar=True)
+
+        base = os.path.join(self.destino, "transacoes", f"empresa={self.empresa.id}")
+        self.assertEqual(sorted(os.listdir(base)), ["mes=2026-01", "mes=2026-02"])
+        jan = ds.dataset(os.path.join(base, "mes=2026-01"), format="parquet").to_table()
+        self.assertEqual(jan.num_rows, 2)
+
+    def test_endpoint_staff_com_marca_dagua(self):
+        a = self._lancar("5.00", date(2026, 1, 5))
+        b = self._lancar("7.00", date(2026, 1, 6))
+        url = reverse("exportar_colunar", args=["transacoes"])
+
+        User.objects.create_user(username="comum", password="123456")
+        self.client.login(username="comum", password="123456")
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        User.objects.create_user(username="bi", password="123456", is_staff=True)
+        self.client.login(username="bi", password="123456")
+        r = self.client.get(url, {"desde": a.id})
+        self.assertEqual(r["X-Marca-Dagua"], str(b.id))
+        tabela = pq.read_table(io.BytesIO(b"".join(r.streaming_content)))
+        self.assertEqual(tabela.column("id").to_pylist(), [b.id])
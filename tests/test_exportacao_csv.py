@@ -0,0 +1,68 @@
+# tests/test_exportacao_csv.py
+import gzip
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from core.models import Empresa, Perfil
+from financeiro.models import RecomendacaoIA, Transacao
+
+User = get_user_model()
+
+
+def _conteudo(resp):
+    return b"".join(resp.streaming_content)
+
+
+class ExportacaoCsvTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nome="Loja Export")
+        outra = Empresa.objects.create(nome="Outra Loja")
+
+        self.user = User.objects.create_user(username="contador", password="123456")
+        Perfil.objects.filter(user=self.user).update(empresa=self.empresa)
+        self.client.login(username="contador", password="123456")
+
+        for empresa, tipo, valor, dia in [
+            (self.empresa, "receita", "100.00", date(2026, 1, 5)),
+            (self.empresa, "receita", "70.00", date(2025, 6, 1)),
+            (self.empresa, "despesa", "30.00", date(2026, 1, 6)),
+            (outra, "receita", "999.00", date(2026, 1, 5)),
+        ]:
+            Transacao.objects.create(
+                empresa=empresa, tipo=tipo, categoria="Banho", descricao="x",
+                valor=Decimal(valor), data=dia,
+            )
+
+    def test_receitas_em_streaming_filtradas_por_empresa_e_periodo(self):
+        r = self.client.get(
+            reverse("financeiro:export_receitas_csv"), {"data_inicio": "2026-01-01"}
+        )
+        self.assertTrue(r.streaming)
+        linhas = _conteudo(r).decode("utf-8").lstrip("\ufeff").splitlines()
+        self.assertEqual(linhas[0], "id;data;categoria;descricao;valor")
+        self.assertEqual(
+            [linha.split(";")[1:] for linha in linhas[1:]], [["2026-01-05", "Banho", "x", "100.00"]]
+        )
+
+    def test_gzip(self):
+        r = self.client.get(reverse("financeiro:export_despesas_csv"), {"gzip": "1"})
+        self.assertIn(".csv.gz", r["Content-Disposition"])
+        texto = gzip.decompress(_conteudo(r)).decode("utf-8")
+        self.assertEqual(texto.count("\n"), 2)  # cabeçalho + 1 despesa
+        self.assertIn("30.00", texto)
+
+    def test_historico_ia_por_tipo(self):
+        RecomendacaoIA.objects.create(
+            usuario=self.user, texto="Saldo negativo, atenção", tipo="alerta"
+        )
+        RecomendacaoIA.objects.create(usuario=self.user, texto="Reserve 10%", tipo="economia")
+
+        r = self.client.get(reverse("financeiro:ia_historico_export_csv_v2"), {"tipo": "alerta"})
+        linhas = _conteudo(r).decode("utf-8").splitlines()
+        self.assertEqual(linhas[0], "data,tipo,titulo,mensagem")
+        self.assertEqual(len(linhas), 2)
+        self.assertIn("alerta,Dica da IA", linhas[1])
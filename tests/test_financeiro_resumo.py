@@ -0,0 +1,92 @@
+# tests/test_financeiro_resumo.py
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import Empresa, Perfil
+from financeiro.models import ResumoDiarioFinanceiro, Transacao
+from financeiro.services_resumo import reconstruir_resumo
+
+User = get_user_model()
+
+
+class ResumoDiarioFinanceiroTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nome="Loja Resumo")
+        self.dia = date(2026, 3, 10)
+
+    def _lancar(self, tipo, valor, categoria="Ração", dia=None):
+        return Transacao.objects.create(
+            empresa=self.empresa,
+            tipo=tipo,
+            categoria=categoria,
+            descricao=f"{tipo} {valor}",
+            valor=Decimal(valor),
+            data=dia or self.dia,
+        )
+
+    def _linhas(self):
+        return {
+            (r.dia, r.tipo, r.categoria): (r.total, r.quantidade)
+            for r in ResumoDiarioFinanceiro.objects.filter(empresa=self.empresa, quantidade__gt=0)
+        }
+
+    def test_resumo_acompanha_save_update_delete(self):
+        a = self._lancar("despesa", "10.00")
+        self._lancar("despesa", "5.50")
+        b = self._lancar("receita", "100.00", categoria=None)
+        self.assertEqual(
+            self._linhas(),
+            {
+                (self.dia, "despesa", "Ração"): (Decimal("15.50"), 2),
+                (self.dia, "receita", ""): (Decimal("100.00"), 1),
+            },
+        )
+
+        # muda categoria e dia: sai de uma linha e entra em outra
+        a.categoria = "Banho"
+        a.data = date(2026, 3, 11)
+        a.save()
+        b.delete()
+
+        self.assertEqual(
+            self._linhas(),
+            {
+                (self.dia, "despesa", "Ração"): (Decimal("5.50"), 1),
+                (date(2026, 3, 11), "despesa", "Banho"): (Decimal("10.00"), 1),
+            },
+        )
+        self.assertEqual(reconstruir_resumo(empresa=self.empresa, corrigir=False), [])
+
+        # update em massa não dispara signal: o rebuild acha e corrige
+        Transacao.objects.filter(empresa=self.empresa).update(valor=Decimal("1.00"))
+        self.assertEqual(len(reconstruir_resumo(empresa=self.empresa)), 2)
+        self.assertEqual(reconstruir_resumo(empresa=self.empresa, corrigir=False), [])
+
+    def test_grafico_le_do_resumo(self):
+        self._lancar("receita", "80.00", categoria="Banho")
+        self._lancar("despesa", "30.00")
+        self._lancar("despesa", "20.00", dia=date(2026, 3, 12))
+
+        user = User.objects.create_user(username="gerente", password="123456")
+        Perfil.objects.filter(user=user).update(empresa=self.empresa)
+        self.client.login(username="gerente", password="123456")
+
+        with CaptureQueriesContext(connection) as ctx:
+            r = self.client.get(
+                reverse("financeiro:dados_grafico_filtrados"),
+                {"inicio": "2026-03-10", "fim": "2026-03-12"},
+            )
+        # o gráfico não varre Transacao
+        self.assertFalse([q for q in ctx.captured_queries if "financeiro_transacao" in q["sql"]])
+        dados = r.json()
+        self.assertEqual(dados["dias"], ["10/03", "11/03", "12/03"])
+        self.assertEqual(dados["receitas"], [80.0, 0.0, 0.0])
+        self.assertEqual(dados["despesas"], [30.0, 0.0, 20.0])
+        self.assertEqual(dados["categorias"], ["Ração"])
+        self.assertEqual(dados["valores"], [50.0])
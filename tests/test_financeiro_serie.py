@@ -0,0 +1,86 @@
+# tests/test_financeiro_serie.py
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Empresa
+from financeiro.ia_engine import analisar_serie_mensal, regressao_linear
+from financeiro.models import SerieMensalFinanceira, Transacao
+from financeiro.services_serie import serie_mensal
+
+
+class SerieMensalFinanceiraTests(TestCase):
+    def setUp(self):
+        self.empresa = Empresa.objects.create(nome="Loja Série")
+        self.hoje = timezone.localdate()
+        self.mes_passado = self.hoje.replace(day=1) - timedelta(days=1)
+
+    def _lancar(self, tipo, valor, dia):
+        return Transacao.objects.create(
+            empresa=self.empresa,
+            tipo=tipo,
+            categoria="Ração",
+            descricao=f"{tipo} {valor}",
+            valor=Decimal(valor),
+            data=dia,
+        )
+
+    def _serie(self):
+        return serie_mensal(self.mes_passado.replace(day=1), self.hoje, empresa=self.empresa)
+
+    def test_mes_encerrado_fecha_e_so_o_corrente_recalcula(self):
+        antiga = self._lancar("receita", "200.00", self.mes_passado)
+        self._lancar("despesa", "50.00", self.mes_passado)
+        self._lancar("receita", "10.00", self.hoje)
+
+        serie = self._serie()
+        self.assertEqual([p["saldo"] for p in serie], [150.0, 10.0])
+        fechados = list(SerieMensalFinanceira.objects.filter(empresa=self.empresa))
+        self.assertEqual(
+            [(p.mes, p.saldo) for p in fechados],
+            [(self.mes_passado.replace(day=1), Decimal("150.00"))],
+        )
+
+        # mês corrente muda: o ponto fechado não é tocado
+        self._lancar("despesa", "4.00", self.hoje)
+        with CaptureQueriesContext(connection) as ctx:
+            serie = self._serie()
+        self.assertEqual([p["saldo"] for p in serie], [150.0, 6.0])
+        self.assertEqual(len(ctx.captured_queries), 2)  # pontos fechados + soma do mês corrente
+
+        # lançamento retroativo reabre o mês
+        antiga.valor = Decimal("300.00")
+        antiga.save()
+        self.assertFalse(SerieMensalFinanceira.objects.filter(empresa=self.empresa).exists())
+        self.assertEqual([p["saldo"] for p in self._serie()], [250.0, 6.0])
+
+    def test_motor_usa_a_serie_e_a_tendencia(self):
+        self.assertEqual(regressao_linear([1.0, 2.0, 3.0]), (1.0, 1.0))
+        self.assertIsNone(regressao_linear([5.0]))
+
+        self._lancar("receita", "100.00", self.mes_passado)
+        self._lancar("receita", "40.00", self.hoje)
+        resultado = analisar_serie_mensal(self._serie())
+        self.assertTrue(resultado["ok"])
+        self.assertEqual(resultado["dados"]["tendencia_saldo"], -60.0)
+        self.assertEqual(resultado["dados"]["previsao_saldo"], -20.0)
+
+    def test_fechar_e_reabrir_pegam_a_mesma_trava(self):
+        antiga = self._lancar("receita", "80.00", self.mes_passado)
+
+        def travas(ctx):
+            return [q["sql"] for q in ctx.captured_queries if "pg_advisory_xact_lock" in q["sql"]]
+
+        with CaptureQueriesContext(connection) as fechando:
+            self._serie()
+        antiga.valor = Decimal("90.00")
+        with CaptureQueriesContext(connection) as reabrindo:
+            antiga.save()
+
+        self.assertEqual(len(travas(fechando)), 1)
+        self.assertEqual(set(travas(fechando)), set(travas(reabrindo)))
+        self.assertEqual([p["saldo"] for p in self._serie()], [90.0])
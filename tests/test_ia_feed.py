@@ -0,0 +1,74 @@
+# tests/test_ia_feed.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from financeiro.models import HistoricoIA, RecomendacaoIA
+
+User = get_user_model()
+
+
+class FeedHistoricoIATests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="dona", password="123456")
+        self.client.login(username="dona", password="123456")
+
+        base = timezone.now().replace(microsecond=0)
+        for i in range(7):
+            # mesmos instantes nas duas tabelas: o cursor precisa desempatar
+            criado = base - timedelta(minutes=i)
+            h = HistoricoIA.objects.create(usuario=self.user, texto=f"dica {i}", tipo="positiva")
+            r = RecomendacaoIA.objects.create(usuario=self.user, texto=f"rec {i}", tipo="alerta")
+            HistoricoIA.objects.filter(pk=h.pk).update(criado_em=criado)
+            RecomendacaoIA.objects.filter(pk=r.pk).update(criado_em=criado)
+        HistoricoIA.objects.create(
+            usuario=self.user, texto="estoque vencendo", tipo="neutra", origem="lote"
+        )
+
+    def _get(self, **params):
+        return self.client.get(reverse("financeiro:ia_historico_feed_v2"), params).json()
+
+    def test_tipo_normalizado_gravado_no_save(self):
+        self.assertEqual(
+            sorted(HistoricoIA.objects.values_list("tipo_normalizado", flat=True).distinct()),
+            ["alerta", "positiva"],  # origem=lote vira alerta
+        )
+        rec = RecomendacaoIA.objects.create(
+            usuario=self.user, texto="Saldo negativo no mês", tipo="economia"
+        )
+        self.assertEqual(rec.tipo_normalizado, "alerta")
+        rec.texto = "Excelente, parabéns"
+        rec.save(update_fields=["texto"])
+        rec.refresh_from_db()
+        self.assertEqual(rec.tipo_normalizado, "positiva")
+
+    def test_cursor_percorre_tudo_sem_repetir(self):
+        vistos, cursor = [], None
+        while True:
+            params = {"limit": 4}
+            if cursor:
+                params["cursor"] = cursor
+            dados = self._get(**params)
+            vistos += [(it["tipo"], it["texto"]) for it in dados["items"]]
+            cursor = dados["next_cursor"]
+            if not dados["has_more"]:
+                self.assertIsNone(cursor)
+                break
+        self.assertEqual(len(vistos), 15)
+        self.assertEqual(len(set(vistos)), 15)
+        self.assertEqual(vistos[0], ("alerta", "estoque vencendo"))
+
+    def test_filtro_e_contagem_no_banco(self):
+        with CaptureQueriesContext(connection) as ctx:
+            dados = self._get(tipo="alerta", limit=3)
+        self.assertEqual(dados["count"], {"positiva": 7, "alerta": 8, "neutra": 0, "total": 15})
+        self.assertEqual(dados["total_filtered"], 8)
+        self.assertEqual({it["tipo"] for it in dados["items"]}, {"alerta"})
+        feed = [q["sql"] for q in ctx.captured_queries if "financeiro_historicoia" in q["sql"]]
+        self.assertEqual(len(feed), 2)  # página (UNION) + contagem (UNION)
+        self.assertTrue(all("UNION ALL" in sql for sql in feed))
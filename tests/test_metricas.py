@@ -0,0 +1,65 @@
+# tests/test_metricas.py
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.metricas import ColetorSQL, forma_sql, registro
+from core.middleware import MetricasRequestMiddleware
+from core.models import Empresa
+
+User = get_user_model()
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="operador", password="123456")
+        self.staff = User.objects.create_user(username="gerente", password="123456", is_staff=True)
+        registro.limpar()
+
+    def test_request_vai_para_o_registro_e_metrics_so_staff(self):
+        self.client.login(username="operador", password="123456")
+        self.client.get("/")
+        dados = registro.copia()[("core:home", "GET")]
+        self.assertEqual(dados["requests"], 1)
+        self.assertGreater(dados["sql_queries"], 0)
+        self.assertGreater(dados["bytes"], 0)
+
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+        self.client.login(username="gerente", password="123456")
+        r = self.client.get("/metrics")
+        self.assertEqual(r.status_code, 200)
+        texto = r.content.decode()
+        self.assertIn('spaco_request_segundos_count{view="core:home",metodo="GET"} 1', texto)
+        self.assertIn("# TYPE spaco_sql_queries_total counter", texto)
+        # o próprio /metrics não entra na conta
+        self.assertNotIn('view="core:metricas"', texto)
+
+    @override_settings(METRICAS_LIMITE_REPETICAO=3)
+    def test_query_repetida_e_sinalizada(self):
+        self.assertEqual(
+            forma_sql("SELECT 1 FROM t WHERE id IN (%s, %s)"),
+            forma_sql("SELECT 1 FROM t WHERE id IN (%s,%s,%s)"),
+        )
+
+        coletor = ColetorSQL()
+        with connection.execute_wrapper(coletor):
+            for u in User.objects.all():
+                Empresa.objects.filter(pk=u.pk).exists()
+                Empresa.objects.filter(pk=u.pk).exists()
+        forma, vezes = coletor.mais_repetida()
+        self.assertEqual(vezes, 4)
+        self.assertIn("core_empresa", forma)
+
+        def view_n_mais_um(request):
+            for u in User.objects.all():
+                Empresa.objects.filter(pk=u.pk).exists()
+                Empresa.objects.filter(pk=u.pk).exists()
+            return HttpResponse("ok")
+
+        middleware = MetricasRequestMiddleware(view_n_mais_um)
+        with self.assertLogs("core.metricas", level="WARNING") as logs:
+            middleware(RequestFactory().get("/qualquer"))
+        self.assertIn("repetiu a mesma query 4x", logs.output[0])
+        self.assertEqual(registro.copia()[("desconhecida", "GET")]["repetidas"], 1)
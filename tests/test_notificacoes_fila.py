@@ -0,0 +1,135 @@
+# tests/test_notificacoes_fila.py
+import json
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from notificacoes.models import Notificacao
+from notificacoes.outbox import LimiteTaxa, enfileirar, processar_fila
+from notificacoes.services import notificar_dica_financeira_teste
+
+# o chat_id decide a resposta do Telegram falso
+RESPOSTAS = {
+    "quebrado": (500, {"ok": False, "description": "Internal"}),
+    "apressado": (429, {"ok": False, "parameters": {"retry_after": 120}}),
+    "bloqueado": (403, {"ok": False, "description": "Forbidden: bot was blocked"}),
+}
+
+
+class _TelegramFalso(BaseHTTPRequestHandler):
+    def do_POST(self):
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.recebidos.append(corpo["chat_id"])
+        if corpo["chat_id"] == "lento":
+            time.sleep(0.5)
+        status, resposta = RESPOSTAS.get(corpo["chat_id"], (200, {"ok": True, "result": {}}))
+        dados = json.dumps(resposta).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def log_message(self, *args):
+        pass
+
+
+class FilaNotificacoesTests(TestCase):
+    def setUp(self):
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _TelegramFalso)
+        self.servidor.recebidos = []
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+
+        cfg = override_settings(
+            TELEGRAM_BOT_TOKEN="token-teste",
+            TELEGRAM_API_URL=f"http://127.0.0.1:{self.servidor.server_port}",
+            NOTIF_MAX_TENTATIVAS=3,
+            NOTIF_BACKOFF_BASE=0,  # retentativa vence na hora: a mesma drenagem tenta de novo
+            NOTIF_LIMITE_POR_CANAL={},
+        )
+        cfg.enable()
+        self.addCleanup(cfg.disable)
+
+    def test_entrega_em_paralelo(self):
+        for i in range(12):
+            enfileirar("telegram", f"chat-{i}", f"msg {i}")
+
+        resumo = processar_fila(workers=4, lote=5)
+
+        self.assertEqual(resumo["enviados"], 12)
+        self.assertEqual(resumo["lotes"], 3)
+        self.assertEqual(sorted(self.servidor.recebidos), sorted(f"chat-{i}" for i in range(12)))
+        self.assertFalse(Notificacao.objects.exclude(status="enviado").exists())
+        self.assertFalse(Notificacao.objects.filter(enviado_em__isnull=True).exists())
+
+    def test_grava_na_ordem_em_que_termina(self):
+        lento = enfileirar("telegram", "lento", "oi")
+        rapido = enfileirar("telegram", "rapido", "oi")
+
+        processar_fila(workers=2)
+
+        lento.refresh_from_db()
+        rapido.refresh_from_db()
+        # a entrega lenta (submetida antes) não segura a gravação da rápida
+        self.assertLess(rapido.enviado_em, lento.enviado_em)
+
+    def test_dica_enviada_na_hora_sem_worker(self):
+        n = notificar_dica_financeira_teste("Dica", canal="telegram", enviar_agora=True)
+        self.assertEqual((n.status, n.tentativas), ("enviado", 1))
+        self.assertEqual(self.servidor.recebidos, ["TESTE_LOCAL"])
+
+        # enquanto o request tenta, o worker não pega a mesma linha
+        enfileirar("telegram", "chat-1", "oi", reservada=True)
+        self.assertEqual(processar_fila(workers=1)["lotes"], 0)
+
+    def test_falha_temporaria_reenvia_ate_esgotar(self):
+        n = enfileirar("telegram", "quebrado", "oi")
+
+        resumo = processar_fila(workers=2)
+
+        n.refresh_from_db()
+        self.assertEqual(self.servidor.recebidos, ["quebrado"] * 3)
+        self.assertEqual((n.status, n.tentativas), ("erro", 3))
+        self.assertIn("status=500", n.erro_msg)
+        self.assertEqual((resumo["reagendados"], resumo["erros"]), (2, 1))
+
+    @override_settings(NOTIF_BACKOFF_BASE=60)
+    def test_backoff_e_retry_after(self):
+        quebrado = enfileirar("telegram", "quebrado", "oi")
+        apressado = enfileirar("telegram", "apressado", "oi")
+        antes = timezone.now()
+
+        processar_fila(workers=2)
+        processar_fila(workers=2)  # nada venceu ainda: ninguém é tentado de novo
+
+        self.assertEqual(len(self.servidor.recebidos), 2)
+        quebrado.refresh_from_db()
+        apressado.refresh_from_db()
+        self.assertEqual((quebrado.status, quebrado.tentativas), ("pendente", 1))
+        self.assertGreater(quebrado.proxima_tentativa_em, antes + timedelta(seconds=50))
+        # 429 respeita o retry_after da API (120s) mesmo com backoff menor
+        self.assertGreaterEqual(apressado.proxima_tentativa_em, antes + timedelta(seconds=120))
+
+    def test_erro_permanente_nao_retenta(self):
+        n = enfileirar("telegram", "bloqueado", "oi")
+        processar_fila(workers=2)
+        n.refresh_from_db()
+        self.assertEqual((n.status, n.tentativas), ("erro", 1))
+        self.assertEqual(self.servidor.recebidos, ["bloqueado"])
+
+    def test_limite_por_canal(self):
+        limite = LimiteTaxa(20)
+        inicio = time.monotonic()
+        threads = [threading.Thread(target=limite.acquire) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 6 envios a 20/s: o último sai ~0,25s depois do primeiro
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.24)
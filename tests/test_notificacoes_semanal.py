@@ -0,0 +1,93 @@
+# tests/test_notificacoes_semanal.py
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Empresa, Perfil
+from financeiro.models import Transacao
+from notificacoes.engine_notificacoes import analisar_financas_semana, metricas_semana_por_empresa
+from notificacoes.jobs import executar_notificacoes_semanais
+from notificacoes.models import CanalNotificacaoUsuario, Notificacao
+
+User = get_user_model()
+
+
+class NotificacoesSemanaisTests(TestCase):
+    def setUp(self):
+        self.loja_a = Empresa.objects.create(nome="Loja A")
+        self.loja_b = Empresa.objects.create(nome="Loja B")
+        hoje = timezone.localdate()
+        for empresa, tipo, categoria, valor in [
+            (self.loja_a, "receita", "Banho", "1000.00"),
+            (self.loja_a, "despesa", "Ração", "300.00"),
+            (self.loja_a, "despesa", "Aluguel", "500.00"),
+            (self.loja_b, "receita", "Tosa", "100.00"),
+            (self.loja_b, "despesa", "Ração", "150.00"),
+        ]:
+            Transacao.objects.create(
+                empresa=empresa, tipo=tipo, categoria=categoria, descricao="x",
+                valor=Decimal(valor), data=hoje,
+            )
+
+    def _usuario(self, nome, empresa):
+        u = User.objects.create_user(username=nome, password="123456")
+        Perfil.objects.filter(user=u).update(empresa=empresa)
+        return User.objects.get(pk=u.pk)  # sem o perfil em cache do create_user
+
+    def test_metricas_de_todas_as_empresas_numa_query(self):
+        with CaptureQueriesContext(connection) as ctx:
+            metricas = metricas_semana_por_empresa()
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        a = metricas[self.loja_a.id]
+        self.assertEqual((a["receitas"], a["despesas"], a["saldo"]), (1000.0, 800.0, 200.0))
+        self.assertEqual(a["categorias_despesa"], [("Aluguel", 500.0), ("Ração", 300.0)])
+        self.assertEqual(metricas[self.loja_b.id]["saldo"], -50.0)
+        self.assertNotIn(None, metricas)  # não há total somando as empresas
+
+        bia = self._usuario("bia", self.loja_b)
+        self.assertEqual(analisar_financas_semana(bia)["saldo"], -50.0)
+
+    def test_job_semanal_em_queries_constantes(self):
+        def rodar():
+            with CaptureQueriesContext(connection) as ctx:
+                resumo = executar_notificacoes_semanais(canal="telegram")
+            return resumo, len(ctx.captured_queries)
+
+        dono = self._usuario("dono_a", self.loja_a)
+        CanalNotificacaoUsuario.objects.create(usuario=dono, canal="telegram", destino="chat-a")
+        self._usuario("dono_b", self.loja_b)
+        resumo, poucos = rodar()
+        self.assertEqual(resumo["enfileirados"], 2)
+
+        for i in range(6):
+            self._usuario(f"extra{i}", self.loja_b if i % 2 else self.loja_a)
+        Notificacao.objects.all().delete()
+        resumo, muitos = rodar()
+        self.assertEqual(resumo["enfileirados"], 8)
+        self.assertEqual(muitos, poucos)
+
+        msg = Notificacao.objects.get(usuario=dono)
+        self.assertEqual((msg.destino, msg.status), ("chat-a", "pendente"))
+        self.assertIn("Aluguel: R$ 500,00", msg.mensagem)
+        self.assertIn("Saldo:* R$ 200,00", msg.mensagem)
+
+    def test_usuario_sem_empresa_nao_ve_numeros_de_outra(self):
+        avulso = User.objects.create_user(username="avulso", password="123456")
+        Perfil.objects.filter(user=avulso).delete()
+        avulso = User.objects.get(pk=avulso.pk)
+        CanalNotificacaoUsuario.objects.create(usuario=avulso, canal="telegram", destino="chat-x")
+
+        metricas = analisar_financas_semana(avulso)
+        self.assertEqual((metricas["receitas"], metricas["despesas"]), (0.0, 0.0))
+        self.assertEqual(metricas["categorias_despesa"], [])
+
+        executar_notificacoes_semanais(canal="telegram")
+        msg = Notificacao.objects.get(usuario=avulso).mensagem
+        self.assertIn("Receitas:* R$ 0,00", msg)
+        self.assertNotIn("Ração", msg)
+        self.assertNotIn("Aluguel", msg)
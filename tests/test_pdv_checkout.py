@@ -0,0 +1,183 @@
+# tests/test_pdv_checkout.py
+import json
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import Empresa, Perfil
+from estoque.models import LoteProduto, MovimentoEstoque, Produto, SaldoLote, SaldoProduto
+from financeiro.models import Transacao
+from pdv.models import ChaveIdempotencia, Venda
+
+User = get_user_model()
+
+
+class _CarrinhoMixin:
+    def setUp(self):
+        self.empresa = Empresa.objects.create(
+            nome="Pet Shop Teste", politica_lote_vencido="justificar"
+        )
+        self.user = User.objects.create_user(username="caixa", password="123456")
+        Perfil.objects.filter(user=self.user).update(empresa=self.empresa)
+        self.client.login(username="caixa", password="123456")
+
+        hoje = timezone.localdate()
+        self.produtos = []
+        for i in range(3):
+            p = Produto.objects.create(
+                empresa=self.empresa,
+                nome=f"Produto {i}",
+                tipo="PRODUTO",
+                preco_venda=Decimal("10.00"),
+                controla_estoque=True,
+            )
+            for d in (30, 60, 90):
+                lote = LoteProduto.objects.create(
+                    produto=p, codigo=f"{i}-{d}", validade=hoje + timedelta(days=d)
+                )
+                MovimentoEstoque.objects.create(
+                    empresa=self.empresa, produto=p, lote=lote, tipo="E", quantidade=2
+                )
+            self.produtos.append(p)
+
+    def _finalizar(self, itens, chave=None, client=None, **extra):
+        payload = {"itens": itens, "forma_pagamento": "pix", **extra}
+        headers = {"HTTP_IDEMPOTENCY_KEY": chave} if chave else {}
+        return (client or self.client).post(
+            reverse("pdv:api_finalizar"), data=json.dumps(payload), content_type="application/json",
+            **headers,
+        )
+
+
+class PdvCheckoutTests(_CarrinhoMixin, TestCase):
+
+    def test_finalizar_baixa_fifo_em_lote(self):
+        # carrinho mínimo (1 produto, 1 lote) e o cheio (3 produtos, 2 lotes
+        # cada) custam o mesmo número de queries: nada por item nem por lote
+        extra = Produto.objects.create(
+            empresa=self.empresa, nome="Avulso", tipo="PRODUTO",
+            preco_venda=Decimal("5.00"), controla_estoque=True,
+        )
+        lote = LoteProduto.objects.create(
+            produto=extra, codigo="AV", validade=timezone.localdate() + timedelta(days=30)
+        )
+        MovimentoEstoque.objects.create(
+            empresa=self.empresa, produto=extra, lote=lote, tipo="E", quantidade=2
+        )
+        # 1ª venda aquece o que só acontece uma vez (empresa do usuário em
+        # cache, linha do resumo financeiro do dia)
+        self.assertEqual(self._finalizar([{"produto_id": extra.id, "qtd": 1}]).status_code, 200)
+        with CaptureQueriesContext(connection) as minimo:
+            r = self._finalizar([{"produto_id": extra.id, "qtd": 1}])
+        self.assertEqual(r.status_code, 200, r.content)
+
+        itens = [{"produto_id": p.id, "qtd": 3} for p in self.produtos]
+        with CaptureQueriesContext(connection) as ctx:
+            r = self._finalizar(itens)
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertTrue(r.json()["ok"])
+        self.assertEqual(len(ctx.captured_queries), len(minimo.captured_queries))
+
+        venda = Venda.objects.get(pk=r.json()["venda_id"])
+        self.assertEqual(venda.total, Decimal("90.00"))
+        self.assertEqual(venda.itens.count(), 3)
+
+        for p in self.produtos:
+            self.assertEqual(SaldoProduto.saldo_de(self.empresa.id, p.id), Decimal("3"))
+            lotes = list(p.lotes.order_by("validade"))
+            saldos = SaldoLote.saldos_de([lote.id for lote in lotes])
+            # FIFO: esvazia o lote mais antigo e consome 1 do seguinte
+            self.assertEqual([saldos[lote.id] for lote in lotes], [0, 1, 2])
+
+    def test_estoque_insuficiente_nao_cria_venda(self):
+        r = self._finalizar([{"produto_id": self.produtos[0].id, "qtd": 7}])
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(r.json()["max_qtd"], 6)
+        self.assertFalse(Venda.objects.exists())
+
+    def test_lote_vencido_exige_justificativa(self):
+        p = self.produtos[0]
+        vencido = LoteProduto.objects.create(
+            produto=p, codigo="VENC", validade=timezone.localdate() - timedelta(days=1)
+        )
+        MovimentoEstoque.objects.create(
+            empresa=self.empresa, produto=p, lote=vencido, tipo="E", quantidade=1
+        )
+
+        r = self._finalizar([{"produto_id": p.id, "qtd": 1}])
+        self.assertEqual(r.status_code, 400)
+        self.assertTrue(r.json()["exige_justificativa"])
+        self.assertEqual(r.json()["detalhes"][0]["lote_id"], vencido.id)
+
+        r = self._finalizar([{"produto_id": p.id, "qtd": 1}], justificativa_lote="cliente ciente")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertEqual(SaldoLote.saldos_de([vencido.id])[vencido.id], Decimal("0"))
+
+    def test_reenvio_com_idempotency_key_devolve_a_mesma_venda(self):
+        itens = [{"produto_id": self.produtos[0].id, "qtd": 2}]
+        primeira = self._finalizar(itens, chave="caixa1-0001")
+        self.assertEqual(primeira.status_code, 200, primeira.content)
+
+        with CaptureQueriesContext(connection) as ctx:
+            reenvio = self._finalizar(itens, chave="caixa1-0001")
+        self.assertEqual(reenvio.json(), primeira.json())
+        self.assertEqual(reenvio["Idempotent-Replayed"], "true")
+        # só lê a chave gravada: sem lock de produto e sem FIFO
+        sqls = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("FOR UPDATE", sqls)
+        self.assertNotIn("estoque_", sqls)
+
+        self.assertEqual(Venda.objects.count(), 1)
+        self.assertEqual(Transacao.objects.filter(empresa=self.empresa).count(), 1)
+        self.assertEqual(SaldoProduto.saldo_de(self.empresa.id, self.produtos[0].id), Decimal("4"))
+        self.assertEqual(ChaveIdempotencia.objects.get().venda_id, primeira.json()["venda_id"])
+
+        # mesma chave com outro carrinho: recusa; chave nova: venda nova
+        outro = [{"produto_id": self.produtos[1].id, "qtd": 1}]
+        self.assertEqual(self._finalizar(outro, chave="caixa1-0001").status_code, 422)
+        self.assertEqual(self._finalizar(itens, chave="caixa1-0002").status_code, 200)
+        self.assertEqual(Venda.objects.count(), 2)
+
+    def test_erro_de_negocio_nao_grava_a_chave(self):
+        itens = [{"produto_id": self.produtos[0].id, "qtd": 7}]
+        self.assertEqual(self._finalizar(itens, chave="k1").status_code, 400)
+        self.assertFalse(ChaveIdempotencia.objects.exists())
+
+
+class PdvIdempotenciaConcorrenteTests(_CarrinhoMixin, TransactionTestCase):
+    """
+    Tentativas simultâneas com a mesma chave (timeout no front + retry).
+    """
+
+    def test_mesma_chave_em_paralelo_vende_uma_vez(self):
+        itens = [{"produto_id": self.produtos[0].id, "qtd": 1}]
+        largada = threading.Barrier(4)
+        respostas = []
+
+        def rodar():
+            client = Client()
+            client.login(username="caixa", password="123456")
+            try:
+                largada.wait()
+                respostas.append(self._finalizar(itens, chave="retry-1", client=client).json())
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=rodar) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=30)
+
+        self.assertEqual(len(respostas), 4)
+        self.assertTrue(all(r["ok"] for r in respostas), respostas)
+        self.assertEqual(len({r["venda_id"] for r in respostas}), 1)
+        self.assertEqual(Venda.objects.count(), 1)
+        self.assertEqual(SaldoProduto.saldo_de(self.empresa.id, self.produtos[0].id), Decimal("5"))
@@ -16,10 +16,14 @@ def _baixar_estoque_fifo(produto, quantidade, venda):
     """
     restante = Decimal(str(quantidade))
 
-    lotes = LoteProduto.objects.filter(produto=produto).order_by("validade", "criado_em")
+    lotes = (
+        LoteProduto.objects.filter(produto=produto)
+        .com_saldo()
+        .order_by("validade", "criado_em")
+    )
 
     for lote in lotes:
-        saldo_lote = Decimal(str(lote.saldo_atual or 0))
+        saldo_lote = Decimal(str(lote.saldo or 0))
         if saldo_lote <= 0:
             continue
 